@@ -11,12 +11,18 @@ FIX F-03: Provides require_self() — enforces that the authenticated user
 
 SEC-012: Log only exception type, not full message, to avoid leaking
          internal URLs or partial tokens into Vercel function logs.
+
+PERF: get_current_user_id() verifies the JWT locally (utils/jwt_verify.py)
+      instead of a Supabase Auth round-trip per request. The remote check is
+      kept behind AUTH_JWT_LOCAL_VERIFY / AUTH_JWT_REMOTE_FALLBACK.
 """
 import logging
+import jwt
 from fastapi import HTTPException, Request, status
-from supabase import Client
 
-from .utils.supabase_client import get_supabase, get_user_supabase
+from .config import settings
+from .utils import jwt_verify
+from .utils.supabase_client import UserSupabase, get_supabase, get_user_supabase
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +54,36 @@ async def get_current_user_id(request: Request) -> str:
             detail="Empty Bearer token",
         )
 
+    cached = jwt_verify.cached_user_id(token)
+    if cached is not None:
+        return cached
+
+    if settings.AUTH_JWT_LOCAL_VERIFY:
+        try:
+            return jwt_verify.verify_token(token)
+        except jwt.InvalidTokenError as e:
+            # Definitive: bad signature, expired, wrong aud/iss, malformed.
+            logger.info(f"Token rejected locally: {type(e).__name__}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired token",
+            )
+        except jwt_verify.KeyNotConfigured:
+            pass  # no local key source — verify remotely, see utils/jwt_verify.py
+        except jwt_verify.KeyUnavailable as e:
+            if not settings.AUTH_JWT_REMOTE_FALLBACK:
+                logger.warning(f"Token verification key unavailable: {e}")
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Token verification failed",
+                )
+            # Opt-in: fall through to the remote check below.
+
+    return _verify_remotely(token)
+
+
+def _verify_remotely(token: str) -> str:
+    """Ask Supabase Auth whether the token is valid — one HTTP round-trip."""
     try:
         supabase = get_supabase()
         result = supabase.auth.get_user(token)
@@ -56,6 +92,7 @@ async def get_current_user_id(request: Request) -> str:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid or expired token",
             )
+        jwt_verify.remember(token, result.user.id, jwt_verify.unverified_exp(token))
         return result.user.id
     except HTTPException:
         raise
@@ -85,7 +122,7 @@ async def get_current_jwt(request: Request) -> str:
     return token
 
 
-async def get_user_db(request: Request) -> Client:
+async def get_user_db(request: Request) -> UserSupabase:
     """
     FastAPI dependency: returns a user-scoped Supabase client.
     Queries through this client enforce Row Level Security.
@@ -113,33 +150,27 @@ def require_mcgill_email(user_id: str) -> None:
     """
     if user_id in _ADMIN_USER_IDS:
         return
-    from .config import settings as _settings
-    admin_emails = {e.strip().lower() for e in _settings.ADMIN_EMAILS.split(",") if e.strip()}
-    try:
-        sb = get_supabase()
-        u = sb.auth.admin.get_user_by_id(user_id)
-        email = (getattr(u.user, "email", None) or "").lower()
-        confirmed = bool(getattr(u.user, "email_confirmed_at", None))
-        if email in admin_emails:
-            return
-        # Domain check AND confirmed — prevents fake signup with an unverified
-        # McGill address from gaining access even if Supabase confirm-email is off.
-        if not (any(email.endswith(d) for d in _MCGILL_DOMAINS) and confirmed):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail={
-                    "code": "mcgill_email_required",
-                    "message": "This feature is only available for McGill students (@mcgill.ca or @mail.mcgill.ca).",
-                },
-            )
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.warning("McGill email check failed for %s: %s", user_id, type(e).__name__)
+    from .utils.auth_identity import get_identity
+    identity = get_identity(user_id)
+    if not identity["found"]:
+        logger.warning("McGill email check failed for %s: auth lookup unavailable", user_id)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={"code": "mcgill_email_required", "message": "Could not verify McGill email."},
         )
+    if identity["is_admin"]:
+        return
+    # Domain check AND confirmed — prevents fake signup with an unverified
+    # McGill address from gaining access even if Supabase confirm-email is off.
+    email = identity["email"]
+    if not (any(email.endswith(d) for d in _MCGILL_DOMAINS) and identity["email_confirmed"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={
+                "code": "mcgill_email_required",
+                "message": "This feature is only available for McGill students (@mcgill.ca or @mail.mcgill.ca).",
+            },
+        )
 
 
 def require_self(current_user_id: str, user_id: str) -> None:
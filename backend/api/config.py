@@ -33,6 +33,36 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_SERVICE_KEY: str
     SUPABASE_ANON_KEY: str = ""  # Public anon key — safe to expose; RLS enforces access
+    # Circuit breaker in supabase_client.with_retry(): after this many
+    # consecutive connection failures/timeouts a class (read or write) fails
+    # fast for DB_BREAKER_COOLDOWN_SECONDS, then lets one probe through.
+    DB_BREAKER_FAILURE_THRESHOLD: int = 5
+    DB_BREAKER_COOLDOWN_SECONDS: float = 15.0
+    # Per-query metrics (utils/db_metrics.py): every PostgREST call is timed
+    # per route into one-minute buckets kept this long, read by
+    # /api/admin/db-stats. DB_SERVER_TIMING adds a Server-Timing header with
+    # each response's DB time — off by default, it reveals query counts.
+    DB_METRICS_ENABLED: bool = True
+    DB_METRICS_WINDOW_MINUTES: int = 15
+    DB_SERVER_TIMING: bool = False
+
+    # ── Auth (access-token verification, see utils/jwt_verify.py) ────────
+    # Project JWT secret (Supabase → Settings → API). Verifies HS256 tokens
+    # locally; asymmetric (RS256/ES256) tokens use the project JWKS instead.
+    # Unset, HS256 tokens are verified remotely with Supabase Auth.
+    SUPABASE_JWT_SECRET: str = ""
+    SUPABASE_JWT_AUDIENCE: str = "authenticated"
+    AUTH_JWT_LOCAL_VERIFY: bool = True
+    # Opt-in: when the JWKS can't be fetched, ask Supabase Auth instead of
+    # rejecting the token.
+    AUTH_JWT_REMOTE_FALLBACK: bool = False
+    AUTH_TOKEN_CACHE_SECONDS: int = 60
+    AUTH_JWKS_CACHE_SECONDS: int = 600
+    # Auth-identity cache (utils/auth_identity.py): admin / McGill / verified
+    # checks share one auth.admin lookup per user per TTL. Failed lookups are
+    # cached for the shorter negative TTL so an Auth outage isn't amplified.
+    AUTH_IDENTITY_CACHE_SECONDS: int = 60
+    AUTH_IDENTITY_NEGATIVE_CACHE_SECONDS: int = 10
 
     # ── Notifications ──────────────────────────────────────────────
     RESEND_API_KEY: str = ""
@@ -47,6 +77,10 @@ class Settings(BaseSettings):
     # requests are sent while verification email delivery is broken. Remove
     # with the manual-approval flow once McGill IT resolves the filtering.
     APPROVAL_NOTIFY_EMAIL: str = "symbolosadvsry@gmail.com"
+    # Users per chunk when a reminder card is broadcast to everyone
+    # (utils/broadcast.py). Each chunk is one Inngest step; at most 1000,
+    # the PostgREST row cap the fallback path reads users under.
+    BROADCAST_CHUNK_SIZE: int = 500
 
     @field_validator("ADMIN_SECRET")
     @classmethod
@@ -98,14 +132,67 @@ class Settings(BaseSettings):
     CLAUDE_CARDS_MODEL: str = "claude-haiku-4-5-20251001"
     CLAUDE_MAX_TOKENS: int = 2048   # Balanced between quality and cost; increase for longer responses
 
+    # ── LLM gateway (utils/llm.py) ───────────────────────────────────────
+    # Claude calls in flight per instance, across every feature. The
+    # Anthropic connection pool is sized to match.
+    LLM_MAX_CONCURRENCY: int = 12
+    # Slots only "interactive" features (chat, card threads) may take, so a
+    # burst of card generation can never occupy all of them.
+    LLM_RESERVED_INTERACTIVE: int = 4
+    # Most slots "bulk" features (card generation, translation) hold at once.
+    LLM_BULK_MAX_CONCURRENCY: int = 6
+    # Longest a call waits for a slot before answering 503.
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 30.0
+    # Retries on 429 / 5xx / 529 / connection errors, exponential backoff
+    # with jitter from LLM_RETRY_BASE_SECONDS, Retry-After honoured, capped.
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_SECONDS: float = 1.0
+    LLM_RETRY_MAX_SECONDS: float = 20.0
+    LLM_TIMEOUT_SECONDS: float = 120.0
+    # Feature → tier overrides (interactive | standard | bulk) on top of
+    # llm.FEATURE_TIERS. JSON object in the environment.
+    LLM_FEATURE_TIERS: dict[str, str] = {}
+
     # ── Chat Configuration ───────────────────────────────────────────────
     CHAT_HISTORY_LIMIT: int = 10    # Max history entries returned per request
     CHAT_CONTEXT_MESSAGES: int = 6  # Messages sent to Claude for context
     MAX_MESSAGE_LENGTH: int = 4000  # Hard cap on user message length
+    # Student context shared by chat and cards (utils/student_context.py).
+    # Writes invalidate it; the TTL is only a backstop across instances.
+    STUDENT_CONTEXT_TTL_SECONDS: int = 300
+    STUDENT_CONTEXT_CACHE_MAX_ENTRIES: int = 1000
+    STUDENT_CONTEXT_CACHE_MAX_MB: int = 32
+    # Write a /send turn to chat_messages after the response has gone out
+    # instead of before. Saves one round-trip of latency, but the turn is
+    # lost if the process dies first — and serverless runtimes may freeze
+    # the function as soon as the response is sent, so leave it off there.
+    CHAT_DEFER_PERSIST: bool = False
+    # Token budget per student-data prompt section (completed, favorites,
+    # calendar, ...) on top of prompt_budget.DEFAULT_BUDGETS. JSON object in
+    # the environment; see /api/admin/stats "prompt_sections" to tune.
+    PROMPT_SECTION_BUDGETS: dict[str, int] = {}
+
+    # ── Card precompute (cards.py, Inngest precompute-cards) ─────────────
+    # Nightly, students whose AI cards go stale within this many hours (or
+    # went stale that recently) and who saw their current cards get new ones
+    # through the Message Batches API, so Home doesn't generate on open.
+    CARDS_PRECOMPUTE_LEAD_HOURS: int = 24
+    # Most students per nightly batch; 0 turns precompute off.
+    CARDS_PRECOMPUTE_MAX_USERS: int = 2000
 
     # ── Course Search Configuration ──────────────────────────────────────
     DEFAULT_SEARCH_LIMIT: int = 50  # Default page size for search results
     MAX_SEARCH_LIMIT: int = 200     # Absolute max to prevent huge queries
+    # Budget for utils/cache.py's search_cache (search, term offerings, RMP
+    # lookups) per instance; least recently used entries go first.
+    SEARCH_CACHE_MAX_ENTRIES: int = 2000
+    SEARCH_CACHE_MAX_MB: int = 32
+    # Optional shared L2 behind those caches: any Redis-protocol URL
+    # (redis:// or rediss://, e.g. Upstash). Empty = in-process L1 only.
+    CACHE_REDIS_URL: str = ""
+    CACHE_L2_PREFIX: str = "ai-advisor:cache:"
+    CACHE_L2_TIMEOUT_SECONDS: float = 0.25
+    CACHE_L2_COOLDOWN_SECONDS: float = 30.0
 
     # ── Security / CORS ──────────────────────────────────────────────────
     # `capacitor://localhost` (iOS) and `https://localhost` (Android) are the
@@ -164,6 +251,37 @@ class Settings(BaseSettings):
     RATE_LIMIT_PER_MINUTE:        int = 100  # General API rate limit per IP
     CHAT_RATE_LIMIT_PER_MINUTE:   int = 50   # /api/chat/* per IP (Claude-backed)
     CLAUDE_RATE_LIMIT_PER_MINUTE: int = 30   # cards, electives, transcript (heavy AI)
+    VERIFICATION_RATE_LIMIT_PER_MINUTE: int = 20  # unauthenticated verify/poll endpoints
+    # Route → tier table for the rate-limit middleware. Keys are route
+    # template prefixes below API_PREFIX, matched on whole path segments;
+    # the longest matching prefix wins and anything unlisted is "default".
+    # Tiers: chat | claude | verification | default | exempt. Override with
+    # a JSON object in the environment.
+    RATE_LIMIT_ROUTE_TIERS: dict[str, str] = {
+        "/chat":                 "chat",
+        "/cards/generate":       "claude",
+        "/cards/stream":         "claude",
+        "/cards/ask":            "claude",
+        "/cards/retranslate":    "claude",
+        "/electives/recommend":  "claude",
+        "/transcript/parse":     "claude",
+        "/transcript/import":    "claude",
+        "/syllabus/parse":       "claude",
+        # Unauthenticated verification endpoints: tighter limit to block UUID
+        # enumeration. Legitimate polling is every 3 s (~20/min).
+        "/auth/check-verified":  "verification",
+        "/auth/verify-email":    "verification",
+        # Inngest callback — verified by HMAC signature, not rate-limited.
+        "/inngest":              "exempt",
+    }
+    # Two-tier limiter (main.HybridRateLimiter): how often local token
+    # leases are topped up from `rate_limits`, and the largest lease one
+    # instance may hold for a key, as a fraction of that key's limit.
+    RATE_LIMIT_FLUSH_INTERVAL_SECONDS: float = 2.0
+    RATE_LIMIT_MAX_LEASE_FRACTION: float = 0.25
+    # Longest the rate-limit middleware waits on Supabase (retries included)
+    # before the in-memory fallback decides the request instead.
+    RATE_LIMIT_DEADLINE_SECONDS: float = 0.75
 
     # ── Timeouts (seconds) ───────────────────────────────────────────────
     REQUEST_TIMEOUT: int = 30
@@ -178,6 +296,39 @@ class Settings(BaseSettings):
             raise ValueError(f"ENVIRONMENT must be one of {allowed}")
         return v
 
+    @field_validator("RATE_LIMIT_ROUTE_TIERS")
+    @classmethod
+    def validate_rate_limit_route_tiers(cls, v: dict) -> dict:
+        allowed = {"chat", "claude", "verification", "default", "exempt"}
+        bad = {p: t for p, t in v.items() if t not in allowed}
+        if bad:
+            raise ValueError(f"RATE_LIMIT_ROUTE_TIERS has unknown tiers {bad}; allowed: {sorted(allowed)}")
+        return {("/" + p.strip("/").lower()): t for p, t in v.items()}
+
+    @field_validator("LLM_FEATURE_TIERS")
+    @classmethod
+    def validate_llm_feature_tiers(cls, v: dict) -> dict:
+        allowed = {"interactive", "standard", "bulk"}
+        bad = {f: t for f, t in v.items() if t not in allowed}
+        if bad:
+            raise ValueError(f"LLM_FEATURE_TIERS has unknown tiers {bad}; allowed: {sorted(allowed)}")
+        return v
+
+    @field_validator("PROMPT_SECTION_BUDGETS")
+    @classmethod
+    def validate_prompt_section_budgets(cls, v: dict) -> dict:
+        bad = {s: b for s, b in v.items() if b < 1}
+        if bad:
+            raise ValueError(f"PROMPT_SECTION_BUDGETS must be positive token counts, got {bad}")
+        return v
+
+    @field_validator("BROADCAST_CHUNK_SIZE")
+    @classmethod
+    def validate_broadcast_chunk_size(cls, v: int) -> int:
+        if not 1 <= v <= 1000:
+            raise ValueError(f"BROADCAST_CHUNK_SIZE must be between 1 and 1000, got {v}")
+        return v
+
     @field_validator("SUPABASE_URL")
     @classmethod
     def validate_supabase_url(cls, v: str) -> str:
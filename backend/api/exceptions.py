@@ -5,6 +5,8 @@ SEC-015: DatabaseException no longer returns raw Supabase/Postgres error strings
          to the client. Internal details are logged server-side only.
 SEC-017: UserAlreadyExistsException no longer includes email in response details
          (minor enumeration risk).
+DatabaseUnavailableException: 503 + Retry-After while the Supabase circuit
+         breaker is open (see utils/supabase_client.py).
 """
 from fastapi import HTTPException, Request, status
 from fastapi.responses import JSONResponse
@@ -67,11 +69,12 @@ class AppException(HTTPException):
         status_code: int,
         code: ErrorCode,
         message: str,
-        details: Optional[Any] = None
+        details: Optional[Any] = None,
+        headers: Optional[dict] = None,
     ):
         self.code = code
         self.details = details
-        super().__init__(status_code=status_code, detail=message)
+        super().__init__(status_code=status_code, detail=message, headers=headers)
 
 
 # Specific Exceptions
@@ -136,6 +139,34 @@ class DatabaseException(AppException):
         )
 
 
+class DatabaseUnavailableException(AppException):
+    """The circuit breaker for this class of Supabase call is open: recent
+    calls failed at the connection level, so we answer immediately instead
+    of queueing another doomed reconnect. Not logged per request — the
+    breaker logs once when it trips."""
+    def __init__(self, operation: str, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            code=ErrorCode.DATABASE_CONNECTION_ERROR,
+            message="Database temporarily unavailable. Please try again shortly.",
+            details={"operation": operation},
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class LLMBusyException(AppException):
+    """Every LLM gateway slot this call's tier may use stayed busy for
+    LLM_QUEUE_TIMEOUT_SECONDS (see utils/llm.py). Answered as a 503 rather
+    than holding the request open indefinitely."""
+    def __init__(self, feature: str, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            code=ErrorCode.AI_SERVICE_ERROR,
+            message="AI service is busy. Please try again in a moment.",
+            details={"feature": feature},
+            headers={"Retry-After": str(retry_after)},
+        )
+
 
 # NOTE: AIServiceException, MessageTooLongException, and RateLimitException
 # were removed — they were defined but never raised anywhere in the codebase.
@@ -162,7 +193,8 @@ async def app_exception_handler(request: Request, exc: AppException):
             "code": exc.code,
             "message": exc.detail,
             "details": exc.details
-        }
+        },
+        headers=exc.headers,
     )
 
 
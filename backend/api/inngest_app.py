@@ -2,7 +2,8 @@
 Inngest background job definitions.
 
 Functions registered here are triggered by events sent from the transcript
-and syllabus upload endpoints. Inngest calls back our /api/inngest endpoint
+and syllabus upload endpoints and the daily cron (reminder-card broadcasts),
+or on a schedule (rate_limits sweeper). Inngest calls back our /api/inngest endpoint
 on Vercel once per job, so each job runs in its own serverless invocation
 with no timeout on the HTTP request that originated the upload.
 
@@ -99,9 +100,12 @@ async def process_transcript(ctx: inngest.Context) -> dict:
         import json as _json
         import anthropic
         from .routes.transcript import UnreadableTranscriptError
+        from .exceptions import LLMBusyException
         if isinstance(exc, UnreadableTranscriptError):
             # User-facing, actionable message (scanned/no-text transcript).
             msg = str(exc)
+        elif isinstance(exc, LLMBusyException):
+            msg = "The AI service is busy right now. Please try again in a moment."
         elif isinstance(exc, (anthropic.APIConnectionError, anthropic.APITimeoutError)):
             msg = "Couldn't reach the AI service. Please try again in a moment."
         elif isinstance(exc, anthropic.APIStatusError):
@@ -167,6 +171,7 @@ async def process_syllabus(ctx: inngest.Context) -> dict:
 
     try:
         from .routes.syllabus import _extract_syllabus_data, _persist_syllabus_result
+        from .exceptions import LLMBusyException
         import json
         import anthropic
 
@@ -196,6 +201,13 @@ async def process_syllabus(ctx: inngest.Context) -> dict:
                     "success": False,
                     "error": "Failed to parse syllabus — Claude returned invalid data.",
                 })
+            except LLMBusyException:
+                # Transient: every LLM gateway slot stayed busy (utils/llm.py).
+                all_results.append({
+                    "filename": filename,
+                    "success": False,
+                    "error": "The AI service is busy right now. Please try again in a moment.",
+                })
             except (anthropic.APIConnectionError, anthropic.APITimeoutError) as exc:
                 # Transient: couldn't reach the AI service (network blip / timeout).
                 # Distinct message so the student knows to simply retry.
@@ -252,5 +264,71 @@ async def process_syllabus(ctx: inngest.Context) -> dict:
         raise
 
 
+# ── rate_limits sweeper ───────────────────────────────────────────────────────
+# Drops expired rate-limit / LLM-budget / anomaly windows so no user request
+# has to. See utils/rate_limit_maintenance.py. The returned report (rows per
+# namespace, table size, duration) shows up on the run in the Inngest UI.
+
+@inngest_client.create_function(
+    fn_id="sweep-rate-limits",
+    trigger=inngest.TriggerCron(cron="*/10 * * * *"),
+    retries=1,
+)
+async def sweep_rate_limits(ctx: inngest.Context) -> dict:
+    import asyncio
+    from .utils.rate_limit_maintenance import sweep_rate_limits as _sweep
+
+    # Sync supabase client — keep it off the event loop.
+    return await asyncio.to_thread(_sweep)
+
+
+# ── Reminder-card broadcasts ──────────────────────────────────────────────────
+# Sent by the daily cron (cards.run_reminder_broadcast) on a reminder's dates.
+# One step per chunk of users — see utils/broadcast.py. A run that fails or
+# times out resumes after its last finished chunk; one run per broadcast at
+# a time, and the event id keeps it to one run per broadcast per day.
+
+@inngest_client.create_function(
+    fn_id="broadcast-cards",
+    trigger=inngest.TriggerEvent(event="cards/broadcast"),
+    retries=3,
+    concurrency=[inngest.Concurrency(limit=1, key="event.data.broadcast")],
+)
+async def broadcast_cards(ctx: inngest.Context) -> dict:
+    from datetime import date
+    from .routes.cards import broadcast_spec
+    from .utils.broadcast import run_in_steps
+
+    name = ctx.event.data["broadcast"]
+    day  = date.fromisoformat(ctx.event.data["date"])
+    if broadcast_spec(name, day) is None:
+        return {"broadcast": name, "sent": 0, "skipped": "not_scheduled"}
+    result = await run_in_steps(ctx.step, lambda: broadcast_spec(name, day))
+    logger.info("Broadcast %s: %s", name, result)
+    return {"broadcast": name, **result}
+
+
+# ── Advisor-card precompute ───────────────────────────────────────────────────
+# Nightly, off-peak for McGill (~3am Montreal): regenerates the AI cards of
+# active students whose cards go stale within a day, through Message Batches,
+# so their next Home visit doesn't wait on generation. Each chunk's submit and
+# save is its own step and the run sleeps between status polls (up to a day),
+# so no invocation does much work or waits on a batch. See the precompute
+# section of routes/cards.py.
+
+@inngest_client.create_function(
+    fn_id="precompute-cards",
+    trigger=inngest.TriggerCron(cron="0 7 * * *"),
+    retries=2,
+    concurrency=[inngest.Concurrency(limit=1)],
+)
+async def precompute_cards(ctx: inngest.Context) -> dict:
+    from .routes.cards import run_precompute_in_steps
+
+    result = await run_precompute_in_steps(ctx.step)
+    logger.info("Card precompute: %s", result)
+    return result
+
+
 # All functions to register with FastAPI
-INNGEST_FUNCTIONS = [process_transcript, process_syllabus]
+INNGEST_FUNCTIONS = [process_transcript, process_syllabus, sweep_rate_limits, broadcast_cards, precompute_cards]
@@ -5,19 +5,24 @@ FIX #13: Replaced InMemoryRateLimiter with SupabaseRateLimiter.
 SEC-006: Tightened in-memory fallback limit from 10 to 3 rpm (per-instance on serverless).
 SEC-009: Removed 'unsafe-inline' from script-src CSP; added frame-ancestors 'none'.
 SEC-010: Normalise rate limit path key to prevent bypass via trailing slash/case.
+PERF: HybridRateLimiter — local token leases + one batched reservation RPC per
+      flush instead of up to two Postgres round-trips per request.
+PERF: Rate-limit buckets keyed by matched route template (RouteTemplateIndex)
+      with tiers from settings.RATE_LIMIT_ROUTE_TIERS, not per concrete URL.
 """
 from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import os
 import time
 import uuid
 import logging
 import base64
 import json as _json
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 
 
 from .config import settings
@@ -55,8 +60,10 @@ def _init_sentry() -> None:
 _init_sentry()
 from .logging_config import setup_logging
 from .auth import get_current_user_id
+from .utils import db_metrics
 from .exceptions import (
     AppException,
+    DatabaseUnavailableException,
     app_exception_handler,
     validation_exception_handler,
     general_exception_handler,  
@@ -96,6 +103,14 @@ def _validate_startup():
             "Set SUPABASE_ANON_KEY to enable Row Level Security enforcement."
         )
 
+    if settings.AUTH_JWT_LOCAL_VERIFY and not settings.SUPABASE_JWT_SECRET:
+        logger.warning(
+            "SUPABASE_JWT_SECRET is not set — HS256 access tokens are verified "
+            "remotely with Supabase Auth (one round-trip per new token). Fine if "
+            "the project signs with asymmetric keys (verified via JWKS); otherwise "
+            "set it to verify tokens locally."
+        )
+
     if errors:
         for err in errors:
             logger.critical(f"STARTUP VALIDATION FAILED: {err}")
@@ -108,6 +123,15 @@ def _validate_startup():
 
 # ── FIX #13: Supabase-backed rate limiter ────────────────────────────────────
 
+def _db_unreachable(exc: Exception) -> bool:
+    """A rate-limit call that failed because Supabase couldn't be reached —
+    a dropped connection, a timeout, or the circuit breaker refusing the
+    call while it's open — as opposed to the RPC itself being missing."""
+    from .utils.supabase_client import _is_connection_error, _is_timeout
+    return (isinstance(exc, DatabaseUnavailableException)
+            or _is_connection_error(exc) or _is_timeout(exc))
+
+
 class SupabaseRateLimiter:
     """
     Sliding-window rate limiter backed by Supabase (Postgres).
@@ -123,16 +147,14 @@ class SupabaseRateLimiter:
       • window_start = current UTC minute truncated to the minute boundary
       • On each request: upsert (key, window_start) with count+1
       • If count after upsert ≥ limit → reject
-      • Rows older than _PRUNE_AFTER are deleted lazily (every _PRUNE_EVERY calls)
+      • Expired windows are swept by utils/rate_limit_maintenance.py on a
+        schedule, never on the request path
     """
 
     _WINDOW_SECONDS = 60
-    _PRUNE_AFTER    = timedelta(minutes=10)
-    _PRUNE_EVERY    = 500  # prune stale rows once every N is_allowed() calls
 
     def __init__(self, default_rpm: int = 100):
         self.default_rpm = default_rpm
-        self._call_count = 0
         self._fallback_counts: dict = {}  # F-04: in-memory fallback for DB outages
 
     @staticmethod
@@ -203,8 +225,7 @@ class SupabaseRateLimiter:
                 # for a genuinely different failure — e.g. the RPC function
                 # not existing yet — where a fresh connection wouldn't help
                 # and retrying the SAME rpc() call would just fail again.
-                from .utils.supabase_client import _is_connection_error, _is_timeout
-                if _is_connection_error(rpc_exc) or _is_timeout(rpc_exc):
+                if _db_unreachable(rpc_exc):
                     raise
                 # Fallback: read + write (slightly less atomic but fine for our
                 # traffic levels — duplicate requests within microseconds would
@@ -231,11 +252,6 @@ class SupabaseRateLimiter:
                         'updated_at': datetime.now(timezone.utc).isoformat(),
                     }).execute()
 
-            # Lazy prune
-            self._call_count += 1
-            if self._call_count % self._PRUNE_EVERY == 0:
-                self._prune(supabase)
-
             return new_count < limit
 
         try:
@@ -255,14 +271,10 @@ class SupabaseRateLimiter:
             # Lazy import, matching every other supabase_client use in this
             # module — avoids a circular import and keeps cold-start fast.
             #
-            # is_allowed() is called synchronously from inside `async def`
-            # middleware, so with_retry's time.sleep backoff can block the
-            # event loop for up to ~0.9s (MAX_RETRIES=3) on a genuine
-            # multi-attempt retry. That matches every other synchronous
-            # Supabase call already wrapped in with_retry throughout this
-            # codebase (get_user_by_id, create_user, …) called the same way
-            # from async routes — not a new risk this introduces, just the
-            # same accepted tradeoff applied consistently.
+            # with_retry's time.sleep backoff blocks the calling thread for up
+            # to ~0.9s (MAX_RETRIES=3) on a genuine multi-attempt retry. The
+            # middleware therefore uses is_allowed_async() below instead;
+            # this sync path remains for threads and scripts.
             from .utils.supabase_client import with_retry
             return with_retry("rate_limiter", _run, retry_on_timeout=True)
 
@@ -274,19 +286,365 @@ class SupabaseRateLimiter:
             )
             return self._fallback_is_allowed(key)
 
-    def _prune(self, supabase) -> None:
-        """Delete rate_limit rows older than _PRUNE_AFTER. Best-effort."""
+    # ── Async path (used by the middleware) ──────────────────────────────────
+    # is_allowed() is synchronous and goes through with_retry, whose
+    # time.sleep backoff froze the whole event loop — every concurrent request
+    # on the instance — for up to ~0.9s during a Supabase blip. The async path
+    # awaits the async client, backs off with asyncio.sleep, and gives up at
+    # _DEADLINE: past that, the in-memory fallback decides this request.
+    _DEADLINE = settings.RATE_LIMIT_DEADLINE_SECONDS
+
+    def _get_async_supabase(self):
+        from .utils.supabase_client import get_async_supabase
+        return get_async_supabase()
+
+    async def is_allowed_async(self, key: str, rpm: int | None = None) -> bool:
+        """is_allowed() for the event loop, bounded by _DEADLINE."""
+        try:
+            return await asyncio.wait_for(self._is_allowed_db_async(key, rpm), timeout=self._DEADLINE)
+        except asyncio.TimeoutError:
+            logger.error(
+                f"[SECURITY] Rate limiter missed its {self._DEADLINE}s deadline — "
+                f"in-memory fallback (limit={self._FALLBACK_RPM} rpm) for this request."
+            )
+        except Exception as e:
+            logger.error(
+                f"[SECURITY] Rate limiter DB unavailable — falling back to in-memory "
+                f"(limit={self._FALLBACK_RPM} rpm). Multi-instance protection is "
+                f"degraded until Supabase recovers. Error: {type(e).__name__}"
+            )
+        return self._fallback_is_allowed(key)
+
+    async def _is_allowed_db_async(self, key: str, rpm: int | None) -> bool:
+        limit = rpm or self.default_rpm
+        window = self._window_start()
+
+        async def _run():
+            # Fetched inside the retried closure — see is_allowed()._run().
+            supabase = await self._get_async_supabase()
+            result = await supabase.rpc(
+                'increment_rate_limit',
+                {'p_key': key, 'p_window': window}
+            ).execute()
+            return result.data
+
+        from .utils.supabase_client import with_retry_async
+        try:
+            new_count = await with_retry_async("rate_limiter", _run, retry_on_timeout=True)
+        except Exception as rpc_exc:
+            if _db_unreachable(rpc_exc):
+                raise
+            # RPC not deployed: the manual read+write fallback only exists on
+            # the sync client — run it off the event loop rather than port it.
+            return await asyncio.to_thread(SupabaseRateLimiter.is_allowed, self, key, rpm)
+        return new_count < limit
+
+
+class HybridRateLimiter(SupabaseRateLimiter):
+    """
+    Two-tier limiter: in-process token buckets decide most requests, and the
+    shared `rate_limits` table hands those buckets their tokens in batched
+    flushes.
+
+    SupabaseRateLimiter pays one (usually two — IP + user bucket) Postgres
+    round-trip per request before the route even runs. Here, per key, this
+    instance holds a small lease of tokens reserved against the key's global
+    count for the current minute:
+
+      • A request that finds a token is admitted with no I/O.
+      • Every _FLUSH_INTERVAL seconds, ONE reserve_rate_limits RPC (see
+        migrations/2026_10_18_rate_limits_reserve.sql) tops up every bucket
+        that was used since the last flush, sized from that use — so steady
+        traffic never waits on Postgres.
+      • Only a bucket that runs dry between flushes (a brand-new key, or a
+        burst) reserves synchronously: one RPC, the same cost as before.
+
+    The RPC grants only what still fits under each key's cap, atomically per
+    row, so the sum of every instance's leases can never exceed it — the
+    global cap holds across instances exactly as with the per-request RPC.
+    The price is slight over-restriction (tokens leased but unused when the
+    minute ends aren't reused elsewhere), which is why leases are sized from
+    recent use and capped at _MAX_LEASE_FRACTION of the limit.
+
+    Falls back to the parent's per-request path when the RPC isn't deployed,
+    or while reservations are failing — a DB outage must still land on the
+    3 rpm in-memory fallback (SEC-006), not on whatever tokens are left.
+    """
+
+    _FLUSH_INTERVAL     = settings.RATE_LIMIT_FLUSH_INTERVAL_SECONDS
+    _MAX_LEASE_FRACTION = settings.RATE_LIMIT_MAX_LEASE_FRACTION
+    _INITIAL_LEASE      = 3    # tokens for a key's first reservation
+    _BULK_RETRY_AFTER   = 300  # seconds before re-probing a missing RPC
+
+    def __init__(self, default_rpm: int = 100):
+        super().__init__(default_rpm=default_rpm)
+        self._window: str | None = None
+        # { key: {"tokens": int, "used": int, "limit": int, "exhausted": bool} }
+        # Current window only.
+        self._buckets: dict[str, dict] = {}
+        self._last_flush = time.monotonic()
+        self._bulk_disabled_until = 0.0
+        self._sync_healthy = True
+        # Async path: one reservation in flight at a time, so a burst of
+        # concurrent requests on a dry bucket shares a single RPC.
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+
+    def _roll_window(self) -> None:
+        window = self._window_start()
+        if window != self._window:
+            # Leases are reserved against one minute's count; a new minute
+            # starts every bucket from scratch.
+            self._window = window
+            self._buckets.clear()
+
+    def _bucket(self, key: str, rpm: int | None) -> dict:
+        limit = rpm or self.default_rpm
+        return self._buckets.setdefault(
+            key, {"tokens": 0, "used": 0, "limit": limit, "exhausted": False},
+        )
+
+    def _take(self, bucket: dict) -> bool:
+        if bucket["tokens"] == 0:
+            return False
+        bucket["tokens"] -= 1
+        bucket["used"] += 1
+        return True
+
+    def _flush_due(self) -> bool:
+        return time.monotonic() - self._last_flush >= self._FLUSH_INTERVAL
+
+    def is_allowed(self, key: str, rpm: int | None = None) -> bool:
+        if time.monotonic() < self._bulk_disabled_until:
+            return super().is_allowed(key, rpm)
+
+        self._roll_window()
+        if not self._sync_healthy:
+            # The last reservation failed. Re-probe once per interval; until
+            # one succeeds every request is decided by the parent, so its
+            # retry and in-memory fallback apply unchanged.
+            if self._flush_due():
+                self._flush()
+            if not self._sync_healthy:
+                return super().is_allowed(key, rpm)
+
+        bucket = self._bucket(key, rpm)
+        if bucket["tokens"] == 0 and not bucket["exhausted"]:
+            if self._flush(demand=key) is None:
+                return super().is_allowed(key, rpm)
+
+        if not self._take(bucket):
+            return False
+        if self._flush_due():
+            self._flush()
+        return True
+
+    async def is_allowed_async(self, key: str, rpm: int | None = None) -> bool:
+        """
+        The middleware's path. Token hits never await anything; periodic
+        top-ups run as a background task; only a dry bucket awaits a
+        reservation, bounded by _DEADLINE like the parent's async path.
+        """
+        if time.monotonic() < self._bulk_disabled_until:
+            return await super().is_allowed_async(key, rpm)
+
+        self._roll_window()
+        if not self._sync_healthy:
+            if self._flush_due():
+                try:
+                    await self._flush_async_bounded()
+                except asyncio.TimeoutError:
+                    pass  # still unhealthy — the parent's bounded path decides
+            if not self._sync_healthy:
+                return await super().is_allowed_async(key, rpm)
+
+        bucket = self._bucket(key, rpm)
+        if bucket["tokens"] == 0 and not bucket["exhausted"]:
+            try:
+                granted = await self._flush_async_bounded(demand=key)
+            except asyncio.TimeoutError:
+                return self._fallback_is_allowed(key)
+            if granted is None:
+                return await super().is_allowed_async(key, rpm)
+
+        if not self._take(bucket):
+            return False
+        if self._flush_due():
+            self._schedule_flush()
+        return True
+
+    def flush(self) -> None:
+        """Top up every active bucket now instead of waiting for the interval."""
+        self._flush()
+
+    def _lease_size(self, bucket: dict, demanded: bool) -> int:
+        # Parent semantics: a request is allowed while the count AFTER it is
+        # still below the limit, i.e. at most limit - 1 per window.
+        cap = bucket["limit"] - 1
+        want = -(-bucket["used"] * 3 // 2)  # ~1.5x last interval's use, rounded up
+        if demanded:
+            want = max(want, self._INITIAL_LEASE)
+        return max(1, min(want, int(cap * self._MAX_LEASE_FRACTION)))
+
+    # ── Reservations ──────────────────────────────────────────────────────────
+    # Split into prepare / RPC / apply so the sync and async paths share
+    # everything except the I/O itself.
+
+    def _prepare_reservation(self, demand: str | None) -> dict | None:
+        """
+        Work out which buckets need tokens. `demand` is a key whose bucket
+        just ran dry under a live request; it always gets a reservation.
+        Returns the RPC params, or None if nothing needs reserving.
+        """
+        wanted: dict[str, tuple[int, int]] = {}
+        for key, bucket in self._buckets.items():
+            demanded = key == demand
+            if bucket["exhausted"] or (not bucket["used"] and not demanded):
+                continue
+            need = self._lease_size(bucket, demanded) - bucket["tokens"]
+            if need > 0:
+                wanted[key] = (need, bucket["limit"] - 1)
+            bucket["used"] = 0
+        self._last_flush = time.monotonic()
+        if not wanted:
+            self._sync_healthy = True
+            return None
+
+        # Sorted so two instances flushing at once lock rows in the same order.
+        keys = sorted(wanted)
+        return {
+            'p_window': self._window,
+            'p_keys':   keys,
+            'p_counts': [wanted[k][0] for k in keys],
+            'p_caps':   [wanted[k][1] for k in keys],
+        }
+
+    def _apply_reservation(self, params: dict, data) -> dict[str, int]:
+        granted = {row["key"]: int(row["granted"]) for row in data}
+        self._sync_healthy = True
+        if params['p_window'] == self._window:
+            wanted = dict(zip(params['p_keys'], params['p_counts']))
+            for key, tokens in granted.items():
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    continue
+                bucket["tokens"] += tokens
+                if tokens < wanted[key]:
+                    # The cap is reached globally; counts only go up within
+                    # a window, so deny locally until the minute rolls over.
+                    bucket["exhausted"] = True
+        return granted
+
+    def _reservation_failed(self, e: Exception) -> None:
+        if _db_unreachable(e):
+            self._sync_healthy = False
+            logger.error(
+                f"[SECURITY] Rate limiter reservation failed — deciding per "
+                f"request until Supabase recovers. Error: {type(e).__name__}"
+            )
+        else:
+            # RPC not deployed yet (or returned a shape we don't
+            # understand) — use the per-request path for a while.
+            self._bulk_disabled_until = time.monotonic() + self._BULK_RETRY_AFTER
+            logger.warning(
+                f"reserve_rate_limits unavailable — using the per-request "
+                f"limiter for {self._BULK_RETRY_AFTER}s: {type(e).__name__}"
+            )
+
+    def _flush(self, demand: str | None = None) -> dict[str, int] | None:
+        """
+        Reserve tokens for every bucket that needs them in ONE RPC.
+        Returns {key: tokens_granted}, or None if the reservation failed.
+        """
+        params = self._prepare_reservation(demand)
+        if params is None:
+            return {}
+
+        def _run():
+            # Fetched inside the retried closure — see the parent's _run().
+            supabase = self._get_supabase()
+            return supabase.rpc('reserve_rate_limits', params).execute()
+
+        from .utils.supabase_client import with_retry
+        try:
+            # retry_on_timeout=True for the same reason as the parent: a
+            # duplicated reservation only ever makes the limiter stricter.
+            result = with_retry("rate_limiter_reserve", _run, retry_on_timeout=True)
+            granted = self._apply_reservation(params, result.data)
+        except Exception as e:
+            self._reservation_failed(e)
+            return None
+        return granted
+
+    async def _flush_async(self, demand: str | None = None) -> dict[str, int] | None:
+        """Async _flush(). Callers hold _flush_lock."""
+        params = self._prepare_reservation(demand)
+        if params is None:
+            return {}
+
+        async def _run():
+            supabase = await self._get_async_supabase()
+            return await supabase.rpc('reserve_rate_limits', params).execute()
+
+        from .utils.supabase_client import with_retry_async
         try:
-            cutoff = (datetime.now(timezone.utc) - self._PRUNE_AFTER).isoformat()
-            supabase.table('rate_limits').delete().lt('window_start', cutoff).execute()
+            result = await with_retry_async("rate_limiter_reserve", _run, retry_on_timeout=True)
+            granted = self._apply_reservation(params, result.data)
         except Exception as e:
-            logger.debug(f"Rate limit prune failed (non-critical): {e}")
+            self._reservation_failed(e)
+            return None
+        return granted
+
+    async def _flush_async_bounded(self, demand: str | None = None) -> dict[str, int] | None:
+        """
+        _flush_async() under the lock and within _DEADLINE. Raises
+        asyncio.TimeoutError past the deadline, after marking the DB
+        unhealthy so following requests take the parent's bounded path.
+        """
+        async def _locked():
+            async with self._flush_lock:
+                bucket = self._buckets.get(demand) if demand is not None else None
+                if bucket is not None and (bucket["tokens"] or bucket["exhausted"]):
+                    # A reservation that finished while we waited for the
+                    # lock already covered this bucket.
+                    return {}
+                return await self._flush_async(demand)
+
+        try:
+            return await asyncio.wait_for(_locked(), timeout=self._DEADLINE)
+        except asyncio.TimeoutError:
+            self._sync_healthy = False
+            logger.error(
+                f"[SECURITY] Rate limiter reservation missed its {self._DEADLINE}s "
+                f"deadline — in-memory fallback (limit={self._FALLBACK_RPM} rpm) "
+                f"until Supabase answers again."
+            )
+            raise
+
+    def _schedule_flush(self) -> None:
+        """Top up leases in the background — the request doesn't wait for it."""
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+
+        async def _background():
+            try:
+                await self._flush_async_bounded()
+            except asyncio.TimeoutError:
+                pass  # already logged; the next dry bucket re-probes
+
+        # Claim the interval now so requests arriving before the task runs
+        # don't each try to schedule one.
+        self._last_flush = time.monotonic()
+        self._flush_task = asyncio.create_task(_background())
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     _validate_startup()
     logger.info(f"Starting {settings.API_TITLE} v{settings.API_VERSION}")
+    # Term filter data from the import script's snapshot, so the first
+    # /courses/search?term= doesn't scan mcgill_sections.
+    courses.prime_term_offerings()
     yield
     logger.info("Shutting down…")
     from .utils.posthog_client import shutdown as _posthog_shutdown
@@ -314,7 +672,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["Authorization", "Content-Type", "X-Request-ID", "X-Cron-Secret"],
-    expose_headers=["X-Process-Time", "X-Request-ID"],
+    expose_headers=["X-Process-Time", "X-Request-ID", "Server-Timing"],
 )
 
 
@@ -347,8 +705,9 @@ async def add_security_headers(request: Request, call_next):
     return response
 
 
-# FIX #13: Use Supabase-backed limiter instead of in-memory
-_limiter = SupabaseRateLimiter(default_rpm=settings.RATE_LIMIT_PER_MINUTE)
+# FIX #13: Use Supabase-backed limiter instead of in-memory.
+# Two-tier: local token leases + batched reservations (see HybridRateLimiter).
+_limiter = HybridRateLimiter(default_rpm=settings.RATE_LIMIT_PER_MINUTE)
 
 
 def _get_client_ip(request: Request) -> str:
@@ -401,48 +760,132 @@ def _get_user_id_from_token(request: Request) -> str | None:
         return None
 
 
+class RouteTemplateIndex:
+    """
+    Maps a request path to the route template that will serve it, so rate-limit
+    buckets are keyed by `/api/cards/{user_id}/{card_id}` rather than by every
+    concrete card URL. Without this, `rate_limits` (and its prune) grew with
+    the number of distinct URLs instead of with the number of clients.
+
+    The middleware runs before routing, so the index compiles the app's
+    templates itself, once, on first use — after every router is included.
+    Paths that match no route share a single `<unmatched>` bucket, which also
+    stops a 404 scanner from minting a row per probe.
+    """
+
+    UNMATCHED = "<unmatched>"
+    # A path some route serves, but not with this method (a 405).
+    METHOD_NOT_ALLOWED = "<method-not-allowed>"
+
+    def __init__(self, app_: FastAPI, routers):
+        self._app = app_
+        self._routers = routers
+        self._compiled: list[tuple] | None = None
+        self._tiers: dict[str, str] = {}
+
+    def _compile(self) -> list[tuple]:
+        from starlette.routing import compile_path
+
+        # App-level routes first (/, /api/health, /api/inngest, …), then each
+        # router under its prefix. Depending on the FastAPI version,
+        # app.router.routes either already holds the included routes with
+        # their full paths or keeps each router as one lazy entry (no
+        # path_regex, skipped) — so a template is compiled once, at its first
+        # position, with the union of the methods of every route serving it
+        # (GET and DELETE /cards/{user_id}).
+        routes = [(route, getattr(route, "path", None)) for route in self._app.router.routes]
+        for router, prefix in self._routers:
+            routes.extend((route, f"{prefix}{route.path}") for route in router.routes)
+
+        templates: dict[str, set] = {}
+        for route, full_path in routes:
+            if getattr(route, "path_regex", None) is None:
+                continue
+            template = full_path.rstrip("/") or "/"
+            templates.setdefault(template, set()).update(getattr(route, "methods", None) or ())
+
+        compiled = []
+        for template, methods in templates.items():
+            regex, _fmt, _conv = compile_path(template)
+            compiled.append((regex, template, frozenset(methods)))
+        return compiled
+
+    def resolve(self, method: str, path: str) -> str:
+        """Template for (method, path). Method-aware so a literal POST
+        /cards/generate isn't claimed by an earlier GET /cards/{user_id}.
+        A path only other methods serve is METHOD_NOT_ALLOWED; one nothing
+        serves is UNMATCHED."""
+        if self._compiled is None:
+            self._compiled = self._compile()
+        path = path.rstrip("/") or "/"
+        routed = False
+        for regex, template, methods in self._compiled:
+            if regex.match(path):
+                if not methods or method in methods:
+                    return template
+                routed = True
+        return self.METHOD_NOT_ALLOWED if routed else self.UNMATCHED
+
+    def resolve_request(self, request: Request) -> str:
+        """resolve() for a request. A CORS preflight is keyed by the route the
+        request it announces (Access-Control-Request-Method) will hit — no
+        route serves OPTIONS itself."""
+        method = request.method
+        if method == "OPTIONS":
+            method = request.headers.get("access-control-request-method", "").upper() or method
+        return self.resolve(method, request.url.path)
+
+    def tier(self, template: str) -> str:
+        """Tier from RATE_LIMIT_ROUTE_TIERS — longest whole-segment prefix wins."""
+        cached = self._tiers.get(template)
+        if cached is not None:
+            return cached
+        rel = template.lower()
+        if rel.startswith(settings.API_PREFIX):
+            rel = rel[len(settings.API_PREFIX):] or "/"
+        best, best_len = "default", -1
+        for prefix, tier in settings.RATE_LIMIT_ROUTE_TIERS.items():
+            if (rel == prefix or rel.startswith(prefix + "/")) and len(prefix) > best_len:
+                best, best_len = tier, len(prefix)
+        self._tiers[template] = best
+        return best
+
+
+def _tier_rpm(tier: str) -> int | None:
+    """Per-IP requests/minute for a tier; None means not rate-limited."""
+    if tier == "exempt":
+        return None
+    return {
+        "chat":         settings.CHAT_RATE_LIMIT_PER_MINUTE,
+        "claude":       settings.CLAUDE_RATE_LIMIT_PER_MINUTE,
+        "verification": settings.VERIFICATION_RATE_LIMIT_PER_MINUTE,
+    }.get(tier, settings.RATE_LIMIT_PER_MINUTE)
+
+
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
     client_ip = _get_client_ip(request)
 
-    # SEC-010: Normalise path to prevent bypass via trailing slash or case variation.
-    # Without this, /api/chat/send and /api/chat/send/ and /api/Chat/send
-    # would each get separate rate limit buckets.
-    raw_path = request.url.path
-    normalised_path = raw_path.rstrip("/").lower()
-
-    # Tier the rate limit by endpoint cost:
-    #   - /api/chat/*                       : CHAT_RATE_LIMIT_PER_MINUTE (50/IP)
-    #   - cards generate/stream/ask/translate : tightest — Claude + DB heavy
-    #   - electives/recommend               : tight — single Claude call
-    #   - transcript/parse|import           : tight — Claude with PDF (slow + costly)
+    # SEC-010: the bucket is the matched route template, so trailing-slash and
+    # case variants of a path can't mint separate buckets — and neither can
+    # the ids inside it. Unroutable paths all share one bucket.
+    route_key = _route_templates.resolve_request(request)
+
+    # Tier the rate limit by endpoint cost — see RATE_LIMIT_ROUTE_TIERS:
+    #   - chat                              : CHAT_RATE_LIMIT_PER_MINUTE (50/IP)
+    #   - claude (cards generate/stream/ask, electives/recommend,
+    #     transcript + syllabus parse)      : CLAUDE_RATE_LIMIT_PER_MINUTE (30/IP)
+    #   - verification                      : VERIFICATION_RATE_LIMIT_PER_MINUTE (20/IP)
+    #   - exempt (Inngest, HMAC-verified)   : not rate-limited
     #   - everything else                   : RATE_LIMIT_PER_MINUTE (100/IP)
-    if "/chat" in normalised_path:
-        rpm = settings.CHAT_RATE_LIMIT_PER_MINUTE
-    elif (
-        "/cards/generate" in normalised_path
-        or "/cards/stream"   in normalised_path
-        or "/cards/ask"      in normalised_path
-        or "/cards/retranslate" in normalised_path
-        or "/electives/recommend" in normalised_path
-        or "/transcript/parse"    in normalised_path
-        or "/transcript/import"   in normalised_path
-        or "/syllabus/parse"      in normalised_path
-    ):
-        rpm = settings.CLAUDE_RATE_LIMIT_PER_MINUTE
-    elif "/inngest" in normalised_path:
-        # Inngest callback — verified by HMAC signature, not rate-limited
+    rpm = _tier_rpm(_route_templates.tier(route_key))
+    if rpm is None:
         return await call_next(request)
-    elif "/auth/check-verified" in normalised_path or "/auth/verify-email" in normalised_path:
-        # Unauthenticated verification endpoints: tighter limit to block UUID
-        # enumeration. Legitimate polling is every 3 s (~20/min), so 20 rpm
-        # per IP covers normal use while blocking brute-force UUID scans.
-        rpm = 20
-    else:
-        rpm = settings.RATE_LIMIT_PER_MINUTE
 
     # ── IP-based check (covers unauthenticated requests + shared-IP DoS) ──────
-    if not _limiter.is_allowed(f"ip:{client_ip}:{normalised_path}", rpm):
+    # Async path: never blocks the event loop, and gives up on Supabase at
+    # RATE_LIMIT_DEADLINE_SECONDS in favour of the in-memory fallback.
+    if not await _limiter.is_allowed_async(f"ip:{client_ip}:{route_key}", rpm):
         return JSONResponse(
             status_code=429,
             content={
@@ -456,7 +899,7 @@ async def rate_limit_middleware(request: Request, call_next):
     user_id = _get_user_id_from_token(request)
     if user_id:
         user_rpm = max(rpm // 2, 10)  # per-user limit is half the IP limit, min 10
-        if not _limiter.is_allowed(f"user:{user_id}:{normalised_path}", user_rpm):
+        if not await _limiter.is_allowed_async(f"user:{user_id}:{route_key}", user_rpm):
             return JSONResponse(
                 status_code=429,
                 content={
@@ -473,10 +916,16 @@ async def rate_limit_middleware(request: Request, call_next):
 async def add_process_time_header(request: Request, call_next):
     start_time = time.time()
     request_id = str(uuid.uuid4())
+    # Outermost middleware, so the rate limiter's queries are attributed to
+    # the route too. The contextvar is copied into call_next's task and the
+    # threadpool; the totals dict is shared, so it sees their queries.
+    db_totals = db_metrics.begin_request(_route_templates.resolve_request(request))
     response = await call_next(request)
     process_time = time.time() - start_time
     response.headers["X-Process-Time"] = str(process_time)
     response.headers["X-Request-ID"] = request_id
+    if settings.DB_SERVER_TIMING:
+        response.headers["Server-Timing"] = db_metrics.server_timing(db_totals)
     return response
 
 @app.get(f"{settings.API_PREFIX}/sentry-test")
@@ -489,30 +938,38 @@ app.add_exception_handler(RequestValidationError, validation_exception_handler)
 app.add_exception_handler(Exception, general_exception_handler)
 
 # Routers
-app.include_router(admin.router,               prefix=f"{settings.API_PREFIX}/admin",               tags=["Admin"])
-app.include_router(chat.router,                prefix=f"{settings.API_PREFIX}/chat",                tags=["Chat"])
-app.include_router(courses.router,             prefix=f"{settings.API_PREFIX}/courses",             tags=["Courses"])
-app.include_router(users.router,               prefix=f"{settings.API_PREFIX}/users",               tags=["Users"])
-app.include_router(favorites.router,           prefix=f"{settings.API_PREFIX}/favorites",           tags=["Favorites"])
-app.include_router(completed.router,           prefix=f"{settings.API_PREFIX}/completed",           tags=["Completed"])
-app.include_router(notifications.router,       prefix=f"{settings.API_PREFIX}/notifications",       tags=["Notifications"])
-app.include_router(current.router,             prefix=f"{settings.API_PREFIX}/current",             tags=["Current Courses"])
-app.include_router(suggestions.router,         prefix=f"{settings.API_PREFIX}/suggestions",         tags=["Suggestions"])
-app.include_router(cards.router,               prefix=f"{settings.API_PREFIX}/cards",               tags=["Cards"])
-app.include_router(transcript.router,          prefix=f"{settings.API_PREFIX}/transcript",          tags=["Transcript"])
-app.include_router(degree_requirements.router, prefix=f"{settings.API_PREFIX}/degree-requirements", tags=["Degree Requirements"])
-app.include_router(electives.router,           prefix=f"{settings.API_PREFIX}/electives",           tags=["Electives"])
-app.include_router(clubs.router,               prefix=f"{settings.API_PREFIX}/clubs",               tags=["Clubs"])
-app.include_router(syllabus.router,            prefix=f"{settings.API_PREFIX}/syllabus",            tags=["Syllabus"])
-app.include_router(professors.router,          prefix=f"{settings.API_PREFIX}/professors",          tags=["Professors"])
-app.include_router(newsletters.router,         prefix=f"{settings.API_PREFIX}/newsletters",         tags=["Newsletters"])
-app.include_router(forum.router,               prefix=f"{settings.API_PREFIX}/forum",               tags=["Forum"])
-app.include_router(verification.router,        prefix=f"{settings.API_PREFIX}/auth",                tags=["Auth"])
-app.include_router(webhooks.router,             prefix=f"{settings.API_PREFIX}/webhooks",            tags=["Webhooks"])
-app.include_router(feedback.router,             prefix=f"{settings.API_PREFIX}/feedback",            tags=["Feedback"])
-app.include_router(course_allocations.router,   prefix=f"{settings.API_PREFIX}/users",               tags=["Course Allocations"])
-app.include_router(jobs.router,                 prefix=f"{settings.API_PREFIX}/jobs",                tags=["Jobs"])
-app.include_router(admin_approval.router,       prefix=f"{settings.API_PREFIX}/admin-approval",      tags=["Admin Approval"])
+_ROUTERS = (
+    (admin.router,              "/admin",              "Admin"),
+    (chat.router,               "/chat",               "Chat"),
+    (courses.router,            "/courses",            "Courses"),
+    (users.router,              "/users",              "Users"),
+    (favorites.router,          "/favorites",          "Favorites"),
+    (completed.router,          "/completed",          "Completed"),
+    (notifications.router,      "/notifications",      "Notifications"),
+    (current.router,            "/current",            "Current Courses"),
+    (suggestions.router,        "/suggestions",        "Suggestions"),
+    (cards.router,              "/cards",              "Cards"),
+    (transcript.router,         "/transcript",         "Transcript"),
+    (degree_requirements.router,"/degree-requirements","Degree Requirements"),
+    (electives.router,          "/electives",          "Electives"),
+    (clubs.router,              "/clubs",              "Clubs"),
+    (syllabus.router,           "/syllabus",           "Syllabus"),
+    (professors.router,         "/professors",         "Professors"),
+    (newsletters.router,        "/newsletters",        "Newsletters"),
+    (forum.router,              "/forum",              "Forum"),
+    (verification.router,       "/auth",               "Auth"),
+    (webhooks.router,           "/webhooks",           "Webhooks"),
+    (feedback.router,           "/feedback",           "Feedback"),
+    (course_allocations.router, "/users",              "Course Allocations"),
+    (jobs.router,               "/jobs",               "Jobs"),
+    (admin_approval.router,     "/admin-approval",     "Admin Approval"),
+)
+for _router, _prefix, _tag in _ROUTERS:
+    app.include_router(_router, prefix=f"{settings.API_PREFIX}{_prefix}", tags=[_tag])
+
+_route_templates = RouteTemplateIndex(
+    app, [(router, f"{settings.API_PREFIX}{prefix}") for router, prefix, _ in _ROUTERS]
+)
 
 # ── Inngest serve endpoint ───────────────────────────────────────────────────
 # Registers /api/inngest so Inngest can call back our background functions.
@@ -564,7 +1021,9 @@ async def health_check(deep: bool = False):
     what the uptime monitor should poll, because a shallow check reports
     "healthy" even when the database is unreachable — which is exactly the
     outage you most want to be paged about. Returns 503 if the DB is down
-    so Better Stack / UptimeRobot register it as an incident.
+    so Better Stack / UptimeRobot register it as an incident. Also reports
+    the supabase_client circuit breakers (read/write): an open breaker means
+    requests are currently being answered 503 without touching the DB.
     """
     response = {"status": "healthy"}
     if settings.DEBUG:
@@ -573,15 +1032,18 @@ async def health_check(deep: bool = False):
     if deep:
         checks = {}
         ok = True
-        # Database round-trip — cheap single-row read.
+        from .utils.supabase_client import breaker_states, get_supabase
+        # Database round-trip — cheap single-row read. Deliberately NOT
+        # through with_retry(): it must probe the DB even while a breaker
+        # is open.
         try:
-            from .utils.supabase_client import get_supabase
             get_supabase().table("users").select("id").limit(1).execute()
             checks["database"] = "ok"
         except Exception as exc:
             checks["database"] = "error"
             ok = False
             logger.error("Health check DB probe failed: %s", type(exc).__name__)
+        checks["database_breakers"] = breaker_states()
 
         response["checks"] = checks
         if not ok:
@@ -602,28 +1064,19 @@ async def auth_flags(current_user_id: str = Depends(get_current_user_id)):
     flip is_mcgill_email to true — gaining access to private clubs and
     McGill-only features.
     """
-    from .utils.supabase_client import get_supabase
-    admin_emails = set(e.strip().lower() for e in settings.ADMIN_EMAILS.split(",") if e.strip())
+    from .utils.auth_identity import get_identity
     mcgill_domains = ("@mcgill.ca", "@mail.mcgill.ca")
     try:
-        sb = get_supabase()
         # Verified auth email — the user CANNOT change this through any
         # public route. Supabase only updates it after the user proves
         # control of the new mailbox via Supabase Auth's own email-change
-        # confirmation flow.
-        auth_email = ""
-        email_confirmed = False
-        try:
-            u = sb.auth.admin.get_user_by_id(current_user_id)
-            auth_email = (getattr(u.user, "email", None) or "").lower()
-            email_confirmed = bool(getattr(u.user, "email_confirmed_at", None))
-        except Exception:
-            pass
-
-        is_admin = auth_email in admin_emails
+        # confirmation flow. Shared, TTL-cached lookup (utils/auth_identity.py).
+        identity = get_identity(current_user_id)
+        auth_email = identity["email"]
+        is_admin = identity["is_admin"]
         # Require BOTH correct domain AND confirmed email — prevents a fake
         # signup with an unverified @mcgill.ca address from gaining McGill access.
-        is_mcgill = (any(auth_email.endswith(d) for d in mcgill_domains) and email_confirmed) or is_admin
+        is_mcgill = (any(auth_email.endswith(d) for d in mcgill_domains) and identity["email_confirmed"]) or is_admin
         return {"is_admin": is_admin, "is_mcgill_email": is_mcgill}
     except Exception:
         return {"is_admin": False, "is_mcgill_email": False}
@@ -8,6 +8,7 @@ Backend admin authentication endpoint.
 - Brute-force protection is now Supabase-backed (F-05) so the 5-attempt limit
   is shared across all serverless instances. Falls back to in-memory on DB error.
 """
+import asyncio
 import hashlib
 import hmac
 import logging
@@ -19,6 +20,8 @@ from fastapi import APIRouter, HTTPException, Request, status
 from pydantic import BaseModel
 
 from ..config import settings
+from ..utils import auth_identity, db_metrics, llm, prompt_budget, student_context, translation_memory
+from ..utils.cache import search_cache, subjects_cache, translation_cache
 from ..utils.supabase_client import get_supabase
 from ..utils.audit import log_access
 
@@ -324,4 +327,52 @@ async def admin_stats(req: Request):
             "club_joins":           club_joins,
             "advisor_cards":        advisor_cards,
         },
+        "caches": {
+            "auth_identity": auth_identity.stats(),
+            "search":        search_cache.stats(),
+            "subjects":      subjects_cache.stats(),
+            "student_context": student_context.stats(),
+            "translation":   translation_cache.stats(),
+        },
+        # Claude calls on this instance: gate occupancy and per-feature
+        # tokens / latency / retries (utils/llm.py).
+        "llm": llm.stats(),
+        # Estimated tokens per student-data prompt section against its
+        # budget, and how often it was cut (utils/prompt_budget.py).
+        "prompt_sections": prompt_budget.stats(),
+        # Card strings retranslate answered from memory vs sent to Claude
+        # (utils/translation_memory.py).
+        "translation_memory": translation_memory.stats(),
     }
+
+
+@router.get("/db-stats")
+async def admin_db_stats(req: Request, minutes: int | None = None, sort: str = "total_ms", limit: int = 50):
+    """Per-route PostgREST query aggregates from this instance's rolling
+    window (see utils/db_metrics.py), heaviest first by `sort` — one of
+    total_ms, count, max_ms, avg_ms, rows, bytes."""
+    token = req.headers.get("X-Cron-Secret", "")
+    if not verify_admin_token(token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if sort not in ("total_ms", "count", "max_ms", "avg_ms", "rows", "bytes"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown sort: {sort}")
+    return db_metrics.snapshot(minutes=minutes, sort=sort, limit=max(1, min(limit, 500)))
+
+
+# ── Maintenance ───────────────────────────────────────────────────────────────
+
+@router.post("/rate-limits/sweep")
+async def admin_sweep_rate_limits(req: Request):
+    """Run the rate_limits sweeper now and return its report (rows deleted and
+    left per namespace, table size, duration). It also runs every 10 minutes
+    from Inngest — this is for checking on it, not for keeping it alive."""
+    token = req.headers.get("X-Cron-Secret", "")
+    if not verify_admin_token(token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+
+    from ..utils.rate_limit_maintenance import sweep_rate_limits
+    try:
+        return await asyncio.to_thread(sweep_rate_limits)
+    except Exception as exc:
+        logger.error("Manual rate_limits sweep failed: %s", type(exc).__name__)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Sweep failed")
@@ -39,6 +39,7 @@ from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
 
 from api.config import settings
+from api.utils import auth_identity
 from api.utils.supabase_client import get_supabase
 from api.utils.audit import log_access
 
@@ -125,6 +126,7 @@ def _confirm_auth_user(user_id: str) -> None:
         get_supabase().table("users").update({"email_verified": True}).eq("id", user_id).execute()
     except Exception:  # noqa: BLE001 — flag sync is non-critical
         logger.warning("email_verified flag sync failed for %s", user_id)
+    auth_identity.invalidate(user_id)
 
 
 # ── Minimal HTML (no forms/styles/scripts — strict backend CSP) ─────────────
@@ -20,48 +20,34 @@ CONTEXT FIX (v3):
 from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-import anthropic
 import asyncio
 import logging
 import json
 import re
+import time
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional
 from postgrest.exceptions import APIError
 
 from api.utils.supabase_client import get_supabase, get_user_by_id
 from api.config import settings
-from api.exceptions import UserNotFoundException
+from api.exceptions import UserNotFoundException, LLMBusyException
 from api.auth import get_current_user_id, require_self, get_user_db
 from api.utils.sanitise import sanitise_user_message, sanitise_context_field
 from api.utils.lang import lang_instruction as _lang_instruction
 from api.utils.degree_progress import compute_degree_progress_summary
+from api.utils.prompt_budget import PromptAssembler, deduplicate_completed, recent_first
 from api.routes.chat import _MILESTONES
 from api.routes.courses import build_course_grounding_block
+from api.utils import llm, student_context
+from api.utils.broadcast import queue_broadcast, run_broadcast
+from api.utils import translation_memory
+from api.utils.batch_loader import BatchLoader
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-
-_anthropic_client: anthropic.Anthropic | None = None
-_async_anthropic_client: anthropic.AsyncAnthropic | None = None
-
-
-def get_anthropic_client() -> anthropic.Anthropic:
-    global _anthropic_client
-    if _anthropic_client is None:
-        _anthropic_client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-    return _anthropic_client
-
-
-def get_async_anthropic_client() -> anthropic.AsyncAnthropic:
-    global _async_anthropic_client
-    if _async_anthropic_client is None:
-        _async_anthropic_client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
-    return _async_anthropic_client
-
-
 CARD_CATEGORIES = ["deadlines", "degree", "courses", "grades", "planning", "opportunities", "advice"]
 CATEGORIES_PROMPT_LIST = "\n".join(f'  - "{c}"' for c in CARD_CATEGORIES)
 
@@ -141,49 +127,17 @@ class ReorderRequest(BaseModel):
 
 def fetch_student_context(user_id: str, user_sb=None) -> dict:
     """
-    Fetch all student data needed for card generation.
+    Fetch all student data needed for card generation, from the shared
+    student-context cache (utils/student_context).
     user_sb: pass a user-scoped Supabase client to enforce RLS on all queries.
              Falls back to service role if not provided (e.g. from cron/admin).
     """
-    sb = user_sb if user_sb is not None else get_supabase()
-    user = get_user_by_id(user_id)
+    return _for_cards(student_context.get(user_id, sb=user_sb))
 
-    favorites = (sb.table("favorites")
-        .select("course_code, course_title, subject, catalog")
-        .eq("user_id", user_id).order("created_at", desc=True).limit(30)
-        .execute().data or [])
-
-    completed = (sb.table("completed_courses")
-        .select("course_code, course_title, subject, catalog, term, year, grade, credits, professor")
-        .eq("user_id", user_id).order("year", desc=True).limit(50)
-        .execute().data or [])
 
-    current = (sb.table("current_courses")
-        .select("course_code, course_title, subject, catalog, credits, term, year, professor")
-        .eq("user_id", user_id).execute().data or [])
-
-    today = datetime.now(timezone.utc).date().isoformat()
-    calendar = (sb.table("calendar_events")
-        .select("title, date, time, type, description")
-        .eq("user_id", user_id).gte("date", today)
-        .order("date", desc=False).limit(20)
-        .execute().data or [])
-
-    joined_clubs, created_clubs = [], []
-    try:
-        r = sb.table("user_clubs").select("clubs(name, category, meeting_schedule)").eq("user_id", user_id).execute()
-        joined_clubs = [x.get("clubs", {}).get("name", "Unknown") for x in (r.data or []) if x.get("clubs")]
-    except Exception:
-        pass
-    try:
-        r = sb.table("clubs").select("name, category, is_private").eq("created_by", user_id).execute()
-        created_clubs = r.data or []
-    except Exception:
-        pass
-
-    return {"user": user, "favorites": favorites, "completed": completed,
-            "current": current, "calendar": calendar,
-            "joined_clubs": joined_clubs, "created_clubs": created_clubs}
+def _for_cards(ctx: dict) -> dict:
+    """Cards have always sent the 50 most recent completed courses."""
+    return {**ctx, "completed": ctx["completed"][:50]}
 
 
 def fetch_saved_cards(user_id: str, user_sb=None) -> list:
@@ -211,7 +165,11 @@ def fetch_recent_card_titles(user_id: str, user_sb=None, limit: int = 24) -> lis
         return []
 
 
-def cards_are_fresh(user_id: str, max_age_hours: int = 168) -> bool:
+# AI cards older than this are regenerated when Home opens.
+CARDS_MAX_AGE_HOURS = 168
+
+
+def cards_are_fresh(user_id: str, max_age_hours: int = CARDS_MAX_AGE_HOURS) -> bool:
     """Returns True if AI cards exist and were generated within max_age_hours (default 7 days)."""
     try:
         supabase = get_supabase()
@@ -293,7 +251,20 @@ def _parse_cards_lenient(raw: str) -> list:
     return cards
 
 
-def save_cards(user_id: str, cards: list) -> None:
+def top_sort_order() -> int:
+    """sort_order that puts a new card above every existing one, without
+    touching them. Cards sort ascending; reorder_advisor_cards writes
+    positions 0..n, generated cards take 0..7, and cards inserted on top
+    take minus the current epoch second — below every position, and below
+    earlier top inserts, so the newest is first. One insert, no reads or
+    shifts (this used to be one UPDATE per existing card). Fits the int4
+    column until 2038."""
+    return -int(time.time())
+
+
+def save_cards(user_id: str, cards: list, *, precomputed: bool = False) -> None:
+    """Replace the student's AI cards. precomputed: generated off-peak rather
+    than for a visit — saved unseen until GET /cards serves them."""
     supabase = get_supabase()
     supabase.table("advisor_cards").delete().eq("user_id", user_id).eq("source", "ai").execute()
     now = datetime.now(timezone.utc).isoformat()
@@ -307,6 +278,7 @@ def save_cards(user_id: str, cards: list) -> None:
             "body": card.get("body", ""), "actions": json.dumps(actions),
             "category": _sanitise_category(card), "priority": card.get("priority", i + 1),
             "sort_order": i, "generated_at": now,
+            **({"seen_at": None} if precomputed else {}),
         })
     if not rows:
         return
@@ -330,16 +302,13 @@ def insert_user_card(user_id: str, card_data: dict, question: str, language: str
     supabase = get_supabase()
     actions = card_data.get("actions") or []
     now = datetime.now(timezone.utc).isoformat()
-    existing = (supabase.table("advisor_cards").select("sort_order")
-        .eq("user_id", user_id).order("sort_order", desc=True).limit(1).execute().data or [])
-    next_sort = (existing[0]["sort_order"] + 1) if existing else 0
     row = {
         "user_id": user_id, "source": "user",
         "card_type": card_data.get("type", "insight"), "icon": card_data.get("icon", "❓"),
         "label": card_data.get("label", "YOUR QUESTION"), "title": card_data.get("title", question[:80]),
         "body": card_data.get("body", ""), "actions": json.dumps(actions),
         "category": _sanitise_category(card_data), "priority": 0,
-        "sort_order": next_sort, "generated_at": now, "prompted_language": language,
+        "sort_order": top_sort_order(), "generated_at": now, "prompted_language": language,
         # What the student actually typed. `title` is the model's paraphrase and
         # only falls back to the question, so without this the original wording
         # was lost the moment the card was written — the column existed and
@@ -433,41 +402,13 @@ reference list below.
 """
 
 
-def _deduplicate_completed(completed: list) -> list:
-    """
-    Filter completed courses so that withdrawn/failed attempts are excluded
-    when the same course was later completed with a passing grade.
-
-    This prevents the AI from suggesting "retake COMP 273" when the student
-    already withdrew and then retook it successfully.
-    """
-    NON_PASSING = {"W", "F", "U", "WF", "WL", "J", "KF"}
-
-    # Build a set of course codes that have at least one passing grade
-    passed_codes = set()
-    for c in completed:
-        grade = (c.get("grade") or "").strip().upper()
-        if grade and grade not in NON_PASSING:
-            passed_codes.add(c.get("course_code", ""))
-
-    # Filter: keep all entries UNLESS it's a non-passing grade for a course
-    # that was later passed
-    result = []
-    for c in completed:
-        code = c.get("course_code", "")
-        grade = (c.get("grade") or "").strip().upper()
-        if grade in NON_PASSING and code in passed_codes:
-            # Skip this entry — the student retook and passed
-            continue
-        result.append(c)
-    return result
-
-
 def build_rich_context(ctx: dict, saved_cards: list = None, recent_titles: list[str] | None = None) -> str:
+    p = PromptAssembler("cards_context")
     user = ctx["user"]
     completed, current, favorites, calendar = (ctx["completed"], ctx["current"], ctx["favorites"], ctx["calendar"])
-    # Deduplicate: remove withdrawn/failed entries when course was later passed
-    completed = _deduplicate_completed(completed)
+    # Deduplicate: remove withdrawn/failed entries when course was later passed.
+    # Newest terms first, so a budget cut drops the oldest courses.
+    completed = recent_first(deduplicate_completed(completed))
     total_credits = sum(c.get("credits") or 3 for c in completed)
     # Computed here (not trusted from the client) — see compute_degree_progress_summary's
     # docstring for why: it used to depend on the frontend having rendered the
@@ -484,38 +425,38 @@ def build_rich_context(ctx: dict, saved_cards: list = None, recent_titles: list[
     def fmt_completed():
         # "Prof: X" is the student's own recorded instructor for that course —
         # real data, not a rating — shown only when known.
-        return "\n".join(
+        return p.section("completed", [
             f"  - {c['course_code']} ({sanitise_context_field(c.get('course_title',''))}) | "
             f"Grade: {c.get('grade') or 'N/A'} | Term: {c.get('term','?')} {c.get('year','')}"
             + (f" | Prof: {sanitise_context_field(c['professor'])}" if c.get('professor') else "")
-            for c in completed) or "  None recorded"
+            for c in completed], more="  (+{n} older courses not shown)")
 
-    def fmt_list(items, code_key="course_code", title_key="course_title", show_professor=False):
+    def fmt_list(section, items, code_key="course_code", title_key="course_title", show_professor=False):
         def line(i):
             base = f"  - {i[code_key]} ({sanitise_context_field(i.get(title_key,''))})"
             if show_professor and i.get("professor"):
                 base += f" — Prof. {sanitise_context_field(i['professor'])}"
             return base
-        return "\n".join(line(i) for i in items) or "  None recorded"
+        return p.section(section, [line(i) for i in items])
 
     # Term-aware enrollment (mirrors chat.py): upcoming-term registrations
     # must not be described as courses the student is taking right now.
     from ..utils.terms import get_active_term, split_current_courses
     _active_term, _active_year = get_active_term()
     _taking_now, _upcoming_terms = split_current_courses(current)
-    _upcoming_str = "\n".join(
+    _upcoming_str = p.section("upcoming", [
         f"  {term} {year}:\n" + "\n".join(
             f"    - {c['course_code']} ({sanitise_context_field(c.get('course_title',''))})"
             + (f" — Prof. {sanitise_context_field(c['professor'])}" if c.get('professor') else "")
             for c in cs
         )
         for (term, year), cs in _upcoming_terms
-    ) or "  None"
+    ], empty="  None")
 
-    calendar_str = "\n".join(
+    calendar_str = p.section("calendar", [
         f"  - {e['date']}: {sanitise_context_field(e['title'])} [{e.get('type','personal')}]"
         + (f" — {sanitise_context_field(e['description'])}" if e.get('description') else "")
-        for e in calendar) or "  No upcoming events"
+        for e in calendar], empty="  No upcoming events")
 
     majors_str = user.get("major", "Undeclared")
     for m in (user.get("other_majors") or []):
@@ -526,9 +467,9 @@ def build_rich_context(ctx: dict, saved_cards: list = None, recent_titles: list[
 
     saved_section = ""
     if saved_cards:
-        saved_lines = "\n".join(
+        saved_lines = p.section("saved_cards", [
             f"  - [{c.get('category','planning')}] {sanitise_context_field(c['title'])}: {sanitise_context_field(c['body'][:120])}"
-            for c in saved_cards)
+            for c in saved_cards])
         saved_section = f"\nSAVED CARDS (already pinned — DO NOT regenerate cards covering these topics):\n{saved_lines}\n"
 
     # Recently shown card titles — nudge the model toward different angles
@@ -548,7 +489,7 @@ def build_rich_context(ctx: dict, saved_cards: list = None, recent_titles: list[
             recent_section = (
                 "\nRECENTLY SHOWN CARDS (the student has already seen these — DO NOT "
                 "repeat the same topic, angle, or recommendation; surface NEW insights):\n"
-                + "\n".join(f"  - {t}" for t in unique)
+                + p.section("recent_cards", [f"  - {t}" for t in unique])
                 + "\n"
             )
 
@@ -574,7 +515,11 @@ def build_rich_context(ctx: dict, saved_cards: list = None, recent_titles: list[
     # The stable header + instructions + professor guide are now in
     # _CARDS_SYSTEM_PROMPT (cacheable). This returns ONLY the per-user
     # data + return-format instruction for the user message.
-    return f"""{saved_section}{recent_section}Today: {datetime.now(timezone.utc).date().isoformat()}
+    joined_clubs = p.section("clubs", list(ctx.get("joined_clubs", [])), sep=", ", empty="None",
+                             more="(+{n} more)")
+    created_clubs = ", ".join(c.get("name", "") for c in ctx.get("created_clubs", [])) or "None"
+
+    return p.finish(f"""{saved_section}{recent_section}Today: {datetime.now(timezone.utc).date().isoformat()}
 
 STUDENT PROFILE
   Faculty      : {safe_faculty}
@@ -588,23 +533,23 @@ COMPLETED COURSES
 {fmt_completed()}
 
 COURSES THIS TERM ({_active_term} {_active_year})
-{fmt_list(_taking_now, show_professor=True)}
+{fmt_list("current", _taking_now, show_professor=True)}
 
 REGISTERED FOR UPCOMING TERMS (not yet started — say "registered for", never "currently taking" or "this term")
 {_upcoming_str}
 
 SAVED/FAVOURITED COURSES
-{fmt_list(favorites)}
+{fmt_list("favorites", favorites)}
 
 UPCOMING CALENDAR EVENTS
 {calendar_str}
 
 STUDENT CLUBS
-  Joined: {', '.join(ctx.get('joined_clubs', [])) or 'None'}
-  Created: {', '.join(c.get('name','') for c in ctx.get('created_clubs', [])) or 'None'}
+  Joined: {joined_clubs}
+  Created: {created_clubs}
 
 Generate exactly 8 cards based on the schema in the system prompt.
-Return ONLY the JSON array — no markdown, no commentary."""
+Return ONLY the JSON array — no markdown, no commentary.""")
 
 
 def _build_single_card_prompt(question: str, ctx: dict, language: str, course_grounding: str | None = None) -> str:
@@ -653,6 +598,17 @@ def _set_stored_cards_language(user_id: str, language: str) -> None:
         logger.warning(f"Could not persist cards language for {user_id}: {e}")
 
 
+def _mark_cards_seen(user_id: str) -> None:
+    """Precomputed cards were just served — the student is active, so the
+    next precompute may refresh them again."""
+    try:
+        (get_supabase().table("advisor_cards")
+            .update({"seen_at": datetime.now(timezone.utc).isoformat()})
+            .eq("user_id", user_id).eq("source", "ai").execute())
+    except Exception as e:
+        logger.warning(f"Could not mark cards seen for {user_id}: {e}")
+
+
 def _fetch_cards_response(user_id: str, confirmed_language: str | None = None, user_sb=None) -> dict:
     """
     confirmed_language: pass the language when cards were just generated/retranslated.
@@ -661,13 +617,16 @@ def _fetch_cards_response(user_id: str, confirmed_language: str | None = None, u
     get_user_by_id(user_id)
     sb = user_sb if user_sb is not None else get_supabase()
     resp = (sb.table("advisor_cards").select("*")
-        .eq("user_id", user_id).order("sort_order", desc=False).execute())
+        .eq("user_id", user_id).order("sort_order", desc=False)
+        .order("generated_at", desc=True).execute())
     cards = resp.data or []
     for card in cards:
         if isinstance(card.get("actions"), str):
             card["actions"] = json.loads(card["actions"])
     ai_cards = [c for c in cards if c.get("source") == "ai"]
     generated_at = ai_cards[0].get("generated_at") if ai_cards else None
+    if any("seen_at" in c and c["seen_at"] is None for c in ai_cards):
+        _mark_cards_seen(user_id)
     # Use confirmed language if just set; otherwise read from stored metadata
     cards_language = confirmed_language if confirmed_language else _get_stored_cards_language(user_id)
     return {
@@ -727,8 +686,9 @@ async def generate_cards(user_id: str, request: GenerateRequest, req: Request, c
         recent_titles = fetch_recent_card_titles(user_id, user_sb=user_sb) if request.force else []
         prompt = build_rich_context(ctx, saved_cards=saved, recent_titles=recent_titles) + _lang_instruction(request.language)
 
-        client = get_anthropic_client()
-        message = client.messages.create(
+        message = await llm.create(
+            "cards",
+            trace={"user_id": user_id},
             model=settings.CLAUDE_MODEL,
             max_tokens=4096,
             system=[{
@@ -739,19 +699,7 @@ async def generate_cards(user_id: str, request: GenerateRequest, req: Request, c
             messages=[{"role": "user", "content": prompt}],
         )
 
-        raw = message.content[0].text.strip()
-        if raw.startswith("```"):
-            raw = raw.split("\n", 1)[1].rsplit("```", 1)[0].strip()
-
-        cards = json.loads(raw)
-        if not isinstance(cards, list):
-            raise ValueError("AI did not return a JSON array")
-        for card in cards:
-            card["category"] = _sanitise_category(card)
-            card.setdefault("type", "insight")
-            card.setdefault("icon", "💡")
-            card.setdefault("actions", [])
-
+        cards = _parse_generated_cards(message.content[0].text)
         save_cards(user_id, cards)
         _set_stored_cards_language(user_id, request.language)
         logger.info(f"Generated {len(cards)} cards for {user_id} in {request.language}")
@@ -759,6 +707,8 @@ async def generate_cards(user_id: str, request: GenerateRequest, req: Request, c
 
     except UserNotFoundException:
         raise HTTPException(status_code=404, detail="User not found")
+    except LLMBusyException:
+        raise
     except json.JSONDecodeError as e:
         logger.error(f"Card JSON parse error: {e}")
         raise HTTPException(status_code=500, detail="Failed to parse AI response")
@@ -767,63 +717,33 @@ async def generate_cards(user_id: str, request: GenerateRequest, req: Request, c
         raise HTTPException(status_code=500, detail="Failed to generate advisor cards")
 
 
-async def _fetch_student_context_parallel(user_id: str, user_sb=None) -> dict:
-    """Same as fetch_student_context but runs all DB queries in parallel."""
-    sb = user_sb if user_sb is not None else get_supabase()
-    # user lookup is needed before parallel queries but is a single fast call
-    user = await asyncio.to_thread(get_user_by_id, user_id)
-
-    today = datetime.now(timezone.utc).date().isoformat()
-
-    def q_favorites():
-        return (sb.table("favorites")
-            .select("course_code, course_title, subject, catalog")
-            .eq("user_id", user_id).order("created_at", desc=True).limit(30)
-            .execute().data or [])
-
-    def q_completed():
-        return (sb.table("completed_courses")
-            .select("course_code, course_title, subject, catalog, term, year, grade, credits, professor")
-            .eq("user_id", user_id).order("year", desc=True).limit(50)
-            .execute().data or [])
+def _parse_generated_cards(text: str, lenient: bool = False) -> list:
+    """Cards from a generation reply (a JSON array, maybe fenced), with
+    defaults filled in. Raises JSONDecodeError / ValueError unless lenient,
+    which salvages whatever cards parse instead (possibly none)."""
+    raw = text.strip()
+    if raw.startswith("```"):
+        raw = raw.split("\n", 1)[1].rsplit("```", 1)[0].strip()
 
-    def q_current():
-        return (sb.table("current_courses")
-            .select("course_code, course_title, subject, catalog, credits, term, year, professor")
-            .eq("user_id", user_id).execute().data or [])
-
-    def q_calendar():
-        return (sb.table("calendar_events")
-            .select("title, date, time, type, description")
-            .eq("user_id", user_id).gte("date", today)
-            .order("date", desc=False).limit(20)
-            .execute().data or [])
+    try:
+        cards = json.loads(raw)
+        if not isinstance(cards, list):
+            raise ValueError("AI did not return a JSON array")
+    except ValueError:  # JSONDecodeError included
+        if not lenient:
+            raise
+        cards = _parse_cards_lenient(raw)
+    for card in cards:
+        card["category"] = _sanitise_category(card)
+        card.setdefault("type", "insight")
+        card.setdefault("icon", "💡")
+        card.setdefault("actions", [])
+    return cards
 
-    def q_clubs():
-        joined, created = [], []
-        try:
-            r = sb.table("user_clubs").select("clubs(name, category, meeting_schedule)").eq("user_id", user_id).execute()
-            joined = [x.get("clubs", {}).get("name", "Unknown") for x in (r.data or []) if x.get("clubs")]
-        except Exception:
-            pass
-        try:
-            r = sb.table("clubs").select("name, category, is_private").eq("created_by", user_id).execute()
-            created = r.data or []
-        except Exception:
-            pass
-        return joined, created
-
-    favorites, completed, current, calendar, (joined_clubs, created_clubs) = await asyncio.gather(
-        asyncio.to_thread(q_favorites),
-        asyncio.to_thread(q_completed),
-        asyncio.to_thread(q_current),
-        asyncio.to_thread(q_calendar),
-        asyncio.to_thread(q_clubs),
-    )
 
-    return {"user": user, "favorites": favorites, "completed": completed,
-            "current": current, "calendar": calendar,
-            "joined_clubs": joined_clubs, "created_clubs": created_clubs}
+async def _fetch_student_context_parallel(user_id: str, user_sb=None) -> dict:
+    """Same as fetch_student_context, for async callers (queries run in parallel)."""
+    return _for_cards(await student_context.get_async(user_id, sb=user_sb))
 
 
 def _build_ndjson_context(ctx: dict, saved_cards: list = None, recent_titles: list[str] | None = None) -> str:
@@ -906,7 +826,6 @@ async def stream_cards(
             recent_titles = results[2] if len(results) > 2 else []
 
             prompt = _build_ndjson_context(ctx, saved_cards=saved, recent_titles=recent_titles) + _lang_instruction(language)
-            async_client = get_async_anthropic_client()
 
             collected_cards: list = []
             line_buffer = ""
@@ -914,7 +833,9 @@ async def stream_cards(
             # Anthropic prompt caching — static card playbook lives in the
             # system block and is served at ~90% discount on subsequent calls
             # within the 5-min cache window.
-            async with async_client.messages.stream(
+            async with llm.stream(
+                "cards",
+                trace={"user_id": user_id},
                 model=settings.CLAUDE_MODEL,
                 max_tokens=4096,
                 system=[{
@@ -977,6 +898,142 @@ async def stream_cards(
     )
 
 
+# Card sources retranslate translates in place. Asked cards ("user") keep the
+# language they were asked in — their thread replies follow prompted_language.
+_TRANSLATED_SOURCES = ("ai", "system")
+
+
+def _fetch_translatable_cards(user_id: str, user_sb=None) -> list:
+    sb = user_sb if user_sb is not None else get_supabase()
+    return (sb.table("advisor_cards").select("*")
+            .eq("user_id", user_id).in_("source", list(_TRANSLATED_SOURCES))
+            .execute().data or [])
+
+
+def _card_actions(card: dict) -> list:
+    actions = card.get("actions") or []
+    return json.loads(actions) if isinstance(actions, str) else actions
+
+
+# Fields translated in place. A system card's label stays as sent: it's the
+# key its broadcast uses to find who already has the card (utils/broadcast.py),
+# so a translated label would get the reminder sent again.
+def _translated_fields(card: dict) -> tuple:
+    return ("title", "body") if card.get("source") == "system" else ("label", "title", "body")
+
+
+def _card_strings(card: dict) -> list:
+    """The text of a card a student reads: label (AI cards), title, body, and
+    each follow-up chip (plain questions, or the label of a button action)."""
+    strings = [card.get(f) for f in _translated_fields(card)]
+    for a in _card_actions(card):
+        strings.append(a if isinstance(a, str) else (a or {}).get("label"))
+    return [t for t in strings if isinstance(t, str) and t.strip()]
+
+
+def _translated_card(card: dict, tr: dict) -> dict:
+    """The translated columns of `card`, every string swapped for its
+    translation in `tr` — only these are written back."""
+    row = {}
+    for field in _translated_fields(card):
+        if card.get(field):
+            row[field] = tr.get(card[field], card[field])
+    actions = []
+    for a in _card_actions(card):
+        if isinstance(a, str):
+            actions.append(tr.get(a, a))
+        elif isinstance(a, dict) and a.get("label"):
+            actions.append({**a, "label": tr.get(a["label"], a["label"])})
+        else:
+            actions.append(a)
+    row["actions"] = json.dumps(actions)
+    return row
+
+
+async def _translate_cards(user_id: str, cards: list, language: str) -> None:
+    """Translate the student's cards in place: reminder-card strings the
+    translation memory already has cost nothing, the rest (and all of the
+    student's own AI-card text, which is never remembered) go to Claude in
+    one call, and the translated columns are written back per card."""
+    tr = await translation_memory.translate(
+        (t for card in cards if card.get("source") == "system" for t in _card_strings(card)),
+        language,
+        private=(t for card in cards if card.get("source") != "system" for t in _card_strings(card)),
+        trace={"user_id": user_id},
+    )
+    updates = [(card["id"], _translated_card(card, tr)) for card in cards]
+    await asyncio.to_thread(_save_translated_cards, updates)
+
+
+def _save_translated_cards(updates: list) -> None:
+    # An UPDATE per card, not an upsert of the rows read before the Claude
+    # call: /generate or the nightly precompute may have replaced the cards
+    # meanwhile (a deleted card must not come back), and /save may have
+    # toggled is_saved (only the translated columns are ours to write).
+    sb = get_supabase()
+    for card_id, row in updates:
+        sb.table("advisor_cards").update(row).eq("id", card_id).execute()
+
+
+async def _regenerate_cards_in_language(user_id: str, language: str, user_sb=None) -> None:
+    """Generate the AI cards afresh in `language` — for students who have
+    none yet to translate."""
+    ctx = fetch_student_context(user_id, user_sb=user_sb)
+    # Don't include saved_cards — they may be in a different language
+    # which would influence the model to respond in that language instead.
+    prompt = build_rich_context(ctx, saved_cards=None) + _lang_instruction(language)
+
+    # Haiku occasionally emits slightly malformed JSON (e.g. a missing
+    # comma). Tolerate trailing commas / prose wrappers, and retry the
+    # call once before giving up — this turns a hard 500 into a rare miss.
+    cards = None
+    for attempt in range(2):
+        message = await llm.create(
+            "cards_retranslate",
+            trace={"user_id": user_id},
+            model=settings.CLAUDE_MODEL,
+            max_tokens=4096,
+            system=[{
+                "type":          "text",
+                "text":          _CARDS_SYSTEM_PROMPT,
+                "cache_control": {"type": "ephemeral"},
+            }],
+            messages=[{"role": "user", "content": prompt}],
+        )
+        raw = message.content[0].text.strip()
+        if raw.startswith("```"):
+            raw = raw.split("\n", 1)[1].rsplit("```", 1)[0].strip()
+        # Keep only the JSON array and strip trailing commas before ] or }.
+        if "[" in raw and "]" in raw:
+            raw = raw[raw.find("["):raw.rfind("]") + 1]
+        raw = re.sub(r",(\s*[\]}])", r"\1", raw)
+        try:
+            cards = json.loads(raw)
+            break
+        except json.JSONDecodeError as e:
+            if attempt == 0:
+                logger.warning(f"Retranslate JSON invalid, retrying once: {e}")
+                continue
+            # Last attempt: fall back to recovering individual cards
+            # rather than losing the whole batch over e.g. one missing
+            # comma between two objects.
+            cards = _parse_cards_lenient(raw)
+            if not cards:
+                raise
+            logger.warning(
+                f"Retranslate JSON invalid on final attempt, recovered "
+                f"{len(cards)} card(s) via lenient per-object parsing: {e}"
+            )
+    if not isinstance(cards, list):
+        raise ValueError("AI did not return a JSON array")
+    for card in cards:
+        card["category"] = _sanitise_category(card)
+        card.setdefault("type", "insight")
+        card.setdefault("icon", "💡")
+        card.setdefault("actions", [])
+    save_cards(user_id, cards)
+
+
 @router.post("/retranslate/{user_id}", response_model=dict)
 async def retranslate_cards(user_id: str, request: RetranslateRequest, req: Request, current_user_id: str = Depends(get_current_user_id), user_sb=Depends(get_user_db)):
     require_self(current_user_id, user_id)
@@ -987,66 +1044,19 @@ async def retranslate_cards(user_id: str, request: RetranslateRequest, req: Requ
         # than falsely claiming the new language — forcing a fresh retranslation
         # on next load instead of silently showing wrong-language cards forever.
         _set_stored_cards_language(user_id, "")
-        ctx = fetch_student_context(user_id, user_sb=user_sb)
-        # Don't include saved_cards — they may be in a different language
-        # which would influence the model to respond in that language instead.
-        prompt = build_rich_context(ctx, saved_cards=None) + _lang_instruction(request.language)
-
-        client = get_anthropic_client()
-
-        # Haiku occasionally emits slightly malformed JSON (e.g. a missing
-        # comma). Tolerate trailing commas / prose wrappers, and retry the
-        # call once before giving up — this turns a hard 500 into a rare miss.
-        cards = None
-        for attempt in range(2):
-            message = client.messages.create(
-                model=settings.CLAUDE_MODEL,
-                max_tokens=4096,
-                system=[{
-                    "type":          "text",
-                    "text":          _CARDS_SYSTEM_PROMPT,
-                    "cache_control": {"type": "ephemeral"},
-                }],
-                messages=[{"role": "user", "content": prompt}],
-            )
-            raw = message.content[0].text.strip()
-            if raw.startswith("```"):
-                raw = raw.split("\n", 1)[1].rsplit("```", 1)[0].strip()
-            # Keep only the JSON array and strip trailing commas before ] or }.
-            if "[" in raw and "]" in raw:
-                raw = raw[raw.find("["):raw.rfind("]") + 1]
-            raw = re.sub(r",(\s*[\]}])", r"\1", raw)
-            try:
-                cards = json.loads(raw)
-                break
-            except json.JSONDecodeError as e:
-                if attempt == 0:
-                    logger.warning(f"Retranslate JSON invalid, retrying once: {e}")
-                    continue
-                # Last attempt: fall back to recovering individual cards
-                # rather than losing the whole batch over e.g. one missing
-                # comma between two objects.
-                cards = _parse_cards_lenient(raw)
-                if not cards:
-                    raise
-                logger.warning(
-                    f"Retranslate JSON invalid on final attempt, recovered "
-                    f"{len(cards)} card(s) via lenient per-object parsing: {e}"
-                )
-        if not isinstance(cards, list):
-            raise ValueError("AI did not return a JSON array")
-        for card in cards:
-            card["category"] = _sanitise_category(card)
-            card.setdefault("type", "insight")
-            card.setdefault("icon", "💡")
-            card.setdefault("actions", [])
-        save_cards(user_id, cards)
+        cards = await asyncio.to_thread(_fetch_translatable_cards, user_id, user_sb)
+        if any(c.get("source") == "ai" for c in cards):
+            await _translate_cards(user_id, cards, request.language)
+        else:
+            await _regenerate_cards_in_language(user_id, request.language, user_sb)
         _set_stored_cards_language(user_id, request.language)
         logger.info(f"Retranslated {len(cards)} cards for {user_id} in {request.language}")
         return _fetch_cards_response(user_id, confirmed_language=request.language, user_sb=user_sb)
 
     except UserNotFoundException:
         raise HTTPException(status_code=404, detail="User not found")
+    except LLMBusyException:
+        raise
     except json.JSONDecodeError as e:
         logger.error(f"Retranslate JSON parse error: {e}")
         raise HTTPException(status_code=500, detail="Failed to parse AI response")
@@ -1095,11 +1105,11 @@ async def ask_card(user_id: str, request: AskRequest, req: Request, current_user
     try:
         get_user_by_id(user_id)
         ctx = fetch_student_context(user_id, user_sb=user_sb)
-        course_grounding = build_course_grounding_block(request.question)
+        course_grounding = await asyncio.to_thread(build_course_grounding_block, request.question)
         prompt = _build_single_card_prompt(request.question, ctx, request.language, course_grounding)
 
-        client = get_anthropic_client()
-        message = client.messages.create(model=settings.CLAUDE_MODEL, max_tokens=1024,
+        message = await llm.create("card_ask", trace={"user_id": user_id},
+            model=settings.CLAUDE_MODEL, max_tokens=1024,
             messages=[{"role": "user", "content": prompt}])
 
         raw = message.content[0].text.strip()
@@ -1112,6 +1122,8 @@ async def ask_card(user_id: str, request: AskRequest, req: Request, current_user
 
     except UserNotFoundException:
         raise HTTPException(status_code=404, detail="User not found")
+    except LLMBusyException:
+        raise
     except json.JSONDecodeError as e:
         logger.error(f"Ask card JSON parse error: {e}")
         raise HTTPException(status_code=500, detail="Failed to parse AI response")
@@ -1169,7 +1181,7 @@ async def thread_message(
         # see build_course_grounding_block's docstring / chat.py's send_message
         # for why this exists. No cache_control is used on this endpoint's
         # system param, so it's safe to just concatenate.
-        course_grounding = build_course_grounding_block(request.message)
+        course_grounding = await asyncio.to_thread(build_course_grounding_block, request.message)
         if course_grounding:
             system_context = f"{system_context}\n\n{course_grounding}"
 
@@ -1183,12 +1195,13 @@ async def thread_message(
                     messages.append({"role": role, "content": content})
         messages.append({"role": "user", "content": request.message})
 
-        client = get_anthropic_client()
         logger.info(
             f"Card thread {card_id}: {len(messages)} messages, "
             f"lang={reply_language}, user={request.user_id}"
         )
-        response = client.messages.create(
+        response = await llm.create(
+            "card_thread",
+            trace={"user_id": request.user_id, "metadata": {"card_id": card_id}},
             model=settings.CLAUDE_MODEL,
             max_tokens=512,
             system=system_context,
@@ -1250,8 +1263,11 @@ async def reorder_cards(user_id: str, request: ReorderRequest, req: Request, cur
         raise HTTPException(status_code=500, detail="Failed to reorder cards")
 
 # ════════════════════════════════════════════════════════════════════
-#  Post-finals transcript reminder
+#  Reminder broadcasts
 # ════════════════════════════════════════════════════════════════════
+# Each reminder is a card broadcast to every user on its configured dates
+# (utils/broadcast.py): chunked, one set-based insert per chunk, idempotent
+# per user per day, and run as Inngest steps so a timed-out run resumes.
 
 def is_post_finals_day(today: "date | None" = None) -> bool:
     """Returns True if `today` is one of the configured post-finals dates."""
@@ -1260,378 +1276,398 @@ def is_post_finals_day(today: "date | None" = None) -> bool:
     return (t.month, t.day) in POST_FINALS_REMINDER_DATES
 
 
-def _has_recent_transcript_activity(user_id: str, within_days: int = 14) -> bool:
-    """Skip reminder if user has imported any course rows in the last N days
-       (suggests they already re-uploaded after finals)."""
-    try:
-        supabase = get_supabase()
-        cutoff = (datetime.now(timezone.utc) - timedelta(days=within_days)).isoformat()
-        resp = (supabase.table("completed_courses")
-                .select("id")
-                .eq("user_id", user_id)
-                .gte("created_at", cutoff)
-                .limit(1).execute())
-        return bool(resp.data)
-    except Exception:
-        return False
+def is_course_registration_day(today: "date | None" = None) -> bool:
+    """True if today is one of the configured course-registration reminder dates."""
+    from datetime import date as _date
+    t = today or _date.today()
+    return (t.month, t.day) in COURSE_REGISTRATION_REMINDER_DATES
 
 
-def _has_active_transcript_reminder(user_id: str) -> bool:
-    """True if a transcript-reminder card was already inserted today (idempotency)."""
-    try:
-        supabase = get_supabase()
-        today_iso = datetime.now(timezone.utc).date().isoformat()
-        resp = (supabase.table("advisor_cards")
-                .select("id")
-                .eq("user_id", user_id)
-                .eq("label", TRANSCRIPT_REMINDER_LABEL)
-                .gte("generated_at", today_iso)
-                .limit(1).execute())
-        return bool(resp.data)
-    except Exception:
-        return False
+def is_summer_registration_day(today: "date | None" = None) -> bool:
+    """True if today is one of the configured summer-registration reminder dates."""
+    from datetime import date as _date
+    t = today or _date.today()
+    return (t.month, t.day) in SUMMER_REGISTRATION_REMINDER_DATES
 
 
-def _insert_transcript_reminder_card(user_id: str) -> bool:
-    """
-    Insert a high-priority transcript-reminder card for one user.
-    Returns True if inserted, False if skipped (already exists / recent upload).
-    """
-    if _has_active_transcript_reminder(user_id):
-        return False
-    if _has_recent_transcript_activity(user_id, within_days=14):
-        return False
+def _days_before_open(reminder_dates: list, today) -> int:
+    """Days from `today` to the registration-opens date. The LATEST date in
+    the list is the actual opens day; earlier entries are heads-ups. 0 on
+    the opens day itself."""
+    opens_month, opens_day = sorted(reminder_dates)[-1]
     try:
-        supabase = get_supabase()
-        now = datetime.now(timezone.utc).isoformat()
-        # Push existing cards down by 1 so this reminder appears at the top
-        try:
-            existing = (supabase.table("advisor_cards").select("id, sort_order")
-                        .eq("user_id", user_id).execute().data or [])
-            for c in existing:
-                supabase.table("advisor_cards") \
-                    .update({"sort_order": (c.get("sort_order") or 0) + 1}) \
-                    .eq("id", c["id"]).execute()
-        except Exception:
-            pass
-
-        row = {
-            "user_id": user_id,
-            "source": "system",
-            "card_type": "urgent",
-            "icon": "📄",
-            "label": TRANSCRIPT_REMINDER_LABEL,
-            "title": "Re-upload your transcript",
-            "body": (
-                "Final grades for this term should now be posted on Minerva. "
-                "Re-upload your unofficial transcript to keep your courses, GPA, "
-                "and degree progress current. (Minerva → Unofficial Transcript → "
-                "⌘/Ctrl + P → Save as PDF)"
-            ),
-            "actions": json.dumps([
-                {"type": "open_transcript_upload", "label": "Upload transcript"},
-                "How do I get my unofficial transcript PDF?",
-                "What gets updated when I re-upload?",
-            ]),
-            "category": "planning",
-            "priority": 1,
-            "sort_order": 0,
-            "generated_at": now,
-        }
-        supabase.table("advisor_cards").insert(row).execute()
-        return True
-    except Exception as e:
-        logger.warning(f"Failed to insert transcript reminder for {user_id}: {e}")
-        return False
-
+        return max(0, (today.replace(month=opens_month, day=opens_day) - today).days)
+    except ValueError:
+        return 0
 
-def run_transcript_reminder_cron() -> dict:
-    """
-    Daily cron: if today is a post-finals date, drop a reminder card into every
-    user's brief (idempotent — won't duplicate within the same day, and skips
-    users who already re-uploaded recently).
-    """
-    if not is_post_finals_day():
-        return {"sent": 0, "skipped": "not_post_finals_day"}
-    try:
-        supabase = get_supabase()
-        users_resp = supabase.table("users").select("id").execute()
-        sent = 0
-        for u in (users_resp.data or []):
-            if u.get("id") and _insert_transcript_reminder_card(u["id"]):
-                sent += 1
-        logger.info(f"Transcript reminder cron: inserted {sent} cards")
-        return {"sent": sent}
-    except Exception as e:
-        logger.exception(f"Transcript reminder cron failed: {e}")
-        return {"sent": 0, "error": str(e)}
 
+def _system_card(**fields) -> dict:
+    return {
+        "source": "system",
+        **fields,
+        "sort_order": top_sort_order(),
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+    }
 
-# ════════════════════════════════════════════════════════════════════
-#  Course-registration opens reminder
-# ════════════════════════════════════════════════════════════════════
 
-def is_course_registration_day(today: "date | None" = None) -> bool:
-    """True if today is one of the configured course-registration reminder dates."""
-    from datetime import date as _date
-    t = today or _date.today()
-    return (t.month, t.day) in COURSE_REGISTRATION_REMINDER_DATES
+def _transcript_reminder_card() -> dict:
+    """The high-priority transcript-reminder card (without user_id)."""
+    return _system_card(
+        card_type="urgent",
+        icon="📄",
+        label=TRANSCRIPT_REMINDER_LABEL,
+        title="Re-upload your transcript",
+        body=(
+            "Final grades for this term should now be posted on Minerva. "
+            "Re-upload your unofficial transcript to keep your courses, GPA, "
+            "and degree progress current. (Minerva → Unofficial Transcript → "
+            "⌘/Ctrl + P → Save as PDF)"
+        ),
+        actions=json.dumps([
+            {"type": "open_transcript_upload", "label": "Upload transcript"},
+            "How do I get my unofficial transcript PDF?",
+            "What gets updated when I re-upload?",
+        ]),
+        category="planning",
+        priority=1,
+    )
 
 
-def _has_active_course_registration_card(user_id: str) -> bool:
-    """True if a course-registration card was already inserted today (idempotency)."""
-    try:
-        supabase = get_supabase()
-        today_iso = datetime.now(timezone.utc).date().isoformat()
-        resp = (supabase.table("advisor_cards")
-                .select("id")
-                .eq("user_id", user_id)
-                .eq("label", COURSE_REGISTRATION_REMINDER_LABEL)
-                .gte("generated_at", today_iso)
-                .limit(1).execute())
-        return bool(resp.data)
-    except Exception:
-        return False
+def _course_registration_card(days_before_open: int) -> dict:
+    """
+    The course-registration card (without user_id). days_before_open
+    distinguishes the heads-up card (>0) from the day-of card (0).
+    """
+    # Wording shifts based on whether registration is opening today or upcoming.
+    # Both cards lead with the same point: Fall and Winter open TOGETHER, so
+    # this is one sitting for the whole year. Students who plan only Fall
+    # come back in November to find the Winter sections they wanted full.
+    if days_before_open > 0:
+        title = f"Registration opens in {days_before_open} days — plan Fall AND Winter"
+        body = (
+            f"McGill course registration opens in about {days_before_open} days, and Fall and "
+            "Winter open at the SAME TIME — you register for both terms in one sitting, not "
+            "twice. Check Minerva for the exact day and time YOUR registration opens: McGill "
+            "staggers start times per student, so yours may differ from a friend's. Plan a full "
+            "year before then — the courses you need for Fall, the ones for Winter, and a "
+            "backup for each. If you only plan Fall, the Winter sections you wanted are usually "
+            "gone by the time you come back to them."
+        )
+        card_type = "warning"
+    else:
+        title = "Registration is open — register for Fall AND Winter"
+        body = (
+            "McGill course registration is opening. Fall and Winter open together, so register "
+            "for BOTH terms in one session — there is no second registration date for Winter, "
+            "and popular sections fill within hours. Registration times are staggered per "
+            "student, so check Minerva for your own start time and be ready at it rather than "
+            "assuming it is this morning. Watch for time conflicts within each term, confirm "
+            "prerequisites carry across from Fall to Winter, and have a backup ready for "
+            "anything that fills up."
+        )
+        card_type = "urgent"
+
+    return _system_card(
+        card_type=card_type,
+        icon="📝",
+        label=COURSE_REGISTRATION_REMINDER_LABEL,
+        title=title,
+        body=body,
+        actions=json.dumps([
+            # Opens an inline date/time form in the card. The student's own
+            # start time is the one thing this card cannot know — McGill
+            # staggers them — so they read it off Minerva and enter it, and
+            # we put it on their calendar with a reminder the day before.
+            {"type": "set_registration_time", "label": "Add my registration time to my calendar"},
+            {"type": "open_degree_planning", "label": "Open Degree Planning"},
+            "Which courses should I take in Fall and which in Winter?",
+            "Where in Minerva do I find my registration start time?",
+            "Do any of my Winter choices need a Fall prerequisite first?",
+            "What backups should I have ready if my first picks fill up?",
+        ]),
+        category="deadlines",
+        priority=1,
+    )
 
 
-def _insert_course_registration_card(user_id: str, days_before_open: int) -> bool:
+def _summer_registration_card(days_before_open: int) -> dict:
     """
-    Insert a course-registration card for one user. days_before_open distinguishes
-    the heads-up card (>0) from the day-of card (0).
+    The summer-registration card (without user_id). Tone is informational
+    rather than urgent — only a subset of students take summer courses.
     """
-    if _has_active_course_registration_card(user_id):
-        return False
-    try:
-        supabase = get_supabase()
-        now = datetime.now(timezone.utc).isoformat()
-
-        # Push existing cards down by 1 so this one appears at the top
-        try:
-            existing = (supabase.table("advisor_cards").select("id, sort_order")
-                        .eq("user_id", user_id).execute().data or [])
-            for c in existing:
-                supabase.table("advisor_cards") \
-                    .update({"sort_order": (c.get("sort_order") or 0) + 1}) \
-                    .eq("id", c["id"]).execute()
-        except Exception:
-            pass
-
-        # Wording shifts based on whether registration is opening today or upcoming.
-        # Both cards lead with the same point: Fall and Winter open TOGETHER, so
-        # this is one sitting for the whole year. Students who plan only Fall
-        # come back in November to find the Winter sections they wanted full.
-        if days_before_open > 0:
-            title = f"Registration opens in {days_before_open} days — plan Fall AND Winter"
-            body = (
-                f"McGill course registration opens in about {days_before_open} days, and Fall and "
-                "Winter open at the SAME TIME — you register for both terms in one sitting, not "
-                "twice. Check Minerva for the exact day and time YOUR registration opens: McGill "
-                "staggers start times per student, so yours may differ from a friend's. Plan a full "
-                "year before then — the courses you need for Fall, the ones for Winter, and a "
-                "backup for each. If you only plan Fall, the Winter sections you wanted are usually "
-                "gone by the time you come back to them."
-            )
-            card_type = "warning"
-        else:
-            title = "Registration is open — register for Fall AND Winter"
-            body = (
-                "McGill course registration is opening. Fall and Winter open together, so register "
-                "for BOTH terms in one session — there is no second registration date for Winter, "
-                "and popular sections fill within hours. Registration times are staggered per "
-                "student, so check Minerva for your own start time and be ready at it rather than "
-                "assuming it is this morning. Watch for time conflicts within each term, confirm "
-                "prerequisites carry across from Fall to Winter, and have a backup ready for "
-                "anything that fills up."
-            )
-            card_type = "urgent"
-
-        row = {
-            "user_id": user_id,
-            "source": "system",
-            "card_type": card_type,
-            "icon": "📝",
-            "label": COURSE_REGISTRATION_REMINDER_LABEL,
-            "title": title,
-            "body": body,
-            "actions": json.dumps([
-                # Opens an inline date/time form in the card. The student's own
-                # start time is the one thing this card cannot know — McGill
-                # staggers them — so they read it off Minerva and enter it, and
-                # we put it on their calendar with a reminder the day before.
-                {"type": "set_registration_time", "label": "Add my registration time to my calendar"},
-                {"type": "open_degree_planning", "label": "Open Degree Planning"},
-                "Which courses should I take in Fall and which in Winter?",
-                "Where in Minerva do I find my registration start time?",
-                "Do any of my Winter choices need a Fall prerequisite first?",
-                "What backups should I have ready if my first picks fill up?",
-            ]),
-            "category": "deadlines",
-            "priority": 1,
-            "sort_order": 0,
-            "generated_at": now,
-        }
-        supabase.table("advisor_cards").insert(row).execute()
-        return True
-    except Exception as e:
-        logger.warning(f"Failed to insert course-registration card for {user_id}: {e}")
-        return False
+    if days_before_open > 0:
+        title = f"Summer course registration opens in {days_before_open} days"
+        body = (
+            f"Planning to take a summer course? McGill summer registration opens in about "
+            f"{days_before_open} days. Decide whether you want to lighten next year's load, "
+            "catch up on a prereq, or knock out an elective — and have your picks ready."
+        )
+        card_type = "insight"
+    else:
+        title = "Summer course registration is open"
+        body = (
+            "McGill summer course registration is now open on Minerva. If you're planning to "
+            "take a summer course — to catch up on a prereq, lighten next year's load, or "
+            "explore something new — register soon since summer sections often have limited "
+            "seats."
+        )
+        card_type = "warning"
+
+    return _system_card(
+        card_type=card_type,
+        icon="☀️",
+        label=SUMMER_REGISTRATION_REMINDER_LABEL,
+        title=title,
+        body=body,
+        actions=json.dumps([
+            {"type": "open_degree_planning", "label": "Open Degree Planning"},
+            "Should I take a summer course this year?",
+            "Which prereqs could I catch up on over the summer?",
+            "Are there any electives I should knock out in summer term?",
+        ]),
+        category="planning",
+        priority=2,
+    )
 
 
-def run_course_registration_reminder_cron() -> dict:
+# Broadcast name → reason reported on days it doesn't send.
+REMINDER_BROADCASTS = {
+    "transcript_reminder":   "not_post_finals_day",
+    "course_registration":   "not_registration_day",
+    "summer_registration":   "not_summer_registration_day",
+}
+
+
+def broadcast_spec(name: str, today: "date") -> dict | None:
+    """The utils/broadcast.py spec for reminder `name` on `today`, or None
+    if it doesn't send that day. Idempotent per user per day: users who
+    already have the card since midnight UTC of `today` are skipped.
+
+    Everything is derived from `today`, never the clock: run_in_steps
+    rebuilds the spec in every chunk step, so a retried or resumed run that
+    crosses midnight must keep the same dedupe window."""
+    since = today.isoformat()
+    if name == "transcript_reminder" and is_post_finals_day(today):
+        # Skip students who imported courses in the last two weeks — they
+        # already re-uploaded after finals.
+        recent = datetime.combine(today - timedelta(days=14), datetime.min.time(), timezone.utc).isoformat()
+        return {"name": name, "card": _transcript_reminder_card(), "since": since,
+                "skip_uploads_since": recent, "report": {}}
+    if name == "course_registration" and is_course_registration_day(today):
+        days = _days_before_open(COURSE_REGISTRATION_REMINDER_DATES, today)
+        return {"name": name, "card": _course_registration_card(days), "since": since,
+                "report": {"days_before_open": days}}
+    if name == "summer_registration" and is_summer_registration_day(today):
+        days = _days_before_open(SUMMER_REGISTRATION_REMINDER_DATES, today)
+        return {"name": name, "card": _summer_registration_card(days), "since": since,
+                "report": {"days_before_open": days}}
+    return None
+
+
+async def run_reminder_broadcast(name: str, today: "date | None" = None) -> dict:
     """
-    Daily cron: if today is one of the configured registration-reminder dates,
-    drop a card into every user's brief (idempotent — one card per user per day).
+    Daily cron: if today is one of reminder `name`'s dates, drop its card
+    into every user's brief — queued to the `broadcast-cards` Inngest
+    function, or run inline if Inngest can't be reached.
     """
-    if not is_course_registration_day():
-        return {"sent": 0, "skipped": "not_registration_day"}
+    # UTC, like the `since` window broadcast_spec derives from it.
+    today = today or datetime.now(timezone.utc).date()
+    spec = broadcast_spec(name, today)
+    if spec is None:
+        return {"sent": 0, "skipped": REMINDER_BROADCASTS[name]}
+    if await queue_broadcast(name, today.isoformat()):
+        return {"queued": True, **spec["report"]}
     try:
-        from datetime import date as _date
-        today = _date.today()
-        # Distance to the closest "registration opens" date in our list. If today
-        # IS the opens day, days_before_open = 0; if it's the heads-up day, > 0.
-        # We treat the LATEST date in the list as "the actual opens day" since
-        # earlier entries are heads-up dates.
-        sorted_dates = sorted(COURSE_REGISTRATION_REMINDER_DATES, key=lambda x: (x[0], x[1]))
-        opens_month, opens_day = sorted_dates[-1]
-        try:
-            opens_date = today.replace(month=opens_month, day=opens_day)
-            days_before_open = max(0, (opens_date - today).days)
-        except ValueError:
-            days_before_open = 0
-
-        supabase = get_supabase()
-        users_resp = supabase.table("users").select("id").execute()
-        sent = 0
-        for u in (users_resp.data or []):
-            if u.get("id") and _insert_course_registration_card(u["id"], days_before_open):
-                sent += 1
-        logger.info(f"Course-registration reminder cron: inserted {sent} cards (days_before_open={days_before_open})")
-        return {"sent": sent, "days_before_open": days_before_open}
+        result = await asyncio.to_thread(run_broadcast, spec)
     except Exception as e:
-        logger.exception(f"Course-registration reminder cron failed: {e}")
-        return {"sent": 0, "error": str(e)}
+        logger.exception(f"Reminder broadcast {name} failed: {e}")
+        return {"sent": 0, "error": str(e), **spec["report"]}
+    return {**result, **spec["report"]}
 
 
 # ════════════════════════════════════════════════════════════════════
-#  Summer-course-registration opens reminder
+#  Off-peak precompute
 # ════════════════════════════════════════════════════════════════════
-
-def is_summer_registration_day(today: "date | None" = None) -> bool:
-    """True if today is one of the configured summer-registration reminder dates."""
-    from datetime import date as _date
-    t = today or _date.today()
-    return (t.month, t.day) in SUMMER_REGISTRATION_REMINDER_DATES
-
-
-def _has_active_summer_registration_card(user_id: str) -> bool:
-    """True if a summer-registration card was already inserted today (idempotency)."""
-    try:
-        supabase = get_supabase()
-        today_iso = datetime.now(timezone.utc).date().isoformat()
-        resp = (supabase.table("advisor_cards")
-                .select("id")
-                .eq("user_id", user_id)
-                .eq("label", SUMMER_REGISTRATION_REMINDER_LABEL)
-                .gte("generated_at", today_iso)
-                .limit(1).execute())
-        return bool(resp.data)
-    except Exception:
-        return False
-
-
-def _insert_summer_registration_card(user_id: str, days_before_open: int) -> bool:
-    """
-    Insert a summer-registration card for one user. Tone is informational
-    rather than urgent — only a subset of students take summer courses.
-    """
-    if _has_active_summer_registration_card(user_id):
-        return False
+# Home regenerates a student's AI cards on open once they're older than
+# CARDS_MAX_AGE_HOURS, so the first visit after that waits on a full
+# generation. The nightly `precompute-cards` Inngest function regenerates
+# them ahead of time instead, through Message Batches (half the price of
+# synchronous calls; nobody is waiting on it):
+#
+#   precompute_candidates()    students whose cards go stale within
+#                              CARDS_PRECOMPUTE_LEAD_HOURS either side of
+#                              now and who have seen their current cards
+#   submit_precompute_batch()  a chunk's contexts, built concurrently, as
+#                              one batch
+#   save_precompute_results()  a batch's new cards, unless a student
+#                              generated or switched language since submit
+#
+# run_precompute_in_steps() runs each chunk's submit and save as its own
+# Inngest step, as broadcasts do (utils/broadcast.py).
+#
+# advisor_cards.seen_at (2026_10_18i) keeps this to active students:
+# precomputed cards are saved unseen and GET /cards marks them seen, so a
+# student who stops coming back gets one precompute, not one a night.
+
+_PRECOMPUTE_CONCURRENCY = 8
+# Students per batch — and per submit / save step, keeping each step's
+# context builds and writes well inside one serverless invocation.
+_PRECOMPUTE_CHUNK = 50
+# Batches finish within 24h; poll every 15 minutes for a little longer.
+_PRECOMPUTE_POLL_EVERY = timedelta(minutes=15)
+_PRECOMPUTE_POLLS = 100
+_PRECOMPUTE_PAGE = 1000
+
+
+def precompute_candidates(now: datetime | None = None) -> list[str]:
+    """User ids due a precompute, at most CARDS_PRECOMPUTE_MAX_USERS."""
+    limit = settings.CARDS_PRECOMPUTE_MAX_USERS
+    if limit <= 0:
+        return []
+    now = now or datetime.now(timezone.utc)
+    lead = timedelta(hours=settings.CARDS_PRECOMPUTE_LEAD_HOURS)
+    stale_at = now - timedelta(hours=CARDS_MAX_AGE_HOURS)
+    sb = get_supabase()
+    users: dict = {}
+    start = 0
     try:
-        supabase = get_supabase()
-        now = datetime.now(timezone.utc).isoformat()
+        while len(users) < limit:
+            # One row per card, so page past PostgREST's row cap.
+            rows = (sb.table("advisor_cards").select("user_id")
+                    .eq("source", "ai")
+                    .gte("generated_at", (stale_at - lead).isoformat())
+                    .lt("generated_at", (stale_at + lead).isoformat())
+                    .not_.is_("seen_at", "null")
+                    .order("user_id").range(start, start + _PRECOMPUTE_PAGE - 1)
+                    .execute().data or [])
+            for r in rows:
+                users.setdefault(r["user_id"], None)
+            if len(rows) < _PRECOMPUTE_PAGE:
+                break
+            start += _PRECOMPUTE_PAGE
+    except APIError as e:
+        if e.code in ("42703", "PGRST204"):
+            logger.info("advisor_cards.seen_at missing — skipping card precompute until the migration is applied")
+            return []
+        raise
+    return list(users)[:limit]
+
+
+async def submit_precompute_batch(user_ids: list[str]) -> dict:
+    """Build each student's card prompt and submit them all as one batch.
+    Returns {"batch_id", "requests", "submitted_at"}; batch_id is None if
+    no student had a context to send."""
+    submitted_at = datetime.now(timezone.utc).isoformat()
+    saved = await asyncio.to_thread(
+        BatchLoader(get_supabase(), "advisor_cards", "user_id, title, body, category",
+                    key="user_id", many=True, where={"is_saved": True}).load_many,
+        user_ids,
+    )
+    sem = asyncio.Semaphore(_PRECOMPUTE_CONCURRENCY)
 
-        # Push existing cards down by 1 so this card lands near the top
-        try:
-            existing = (supabase.table("advisor_cards").select("id, sort_order")
-                        .eq("user_id", user_id).execute().data or [])
-            for c in existing:
-                supabase.table("advisor_cards") \
-                    .update({"sort_order": (c.get("sort_order") or 0) + 1}) \
-                    .eq("id", c["id"]).execute()
-        except Exception:
-            pass
-
-        if days_before_open > 0:
-            title = f"Summer course registration opens in {days_before_open} days"
-            body = (
-                f"Planning to take a summer course? McGill summer registration opens in about "
-                f"{days_before_open} days. Decide whether you want to lighten next year's load, "
-                "catch up on a prereq, or knock out an elective — and have your picks ready."
-            )
-            card_type = "insight"
-        else:
-            title = "Summer course registration is open"
-            body = (
-                "McGill summer course registration is now open on Minerva. If you're planning to "
-                "take a summer course — to catch up on a prereq, lighten next year's load, or "
-                "explore something new — register soon since summer sections often have limited "
-                "seats."
-            )
-            card_type = "warning"
-
-        row = {
-            "user_id": user_id,
-            "source": "system",
-            "card_type": card_type,
-            "icon": "☀️",
-            "label": SUMMER_REGISTRATION_REMINDER_LABEL,
-            "title": title,
-            "body": body,
-            "actions": json.dumps([
-                {"type": "open_degree_planning", "label": "Open Degree Planning"},
-                "Should I take a summer course this year?",
-                "Which prereqs could I catch up on over the summer?",
-                "Are there any electives I should knock out in summer term?",
-            ]),
-            "category": "planning",
-            "priority": 2,
-            "sort_order": 0,
-            "generated_at": now,
+    async def _request(user_id: str) -> dict | None:
+        async with sem:
+            try:
+                ctx = await _fetch_student_context_parallel(user_id)
+                language = await asyncio.to_thread(_get_stored_cards_language, user_id) or "en"
+            except Exception as e:
+                logger.warning(f"Card precompute: no context for {user_id}: {e}")
+                return None
+        saved_cards = [{k: c.get(k) for k in ("title", "body", "category")}
+                       for c in saved.get(user_id) or []]
+        return {
+            "custom_id": f"{user_id}_{language}",
+            "params": {
+                "model":      settings.CLAUDE_MODEL,
+                "max_tokens": 4096,
+                "system": [{
+                    "type":          "text",
+                    "text":          _CARDS_SYSTEM_PROMPT,
+                    "cache_control": {"type": "ephemeral"},
+                }],
+                "messages": [{"role": "user",
+                              "content": build_rich_context(ctx, saved_cards=saved_cards) + _lang_instruction(language)}],
+            },
         }
-        supabase.table("advisor_cards").insert(row).execute()
-        return True
-    except Exception as e:
-        logger.warning(f"Failed to insert summer-registration card for {user_id}: {e}")
-        return False
-
-
-def run_summer_registration_reminder_cron() -> dict:
-    """
-    Daily cron: if today is a configured summer-registration reminder date,
-    drop a card into every user's brief (idempotent — one card per user per day).
-    """
-    if not is_summer_registration_day():
-        return {"sent": 0, "skipped": "not_summer_registration_day"}
-    try:
-        from datetime import date as _date
-        today = _date.today()
-        # Latest configured date = "registration opens"; earlier ones are heads-ups
-        sorted_dates = sorted(SUMMER_REGISTRATION_REMINDER_DATES, key=lambda x: (x[0], x[1]))
-        opens_month, opens_day = sorted_dates[-1]
-        try:
-            opens_date = today.replace(month=opens_month, day=opens_day)
-            days_before_open = max(0, (opens_date - today).days)
-        except ValueError:
-            days_before_open = 0
 
-        supabase = get_supabase()
-        users_resp = supabase.table("users").select("id").execute()
-        sent = 0
-        for u in (users_resp.data or []):
-            if u.get("id") and _insert_summer_registration_card(u["id"], days_before_open):
-                sent += 1
-        logger.info(f"Summer-registration reminder cron: inserted {sent} cards (days_before_open={days_before_open})")
-        return {"sent": sent, "days_before_open": days_before_open}
-    except Exception as e:
-        logger.exception(f"Summer-registration reminder cron failed: {e}")
-        return {"sent": 0, "error": str(e)}
+    requests = [r for r in await asyncio.gather(*(_request(u) for u in user_ids)) if r]
+    if not requests:
+        return {"batch_id": None, "requests": 0, "submitted_at": submitted_at}
+    batch_id = await llm.create_batch("cards_precompute", requests)
+    return {"batch_id": batch_id, "requests": len(requests), "submitted_at": submitted_at}
+
+
+def _superseded(user_id: str, language: str, submitted_at: str) -> bool:
+    """True if the student regenerated their cards or switched language
+    after the batch was submitted — their cards are newer than ours."""
+    newer = (get_supabase().table("advisor_cards").select("id")
+             .eq("user_id", user_id).eq("source", "ai").gt("generated_at", submitted_at)
+             .limit(1).execute().data)
+    return bool(newer) or (_get_stored_cards_language(user_id) or "en") != language
+
+
+async def save_precompute_results(batch: dict) -> dict:
+    """Save the ended batch's cards, unseen. Returns counts of students
+    saved, skipped (superseded) and failed (request errored or unparseable)."""
+    messages = await llm.batch_results("cards_precompute", batch["batch_id"])
+    sem = asyncio.Semaphore(_PRECOMPUTE_CONCURRENCY)
+
+    async def _save(custom_id: str, message) -> str:
+        user_id, language = custom_id.rsplit("_", 1)
+        cards = _parse_generated_cards(message.content[0].text, lenient=True)
+        if not cards:
+            logger.warning(f"Card precompute: unparseable cards for {user_id}")
+            return "failed"
+        async with sem:
+            if await asyncio.to_thread(_superseded, user_id, language, batch["submitted_at"]):
+                return "skipped"
+            await asyncio.to_thread(save_cards, user_id, cards, precomputed=True)
+            await asyncio.to_thread(_set_stored_cards_language, user_id, language)
+        return "saved"
+
+    outcomes = await asyncio.gather(*(_save(cid, m) for cid, m in messages.items()))
+    saved, skipped = outcomes.count("saved"), outcomes.count("skipped")
+    failed = batch["requests"] - saved - skipped
+    logger.info(f"Card precompute {batch['batch_id']}: saved {saved}, skipped {skipped}, failed {failed}")
+    return {"saved": saved, "skipped": skipped, "failed": failed}
+
+
+async def run_precompute_in_steps(step) -> dict:
+    """The whole precompute as Inngest steps (`step` is ctx.step), each one
+    short: select; one batch per chunk of _PRECOMPUTE_CHUNK students, each
+    submitted by its own step; poll until every batch ends (sleeping between
+    polls); then one save step per batch. A run that fails resumes after its
+    last finished step."""
+    users = await step.run("select", lambda: asyncio.to_thread(precompute_candidates))
+    if not users:
+        return {"users": 0}
+    batches = []
+    for n, start in enumerate(range(0, len(users), _PRECOMPUTE_CHUNK)):
+        chunk = users[start:start + _PRECOMPUTE_CHUNK]
+        batch = await step.run(f"submit-{n}", lambda chunk=chunk: submit_precompute_batch(chunk))
+        if batch["batch_id"]:
+            batches.append(batch)
+    totals = {"users": len(users), "batches": len(batches),
+              "requests": sum(b["requests"] for b in batches)}
+    if not batches:
+        return totals
+
+    running = [b["batch_id"] for b in batches]
+    for n in range(_PRECOMPUTE_POLLS):
+        async def _poll(ids=tuple(running)):
+            return [i for i in ids if await llm.batch_status(i) != "ended"]
+        running = await step.run(f"poll-{n}", _poll)
+        if not running:
+            break
+        await step.sleep(f"wait-{n}", _PRECOMPUTE_POLL_EVERY)
+    else:
+        logger.warning(f"Card precompute: {len(running)} batches still running after {_PRECOMPUTE_POLLS} polls")
+
+    totals.update(saved=0, skipped=0, failed=0, timed_out=len(running))
+    for n, batch in enumerate(batches):
+        if batch["batch_id"] in running:
+            continue
+        result = await step.run(f"save-{n}", lambda batch=batch: save_precompute_results(batch))
+        for k in ("saved", "skipped", "failed"):
+            totals[k] += result[k]
+    return totals
@@ -6,6 +6,7 @@ signed in to Symbolos for over STALE_CLUB_THRESHOLD_DAYS.
 from datetime import datetime, timedelta, timezone
 import logging
 
+from ...utils.batch_loader import BatchLoader
 from ...utils.supabase_client import get_supabase
 
 logger = logging.getLogger(__name__)
@@ -38,6 +39,12 @@ def run_stale_club_cleanup_cron(dry_run: bool = False) -> dict:
     across the whole leadership team is more than STALE_CLUB_THRESHOLD_DAYS
     old, delete the club.
 
+    Owner/admin memberships for every club are fetched up front in a few
+    chunked, paged queries, and each leader's sign-in is looked up once per run even if
+    they lead several clubs.
+
+    A club whose leaders can't be loaded is kept, never deleted.
+
     Returns a summary dict. Pass dry_run=True to log what would be deleted
     without actually deleting anything.
     """
@@ -56,6 +63,15 @@ def run_stale_club_cleanup_cron(dry_run: bool = False) -> dict:
         kept_too_new = 0
         deleted_names: list[str] = []
 
+        leaders = BatchLoader(supabase, "user_clubs", "user_id", key="club_id", many=True,
+                              where={"role": ["owner", "admin"]}, order_by="user_id")
+        try:
+            leaders.load_many(c.get("id") for c in all_clubs)
+        except Exception:
+            pass  # per-club loads below retry the chunks that failed
+        kept_lookup_failed = 0
+        signins: dict = {}
+
         for club in all_clubs:
             club_id = club.get("id")
             if not club_id:
@@ -79,20 +95,21 @@ def run_stale_club_cleanup_cron(dry_run: bool = False) -> dict:
             if club.get("created_by"):
                 admin_ids.add(club["created_by"])
             try:
-                rows = (supabase.table("user_clubs")
-                        .select("user_id, role")
-                        .eq("club_id", club_id)
-                        .execute().data or [])
-                for r in rows:
-                    if (r.get("role") or "").lower() in ("owner", "admin") and r.get("user_id"):
-                        admin_ids.add(r["user_id"])
-            except Exception:
-                pass
+                rows = leaders.load(club_id) or []
+            except Exception as e:
+                # Without the full leadership list we can't tell the club is
+                # stale — never delete on a partial read.
+                logger.warning(f"[stale-club cleanup] keeping {club_id}: couldn't load its leaders: {e}")
+                kept_lookup_failed += 1
+                continue
+            admin_ids.update(r["user_id"] for r in rows if r.get("user_id"))
 
             # Find the most recent sign-in across all admins
             latest_signin = None
             for uid in admin_ids:
-                ts = _user_last_signin(supabase, uid)
+                if uid not in signins:
+                    signins[uid] = _user_last_signin(supabase, uid)
+                ts = signins[uid]
                 if ts is None:
                     continue
                 if latest_signin is None or ts > latest_signin:
@@ -136,6 +153,7 @@ def run_stale_club_cleanup_cron(dry_run: bool = False) -> dict:
             "deleted_names":       deleted_names,
             "kept_recent_signin":  kept_recent_signin,
             "kept_too_new":        kept_too_new,
+            "kept_lookup_failed":  kept_lookup_failed,
             "threshold_days":      STALE_CLUB_THRESHOLD_DAYS,
             "dry_run":             dry_run,
         }
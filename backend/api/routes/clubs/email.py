@@ -17,6 +17,7 @@ from datetime import datetime, timedelta, timezone
 from html import escape
 
 from ...config import settings
+from ...utils.batch_loader import BatchLoader, member_emails
 from ...utils.supabase_client import get_supabase
 
 logger = logging.getLogger(__name__)
@@ -105,15 +106,12 @@ def _notify_club_members_new_event(supabase, club_id: str, club_name: str, title
 
     user_ids = [m["user_id"] for m in members.data]
 
-    # Get emails from users table
-    emails = []
-    for uid in user_ids:
-        try:
-            profile = supabase.table("users").select("email").eq("id", uid).execute()
-            if profile.data and profile.data[0].get("email"):
-                emails.append(profile.data[0]["email"])
-        except Exception:
-            continue
+    # Get emails from users table — chunked .in_() lookups, not one per member
+    try:
+        emails = member_emails(BatchLoader(supabase, "users", "email"), user_ids)
+    except Exception as e:
+        logger.warning(f"Member email lookup failed for club {club_id}: {type(e).__name__}")
+        return
 
     if not emails:
         return
@@ -187,14 +185,14 @@ def _notify_club_members_announcement(supabase, club_id: str, club_name: str, ti
     if not members.data:
         return
 
-    emails = []
-    for m in members.data:
-        try:
-            profile = supabase.table("users").select("email").eq("id", m["user_id"]).execute()
-            if profile.data and profile.data[0].get("email"):
-                emails.append(profile.data[0]["email"])
-        except Exception:
-            continue
+    try:
+        emails = member_emails(
+            BatchLoader(supabase, "users", "email"),
+            (m["user_id"] for m in members.data),
+        )
+    except Exception as e:
+        logger.warning(f"Member email lookup failed for club {club_id}: {type(e).__name__}")
+        return
 
     if not emails:
         return
@@ -6,6 +6,7 @@ from typing import Optional
 import logging
 
 from ...utils.supabase_client import get_supabase
+from ...utils import student_context
 from ...auth import get_current_user_id, require_self, get_user_db, require_mcgill_email
 from ._router import router
 from .permissions import is_admin_user, is_club_owner_or_admin
@@ -71,6 +72,7 @@ async def handle_join_request(request_id: str, body: JoinRequestAction, current_
                     "club_id": join_req["club_id"],
                     "calendar_synced": True,
                 }).execute()
+                student_context.invalidate(join_req["user_id"])
 
         # Step 4: Delete the join request — Join Requests don't keep history
         # (unlike Club Submissions / Manager Invites; see CONTEXT.md)
@@ -237,6 +239,7 @@ async def join_club(user_id: str, body: JoinClubRequest, req: Request, current_u
                 "club_id": body.club_id,
                 "calendar_synced": True,
             }).execute()
+            student_context.invalidate(user_id)
             return {"success": True, "status": "joined"}
     except HTTPException:
         raise
@@ -278,6 +281,7 @@ async def leave_club(user_id: str, club_id: str, req: Request, current_user_id:
     require_self(current_user_id, user_id)
     try:
         user_sb.table("user_clubs").delete().eq("user_id", user_id).eq("club_id", club_id).execute()
+        student_context.invalidate(user_id)
         return {"success": True}
     except Exception as e:
         logger.exception(f"Error leaving club: {e}")
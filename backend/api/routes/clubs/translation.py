@@ -83,14 +83,13 @@ def clear_translations_for_fields(supabase, club_id: str, changed_fields: list[s
         logger.warning(f"Failed to clear stale club translations for {club_id}: {e}")
 
 
-def _translate_fields(source: dict, lang: str) -> dict:
+async def _translate_fields(source: dict, lang: str) -> dict:
     """One Haiku call translating the given {field: text} map into `lang`.
     Returns {field: translated}. On any failure returns the source unchanged
     (caller shows English rather than erroring)."""
-    # Import here to avoid a circular import at module load (chat imports courses,
-    # which is unrelated, but keep the clubs package import-light regardless).
+    # Imported here to keep the clubs package import-light.
     from ...config import settings
-    from ..chat import get_anthropic_client
+    from ...utils import llm
 
     lang_name = _LANG_NAMES[lang]
     # Indirect prompt injection defence. This text is club-owner-controlled and
@@ -112,8 +111,8 @@ def _translate_fields(source: dict, lang: str) -> dict:
         f"student club listing.\n\n{payload}"
     )
     try:
-        client = get_anthropic_client()
-        message = client.messages.create(
+        message = await llm.create(
+            "club_translation",
             model=settings.CLAUDE_MODEL,
             max_tokens=1500,
             messages=[{"role": "user", "content": prompt}],
@@ -173,7 +172,7 @@ async def get_club_translation(
         result.update(cached)
         return result
 
-    translated = _translate_fields(source, lang)
+    translated = await _translate_fields(source, lang)
 
     # Persist the cache (best-effort — a write failure still returns the text).
     try:
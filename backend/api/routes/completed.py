@@ -11,6 +11,7 @@ from datetime import datetime
 
 from ..config import settings
 from ..utils.supabase_client import get_supabase, get_user_by_id
+from ..utils import student_context
 from ..exceptions import DatabaseException, UserNotFoundException
 from ..auth import get_current_user_id, require_self, get_user_db
 
@@ -198,6 +199,7 @@ async def add_completed_course(user_id: str, course: CompletedCourse, req: Reque
             raise DatabaseException("add_completed", "No data returned")
 
         logger.info(f"Added completed course {course.course_code} for user {user_id}")
+        student_context.invalidate(user_id)
         return {
             "completed_course": response.data[0],
             "message": "Course marked as completed",
@@ -265,6 +267,7 @@ async def update_completed_course(
                 detail="Completed course not found",
             )
 
+        student_context.invalidate(user_id)
         return {
             "completed_course": response.data[0],
             "message": "Course updated",
@@ -291,6 +294,7 @@ async def remove_completed_course(user_id: str, course_code: str, req: Request,
         ).eq("course_code", course_code).execute()
 
         logger.info(f"Removed completed course {course_code} for user {user_id}")
+        student_context.invalidate(user_id)
         return {"message": "Course removed", "course_code": course_code}
     except Exception as e:
         logger.exception(f"Error removing completed course: {e}")
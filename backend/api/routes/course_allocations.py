@@ -18,6 +18,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
 
 from ..auth import get_current_user_id, require_self
+from ..utils import student_context
 from ..utils.supabase_client import get_supabase
 
 router = APIRouter()
@@ -112,6 +113,7 @@ async def set_allocation(
             {"user_id": user_id, "course_code": code, "program_key": program_key},
             on_conflict="user_id,course_code",
         ).execute()
+        student_context.invalidate(user_id)
         return {"ok": True, "course_code": code, "program_key": program_key}
     except HTTPException:
         raise
@@ -135,6 +137,7 @@ async def delete_allocation(
             .eq("user_id", user_id)
             .eq("course_code", code)
             .execute())
+        student_context.invalidate(user_id)
         return {"ok": True, "course_code": code}
     except Exception as exc:
         logger.exception("delete_allocation failed: %s", exc)
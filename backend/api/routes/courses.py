@@ -14,11 +14,11 @@ EGRESS FIX (v2):
        sql/fix_egress_2_search_courses_rpc.sql).  Postgres does the GROUP BY
        + AVG and returns exactly `limit` pre-aggregated rows.
 
-  Problem 3 — In-memory SimpleCache is wiped on every Vercel cold start, so
+  Problem 3 — In-memory BoundedCache is wiped on every Vercel cold start, so
   each new instance re-downloads the full datasets.
   Mitigation: the two SQL fixes above make cold-start fetches cheap (tiny
-  payloads).  For a full fix, replace SimpleCache with an external store such
-  as Upstash Redis (one line change in cache.py).
+  payloads).  Setting CACHE_REDIS_URL gives the caches a shared Redis L2
+  (see utils/cache.py), so cold instances start from warm entries.
 
 KEY REMINDER: Route order matters in FastAPI. /search and /subjects MUST be
 declared before /{subject}/{catalog}, otherwise FastAPI matches "search" and
@@ -30,11 +30,16 @@ from fastapi.responses import JSONResponse
 from typing import Optional
 import logging
 import re
+import time
+
+from postgrest import APIError
 
 from ..config import settings
 from ..utils.supabase_client import get_supabase
 from ..exceptions import DatabaseException
+from ..utils import term_offerings
 from ..utils.cache import search_cache, subjects_cache
+from ..utils.swr import SWRLoader
 from ..auth import get_current_user_id
 
 router = APIRouter()
@@ -52,52 +57,43 @@ def _norm_code(subject: str, catalog: str) -> str:
     return f"{subject or ''}{catalog or ''}".upper().replace(" ", "")
 
 
-def _load_term_offerings():
-    """Scan mcgill_sections once → (terms, offerings, instructors).
-
-    - terms:       {term label}
-    - offerings:   {term: {normalized course code}}
-    - instructors: {term: {normcode: representative instructor}} — the most
-                   common named instructor across the course's sections that term.
+def _fetch_term_offerings():
+    """Build (terms, offerings, instructors) — see utils/term_offerings.py.
 
-    Paginated because Supabase caps a select at 1000 rows. Cached 6h.
+    Another instance's recent build is taken from search_cache (its L2) when
+    there is one; otherwise scan mcgill_sections and share the result.
     """
-    cached = search_cache.get(_TERM_OFFERINGS_KEY)
-    if cached is not None:
-        return cached
-    from collections import Counter
-    sb = get_supabase()
-    terms: set[str] = set()
-    offerings: dict[str, set] = {}
-    instr_counts: dict[tuple, Counter] = {}
-    start, page = 0, 1000
-    while True:
-        rows = (
-            sb.table("mcgill_sections").select("term, course_code, instructor")
-            .range(start, start + page - 1).execute().data or []
-        )
-        if not rows:
-            break
-        for r in rows:
-            t, c = r.get("term"), r.get("course_code")
-            if not t or not c:
-                continue
-            code = c.upper().replace(" ", "")
-            terms.add(t)
-            offerings.setdefault(t, set()).add(code)
-            if r.get("instructor"):
-                instr_counts.setdefault((t, code), Counter())[r["instructor"]] += 1
-        if len(rows) < page:
-            break
-        start += page
-    instructors: dict[str, dict] = {}
-    for (t, code), counter in instr_counts.items():
-        instructors.setdefault(t, {})[code] = counter.most_common(1)[0][0]
-    result = (terms, offerings, instructors)
-    search_cache.set(_TERM_OFFERINGS_KEY, result, ttl=21600)
+    shared = search_cache.get(_TERM_OFFERINGS_KEY)
+    if shared is not None:
+        return shared
+    result = term_offerings.scan(get_supabase())
+    search_cache.set(_TERM_OFFERINGS_KEY, result)
     return result
 
 
+# Stale-while-revalidate: after 6h the old value keeps being served while
+# one background thread rescans. A cold instance starts from the snapshot
+# written by `scripts/import_sections.py --apply`, so no request waits on
+# the scan unless that file is missing.
+_term_offerings = SWRLoader(
+    "term_offerings",
+    _fetch_term_offerings,
+    fresh_seconds=21600,
+    seed=term_offerings.read_snapshot,
+)
+
+
+def _load_term_offerings():
+    """(terms, offerings, instructors) for the term filter; see
+    utils/term_offerings.aggregate() for the shape."""
+    return _term_offerings.get()
+
+
+def prime_term_offerings() -> bool:
+    """Load the prebuilt snapshot, if any. Called at startup."""
+    return _term_offerings.seed()
+
+
 def _historical_prof_avgs(codes: set[str], instructors: set[str]) -> dict:
     """{(normcode, instructor_lower): (avg_gpa, n)} from the historical courses table.
 
@@ -171,31 +167,91 @@ def extract_course_codes(text: str, limit: int = 3) -> list[str]:
     return codes
 
 
-def fetch_course_grounding(course_code: str) -> dict | None:
+# Facts are cached per normalised code in search_cache, so instances share
+# them through its L2: "grounding:" for real courses, "grounding_miss:" for
+# codes the catalogue doesn't have (over-matches like "THE 100" would
+# otherwise cost a lookup on every message). Failed lookups aren't cached.
+# Uncached codes go to the get_course_grounding RPC together — one round-trip
+# per message at most (2026_10_18e_course_grounding_rpc.sql). Until it is
+# applied, fall back to one get_course_details call per code.
+_BATCH_RPC_RETRY_AFTER = 300  # seconds before re-probing a missing RPC
+_batch_rpc_disabled_until = 0.0
+
+
+def _grounding_facts(course_code: str, row: dict) -> dict:
+    result = {
+        "code": course_code,
+        "title": row.get("course_name") or "",
+        "average": row.get("recent_avg"),
+        "prerequisites": row.get("prerequisites") or None,
+    }
+    if row.get("rmp_rating"):
+        result["rmp_rating"] = row.get("rmp_rating")
+        result["rmp_difficulty"] = row.get("rmp_difficulty")
+    return result
+
+
+def _lookup_course_details(codes: list[str]) -> dict[str, dict | None]:
+    """{code: get_course_details row, or None if there is no such course}.
+    Codes whose lookup failed are left out."""
+    global _batch_rpc_disabled_until
+    supabase = get_supabase()
+    if time.monotonic() >= _batch_rpc_disabled_until:
+        try:
+            rows = supabase.rpc("get_course_grounding", {"p_course_codes": codes}).execute().data or []
+            found = {r["course_code"]: r.get("details") for r in rows}
+            return {c: found.get(c) for c in codes}
+        except APIError as e:
+            if e.code != "PGRST202":
+                logger.warning(f"Course grounding lookup failed for {codes}: {e}")
+                return {}
+            logger.info("get_course_grounding RPC unavailable — looking courses up one at a time")
+            _batch_rpc_disabled_until = time.monotonic() + _BATCH_RPC_RETRY_AFTER
+        except Exception as e:
+            logger.warning(f"Course grounding lookup failed for {codes}: {e}")
+            return {}
+
+    details: dict[str, dict | None] = {}
+    for code in codes:
+        try:
+            rows = supabase.rpc("get_course_details", {"p_course_code": code}).execute().data or []
+            details[code] = rows[0] if rows else None
+        except Exception as e:
+            logger.warning(f"Course grounding lookup failed for {code}: {e}")
+    return details
+
+
+def fetch_course_groundings(course_codes: list[str]) -> dict[str, dict]:
     """Lean version of get_course_details's RPC call for AI-grounding use —
     just the facts (title, grade average, RMP rating, prerequisites), no
-    schedule/term data. Returns None if the course isn't found or the lookup
-    fails (caller should treat that as "no verified data", not an error)."""
-    try:
-        supabase = get_supabase()
-        rpc_resp = supabase.rpc("get_course_details", {"p_course_code": course_code}).execute()
-        rows = rpc_resp.data or []
-        if not rows:
-            return None
-        row = rows[0]
-        result = {
-            "code": course_code,
-            "title": row.get("course_name") or "",
-            "average": row.get("recent_avg"),
-            "prerequisites": row.get("prerequisites") or None,
-        }
-        if row.get("rmp_rating"):
-            result["rmp_rating"] = row.get("rmp_rating")
-            result["rmp_difficulty"] = row.get("rmp_difficulty")
-        return result
-    except Exception as e:
-        logger.warning(f"Course grounding lookup failed for {course_code}: {e}")
-        return None
+    schedule/term data — for several normalised codes ("COMP250") at once.
+    Returns {code: facts} for the codes that are real courses; a code that
+    isn't found or whose lookup failed is simply absent (caller should treat
+    that as "no verified data", not an error)."""
+    found: dict[str, dict] = {}
+    uncached: list[str] = []
+    for code in course_codes:
+        facts = search_cache.get(f"grounding:{code}")
+        if facts is not None:
+            found[code] = facts
+        elif search_cache.get(f"grounding_miss:{code}") is None:
+            uncached.append(code)
+    if not uncached:
+        return found
+
+    for code, row in _lookup_course_details(uncached).items():
+        if row:
+            found[code] = _grounding_facts(code, row)
+            search_cache.set(f"grounding:{code}", found[code])
+        else:
+            search_cache.set(f"grounding_miss:{code}", True)
+    return found
+
+
+def fetch_course_grounding(course_code: str) -> dict | None:
+    """fetch_course_groundings() for one code. Returns None if the course
+    isn't found or the lookup fails."""
+    return fetch_course_groundings([course_code]).get(course_code)
 
 
 def build_course_grounding_block(text: str, limit: int = 3) -> str | None:
@@ -205,7 +261,8 @@ def build_course_grounding_block(text: str, limit: int = 3) -> str | None:
     codes = extract_course_codes(text, limit=limit)
     if not codes:
         return None
-    facts = [f for c in codes if (f := fetch_course_grounding(c))]
+    by_code = fetch_course_groundings(codes)
+    facts = [by_code[c] for c in codes if c in by_code]
     if not facts:
         return None
     lines = []
@@ -362,7 +419,7 @@ async def search(
             "term":             clean_term,
             "includes_ratings": include_ratings,
         }
-        search_cache.set(cache_key, result, ttl=300)
+        search_cache.set(cache_key, result)
         return JSONResponse(
             content=result,
             headers={"Cache-Control": "public, max-age=60, s-maxage=300, stale-while-revalidate=3600"},
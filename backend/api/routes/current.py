@@ -9,6 +9,7 @@ import logging
 import re
 
 from ..utils.supabase_client import get_supabase, get_user_by_id
+from ..utils import student_context
 from ..exceptions import DatabaseException, UserNotFoundException
 from ..auth import get_current_user_id, require_self, get_user_db
 
@@ -105,6 +106,7 @@ async def add_current_course(user_id: str, course: CurrentCourse, req: Request,
         if not response.data:
             raise DatabaseException("add_current", "No data returned")
 
+        student_context.invalidate(user_id)
         return {"current_course": response.data[0], "message": "Course added to current courses"}
     except HTTPException:
         raise
@@ -120,6 +122,7 @@ async def remove_current_course(user_id: str, course_code: str, req: Request, cu
     course_code = normalize_course_code(course_code)
     try:
         user_sb.table("current_courses").delete().eq("user_id", user_id).eq("course_code", course_code).execute()
+        student_context.invalidate(user_id)
         return {"message": "Course removed", "course_code": course_code}
     except Exception as e:
         logger.exception(f"Error removing current course: {e}")
@@ -8,29 +8,18 @@ fewer patterns — trivially bypassed with "1gn0re prev1ous" or zero-width chars
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, Field
 from typing import List, Optional
-import anthropic
 import json
 import re
 
 from api.config import settings
 from api.auth import get_current_user_id
+from api.utils import llm
 
 # SEC-004 FIX: Use the shared, stronger sanitiser
 from api.utils.sanitise import sanitise_user_message
 
 router = APIRouter()
 
-# ── Module-level singleton — created once, reused across all requests ─────────
-_async_client: Optional[anthropic.AsyncAnthropic] = None
-
-
-def _get_client() -> anthropic.AsyncAnthropic:
-    global _async_client
-    if _async_client is None:
-        _async_client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
-    return _async_client
-
-
 # SEC-004 FIX: Removed the local _INJECTION_PATTERNS and _sanitize_field().
 # Now using sanitise_user_message() from the shared module which has:
 #  - L33tspeak normalisation
@@ -65,8 +54,6 @@ async def recommend_electives(
         raise HTTPException(status_code=403, detail={"code": "email_not_verified", "message": "Verify your email to generate recommendations."})
     check_and_record_llm_usage(current_user_id, kind="electives")
     try:
-        client = _get_client()
-
         # SEC-004 FIX: Use shared sanitiser for all user-controlled fields.
         # sanitise_user_message raises HTTP 400 on injection pattern match.
         def _safe(value: str, fallback: str = "Not set") -> str:
@@ -139,7 +126,9 @@ Respond ONLY with valid JSON, no markdown, no explanation:
   ]
 }}"""
 
-        message = await client.messages.create(
+        message = await llm.create(
+            "electives",
+            trace={"user_id": current_user_id},
             model=settings.CLAUDE_MODEL,
             max_tokens=1200,
             messages=[{"role": "user", "content": prompt}]
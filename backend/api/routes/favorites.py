@@ -7,6 +7,7 @@ from pydantic import BaseModel
 import logging
 
 from ..utils.supabase_client import get_supabase
+from ..utils import student_context
 from ..exceptions import DatabaseException
 from ..auth import get_current_user_id, require_self, get_user_db
 
@@ -87,6 +88,7 @@ async def add_user_favorite(user_id: str, favorite: FavoriteRequest, req: Reques
         if not response.data:
             raise DatabaseException("add_favorite", "No data returned from insert")
         logger.info(f"Added favorite {favorite.course_code} for user {user_id}")
+        student_context.invalidate(user_id)
         return {
             "favorite": response.data[0],
             "message": "Course added to favorites"
@@ -131,6 +133,7 @@ async def remove_user_favorite(user_id: str, course_code: str, req: Request, cur
     try:
         user_sb.table("favorites").delete().eq("user_id", user_id).eq("course_code", course_code).execute()
         logger.info(f"Removed favorite {course_code} for user {user_id}")
+        student_context.invalidate(user_id)
         return {
             "message": "Course removed from favorites",
             "course_code": course_code
@@ -48,6 +48,7 @@ import hashlib
 from datetime import datetime, timezone, date
 from html import escape
 
+from ..utils.batch_loader import BatchLoader, member_emails
 from ..utils.supabase_client import get_supabase
 from ..auth import get_current_user_id
 from ..config import settings
@@ -139,8 +140,12 @@ def _send_newsletter_email(to_email: str, source_name: str, source_url: str, act
         logger.exception(f"Failed to send newsletter subscription email: {e}")
 
 
-def _notify_newsletter_subscribers(source_id: str, source_name: str, events: list):
-    """Email all subscribers of a newsletter source about new events."""
+def _notify_newsletter_subscribers(source_id: str, source_name: str, events: list, users: Optional[BatchLoader] = None):
+    """Email all subscribers of a newsletter source about new events.
+
+    `users` is the scrape run's shared users loader, so a student subscribed
+    to several sources is looked up once per run, not once per source.
+    """
     if not settings.RESEND_API_KEY or not events:
         return
     try:
@@ -149,16 +154,9 @@ def _notify_newsletter_subscribers(source_id: str, source_name: str, events: lis
         if not subs.data:
             return
 
-        emails = []
-        for s in subs.data:
-            if s.get("email_muted"):
-                continue
-            try:
-                u = sb.table("users").select("email").eq("id", s["user_id"]).single().execute()
-                if u.data and u.data.get("email"):
-                    emails.append(u.data["email"])
-            except Exception:
-                continue
+        if users is None:
+            users = BatchLoader(sb, "users", "email")
+        emails = member_emails(users, (s["user_id"] for s in subs.data if not s.get("email_muted")))
         if not emails:
             return
 
@@ -888,6 +886,7 @@ async def scrape_newsletter_sources(request: Request):
 
     total_new = 0
     source_results = {}
+    users = BatchLoader(sb, "users", "email")  # shared by every source's notification
 
     for src in sources:
         source_id = src["id"]
@@ -937,7 +936,7 @@ async def scrape_newsletter_sources(request: Request):
             source_results[source_name] = len(new_events)
             # Notify subscribers about new events
             try:
-                _notify_newsletter_subscribers(source_id, source_name, new_events)
+                _notify_newsletter_subscribers(source_id, source_name, new_events, users=users)
             except Exception as e:
                 logger.error(f"Newsletter notification error for {source_name}: {e}")
 
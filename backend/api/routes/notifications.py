@@ -22,6 +22,7 @@ from html import escape
 from datetime import date, timedelta
 import resend
 from ..config import settings
+from ..utils import student_context
 from ..utils.supabase_client import get_supabase
 from ..utils.email_footer import casl_footer_html
 from ..auth import get_current_user_id, require_self
@@ -318,6 +319,7 @@ async def schedule_event(event: CalendarEventIn, request: Request, current_user_
 
     if not saved_id:
         raise HTTPException(status_code=500, detail="Failed to save event")
+    student_context.invalidate(event.user_id)
 
     # Queue notifications
     if event.notify_enabled and saved_id:
@@ -337,6 +339,7 @@ async def delete_event(event_id: str, body: EventDeleteRequest, current_user_id:
     # user's pending notifications. eq("user_id", ...) closes that IDOR.
     supabase.table("notification_queue").delete().eq("event_id", event_id).eq("user_id", body.user_id).execute()
     supabase.table("calendar_events").delete().eq("id", event_id).eq("user_id", body.user_id).execute()
+    student_context.invalidate(body.user_id)
     return {"ok": True}
 
 
@@ -410,26 +413,28 @@ async def run_cron(request: Request, x_cron_secret: Optional[str] = Header(None)
         else:
             fail_count += 1
 
-    # Post-finals transcript reminder — only fires on configured dates
+    # Reminder cards — each fires only on its configured dates, and is handed
+    # to Inngest as a chunked broadcast (utils/broadcast.py) rather than run
+    # user by user inside this request.
+    from .cards import run_reminder_broadcast
+
+    # Post-finals transcript reminder
     try:
-        from .cards import run_transcript_reminder_cron
-        reminder_result = run_transcript_reminder_cron()
+        reminder_result = await run_reminder_broadcast("transcript_reminder")
     except Exception as e:
         logger.exception(f"Transcript reminder cron failed: {e}")
         reminder_result = {"sent": 0, "error": str(e)}
 
     # Course registration reminder — only fires on late-May dates
     try:
-        from .cards import run_course_registration_reminder_cron
-        registration_result = run_course_registration_reminder_cron()
+        registration_result = await run_reminder_broadcast("course_registration")
     except Exception as e:
         logger.exception(f"Course registration reminder cron failed: {e}")
         registration_result = {"sent": 0, "error": str(e)}
 
     # Summer course registration reminder — only fires on early-March dates
     try:
-        from .cards import run_summer_registration_reminder_cron
-        summer_result = run_summer_registration_reminder_cron()
+        summer_result = await run_reminder_broadcast("summer_registration")
     except Exception as e:
         logger.exception(f"Summer registration reminder cron failed: {e}")
         summer_result = {"sent": 0, "error": str(e)}
@@ -452,6 +457,11 @@ async def run_cron(request: Request, x_cron_secret: Optional[str] = Header(None)
         logger.exception(f"Academic-year advance cron failed: {e}")
         academic_year_result = {"advanced": 0, "error": str(e)}
 
+    # rate_limits sweep — normally every 10 min from Inngest; this is the
+    # backstop for deployments where Inngest isn't wired up (previews).
+    from ..utils.rate_limit_maintenance import run_rate_limit_sweep_cron
+    rate_limit_sweep_result = run_rate_limit_sweep_cron()
+
     # If the bulk send had a high failure rate, flag the run as failed to
     # the heartbeat monitor even though the handler returned 200 — a 90%
     # bounce rate means something is wrong (Resend down, DKIM broke) even
@@ -482,4 +492,5 @@ async def run_cron(request: Request, x_cron_secret: Optional[str] = Header(None)
         "summer_reminders":       summer_result,
         "stale_clubs":            stale_clubs_result,
         "academic_year_advance":  academic_year_result,
+        "rate_limit_sweep":       rate_limit_sweep_result,
     }
@@ -225,7 +225,7 @@ async def get_rmp_by_name(
                 'match_score': round(match_score, 3),
             }
 
-        search_cache.set(cache_key, result, ttl=600)
+        search_cache.set(cache_key, result)
         return result
 
     except Exception as e:
@@ -292,7 +292,7 @@ async def get_rmp_by_course(
             'professors':  professors,
             'count':       len(professors),
         }
-        search_cache.set(cache_key, result, ttl=600)
+        search_cache.set(cache_key, result)
         return result
 
     except Exception as e:
@@ -340,7 +340,7 @@ async def search_professors(
         professors = professors[:limit]
 
         result = {'professors': professors, 'count': len(professors), 'query': clean_q}
-        search_cache.set(cache_key, result, ttl=300)
+        search_cache.set(cache_key, result)
         return result
 
     except Exception as e:
@@ -411,7 +411,7 @@ async def _bulk_lookup(raw_codes: list[str]) -> dict:
             ratings[normalized] = _format_professor(best) if best else None
 
         result = {'ratings': ratings, 'courses_checked': len(codes)}
-        search_cache.set(cache_key, result, ttl=600)
+        search_cache.set(cache_key, result)
         return result
 
     except Exception as e:
@@ -9,7 +9,6 @@ then populates calendar_events and enriches current_courses.
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Request
 from fastapi.responses import JSONResponse
 from typing import List, Optional
-import anthropic
 import asyncio
 import base64
 import logging
@@ -25,6 +24,7 @@ import inngest
 from ..routes.professors import _escape_like
 from ..utils.supabase_client import get_supabase, get_user_by_id
 from ..utils.jobs import create_job
+from ..utils import llm, student_context
 from ..exceptions import UserNotFoundException
 from ..config import settings
 from ..auth import get_current_user_id, require_self, get_user_db
@@ -106,17 +106,6 @@ def _lookup_rmp(supabase, instructor_name: str, course_code: str | None) -> dict
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# FIX #9: Module-level AsyncAnthropic singleton — created once, reused across all requests.
-_async_anthropic_client: anthropic.AsyncAnthropic | None = None
-
-
-def _get_async_client() -> anthropic.AsyncAnthropic:
-    global _async_anthropic_client
-    if _async_anthropic_client is None:
-        _async_anthropic_client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
-    return _async_anthropic_client
-
-
 # ── Extraction prompt ──────────────────────────────────────────────────────────
 
 SYLLABUS_EXTRACTION_PROMPT = """You are parsing a McGill University course syllabus PDF.
@@ -240,17 +229,17 @@ def normalize_course_code(code: str) -> str:
 
 # FIX #1: Declare as async and use AsyncAnthropic + await so the Claude API call
 # doesn't block FastAPI's event loop during the ~5–15 second extraction.
-# FIX #9: Use the module-level singleton client instead of creating one per call.
+# FIX #9: Calls go through the shared LLM gateway (utils/llm.py).
 async def _extract_syllabus_data(pdf_bytes: bytes) -> dict:
     # PRIVACY: this receives ONLY the syllabus PDF and the static extraction
     # prompt — no student name, email, username, user_id, or profile. The
     # syllabus is the professor's document (any emails in it are the
     # instructor's/TA's, which is the intended extraction output, not student
     # PII). Do not add student-identifying context to this call.
-    client = _get_async_client()
     b64 = base64.standard_b64encode(pdf_bytes).decode("utf-8")
 
-    msg = await client.messages.create(  # FIX #1: await the async call
+    msg = await llm.create(  # FIX #1: await the async call
+        "syllabus",
         model=settings.CLAUDE_MODEL,
         max_tokens=4096,
         messages=[
@@ -597,6 +586,7 @@ def _persist_syllabus_result(user_id: str, filename: str, extracted: dict, supab
         "Syllabus import user=%s course=%s events=%d course_updated=%s",
         user_id, course_code, result["calendar_events_added"], result["current_course_updated"]
     )
+    student_context.invalidate(user_id)
     return result
 
 
@@ -1063,6 +1053,7 @@ async def parse_syllabuses(
             f"{result['calendar_events_added']} events added, "
             f"current_course_updated={result['current_course_updated']}"
         )
+        student_context.invalidate(user_id)
 
         # ── 5. Lookup RMP data for extracted professor ─────────────────────────
         if instructor.get("name") and course_code:
@@ -5,8 +5,6 @@ then bulk-import completed + current courses and update the user profile.
 """
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Request
 from fastapi.responses import JSONResponse
-from typing import Optional
-import anthropic
 import asyncio
 import base64
 import logging
@@ -19,6 +17,8 @@ import inngest
 from ..utils.supabase_client import get_supabase, get_user_by_id, update_user
 from ..utils.audit import log_access
 from ..utils.jobs import create_job
+from ..utils import llm
+from ..utils import student_context
 from ..exceptions import UserNotFoundException
 from ..config import settings
 from ..auth import get_current_user_id, require_self, get_user_db
@@ -29,17 +29,6 @@ PDF_MAGIC = b'%PDF'
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# ── Singleton async client (created once, reused across all requests) ─────────
-_async_anthropic_client: Optional[anthropic.AsyncAnthropic] = None
-
-
-def _get_async_client() -> anthropic.AsyncAnthropic:
-    global _async_anthropic_client
-    if _async_anthropic_client is None:
-        _async_anthropic_client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
-    return _async_anthropic_client
-
-
 # ── Constants ─────────────────────────────────────────────────────────────────
 
 VALID_TERMS = {"fall", "winter", "summer"}
@@ -55,10 +44,6 @@ COURSE_CODE_PATTERN = re.compile(
     re.IGNORECASE,
 )
 
-# Retries for transient Anthropic API errors (e.g. 500 Internal Server Error)
-_ANTHROPIC_MAX_RETRIES = 2
-_ANTHROPIC_RETRY_BACKOFF = 1.5  # seconds; doubles each attempt
-
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
@@ -302,11 +287,9 @@ def _redact_transcript_text(pdf_bytes: bytes) -> str | None:
     return text
 
 
-# ── Claude extraction (with retry on transient 500s) ─────────────────────────
+# ── Claude extraction ─────────────────────────
 
 async def extract_transcript_data(pdf_bytes: bytes) -> dict:
-    client = _get_async_client()
-
     # Redact the student ID / permanent code locally BEFORE the call. We send
     # Claude the redacted text so those identifiers never leave our server.
     # Only a scanned/image transcript (no text layer) falls back to the PDF.
@@ -328,35 +311,13 @@ async def extract_transcript_data(pdf_bytes: bytes) -> dict:
         {"type": "text", "text": EXTRACTION_PROMPT},
     ]
 
-    last_exc: Exception = RuntimeError("unreachable")
-    for attempt in range(_ANTHROPIC_MAX_RETRIES + 1):
-        try:
-            message = await client.messages.create(
-                model=settings.CLAUDE_MODEL,
-                max_tokens=4000,
-                messages=[{"role": "user", "content": content}],
-            )
-            break  # success — exit retry loop
-        except anthropic.InternalServerError as e:
-            last_exc = e
-            if attempt < _ANTHROPIC_MAX_RETRIES:
-                wait = _ANTHROPIC_RETRY_BACKOFF * (2 ** attempt)
-                logger.warning(
-                    f"Anthropic 500 on attempt {attempt + 1}, retrying in {wait:.1f}s … "
-                    f"(request_id={getattr(e, 'request_id', 'unknown')})"
-                )
-                await asyncio.sleep(wait)
-            else:
-                logger.error(f"Anthropic 500 after {_ANTHROPIC_MAX_RETRIES + 1} attempts: {e}")
-                raise
-        except (anthropic.APIConnectionError, anthropic.APITimeoutError) as e:
-            last_exc = e
-            if attempt < _ANTHROPIC_MAX_RETRIES:
-                wait = _ANTHROPIC_RETRY_BACKOFF * (2 ** attempt)
-                logger.warning(f"Anthropic connection error on attempt {attempt + 1}, retrying in {wait:.1f}s … ({e})")
-                await asyncio.sleep(wait)
-            else:
-                raise
+    # Transient 429 / 5xx / connection errors are retried by the gateway.
+    message = await llm.create(
+        "transcript",
+        model=settings.CLAUDE_MODEL,
+        max_tokens=4000,
+        messages=[{"role": "user", "content": content}],
+    )
 
     raw = message.content[0].text.strip()
     raw = re.sub(r"^```(?:json)?\s*", "", raw, flags=re.MULTILINE)
@@ -676,6 +637,7 @@ def _persist_transcript_data(user_id: str, extracted: dict, user_sb=None) -> dic
         f"+{results['current_added']} current, "
         f"profile_updated={results['profile_updated']}"
     )
+    student_context.invalidate(user_id)
     return results
 
 
@@ -26,6 +26,7 @@ from api.exceptions import (
 )
 from ..config import settings
 from ..auth import get_current_user_id, require_self, get_user_db
+from ..utils import auth_identity, student_context
 from ..utils.audit import log_access
 
 router = APIRouter()
@@ -338,6 +339,7 @@ async def create_new_user(user: UserCreate, req: Request, current_user_id: str =
         user_data["email_verified"] = auth_email_confirmed
 
         new_user = create_user_db(user_data)
+        auth_identity.invalidate(current_user_id)
         logger.info(f"New user created: {new_user.get('id')}")
         return {"user": new_user, "message": "User profile created successfully"}
 
@@ -377,6 +379,7 @@ async def get_user(user_id: str, req: Request, current_user_id: str = Depends(ge
                         {"email_verified": True}
                     ).eq("id", user_id).execute()
                     user["email_verified"] = True
+                    auth_identity.invalidate(user_id)
             except Exception:
                 pass  # best-effort; polling will retry in 4s
         return {"user": user}
@@ -428,6 +431,7 @@ async def update_user(user_id: str, updates: UserUpdate, req: Request, current_u
         # UserNotFoundException when the UPDATE matches no row, so one DB
         # round-trip instead of two on every profile save.
         updated_user = update_user_db(user_id, update_data)
+        student_context.invalidate(user_id)
         logger.info(f"User profile updated: {user_id}")
 
         return {
@@ -517,6 +521,8 @@ async def delete_user_account(user_id: str, req: Request, current_user_id: str =
         if errors:
             logger.error(f"Partial deletion for {user_id}. Failed tables: {errors}")
 
+        auth_identity.invalidate(user_id)
+        student_context.invalidate(user_id)
         logger.info(f"Account deleted: {user_id}")
         return {"message": "Account deleted successfully"}
 
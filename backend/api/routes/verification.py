@@ -35,6 +35,7 @@ from pydantic import BaseModel
 
 from api.auth import get_current_user_id
 from api.config import settings
+from api.utils import auth_identity
 from api.utils.supabase_client import get_supabase, with_retry
 
 router = APIRouter()
@@ -212,6 +213,7 @@ async def send_verification(
             "email_verified": False,
             "last_verification_sent_at": datetime.now(timezone.utc).isoformat(),
         }).eq("id", current_user_id).execute()
+        auth_identity.invalidate(current_user_id)
 
     with_retry("store_verification_token", _store)
 
@@ -297,6 +299,7 @@ async def check_verified(user_id: str):
             sb.auth.admin.update_user_by_id(user_id, {"email_confirm": True})
         except Exception:
             pass
+        auth_identity.invalidate(user_id)
 
     return {"verified": verified}
 
@@ -352,6 +355,7 @@ async def verify_email(req: VerifyEmailRequest):
         get_supabase().auth.admin.update_user_by_id(req.user_id, {"email_confirm": True})
     except Exception:
         pass  # not fatal — our own column is already set
+    auth_identity.invalidate(req.user_id)
 
     logger.info("Email verified for user %s", req.user_id)
     return {"ok": True}
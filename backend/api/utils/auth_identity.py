@@ -0,0 +1,136 @@
+"""
+Shared auth-identity cache.
+
+Four checks on the request path each asked Supabase Auth for the same user
+record on their own: main.auth_flags, llm_budget._is_admin_user,
+auth.require_mcgill_email and verified_user.is_email_verified. A chat turn
+ran two or three of them, so one message cost up to three Auth Admin
+round-trips before Claude was called. They now all read one entry:
+
+    {
+        "email":           auth.users email, lower-cased ("" if unknown),
+        "email_confirmed": auth.users.email_confirmed_at is set,
+        "email_verified":  users.email_verified (our own Resend flow),
+        "is_admin":        email is in ADMIN_EMAILS,
+        "found":           the Auth lookup succeeded,
+    }
+
+Entries live for AUTH_IDENTITY_CACHE_SECONDS. A failed or empty Auth lookup
+is cached too (negative caching), but only for the shorter
+AUTH_IDENTITY_NEGATIVE_CACHE_SECONDS, so an Auth outage costs one lookup per
+user per few seconds instead of one per request, and recovers quickly.
+
+Anything that changes a user's verification or email state must call
+invalidate(user_id) so the next check sees it — otherwise a student who
+just clicked their link would stay "unverified" for up to a minute.
+
+stats() returns hit/miss counters for the admin dashboard.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from ..config import settings
+from . import supabase_client
+
+logger = logging.getLogger(__name__)
+
+# { user_id: (identity, expires_at_epoch) } — insertion-ordered, so the
+# oldest entry is the first one evicted once the cache is full.
+_cache: dict[str, tuple[dict, float]] = {}
+_CACHE_MAX = 4096
+_lock = threading.Lock()
+
+_counters = {"hits": 0, "negative_hits": 0, "misses": 0, "lookup_errors": 0, "invalidations": 0}
+
+
+def _admin_emails() -> set[str]:
+    return {e.strip().lower() for e in settings.ADMIN_EMAILS.split(",") if e.strip()}
+
+
+def _fetch(user_id: str) -> dict:
+    """One Auth Admin lookup plus the users.email_verified column."""
+    sb = supabase_client.get_supabase()
+
+    email = ""
+    confirmed = False
+    found = False
+    try:
+        u = sb.auth.admin.get_user_by_id(user_id)
+        if u.user is not None:
+            email = (getattr(u.user, "email", None) or "").lower()
+            confirmed = bool(getattr(u.user, "email_confirmed_at", None))
+            found = True
+    except Exception as exc:
+        _counters["lookup_errors"] += 1
+        logger.warning("auth.admin.get_user failed for %s: %s", user_id, type(exc).__name__)
+
+    # Verified flag we set ourselves (via Resend round-trip)
+    verified = False
+    try:
+        row = sb.table("users").select("email_verified").eq("id", user_id).single().execute()
+        verified = bool((row.data or {}).get("email_verified"))
+    except Exception as exc:
+        logger.warning("users.email_verified fetch failed for %s: %s", user_id, type(exc).__name__)
+
+    return {
+        "email": email,
+        "email_confirmed": confirmed,
+        "email_verified": verified,
+        "is_admin": bool(email) and email in _admin_emails(),
+        "found": found,
+    }
+
+
+def get_identity(user_id: str) -> dict:
+    """Cached auth identity for a user. Never raises — a failed lookup comes
+    back with found=False and an empty email, which every caller treats as
+    "not admin, not McGill"."""
+    now = time.time()
+    with _lock:
+        hit = _cache.get(user_id)
+        if hit is not None and now < hit[1]:
+            _counters["hits" if hit[0]["found"] else "negative_hits"] += 1
+            return hit[0]
+        _counters["misses"] += 1
+
+    identity = _fetch(user_id)
+    ttl = (
+        settings.AUTH_IDENTITY_CACHE_SECONDS
+        if identity["found"]
+        else settings.AUTH_IDENTITY_NEGATIVE_CACHE_SECONDS
+    )
+    if ttl > 0:
+        with _lock:
+            _cache.pop(user_id, None)
+            if len(_cache) >= _CACHE_MAX:
+                _cache.pop(next(iter(_cache)))
+            _cache[user_id] = (identity, time.time() + ttl)
+    return identity
+
+
+def invalidate(user_id: str) -> None:
+    """Drop a user's entry. Call after any write that changes their email,
+    email confirmation or users.email_verified."""
+    with _lock:
+        if _cache.pop(user_id, None) is not None:
+            _counters["invalidations"] += 1
+
+
+def clear() -> None:
+    with _lock:
+        _cache.clear()
+        for k in _counters:
+            _counters[k] = 0
+
+
+def stats() -> dict:
+    with _lock:
+        lookups = _counters["hits"] + _counters["negative_hits"] + _counters["misses"]
+        return {
+            **_counters,
+            "size": len(_cache),
+            "hit_rate": round((lookups - _counters["misses"]) / lookups, 3) if lookups else 0.0,
+        }
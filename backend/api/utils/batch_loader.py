@@ -0,0 +1,131 @@
+"""
+Request-scoped batch loader for N+1 Supabase lookups.
+
+Fan-out code (club notifications, newsletter mail, the stale-club cron) used
+to look rows up one id at a time inside a loop — 300 members meant 300
+`users` queries. A BatchLoader collects the ids, dedupes them, and fetches
+them with chunked `.in_()` queries instead:
+
+    users = BatchLoader(supabase, "users", "email")
+    rows = users.load_many(member_ids)          # {id: row}, 2 queries for 300
+    users.load(member_ids[0])                   # cached — no query
+
+Results (including "no such row") are cached for the loader's lifetime, so
+create one per request or cron run — never a module-level one, or it would
+serve stale rows forever.
+
+many=True groups rows that share a key (e.g. user_clubs by club_id) and
+returns a list per key instead of a single row. A chunk can then match more
+rows than PostgREST returns in one response (its 1000-row cap truncates
+silently), so many=True pages through each chunk with .range(), ordered by
+(key, order_by), until a short page comes back. `where` narrows the rows on
+the server — {"role": ["owner", "admin"]} is an .in_(), a scalar an .eq():
+
+    admins = BatchLoader(sb, "user_clubs", "user_id", key="club_id", many=True,
+                         where={"role": ["owner", "admin"]}, order_by="user_id")
+
+Chunks (and pages) go through with_retry() as reads; one that still fails
+raises — nothing is cached for its chunk — and the caller decides whether a
+partial fan-out is acceptable.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from .supabase_client import with_retry
+
+logger = logging.getLogger(__name__)
+
+# ids per .in_() query. PostgREST puts them in the URL: 150 UUIDs is ~5.5 KB,
+# comfortably under the gateway's URL limit.
+DEFAULT_CHUNK_SIZE = 150
+
+# Rows per page for many=True — PostgREST's default max-rows. A page shorter
+# than this is the last one.
+PAGE_SIZE = 1000
+
+
+class BatchLoader:
+    def __init__(
+        self,
+        supabase,
+        table: str,
+        columns: str = "*",
+        *,
+        key: str = "id",
+        many: bool = False,
+        where: Optional[Dict[str, Any]] = None,
+        order_by: str = "id",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        self._sb = supabase
+        self._table = table
+        self._key = key
+        self._many = many
+        self._where = where or {}
+        self._order_by = order_by  # unique per key, so pages don't overlap
+        self._chunk_size = chunk_size
+        cols = [c.strip() for c in columns.split(",") if c.strip()]
+        if "*" not in cols and key not in cols:
+            cols.append(key)  # needed to map rows back to ids
+        self._columns = ", ".join(cols)
+        self._cache: Dict[Any, Any] = {}
+        self.queries = 0
+
+    def _query(self, ids: List[Any]):
+        query = self._sb.table(self._table).select(self._columns).in_(self._key, ids)
+        for col, val in self._where.items():
+            query = query.in_(col, list(val)) if isinstance(val, (list, tuple, set)) else query.eq(col, val)
+        return query
+
+    def _fetch(self, ids: List[Any]) -> List[Dict[str, Any]]:
+        if not self._many:
+            # At most one row per id, and a chunk is far under the row cap.
+            self.queries += 1
+            return with_retry(f"batch_load_{self._table}",
+                              lambda: self._query(ids).execute().data or [],
+                              retry_on_timeout=True)
+        rows: List[Dict[str, Any]] = []
+        while True:
+            start = len(rows)
+            self.queries += 1
+            page = with_retry(
+                f"batch_load_{self._table}",
+                lambda: (self._query(ids).order(self._key).order(self._order_by)
+                         .range(start, start + PAGE_SIZE - 1).execute().data or []),
+                retry_on_timeout=True,
+            )
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+
+    def load_many(self, ids: Iterable[Any]) -> Dict[Any, Any]:
+        """{id: row} (or {id: [rows]} when many=True) in first-seen id order.
+        Ids with no row map to None (or [])."""
+        wanted = list(dict.fromkeys(i for i in ids if i is not None))
+        missing = [i for i in wanted if i not in self._cache]
+
+        for start in range(0, len(missing), self._chunk_size):
+            chunk = missing[start:start + self._chunk_size]
+            found: Dict[Any, Any] = {i: ([] if self._many else None) for i in chunk}
+            for row in self._fetch(chunk):
+                k = row.get(self._key)
+                if k not in found:
+                    continue
+                if self._many:
+                    found[k].append(row)
+                else:
+                    found[k] = row
+            self._cache.update(found)
+
+        return {i: self._cache[i] for i in wanted}
+
+    def load(self, id_: Any) -> Optional[Any]:
+        return self.load_many([id_]).get(id_)
+
+
+def member_emails(users: BatchLoader, user_ids: Iterable[str]) -> List[str]:
+    """Non-empty `users.email` values for user_ids, deduped, in order."""
+    emails = [(row or {}).get("email") for row in users.load_many(user_ids).values()]
+    return list(dict.fromkeys(e for e in emails if e))
@@ -0,0 +1,198 @@
+"""
+Card broadcasts — one system card onto every student's brief.
+
+The reminder crons (transcript re-upload, course / summer registration) used
+to `users.select("id")` — which PostgREST silently caps at 1000 rows, so
+everyone after the 1000th user never got the card — then spend two
+round-trips per user (an "already has today's card?" select, then an insert),
+all inside the one /api/notifications/cron request, which a few thousand
+users would push past the serverless timeout.
+
+A broadcast is now described by a spec (cards.broadcast_spec):
+
+    {"name": "transcript_reminder",
+     "card": {...advisor_cards columns, without user_id...},
+     "since": "2026-12-22",            # users with a card of this label since
+                                       # then already have it
+     "skip_uploads_since": iso | None, # also skip users who imported courses since
+     "report": {...}}                  # extra keys for the cron's response
+
+and sent in chunks of users walked by keyset pagination (ORDER BY id,
+id > cursor). Each chunk is one `broadcast_advisor_card` RPC
+(migrations/2026_10_18g_broadcast_advisor_card.sql): an INSERT ... SELECT
+over the chunk with an anti-join dropping users who already have the card,
+returning the chunk's last id as the next cursor. Repeating a chunk inserts
+nothing twice, so a retried chunk is harmless.
+
+Checkpointing: the cron sends a `cards/broadcast` event (queue_broadcast) and
+the `broadcast-cards` Inngest function runs one chunk per step
+(run_in_steps). Inngest keeps each finished step's cursor, so a run that
+times out or fails resumes after the last finished chunk rather than from the
+first user, and every chunk is its own short invocation. If the event can't
+be sent (Inngest not wired up, e.g. previews) the cron runs the same chunks
+inline with run_broadcast().
+
+Until the migration is applied each chunk is three PostgREST calls instead:
+the page of users, one range select of who already has the card, and one
+bulk insert.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Callable, Optional
+
+from postgrest import APIError
+
+from ..config import settings
+from .supabase_client import get_supabase
+
+logger = logging.getLogger(__name__)
+
+# PostgREST's default max-rows; a response this long may have been cut off.
+_PGRST_MAX_ROWS = 1000
+
+# Re-probe for the RPC this often once it's found missing.
+_RPC_RETRY_AFTER = 300.0
+_rpc_disabled_until = 0.0
+
+
+def run_chunk(spec: dict, after: Optional[str] = None) -> dict:
+    """Send the card to the next chunk of users after `after` (None = from
+    the start). Returns {"cursor", "scanned", "sent", "done"}; pass `cursor`
+    back in for the next chunk. Raises on database errors so the step (or
+    the cron) can retry it."""
+    global _rpc_disabled_until
+    limit = settings.BROADCAST_CHUNK_SIZE
+    sb = get_supabase()
+    if time.monotonic() >= _rpc_disabled_until:
+        try:
+            rows = sb.rpc("broadcast_advisor_card", {
+                "p_card":               spec["card"],
+                "p_since":              spec["since"],
+                "p_after":              after,
+                "p_limit":              limit,
+                "p_skip_uploads_since": spec.get("skip_uploads_since"),
+            }).execute().data or []
+            row = rows[0] if rows else {}
+            scanned = int(row.get("scanned") or 0)
+            return {
+                "cursor":  row.get("last_user_id") or after,
+                "scanned": scanned,
+                "sent":    int(row.get("inserted") or 0),
+                "done":    scanned < limit,
+            }
+        except APIError as e:
+            if e.code != "PGRST202":
+                raise
+            logger.info("broadcast_advisor_card RPC unavailable — broadcasting via PostgREST")
+            _rpc_disabled_until = time.monotonic() + _RPC_RETRY_AFTER
+    return _run_chunk_fallback(sb, spec, after, limit)
+
+
+def _in_range(query, after: Optional[str], last: str):
+    """Restrict `query` to the chunk's user ids, after < user_id <= last.
+    A range rather than in_(...): 500 uuids don't fit in a URL."""
+    if after is not None:
+        query = query.gt("user_id", after)
+    return query.lte("user_id", last)
+
+
+def _run_chunk_fallback(sb, spec: dict, after: Optional[str], limit: int) -> dict:
+    query = sb.table("users").select("id").order("id").limit(limit)
+    if after is not None:
+        query = query.gt("id", after)
+    ids = [u["id"] for u in (query.execute().data or []) if u.get("id")]
+    if not ids:
+        return {"cursor": after, "scanned": 0, "sent": 0, "done": True}
+    last = ids[-1]
+    card = spec["card"]
+
+    have = _in_range(
+        sb.table("advisor_cards").select("user_id")
+        .eq("label", card["label"]).gte("generated_at", spec["since"]),
+        after, last,
+    ).execute().data or []
+    skip = {r["user_id"] for r in have}
+    if spec.get("skip_uploads_since"):
+        skip |= _recent_uploaders(sb, ids, after, spec["skip_uploads_since"])
+
+    todo = [uid for uid in ids if uid not in skip]
+    if todo:
+        sb.table("advisor_cards").insert([{**card, "user_id": uid} for uid in todo]).execute()
+    return {"cursor": last, "scanned": len(ids), "sent": len(todo), "done": len(ids) < limit}
+
+
+def _recent_uploaders(sb, ids: list, after: Optional[str], since: str) -> set:
+    """Users of the chunk with completed_courses rows created since `since`."""
+    rows = _in_range(
+        sb.table("completed_courses").select("user_id").gte("created_at", since),
+        after, ids[-1],
+    ).execute().data or []
+    found = {r["user_id"] for r in rows}
+    if len(rows) >= _PGRST_MAX_ROWS:
+        # One row per imported course, so a busy chunk can overflow the cap;
+        # check whoever wasn't seen one at a time.
+        for uid in ids:
+            if uid in found:
+                continue
+            hit = (sb.table("completed_courses").select("id")
+                   .eq("user_id", uid).gte("created_at", since)
+                   .limit(1).execute().data)
+            if hit:
+                found.add(uid)
+    return found
+
+
+def run_broadcast(spec: dict) -> dict:
+    """Every chunk, inline — for when the Inngest event can't be sent."""
+    cursor, sent, scanned, chunks = None, 0, 0, 0
+    while True:
+        r = run_chunk(spec, cursor)
+        chunks += 1
+        sent += r["sent"]
+        scanned += r["scanned"]
+        cursor = r["cursor"]
+        if r["done"]:
+            break
+    logger.info(f"Broadcast {spec['name']}: {sent} cards to {scanned} users in {chunks} chunks")
+    return {"sent": sent, "scanned": scanned, "chunks": chunks}
+
+
+async def run_in_steps(step, spec_for: Callable[[], dict]) -> dict:
+    """Every chunk as its own Inngest step (`step` is ctx.step). The spec is
+    rebuilt inside each step so the card's generated_at is that chunk's."""
+    cursor, sent, scanned, chunks = None, 0, 0, 0
+    while True:
+        async def _chunk(after=cursor):
+            return await asyncio.to_thread(run_chunk, spec_for(), after)
+        r = await step.run(f"chunk-{chunks}", _chunk)
+        chunks += 1
+        sent += r["sent"]
+        scanned += r["scanned"]
+        cursor = r["cursor"]
+        if r["done"]:
+            break
+    return {"sent": sent, "scanned": scanned, "chunks": chunks}
+
+
+async def queue_broadcast(name: str, day: str) -> bool:
+    """Hand broadcast `name` for `day` to Inngest. The event id makes a
+    second send for the same day a no-op. False if the event couldn't be
+    sent, in which case the caller runs it inline."""
+    import inngest
+    from ..inngest_app import inngest_client
+    try:
+        await asyncio.wait_for(
+            inngest_client.send(inngest.Event(
+                name="cards/broadcast",
+                id=f"broadcast:{name}:{day}",
+                data={"broadcast": name, "date": day},
+            )),
+            timeout=6,
+        )
+        return True
+    except Exception as exc:
+        logger.warning("Couldn't queue broadcast %s (%s) — running it inline", name, type(exc).__name__)
+        return False
@@ -1,87 +1,386 @@
 """
 backend/api/utils/cache.py
-In-memory cache with TTL for course data.
-Caches /courses/subjects, /courses/search (same queries), and course details.
+Bounded in-memory LRU cache with TTL for course data.
+Caches /courses/subjects, /courses/search (same queries), the term-offerings
+scan and the professors RMP lookups.
+
+SimpleCache was an unbounded dict that only swept expired keys (an O(n) scan
+inside set()) once it passed 500 entries. search_cache keys include free-text
+queries, so a crawler could grow it without limit while everything was still
+within TTL. BoundedCache instead:
+
+  - keeps entries in recency order and evicts the least recently used one in
+    O(1) whenever a max_entries or max_bytes budget would be exceeded, so
+    memory per serverless instance stays predictable;
+  - sizes every value on set() (approximate, recursive sys.getsizeof) and
+    refuses values bigger than a quarter of the byte budget rather than
+    flushing the whole cache for them;
+  - resolves a TTL per namespace — the key prefix before the first ":" —
+    so call sites don't repeat TTL literals;
+  - counts hits / misses / expirations / evictions / rejections per
+    namespace, reported by stats() and /api/admin/stats.
+
+Two levels: that in-process LRU is L1. When CACHE_REDIS_URL is set, each
+cache also reads through / writes through a shared Redis-protocol L2
+(Upstash, ElastiCache, a local redis-server), so a cold Vercel instance
+gets warm search, subjects, term-offerings and RMP entries from L2 instead
+of re-querying Postgres. Values cross L2 as orjson (stdlib json fallback)
+with sets and tuples tagged so they round-trip; the envelope carries the
+absolute expiry, so an L2 hit lands in L1 with only its remaining TTL.
+
+L2 is best effort: calls use a short socket timeout, and after an error L2
+is skipped for CACHE_L2_COOLDOWN_SECONDS so an outage costs one timeout,
+not one per request. L1 keeps working throughout.
 """
-import time
+import hashlib
+import json
 import logging
-from typing import Any, Optional, Dict
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover — orjson is in requirements.txt
+    orjson = None
+
+from ..config import settings
 
 logger = logging.getLogger(__name__)
 
-# Evict stale entries once the store grows beyond this many keys.
-# Keeps memory bounded without needing a background thread.
-_EVICT_THRESHOLD = 500
+# Largest single value, as a fraction of max_bytes, worth caching.
+_MAX_VALUE_SHARE = 4
+
+# L2 keys longer than this (rmp_bulk joins every course code) are hashed.
+_MAX_L2_KEY = 200
+
+
+def _approx_size(value: Any) -> int:
+    """Approximate deep size of a JSON-ish value (dicts, lists, tuples, sets,
+    scalars) in bytes. Shared sub-objects are counted once."""
+    seen = set()
+    total = 0
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return total
+
+
+def _namespace(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+# ── L2 serialization ─────────────────────────────────────────────────────
+
+def _tag(value: Any) -> Any:
+    """JSON-safe copy of value; sets and tuples become {"__set__"/"__tuple__": [...]}."""
+    if isinstance(value, dict):
+        return {k: _tag(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_tag(v) for v in value]
+    if isinstance(value, tuple):
+        return {"__tuple__": [_tag(v) for v in value]}
+    if isinstance(value, (set, frozenset)):
+        return {"__set__": [_tag(v) for v in value]}
+    return value
+
+
+def _untag(value: Any) -> Any:
+    if isinstance(value, dict):
+        if len(value) == 1:
+            if "__set__" in value:
+                return {_untag(v) for v in value["__set__"]}
+            if "__tuple__" in value:
+                return tuple(_untag(v) for v in value["__tuple__"])
+        return {k: _untag(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_untag(v) for v in value]
+    return value
+
+
+def dumps(value: Any, expires_at: float) -> bytes:
+    envelope = {"exp": expires_at, "v": _tag(value)}
+    if orjson is not None:
+        return orjson.dumps(envelope)
+    return json.dumps(envelope, separators=(",", ":")).encode()
+
+
+def loads(raw: bytes) -> tuple:
+    """(value, expires_at) from dumps() output."""
+    envelope = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    return _untag(envelope["v"]), envelope["exp"]
+
+
+class RedisBackend:
+    """
+    L2 over any Redis-protocol client exposing get / set(ex=) / delete —
+    redis.Redis in production, tests.conftest.FakeRedis in tests.
+    """
+
+    def __init__(self, client, prefix: str = ""):
+        self._client = client
+        self._prefix = prefix
+        self._down_until = 0.0
+
+    def _key(self, key: str) -> str:
+        if len(key) > _MAX_L2_KEY:
+            key = f"{_namespace(key)}:sha1:{hashlib.sha1(key.encode()).hexdigest()}"
+        return self._prefix + key
+
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _failed(self, op: str, key: str, e: Exception) -> None:
+        self._down_until = time.monotonic() + settings.CACHE_L2_COOLDOWN_SECONDS
+        logger.warning(f"Cache L2 {op} failed for {key!r}, skipping L2 for "
+                       f"{settings.CACHE_L2_COOLDOWN_SECONDS}s: {e}")
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self._client.get(self._key(key))
+        except Exception as e:
+            self._failed("get", key, e)
+            raise
+
+    def set(self, key: str, raw: bytes, ttl: int) -> None:
+        try:
+            self._client.set(self._key(key), raw, ex=max(1, int(ttl)))
+        except Exception as e:
+            self._failed("set", key, e)
+            raise
+
+    def delete(self, key: str) -> None:
+        try:
+            self._client.delete(self._key(key))
+        except Exception as e:
+            self._failed("delete", key, e)
+            raise
+
+
+def redis_backend(name: str) -> Optional[RedisBackend]:
+    """L2 backend for the cache called `name`, or None when CACHE_REDIS_URL
+    is unset or the redis package is missing."""
+    if not settings.CACHE_REDIS_URL:
+        return None
+    try:
+        import redis
+        client = redis.Redis.from_url(
+            settings.CACHE_REDIS_URL,
+            socket_timeout=settings.CACHE_L2_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.CACHE_L2_TIMEOUT_SECONDS,
+        )
+    except Exception as e:
+        logger.warning(f"Cache L2 disabled for {name}: {e}")
+        return None
+    return RedisBackend(client, prefix=f"{settings.CACHE_L2_PREFIX}{name}:")
 
 
-class SimpleCache:
+class BoundedCache:
     """
-    Lightweight in-memory TTL cache.
+    Thread-safe in-memory LRU cache with TTLs and an entry/byte budget.
     """
 
-    def __init__(self, default_ttl: int = 300):
+    def __init__(
+        self,
+        default_ttl: int = 300,
+        *,
+        max_entries: int = 1000,
+        max_bytes: int = 16 * 1024 * 1024,
+        namespace_ttls: Optional[Dict[str, int]] = None,
+        l2: Optional[RedisBackend] = None,
+    ):
         """
         Args:
-            default_ttl: Default time-to-live in seconds (5 minutes).
+            default_ttl:    TTL in seconds for namespaces not in namespace_ttls.
+            max_entries:    Most entries kept before LRU eviction.
+            max_bytes:      Approximate memory budget for keys + values.
+            namespace_ttls: {key prefix before ":": TTL seconds}.
+            l2:             Shared second level, or None for L1 only.
         """
-        self._store: Dict[str, Dict[str, Any]] = {}
+        # key → (value, expires_at, nbytes), least recently used first
+        self._store: "OrderedDict[str, tuple]" = OrderedDict()
         self._default_ttl = default_ttl
+        self._ttls = dict(namespace_ttls or {})
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self.l2 = l2
 
-    def _evict_expired(self) -> None:
-        """Remove all entries whose TTL has elapsed.
+    def _count(self, key: str, counter: str) -> None:
+        ns = self._counters.setdefault(_namespace(key), {
+            "hits": 0, "misses": 0, "expired": 0, "evictions": 0, "rejected": 0, "sets": 0,
+            "l2_hits": 0, "l2_misses": 0, "l2_errors": 0,
+        })
+        ns[counter] += 1
 
-        Called lazily in set() when the store exceeds _EVICT_THRESHOLD keys so
-        that expired items don't accumulate indefinitely on long-running servers.
-        The threshold avoids paying the scan cost on every small cache.
-        """
-        now = time.time()
-        expired_keys = [k for k, v in self._store.items() if now > v["expires_at"]]
-        for k in expired_keys:
-            del self._store[k]
-        if expired_keys:
-            logger.debug(f"Cache evicted {len(expired_keys)} expired entries")
+    def _drop(self, key: str) -> None:
+        _, _, nbytes = self._store.pop(key)
+        self._bytes -= nbytes
+
+    def ttl_for(self, key: str) -> int:
+        return self._ttls.get(_namespace(key), self._default_ttl)
 
     def get(self, key: str) -> Optional[Any]:
-        """Return cached value or None if expired / missing."""
-        entry = self._store.get(key)
-        if entry is None:
+        """Return cached value or None if expired / missing in both levels."""
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is not None and time.time() > entry[1]:
+                self._drop(key)
+                self._count(key, "expired")
+                entry = None
+            if entry is not None:
+                self._store.move_to_end(key)
+                self._count(key, "hits")
+                return entry[0]
+            self._count(key, "misses")
+        return self._get_l2(key)
+
+    def _get_l2(self, key: str) -> Optional[Any]:
+        if self.l2 is None or not self.l2.available():
             return None
-        if time.time() > entry["expires_at"]:
-            del self._store[key]
+        try:
+            raw = self.l2.get(key)
+            if raw is None:
+                self._count(key, "l2_misses")
+                return None
+            value, expires_at = loads(raw)
+        except Exception:
+            self._count(key, "l2_errors")
             return None
-        return entry["value"]
+        if time.time() > expires_at:
+            self._count(key, "l2_misses")
+            return None
+        self._count(key, "l2_hits")
+        self._set_l1(key, value, expires_at)
+        return value
 
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
-        """Store a value with optional custom TTL."""
-        # FIX: Proactively evict expired entries when the store gets large so
-        # stale keys don't accumulate indefinitely on long-running processes.
-        if len(self._store) >= _EVICT_THRESHOLD:
-            self._evict_expired()
-
-        self._store[key] = {
-            "value": value,
-            "expires_at": time.time() + (ttl or self._default_ttl),
-        }
+        """Store a value in L1 and L2. TTL: explicit ttl, else the key's
+        namespace TTL, else default_ttl."""
+        ttl = ttl or self.ttl_for(key)
+        expires_at = time.time() + ttl
+        self._set_l1(key, value, expires_at)
+        if self.l2 is not None and self.l2.available():
+            try:
+                self.l2.set(key, dumps(value, expires_at), ttl)
+            except Exception:
+                self._count(key, "l2_errors")
+
+    def _set_l1(self, key: str, value: Any, expires_at: float) -> None:
+        nbytes = _approx_size(value) + sys.getsizeof(key)
+        with self._lock:
+            if key in self._store:
+                self._drop(key)
+            if nbytes > self.max_bytes // _MAX_VALUE_SHARE:
+                self._count(key, "rejected")
+                logger.debug(f"Cache refused {key!r}: {nbytes} bytes exceeds per-value cap")
+                return
+            while self._store and (
+                len(self._store) >= self.max_entries or self._bytes + nbytes > self.max_bytes
+            ):
+                oldest = next(iter(self._store))
+                self._drop(oldest)
+                self._count(oldest, "evictions")
+            self._store[key] = (value, expires_at, nbytes)
+            self._bytes += nbytes
+            self._count(key, "sets")
 
     def invalidate(self, key: str) -> None:
-        """Remove a specific key."""
-        self._store.pop(key, None)
+        """Remove a specific key from both levels."""
+        with self._lock:
+            if key in self._store:
+                self._drop(key)
+        if self.l2 is not None and self.l2.available():
+            try:
+                self.l2.delete(key)
+            except Exception:
+                self._count(key, "l2_errors")
 
     def clear(self) -> None:
-        """Flush entire cache."""
-        self._store.clear()
+        """Flush this instance's L1 (counters and L2 are kept)."""
+        with self._lock:
+            self._store.clear()
+            self._bytes = 0
 
     @property
     def size(self) -> int:
         return len(self._store)
 
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            namespaces = {ns: dict(c) for ns, c in self._counters.items()}
+            size, nbytes = len(self._store), self._bytes
+        for c in namespaces.values():
+            lookups = c["hits"] + c["misses"]
+            c["hit_rate"] = round(c["hits"] / lookups, 3) if lookups else None
+        return {
+            "size": size,
+            "bytes": nbytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "l2": None if self.l2 is None else ("up" if self.l2.available() else "cooling_down"),
+            "namespaces": namespaces,
+        }
+
 
 # ── Shared cache instances ───────────────────────────────────────────────
 # Subjects change ~never → 1-hour TTL
-subjects_cache = SimpleCache(default_ttl=3600)
+subjects_cache = BoundedCache(
+    default_ttl=3600,
+    max_entries=16,
+    max_bytes=1024 * 1024,
+    l2=redis_backend("subjects"),
+)
+
+# Search results are repeated often → 5-minute TTL. RMP ratings come from a
+# weekly scrape, so those namespaces keep 10 minutes; the term-offerings
+# scan of mcgill_sections is 6 hours. Chat grounding facts per course code
+# keep an hour; "no such course" only 10 minutes, so a newly imported
+# course shows up soon.
+search_cache = BoundedCache(
+    default_ttl=300,
+    max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+    max_bytes=settings.SEARCH_CACHE_MAX_MB * 1024 * 1024,
+    namespace_ttls={
+        "search":                300,
+        "section_term_offerings": 21600,
+        "prof_search":           300,
+        "rmp_prof":              600,
+        "rmp_course":            600,
+        "rmp_bulk":              600,
+        "grounding":             3600,
+        "grounding_miss":        600,
+    },
+    l2=redis_backend("search"),
+)
 
-# Search results are repeated often → 5-minute TTL
-search_cache = SimpleCache(default_ttl=300)
+# Card translations (utils/translation_memory.py), keyed by language and
+# source-text hash. A translation never goes stale, so entries live a week
+# and leave only by LRU; the translation_memory table behind this keeps
+# them for good.
+translation_cache = BoundedCache(
+    default_ttl=7 * 24 * 3600,
+    max_entries=5000,
+    max_bytes=8 * 1024 * 1024,
+    l2=redis_backend("translation"),
+)
 
 # NOTE: course_detail_cache was removed — it was instantiated but never
 # imported or used by any route. Course details use the search_cache or
@@ -0,0 +1,267 @@
+"""
+Per-query PostgREST instrumentation.
+
+X-Process-Time only says how long a whole request took. To see which
+Supabase calls dominate it, every PostgREST request made through our httpx
+sessions (service-role sync + async clients, and the pooled user-client
+transport) goes through InstrumentedTransport / AsyncInstrumentedTransport,
+which record:
+
+    route       – route template of the request that issued it (set by the
+                  timing middleware in main.py; "<background>" otherwise)
+    target      – table name, or "rpc:<function>"
+    op          – select / insert / upsert / update / delete / count / rpc
+    duration    – request sent → response body fully read
+    rows        – from PostgREST's Content-Range header (None when absent)
+    bytes       – response body size
+
+Aggregates live in an in-process rolling store of one-minute buckets kept for
+DB_METRICS_WINDOW_MINUTES; GET /api/admin/db-stats reads it. Each instance
+has its own store — on Vercel that means "what this instance saw recently",
+which is enough to spot the hogs.
+
+When DB_SERVER_TIMING is on, the middleware also adds a Server-Timing header
+with this request's DB time, query count and bytes, so browser devtools show
+it next to the request.
+
+Auth Admin calls (auth.admin.*) use the gotrue client's own session and are
+not counted here.
+"""
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from ..config import settings
+
+BACKGROUND_ROUTE = "<background>"
+
+_route: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("db_metrics_route", default=None)
+# Per-request running totals. A mutable dict, so queries issued from the
+# threadpool (sync routes) update the same object the middleware reads.
+_request_totals: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "db_metrics_request_totals", default=None,
+)
+
+_lock = threading.Lock()
+# { minute_epoch: { (route, target, op): aggregate } }
+_buckets: Dict[int, Dict[tuple, Dict[str, Any]]] = {}
+
+_OPS = {"GET": "select", "HEAD": "count", "PATCH": "update", "DELETE": "delete"}
+
+
+# ── Request scope ─────────────────────────────────────────────────────────────
+
+def begin_request(route: str) -> Dict[str, float]:
+    """Attribute queries in this context to `route`; returns the totals dict
+    the caller reads once the response is ready."""
+    totals = {"queries": 0, "ms": 0.0, "bytes": 0, "rows": 0}
+    _route.set(route)
+    _request_totals.set(totals)
+    return totals
+
+
+def server_timing(totals: Dict[str, float]) -> str:
+    return (
+        f'db;dur={totals["ms"]:.1f};'
+        f'desc="{int(totals["queries"])} queries, {int(totals["rows"])} rows, {int(totals["bytes"])} B"'
+    )
+
+
+# ── Recording ─────────────────────────────────────────────────────────────────
+
+def _classify(request: httpx.Request) -> tuple[str, str]:
+    path = request.url.path
+    marker = "/rest/v1/"
+    i = path.find(marker)
+    rel = path[i + len(marker):] if i >= 0 else path.rsplit("/", 1)[-1]
+    if rel.startswith("rpc/"):
+        return f"rpc:{rel[4:]}", "rpc"
+    target = rel.split("/", 1)[0] or "<root>"
+    if request.method == "POST":
+        prefer = request.headers.get("prefer", "")
+        return target, "upsert" if "resolution=" in prefer else "insert"
+    return target, _OPS.get(request.method, request.method.lower())
+
+
+def _rows(response: httpx.Response) -> Optional[int]:
+    """Rows in the body per Content-Range ("0-24/*" → 25, "*/0" → 0)."""
+    cr = response.headers.get("content-range")
+    if not cr:
+        return None
+    span = cr.split("/", 1)[0]
+    if span == "*":
+        return 0
+    try:
+        lo, hi = span.split("-", 1)
+        return int(hi) - int(lo) + 1
+    except ValueError:
+        return None
+
+
+def record(target: str, op: str, duration_ms: float, rows: Optional[int], nbytes: int, status: int) -> None:
+    route = _route.get() or BACKGROUND_ROUTE
+    minute = int(time.time() // 60)
+    with _lock:
+        bucket = _buckets.get(minute)
+        if bucket is None:
+            bucket = _buckets[minute] = {}
+            cutoff = minute - settings.DB_METRICS_WINDOW_MINUTES
+            for m in [m for m in _buckets if m <= cutoff]:
+                del _buckets[m]
+        agg = bucket.get((route, target, op))
+        if agg is None:
+            agg = bucket[(route, target, op)] = {
+                "count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "bytes": 0,
+            }
+        agg["count"] += 1
+        agg["errors"] += status >= 400
+        agg["total_ms"] += duration_ms
+        agg["max_ms"] = max(agg["max_ms"], duration_ms)
+        agg["rows"] += rows or 0
+        agg["bytes"] += nbytes
+
+    totals = _request_totals.get()
+    if totals is not None:
+        totals["queries"] += 1
+        totals["ms"] += duration_ms
+        totals["rows"] += rows or 0
+        totals["bytes"] += nbytes
+
+
+def snapshot(minutes: Optional[int] = None, sort: str = "total_ms", limit: int = 50) -> Dict[str, Any]:
+    """Aggregates over the last `minutes` (default: the whole window), one
+    entry per (route, target, op), heaviest first by `sort`."""
+    window = min(minutes or settings.DB_METRICS_WINDOW_MINUTES, settings.DB_METRICS_WINDOW_MINUTES)
+    since = int(time.time() // 60) - window + 1
+    merged: Dict[tuple, Dict[str, Any]] = {}
+    with _lock:
+        for minute, bucket in _buckets.items():
+            if minute < since:
+                continue
+            for key, agg in bucket.items():
+                m = merged.setdefault(key, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "bytes": 0})
+                for f in ("count", "errors", "total_ms", "rows", "bytes"):
+                    m[f] += agg[f]
+                m["max_ms"] = max(m["max_ms"], agg["max_ms"])
+
+    entries: List[Dict[str, Any]] = []
+    for (route, target, op), m in merged.items():
+        entries.append({
+            "route": route, "target": target, "op": op, **m,
+            "total_ms": round(m["total_ms"], 1),
+            "max_ms": round(m["max_ms"], 1),
+            "avg_ms": round(m["total_ms"] / m["count"], 1),
+            "avg_bytes": m["bytes"] // m["count"],
+        })
+    entries.sort(key=lambda e: e.get(sort, 0), reverse=True)
+    return {
+        "window_minutes": window,
+        "queries": sum(e["count"] for e in entries),
+        "total_ms": round(sum(e["total_ms"] for e in entries), 1),
+        "bytes": sum(e["bytes"] for e in entries),
+        "entries": entries[:limit],
+    }
+
+
+def reset() -> None:
+    with _lock:
+        _buckets.clear()
+
+
+# ── httpx transports ──────────────────────────────────────────────────────────
+
+class _CountingStream(httpx.SyncByteStream):
+    def __init__(self, inner, on_close):
+        self._inner = inner
+        self._on_close = on_close
+        self.nbytes = 0
+
+    def __iter__(self):
+        for chunk in self._inner:
+            self.nbytes += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            self._inner.close()
+        finally:
+            self._on_close(self.nbytes)
+
+
+class _AsyncCountingStream(httpx.AsyncByteStream):
+    def __init__(self, inner, on_close):
+        self._inner = inner
+        self._on_close = on_close
+        self.nbytes = 0
+
+    async def __aiter__(self):
+        async for chunk in self._inner:
+            self.nbytes += len(chunk)
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._inner.aclose()
+        finally:
+            self._on_close(self.nbytes)
+
+
+def _instrument(request: httpx.Request, response: httpx.Response, start: float, stream_cls) -> httpx.Response:
+    on_close = _finisher(request, response, start)
+    if response.is_closed:
+        # Body already in memory (e.g. a transport that pre-reads it).
+        on_close(len(response.content))
+    else:
+        response.stream = stream_cls(response.stream, on_close)
+    return response
+
+
+def _finisher(request: httpx.Request, response: httpx.Response, start: float):
+    target, op = _classify(request)
+    done = {"v": False}
+
+    def _on_close(nbytes: int) -> None:
+        if done["v"]:
+            return
+        done["v"] = True
+        record(target, op, (time.perf_counter() - start) * 1000, _rows(response), nbytes, response.status_code)
+    return _on_close
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """Wraps a sync transport; records each request when its body is closed."""
+
+    def __init__(self, inner: Optional[httpx.BaseTransport] = None, **transport_kwargs):
+        self._inner = inner or httpx.HTTPTransport(**transport_kwargs)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not settings.DB_METRICS_ENABLED:
+            return self._inner.handle_request(request)
+        start = time.perf_counter()
+        response = self._inner.handle_request(request)
+        return _instrument(request, response, start, _CountingStream)
+
+    def close(self) -> None:
+        self._inner.close()
+
+
+class AsyncInstrumentedTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of InstrumentedTransport."""
+
+    def __init__(self, inner: Optional[httpx.AsyncBaseTransport] = None, **transport_kwargs):
+        self._inner = inner or httpx.AsyncHTTPTransport(**transport_kwargs)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not settings.DB_METRICS_ENABLED:
+            return await self._inner.handle_async_request(request)
+        start = time.perf_counter()
+        response = await self._inner.handle_async_request(request)
+        return _instrument(request, response, start, _AsyncCountingStream)
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
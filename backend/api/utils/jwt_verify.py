@@ -0,0 +1,162 @@
+"""
+Local verification of Supabase access tokens.
+
+get_current_user_id() used to call supabase.auth.get_user(token) on every
+authenticated request — one blocking round-trip to Supabase Auth before any
+route logic ran. A Supabase access token is a signed JWT, so it can be
+checked in-process instead:
+
+  • HS256 tokens (legacy project secret) — verified with SUPABASE_JWT_SECRET.
+  • RS256 / ES256 tokens (asymmetric signing keys) — verified against the
+    project's JWKS, fetched once and cached for AUTH_JWKS_CACHE_SECONDS; an
+    unknown `kid` (key rotation) triggers one refetch.
+
+Either way `exp`, `aud` and `iss` are enforced. A verified token's user id is
+then cached by token hash for AUTH_TOKEN_CACHE_SECONDS (never past `exp`), so
+a burst of requests with the same token only verifies once.
+
+Trade-off: a locally verified token stays valid until it expires even if the
+session was revoked in Supabase Auth. Access tokens are short-lived (1 h by
+default) and the remote check only ever saw revocations for the same reason.
+
+If the key for a token isn't available, verify_token() raises KeyUnavailable
+and the caller decides what to do:
+
+  • no SUPABASE_JWT_SECRET for an HS256 token (KeyNotConfigured) — there is
+    no local key source at all, so the token is always verified remotely,
+    as before local verification existed; a deploy that hasn't set the
+    secret yet keeps working, just without the saved round-trip;
+  • the JWKS can't be fetched — a transient outage; remote verification
+    only if AUTH_JWT_REMOTE_FALLBACK is on.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+
+import jwt
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+_ASYMMETRIC_ALGS = ("RS256", "ES256")
+_LEEWAY_SECONDS = 5
+
+# { sha256(token): (user_id, expires_at_epoch) } — insertion-ordered, so the
+# oldest entry is the first one evicted once the cache is full.
+_token_cache: dict[str, tuple[str, float]] = {}
+_TOKEN_CACHE_MAX = 4096
+
+_jwks_client: jwt.PyJWKClient | None = None
+
+
+class KeyUnavailable(Exception):
+    """No key material to verify this token locally. Not a verdict on the
+    token — the caller may still verify it remotely."""
+
+
+class KeyNotConfigured(KeyUnavailable):
+    """This kind of token has no local key configured at all (HS256 without
+    SUPABASE_JWT_SECRET)."""
+
+
+def _issuer() -> str:
+    return f"{settings.SUPABASE_URL.rstrip('/')}/auth/v1"
+
+
+def _get_jwks_client() -> jwt.PyJWKClient:
+    global _jwks_client
+    if _jwks_client is None:
+        _jwks_client = jwt.PyJWKClient(
+            f"{_issuer()}/.well-known/jwks.json",
+            cache_jwk_set=True,
+            lifespan=settings.AUTH_JWKS_CACHE_SECONDS,
+            # The endpoint sits behind the Supabase API gateway.
+            headers={"apikey": settings.SUPABASE_ANON_KEY or settings.SUPABASE_SERVICE_KEY},
+            timeout=5,
+        )
+    return _jwks_client
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def cached_user_id(token: str) -> str | None:
+    """User id for a token verified within the cache window, else None."""
+    hit = _token_cache.get(_token_key(token))
+    if hit is None:
+        return None
+    user_id, expires_at = hit
+    if time.time() >= expires_at:
+        _token_cache.pop(_token_key(token), None)
+        return None
+    return user_id
+
+
+def remember(token: str, user_id: str, exp: float | None = None) -> None:
+    """Cache a verified token → user id, for at most AUTH_TOKEN_CACHE_SECONDS
+    and never past the token's own expiry."""
+    ttl = settings.AUTH_TOKEN_CACHE_SECONDS
+    if ttl <= 0:
+        return
+    expires_at = time.time() + ttl
+    if exp is not None:
+        expires_at = min(expires_at, float(exp))
+    if len(_token_cache) >= _TOKEN_CACHE_MAX:
+        _token_cache.pop(next(iter(_token_cache)))
+    _token_cache[_token_key(token)] = (user_id, expires_at)
+
+
+def unverified_exp(token: str) -> float | None:
+    """`exp` claim without checking the signature — only for sizing the cache
+    entry of a token that was just verified some other way."""
+    try:
+        return jwt.decode(token, options={"verify_signature": False}).get("exp")
+    except Exception:
+        return None
+
+
+def clear_cache() -> None:
+    _token_cache.clear()
+
+
+def verify_token(token: str) -> str:
+    """Verify a Supabase access token locally and return its user id (`sub`).
+
+    Raises jwt.InvalidTokenError if the token is malformed, expired, signed
+    with the wrong key, or minted for another audience/issuer; raises
+    KeyUnavailable if the key to check it against can't be had.
+    """
+    header = jwt.get_unverified_header(token)
+    alg = header.get("alg")
+
+    if alg == "HS256":
+        if not settings.SUPABASE_JWT_SECRET:
+            raise KeyNotConfigured("SUPABASE_JWT_SECRET not configured")
+        key = settings.SUPABASE_JWT_SECRET
+    elif alg in _ASYMMETRIC_ALGS:
+        try:
+            key = _get_jwks_client().get_signing_key_from_jwt(token).key
+        except jwt.PyJWKClientConnectionError as e:
+            raise KeyUnavailable(f"JWKS fetch failed: {type(e).__name__}") from e
+        except jwt.PyJWKClientError as e:
+            # Fetched fine, but no key with this kid even after a refresh.
+            raise jwt.InvalidTokenError("Unknown signing key") from e
+    else:
+        raise jwt.InvalidAlgorithmError(f"Unsupported alg {alg!r}")
+
+    claims = jwt.decode(
+        token,
+        key,
+        algorithms=[alg],
+        audience=settings.SUPABASE_JWT_AUDIENCE,
+        issuer=_issuer(),
+        leeway=_LEEWAY_SECONDS,
+        options={"require": ["exp", "sub", "aud", "iss"]},
+    )
+    user_id = str(claims["sub"])
+    remember(token, user_id, claims.get("exp"))
+    return user_id
@@ -0,0 +1,412 @@
+"""
+LLM gateway: every Claude call in the API goes through here.
+
+Before this, chat, cards, transcript, syllabus, electives and club
+translation each built their own Anthropic client (some sync, blocking the
+event loop inside async routes), each had its own retry loop or none, and
+nothing bounded how many calls one instance had in flight — a burst of card
+generation could use every connection while chat replies queued behind it.
+
+    message = await llm.create("chat", model=..., max_tokens=..., messages=...,
+                               trace={"user_id": uid, "session_id": sid})
+
+    async with llm.stream("chat", model=..., ...) as stream:
+        async for text in stream.text_stream: ...
+
+  - One pooled AsyncAnthropic client (get_client), SDK retries off.
+  - A per-instance gate of LLM_MAX_CONCURRENCY slots. Each feature has a
+    tier (FEATURE_TIERS, overridable via LLM_FEATURE_TIERS):
+        interactive — a student is waiting on the reply (chat, card threads)
+        standard    — user-triggered, tolerant of a short wait
+        bulk        — card generation, translation, precompute
+    Waiters are admitted most-urgent tier first, FIFO within a tier.
+    LLM_RESERVED_INTERACTIVE slots are only ever given to interactive calls
+    and bulk calls never hold more than LLM_BULK_MAX_CONCURRENCY, so a
+    card-generation spike cannot starve chat.
+  - Retries on 429 / 5xx / 529 / connection errors with exponential backoff
+    and jitter, honouring Retry-After. The slot is released while backing
+    off. Streams are retried only until the stream opens.
+  - Every call is traced through langfuse_client.trace_claude (name = the
+    feature) and counted per feature in stats() — calls, errors, retries,
+    tokens, latency and time spent queued.
+
+A call that waits longer than LLM_QUEUE_TIMEOUT_SECONDS for a slot raises
+LLMBusyException (503 with Retry-After).
+
+Work nobody is waiting on can go through the Message Batches API instead
+(create_batch / batch_status / batch_results): half the token price, results
+within 24 hours. A batch holds no gate slot while it runs; its requests and
+result tokens are counted under the feature like any other call. These are
+not retried here — callers run them as Inngest steps, which are.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+import anthropic
+import httpx
+
+from ..config import settings
+from ..exceptions import LLMBusyException
+from .langfuse_client import trace_claude
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE, STANDARD, BULK = "interactive", "standard", "bulk"
+_RANK = {INTERACTIVE: 0, STANDARD: 1, BULK: 2}
+
+FEATURE_TIERS: Dict[str, str] = {
+    "chat":              INTERACTIVE,
+    "card_thread":       INTERACTIVE,
+    "card_ask":          STANDARD,
+    "electives":         STANDARD,
+    "transcript":        STANDARD,
+    "syllabus":          STANDARD,
+    "cards":             BULK,
+    "cards_retranslate": BULK,
+    "club_translation":  BULK,
+    "cards_precompute":  BULK,
+}
+
+# Document uploads: traced for usage and latency, but their (large, personal)
+# prompt is not sent to langfuse.
+_NO_INPUT_CAPTURE = {"transcript", "syllabus"}
+
+_RETRYABLE = (
+    anthropic.RateLimitError,
+    anthropic.InternalServerError,
+    anthropic.OverloadedError,     # 529
+    anthropic.APIConnectionError,  # includes APITimeoutError
+)
+
+
+def tier_of(feature: str) -> str:
+    return {**FEATURE_TIERS, **settings.LLM_FEATURE_TIERS}.get(feature, STANDARD)
+
+
+# ── Client ───────────────────────────────────────────────────────────────
+
+_client: Optional[anthropic.AsyncAnthropic] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> anthropic.AsyncAnthropic:
+    """The shared AsyncAnthropic client. Its connection pool is sized to the
+    gate, and SDK-level retries are off because the gateway retries."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                api_key = settings.ANTHROPIC_API_KEY
+                if not api_key:
+                    raise ValueError("ANTHROPIC_API_KEY not found in environment")
+                _client = anthropic.AsyncAnthropic(
+                    api_key=api_key,
+                    max_retries=0,
+                    timeout=settings.LLM_TIMEOUT_SECONDS,
+                    http_client=httpx.AsyncClient(
+                        limits=httpx.Limits(
+                            max_connections=settings.LLM_MAX_CONCURRENCY,
+                            max_keepalive_connections=settings.LLM_MAX_CONCURRENCY,
+                        ),
+                        timeout=settings.LLM_TIMEOUT_SECONDS,
+                    ),
+                )
+    return _client
+
+
+# ── Concurrency gate ─────────────────────────────────────────────────────
+
+class PriorityGate:
+    """Counting semaphore with tiered admission. Thread-safe; waiters may
+    belong to different event loops (TestClient, Inngest) and are woken on
+    their own loop."""
+
+    def __init__(self, limit: int, reserved_interactive: int = 0, bulk_limit: Optional[int] = None):
+        self.limit = max(1, limit)
+        self._caps = {
+            INTERACTIVE: self.limit,
+            STANDARD:    max(1, self.limit - reserved_interactive),
+        }
+        self._caps[BULK] = max(1, min(self._caps[STANDARD], bulk_limit or self.limit))
+        self._lock = threading.Lock()
+        self._in_use = {INTERACTIVE: 0, STANDARD: 0, BULK: 0}
+        self._waiters: list = []  # heap of (rank, seq, tier, future)
+        self._seq = itertools.count()
+
+    def _admissible(self, tier: str) -> bool:
+        total = sum(self._in_use.values())
+        if tier == BULK:
+            return total < self._caps[STANDARD] and self._in_use[BULK] < self._caps[BULK]
+        return total < self._caps[tier]
+
+    async def acquire(self, tier: str, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            # Queued waiters are all blocked by their own tier's cap; only
+            # one at least as urgent as this call has to go first.
+            ahead = self._waiters and self._waiters[0][0] <= _RANK[tier]
+            if not ahead and self._admissible(tier):
+                self._in_use[tier] += 1
+                return
+            fut = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (_RANK[tier], next(self._seq), tier, fut))
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout)
+        except BaseException:
+            with self._lock:
+                admitted = fut.done() and not fut.cancelled()
+                if not admitted:
+                    fut.cancel()
+                    self._waiters = [w for w in self._waiters if w[3] is not fut]
+                    heapq.heapify(self._waiters)
+            if admitted:
+                self.release(tier)
+            raise
+
+    def release(self, tier: str) -> None:
+        with self._lock:
+            self._in_use[tier] -= 1
+            self._wake()
+
+    def _wake(self) -> None:
+        # Caps shrink with urgency, so if the most urgent waiter can't be
+        # admitted, nobody behind it can either.
+        while self._waiters and self._admissible(self._waiters[0][2]):
+            _, _, tier, fut = heapq.heappop(self._waiters)
+            if fut.done():
+                continue
+            self._in_use[tier] += 1
+            fut.get_loop().call_soon_threadsafe(_admit, fut, self, tier)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waiting = {t: 0 for t in _RANK}
+            for _, _, tier, fut in self._waiters:
+                if not fut.done():
+                    waiting[tier] += 1
+            return {"limit": self.limit, "caps": dict(self._caps),
+                    "in_use": dict(self._in_use), "waiting": waiting}
+
+
+def _admit(fut: asyncio.Future, gate: PriorityGate, tier: str) -> None:
+    if fut.done():  # the waiter gave up between the wake and this callback
+        gate.release(tier)
+    else:
+        fut.set_result(None)
+
+
+_gate = PriorityGate(
+    settings.LLM_MAX_CONCURRENCY,
+    reserved_interactive=settings.LLM_RESERVED_INTERACTIVE,
+    bulk_limit=settings.LLM_BULK_MAX_CONCURRENCY,
+)
+
+
+@asynccontextmanager
+async def _slot(feature: str):
+    tier = tier_of(feature)
+    start = time.perf_counter()
+    try:
+        await _gate.acquire(tier, timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        _count(feature, "rejected")
+        logger.warning(f"LLM gateway: {feature} waited {settings.LLM_QUEUE_TIMEOUT_SECONDS}s for a slot")
+        raise LLMBusyException(feature, retry_after=5)
+    _count(feature, "queued_ms", (time.perf_counter() - start) * 1000)
+    try:
+        yield
+    finally:
+        _gate.release(tier)
+
+
+# ── Retry ────────────────────────────────────────────────────────────────
+
+def _backoff(attempt: int, exc: Exception) -> float:
+    retry_after = None
+    response = getattr(exc, "response", None)
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get("retry-after", ""))
+        except (TypeError, ValueError):
+            retry_after = None
+    if retry_after is None:
+        retry_after = settings.LLM_RETRY_BASE_SECONDS * (2 ** attempt) * (0.5 + random.random())
+    return min(retry_after, settings.LLM_RETRY_MAX_SECONDS)
+
+
+def _status(exc: Exception) -> str:
+    return str(getattr(exc, "status_code", None) or type(exc).__name__)
+
+
+# ── Calls ────────────────────────────────────────────────────────────────
+
+async def create(feature: str, *, trace: Optional[dict] = None, **kwargs) -> Any:
+    """client.messages.create(**kwargs) through the gate, with retries and
+    tracing. trace: optional user_id / session_id / metadata for langfuse."""
+    attempt = 0
+    while True:
+        try:
+            async with _slot(feature):
+                start = time.perf_counter()
+                with _trace(feature, trace, kwargs) as gen:
+                    message = await get_client().messages.create(**kwargs)
+                    gen.finish(message)
+            _record(feature, message, start)
+            return message
+        except _RETRYABLE as e:
+            if attempt >= settings.LLM_MAX_RETRIES:
+                _count(feature, "errors")
+                logger.error(f"LLM {feature}: giving up after {attempt + 1} attempts ({_status(e)}): {e}")
+                raise
+            wait = _backoff(attempt, e)
+            _count(feature, "retries")
+            logger.warning(f"LLM {feature}: {_status(e)} on attempt {attempt + 1}, retrying in {wait:.1f}s")
+            await asyncio.sleep(wait)
+            attempt += 1
+        except anthropic.APIError:
+            _count(feature, "errors")
+            raise
+
+
+@asynccontextmanager
+async def stream(feature: str, *, trace: Optional[dict] = None, **kwargs):
+    """client.messages.stream(**kwargs) through the gate. The slot is held
+    until the block exits; retries apply only to opening the stream."""
+    async with _slot(feature):
+        start = time.perf_counter()
+        with _trace(feature, trace, kwargs) as gen:
+            attempt = 0
+            while True:
+                manager = get_client().messages.stream(**kwargs)
+                try:
+                    s = await manager.__aenter__()
+                    break
+                except _RETRYABLE as e:
+                    if attempt >= settings.LLM_MAX_RETRIES:
+                        _count(feature, "errors")
+                        raise
+                    wait = _backoff(attempt, e)
+                    _count(feature, "retries")
+                    logger.warning(f"LLM {feature}: {_status(e)} opening stream, retrying in {wait:.1f}s")
+                    await asyncio.sleep(wait)
+                    attempt += 1
+            try:
+                yield s
+            except BaseException as e:
+                if isinstance(e, Exception):
+                    _count(feature, "errors")
+                await manager.__aexit__(type(e), e, e.__traceback__)
+                raise
+            await manager.__aexit__(None, None, None)
+            message = _final(s)
+            if message is not None:
+                gen.finish(message)
+                _record(feature, message, start)
+
+
+# ── Message Batches ──────────────────────────────────────────────────────
+
+async def create_batch(feature: str, requests: list) -> str:
+    """Submit [{"custom_id", "params"}] (params as for create()) as one
+    message batch. Returns the batch id."""
+    batch = await get_client().messages.batches.create(requests=requests)
+    _count(feature, "batch_requests", len(requests))
+    logger.info(f"LLM {feature}: submitted batch {batch.id} with {len(requests)} requests")
+    return batch.id
+
+
+async def batch_status(batch_id: str) -> str:
+    """"in_progress", "canceling" or "ended"."""
+    return (await get_client().messages.batches.retrieve(batch_id)).processing_status
+
+
+async def batch_results(feature: str, batch_id: str) -> Dict[str, Any]:
+    """{custom_id: message} for the batch's succeeded requests, once it has
+    ended. Errored / expired / canceled requests are counted and left out."""
+    out: Dict[str, Any] = {}
+    async for entry in await get_client().messages.batches.results(batch_id):
+        if entry.result.type != "succeeded":
+            _count(feature, "errors")
+            continue
+        message = entry.result.message
+        out[entry.custom_id] = message
+        _count(feature, "batch_results")
+        usage = getattr(message, "usage", None)
+        if usage is not None:
+            _count(feature, "input_tokens", getattr(usage, "input_tokens", 0) or 0)
+            _count(feature, "output_tokens", getattr(usage, "output_tokens", 0) or 0)
+            _count(feature, "cache_read_tokens", getattr(usage, "cache_read_input_tokens", 0) or 0)
+            _count(feature, "cache_write_tokens", getattr(usage, "cache_creation_input_tokens", 0) or 0)
+    return out
+
+
+def _final(s) -> Any:
+    try:
+        return s.current_message_snapshot
+    except Exception:
+        return None
+
+
+def _trace(feature: str, trace: Optional[dict], kwargs: dict):
+    trace = trace or {}
+    return trace_claude(
+        name=feature,
+        user_id=trace.get("user_id"),
+        session_id=trace.get("session_id"),
+        metadata=trace.get("metadata"),
+        input_messages=None if feature in _NO_INPUT_CAPTURE else kwargs.get("messages"),
+        model=kwargs.get("model"),
+        max_tokens=kwargs.get("max_tokens"),
+    )
+
+
+# ── Accounting ───────────────────────────────────────────────────────────
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, float]] = {}
+_FIELDS = ("calls", "errors", "retries", "rejected", "input_tokens", "output_tokens",
+           "cache_read_tokens", "cache_write_tokens", "latency_ms", "queued_ms",
+           "batch_requests", "batch_results")
+
+
+def _count(feature: str, field: str, n: float = 1) -> None:
+    with _stats_lock:
+        row = _stats.setdefault(feature, dict.fromkeys(_FIELDS, 0))
+        row[field] += n
+
+
+def _record(feature: str, message: Any, start: float) -> None:
+    usage = getattr(message, "usage", None)
+    with _stats_lock:
+        row = _stats.setdefault(feature, dict.fromkeys(_FIELDS, 0))
+        row["calls"] += 1
+        row["latency_ms"] += (time.perf_counter() - start) * 1000
+        if usage is not None:
+            row["input_tokens"] += getattr(usage, "input_tokens", 0) or 0
+            row["output_tokens"] += getattr(usage, "output_tokens", 0) or 0
+            row["cache_read_tokens"] += getattr(usage, "cache_read_input_tokens", 0) or 0
+            row["cache_write_tokens"] += getattr(usage, "cache_creation_input_tokens", 0) or 0
+
+
+def stats() -> Dict[str, Any]:
+    with _stats_lock:
+        features = {f: dict(row) for f, row in _stats.items()}
+    for f, row in features.items():
+        row["tier"] = tier_of(f)
+        row["avg_latency_ms"] = round(row["latency_ms"] / row["calls"], 1) if row["calls"] else None
+        row["latency_ms"] = round(row["latency_ms"], 1)
+        row["queued_ms"] = round(row["queued_ms"], 1)
+    return {"gate": _gate.stats(), "features": features}
+
+
+def reset_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
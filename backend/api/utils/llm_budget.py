@@ -7,7 +7,8 @@ limits burst, but at 25 req/min an attacker can still rack up ~36k requests
 per day, which is real money on Claude.
 
 This helper enforces a coarser-grained daily request counter per user, stored
-in the existing `rate_limits` table (sliding-window rows we already prune).
+in the existing `rate_limits` table (day buckets, swept after two days by
+utils/rate_limit_maintenance.py).
 Default: 200 chat-class requests + 40 card-class generations per day. Admins
 exempt. The numbers are deliberately generous — a real student plowing
 through assignment week will rarely hit 50/day.
@@ -40,16 +41,9 @@ def _budget_for(kind: str) -> int:
 
 
 def _is_admin_user(user_id: str) -> bool:
-    """Look up if user is in ADMIN_EMAILS by auth email."""
-    try:
-        from .supabase_client import get_supabase
-        sb = get_supabase()
-        u = sb.auth.admin.get_user_by_id(user_id)
-        email = (getattr(u.user, "email", None) or "").lower()
-        admin_emails = {e.strip().lower() for e in settings.ADMIN_EMAILS.split(",") if e.strip()}
-        return email in admin_emails
-    except Exception:
-        return False
+    """Look up if user is in ADMIN_EMAILS by auth email (shared identity cache)."""
+    from .auth_identity import get_identity
+    return get_identity(user_id)["is_admin"]
 
 
 def check_and_record_llm_usage(user_id: str, kind: str = "chat") -> None:
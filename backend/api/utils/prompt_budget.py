@@ -0,0 +1,188 @@
+"""
+Token budgets for the student-data sections of chat and card prompts.
+
+chat._build_base_context and cards.build_rich_context rendered every
+favorite, completed course (up to 60), current course, calendar event, club
+and saved card into the prompt, so a student with a long history paid for
+all of it — in latency and input tokens — on every uncached turn.
+
+Each list section now renders through an assembler:
+
+    p = PromptAssembler("chat_base")
+    completed_str = p.section("completed", lines, sep=", ")
+    ...
+    prompt = p.finish(f"...{completed_str}...")
+
+  - Lines are passed most important first (recent_first() for completed
+    courses, after deduplicate_completed()); a section keeps as many as fit
+    its budget (DEFAULT_BUDGETS, overridable via PROMPT_SECTION_BUDGETS) and
+    says how many it left out, so the model knows the list is partial.
+  - Sizes come from estimate_tokens(), a local estimate — no API call.
+  - What a section keeps depends only on the student's data, never on the
+    request, so one context renders to the same bytes every time. Chat's
+    system prompt is memoised per context version and marked for prompt
+    caching; a prefix that varied per turn would miss the cache every turn.
+  - finish() records each section's size and what was dropped per prompt;
+    stats() reports them on /api/admin/stats to tune the budgets against.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import threading
+from typing import Any, Dict, List, Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Tokens per section. Sections without an entry are not budgeted.
+DEFAULT_BUDGETS: Dict[str, int] = {
+    "completed":    900,
+    "current":      250,
+    "upcoming":     250,
+    "favorites":    250,
+    "calendar":     300,
+    "clubs":        120,
+    "saved_cards":  400,
+    "recent_cards": 250,
+}
+
+_NON_PASSING = {"W", "F", "U", "WF", "WL", "J", "KF"}
+_TERM_RANK = {"fall": 3, "summer": 2, "winter": 1}
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate Claude token count: ~4 characters per token for ASCII
+    (English prose, course codes), one per other character (French accents
+    cost a little extra; Chinese tokenises near one per character). Close
+    enough to budget with, not to bill with."""
+    if not text:
+        return 0
+    other = sum(1 for ch in text if ord(ch) > 127)
+    return math.ceil((len(text) - other) / 4) + other
+
+
+def budget_for(section: str) -> Optional[int]:
+    return settings.PROMPT_SECTION_BUDGETS.get(section, DEFAULT_BUDGETS.get(section))
+
+
+def deduplicate_completed(completed: list) -> list:
+    """
+    Filter completed courses so that withdrawn/failed attempts are excluded
+    when the same course was later completed with a passing grade.
+
+    This prevents the AI from suggesting "retake COMP 273" when the student
+    already withdrew and then retook it successfully.
+    """
+    # Build a set of course codes that have at least one passing grade
+    passed_codes = set()
+    for c in completed:
+        grade = (c.get("grade") or "").strip().upper()
+        if grade and grade not in _NON_PASSING:
+            passed_codes.add(c.get("course_code", ""))
+
+    # Filter: keep all entries UNLESS it's a non-passing grade for a course
+    # that was later passed
+    result = []
+    for c in completed:
+        code = c.get("course_code", "")
+        grade = (c.get("grade") or "").strip().upper()
+        if grade in _NON_PASSING and code in passed_codes:
+            # Skip this entry — the student retook and passed
+            continue
+        result.append(c)
+    return result
+
+
+def recent_first(completed: list) -> list:
+    """Completed courses newest term first (Fall > Summer > Winter within a
+    year); entries without a year go last. Stable, so ties keep their order."""
+    def key(c):
+        try:
+            year = int(c.get("year") or 0)
+        except (TypeError, ValueError):
+            year = 0
+        term = str(c.get("term") or "").split(" ")[0].lower()
+        return (year, _TERM_RANK.get(term, 0))
+    return sorted(completed, key=key, reverse=True)
+
+
+class PromptAssembler:
+    """Fits one prompt's list sections to their budgets and records sizes."""
+
+    def __init__(self, prompt: str):
+        self.prompt = prompt
+        self.sections: Dict[str, Dict[str, int]] = {}
+
+    def section(self, name: str, lines: List[str], *, sep: str = "\n",
+                empty: str = "  None recorded", more: str = "  (+{n} more not shown)") -> str:
+        """Join `lines` (most important first), keeping as many as fit the
+        section's budget. A dropped tail is replaced by `more`."""
+        budget = budget_for(name)
+        kept: List[str] = []
+        used = 0
+        for line in lines:
+            cost = estimate_tokens(line + sep)
+            if budget is not None and kept and used + cost > budget:
+                break
+            kept.append(line)
+            used += cost
+        dropped = len(lines) - len(kept)
+        text = sep.join(kept) if kept else empty
+        if dropped:
+            text += sep + more.format(n=dropped)
+        self.sections[name] = {"tokens": estimate_tokens(text), "dropped": dropped}
+        return text
+
+    def finish(self, prompt_text: str) -> str:
+        """Record this render's per-section sizes and total; returns the text."""
+        total = estimate_tokens(prompt_text)
+        with _stats_lock:
+            row = _stats.setdefault(self.prompt, {"renders": 0, "total_tokens": 0, "sections": {}})
+            row["renders"] += 1
+            row["total_tokens"] += total
+            for name, s in self.sections.items():
+                sec = row["sections"].setdefault(
+                    name, {"renders": 0, "tokens": 0, "max_tokens": 0, "dropped": 0, "truncated": 0})
+                sec["renders"] += 1
+                sec["tokens"] += s["tokens"]
+                sec["max_tokens"] = max(sec["max_tokens"], s["tokens"])
+                sec["dropped"] += s["dropped"]
+                sec["truncated"] += 1 if s["dropped"] else 0
+        logger.debug("%s prompt ~%d tokens: %s", self.prompt, total,
+                     {n: s["tokens"] for n, s in self.sections.items()})
+        return prompt_text
+
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, Any]] = {}
+
+
+def stats() -> Dict[str, Any]:
+    """Per prompt: renders, average total tokens, and per section the
+    average / max estimated tokens, lines dropped and renders truncated."""
+    out: Dict[str, Any] = {}
+    with _stats_lock:
+        for prompt, row in _stats.items():
+            n = row["renders"]
+            out[prompt] = {
+                "renders": n,
+                "avg_tokens": round(row["total_tokens"] / n) if n else 0,
+                "sections": {
+                    name: {
+                        "avg_tokens": round(s["tokens"] / s["renders"]),
+                        "max_tokens": s["max_tokens"],
+                        "budget": budget_for(name),
+                        "dropped": s["dropped"],
+                        "truncated": s["truncated"],
+                    }
+                    for name, s in row["sections"].items()
+                },
+            }
+    return out
+
+
+def reset_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,152 @@
+"""
+rate_limits maintenance — per-namespace retention and the scheduled sweeper.
+
+`rate_limits` holds counters with three very different lifetimes, told apart
+by key prefix:
+
+  minute  ip:* user:* admin_login:*     main rate limiter, admin login limiter
+  hour    anomaly:*                     utils/anomaly.py
+  day     llm_budget:* verify_send:*    utils/llm_budget.py, routes/verification.py
+
+The rate limiter used to prune inline — every 500th request paid for a
+`DELETE ... WHERE window_start < now() - 10 min` across the whole table. That
+put a table-wide delete on a random user's request, and it also threw away
+the current day's LLM budgets and the current hour's anomaly counters, since
+their buckets start at midnight / the top of the hour.
+
+Now each namespace has its own retention and the sweep runs off the request
+path: every 10 minutes from Inngest (`sweep-rate-limits` in inngest_app.py),
+with the daily notifications cron as a backstop. Each run reports rows
+deleted and left per namespace, the table size, and how long it took.
+
+With migrations/2026_10_18b_rate_limits_namespaces.sql applied this is one
+`sweep_rate_limits` RPC driven by an index on (namespace, window_start).
+Without it, the same retention is applied with one PostgREST delete per key
+prefix.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from datetime import datetime, timezone, timedelta
+
+from postgrest.types import ReturnMethod
+
+from .supabase_client import get_supabase
+
+logger = logging.getLogger(__name__)
+
+# Retention is "one full window plus slack", so a sweep never races a bucket
+# that is still being counted. Keep prefixes in sync with the generated
+# `namespace` column in the migration.
+NAMESPACES: dict[str, dict] = {
+    "minute": {"prefixes": ("ip:", "user:", "admin_login:"), "retention": timedelta(minutes=10)},
+    "hour":   {"prefixes": ("anomaly:",),                    "retention": timedelta(hours=2)},
+    "day":    {"prefixes": ("llm_budget:", "verify_send:"),  "retention": timedelta(days=2)},
+}
+
+
+def namespace_for(key: str) -> str:
+    """Namespace a rate_limits key belongs to. Unknown prefixes count as
+    minute windows — the shortest retention — same as the migration."""
+    for name, ns in NAMESPACES.items():
+        if key.startswith(ns["prefixes"]):
+            return name
+    return "minute"
+
+
+def _cutoffs(now: datetime) -> dict[str, str]:
+    return {name: (now - ns["retention"]).isoformat() for name, ns in NAMESPACES.items()}
+
+
+def _sweep_via_rpc(sb, cutoffs: dict[str, str]) -> dict:
+    rows = sb.rpc("sweep_rate_limits", {
+        "p_minute_before": cutoffs["minute"],
+        "p_hour_before":   cutoffs["hour"],
+        "p_day_before":    cutoffs["day"],
+    }).execute().data
+    if not isinstance(rows, list) or not rows:
+        raise RuntimeError(f"unexpected sweep_rate_limits result: {type(rows).__name__}")
+    namespaces = {
+        r["namespace"]: {"deleted": int(r.get("deleted") or 0), "remaining": int(r.get("remaining") or 0)}
+        for r in rows
+    }
+    return {
+        "namespaces": namespaces,
+        "table_rows": sum(n["remaining"] for n in namespaces.values()),
+        "table_bytes": int(rows[0].get("table_bytes") or 0),
+        "via": "rpc",
+    }
+
+
+def _sweep_via_postgrest(sb, cutoffs: dict[str, str]) -> dict:
+    namespaces = {}
+    for name, ns in NAMESPACES.items():
+        deleted = 0
+        remaining = 0
+        for prefix in ns["prefixes"]:
+            res = (
+                sb.table("rate_limits")
+                .delete(count="exact", returning=ReturnMethod.minimal)
+                .like("key", f"{prefix}%")
+                .lt("window_start", cutoffs[name])
+                .execute()
+            )
+            deleted += res.count or 0
+            left = (
+                sb.table("rate_limits")
+                .select("key", count="exact")
+                .like("key", f"{prefix}%")
+                .limit(1)
+                .execute()
+            )
+            remaining += left.count or 0
+        namespaces[name] = {"deleted": deleted, "remaining": remaining}
+
+    # Keys outside every known prefix only get the longest retention here —
+    # the RPC path is the one that can tell them apart cheaply.
+    longest = min(cutoffs.values())
+    sb.table("rate_limits").delete(returning=ReturnMethod.minimal).lt("window_start", longest).execute()
+
+    total = sb.table("rate_limits").select("key", count="exact").limit(1).execute()
+    return {
+        "namespaces": namespaces,
+        "table_rows": total.count or 0,
+        "table_bytes": None,  # not visible through PostgREST
+        "via": "postgrest",
+    }
+
+
+def sweep_rate_limits(now: datetime | None = None) -> dict:
+    """Drop expired windows from every namespace and report what's left.
+
+    Returns {"namespaces": {name: {"deleted", "remaining"}}, "table_rows",
+    "table_bytes", "duration_ms", "via"}. Raises if the database is
+    unreachable — callers decide whether that is fatal.
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoffs = _cutoffs(now)
+    sb = get_supabase()
+    started = time.monotonic()
+    try:
+        report = _sweep_via_rpc(sb, cutoffs)
+    except Exception as exc:
+        logger.info("sweep_rate_limits RPC unavailable (%s) — sweeping via PostgREST", type(exc).__name__)
+        report = _sweep_via_postgrest(sb, cutoffs)
+    report["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+
+    logger.info(
+        "rate_limits sweep: deleted %s, %d rows left (%s bytes) in %.1f ms via %s",
+        {k: v["deleted"] for k, v in report["namespaces"].items()},
+        report["table_rows"], report["table_bytes"], report["duration_ms"], report["via"],
+    )
+    return report
+
+
+def run_rate_limit_sweep_cron() -> dict:
+    """Cron wrapper: never raises, returns the report or the error name."""
+    try:
+        return sweep_rate_limits()
+    except Exception as exc:
+        logger.warning("rate_limits sweep failed: %s", type(exc).__name__)
+        return {"deleted": 0, "error": type(exc).__name__}
@@ -0,0 +1,194 @@
+"""
+Student context: the per-user data every AI turn is grounded on — profile,
+favorites, completed / current courses, upcoming calendar events, clubs.
+
+Chat kept its own unbounded module dict of rendered prompts (invalidated
+only by clearing history, so a new favorite stayed invisible for up to five
+minutes), and card generation re-ran the same six queries on every call.
+Both now read one cache:
+
+    ctx = student_context.get(user_id, sb=user_sb)          # sync
+    ctx = await student_context.get_async(user_id, sb=...)  # queries in parallel
+
+Entries live in a BoundedCache (LRU, entry and byte budget, TTL as a
+backstop) and are dropped by invalidate(user_id), which every route that
+writes one of those tables calls after a successful write.
+
+Each entry carries a version stamp taken *before* its queries ran. If an
+invalidate() for that user lands while a build is in flight, the build's
+result is returned to its caller but not cached, so a write can never be
+overwritten by a read that started before it.
+
+Invalidation is per instance; another serverless instance may serve its own
+copy until the TTL expires.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict
+
+from ..config import settings
+from .cache import BoundedCache
+
+logger = logging.getLogger(__name__)
+
+COMPLETED_LIMIT = 60
+
+_cache = BoundedCache(
+    default_ttl=settings.STUDENT_CONTEXT_TTL_SECONDS,
+    max_entries=settings.STUDENT_CONTEXT_CACHE_MAX_ENTRIES,
+    max_bytes=settings.STUDENT_CONTEXT_CACHE_MAX_MB * 1024 * 1024,
+)
+
+_lock = threading.Lock()
+_stamps = itertools.count(1)
+# user_id → (stamp, monotonic time) of the latest invalidation. Only needs to
+# outlive in-flight builds, so entries older than _MARKER_SECONDS are pruned.
+_invalidated: "OrderedDict[str, tuple]" = OrderedDict()
+_MARKER_SECONDS = 120.0
+_counters = {"invalidations": 0, "discarded_builds": 0}
+
+
+def _key(user_id: str) -> str:
+    return f"ctx:{user_id}"
+
+
+def _queries(sb, user_id: str) -> Dict[str, Callable[[], Any]]:
+    today = datetime.now(timezone.utc).date().isoformat()
+
+    def favorites():
+        return (sb.table("favorites")
+            .select("course_code, course_title, subject, catalog")
+            .eq("user_id", user_id).order("created_at", desc=True).limit(30)
+            .execute().data or [])
+
+    def completed():
+        return (sb.table("completed_courses")
+            .select("course_code, course_title, subject, catalog, term, year, grade, credits, professor")
+            .eq("user_id", user_id).order("year", desc=True).limit(COMPLETED_LIMIT)
+            .execute().data or [])
+
+    def current():
+        return (sb.table("current_courses")
+            .select("course_code, course_title, subject, catalog, credits, term, year, professor")
+            .eq("user_id", user_id).execute().data or [])
+
+    def calendar():
+        return (sb.table("calendar_events")
+            .select("title, date, time, type, description")
+            .eq("user_id", user_id).gte("date", today)
+            .order("date", desc=False).limit(20)
+            .execute().data or [])
+
+    def joined_clubs():
+        try:
+            r = sb.table("user_clubs").select("clubs(name, category, meeting_schedule)").eq("user_id", user_id).execute()
+            return [x.get("clubs", {}).get("name", "Unknown") for x in (r.data or []) if x.get("clubs")]
+        except Exception:
+            return []
+
+    def created_clubs():
+        try:
+            r = sb.table("clubs").select("name, category, is_private").eq("created_by", user_id).execute()
+            return r.data or []
+        except Exception:
+            return []
+
+    return {
+        "favorites": favorites, "completed": completed, "current": current,
+        "calendar": calendar, "joined_clubs": joined_clubs, "created_clubs": created_clubs,
+    }
+
+
+def _begin() -> int:
+    with _lock:
+        return next(_stamps)
+
+
+def _commit(user_id: str, stamp: int, ctx: dict) -> dict:
+    ctx["version"] = stamp
+    with _lock:
+        marker = _invalidated.get(user_id)
+        if marker is not None and marker[0] > stamp:
+            _counters["discarded_builds"] += 1
+            return ctx
+    _cache.set(_key(user_id), ctx)
+    return ctx
+
+
+def get(user_id: str, sb=None) -> dict:
+    """{user, favorites, completed, current, calendar, joined_clubs,
+    created_clubs, version}. sb: user-scoped client for RLS, else service role.
+    Raises UserNotFoundException like get_user_by_id."""
+    cached = _cache.get(_key(user_id))
+    if cached is not None:
+        return cached
+    from .supabase_client import get_supabase, get_user_by_id
+
+    stamp = _begin()
+    sb = sb if sb is not None else get_supabase()
+    ctx = {"user": get_user_by_id(user_id)}
+    ctx.update({name: run() for name, run in _queries(sb, user_id).items()})
+    return _commit(user_id, stamp, ctx)
+
+
+async def get_async(user_id: str, sb=None) -> dict:
+    """get() for async callers: the user lookup is awaited, the rest run in
+    parallel worker threads."""
+    cached = _cache.get(_key(user_id))
+    if cached is not None:
+        return cached
+    from .supabase_client import get_supabase, get_user_by_id_async
+
+    stamp = _begin()
+    sb = sb if sb is not None else get_supabase()
+    queries = _queries(sb, user_id)
+    user, *results = await asyncio.gather(
+        get_user_by_id_async(user_id),
+        *(asyncio.to_thread(run) for run in queries.values()),
+    )
+    ctx = {"user": user, **dict(zip(queries, results))}
+    return _commit(user_id, stamp, ctx)
+
+
+def derived(ctx: dict, name: str, build: Callable[[], Any]) -> Any:
+    """Memoise something computed from ctx (e.g. a rendered prompt) on the
+    entry itself, so it is dropped together with the data it came from."""
+    memo = ctx.setdefault("_derived", {})
+    if name not in memo:
+        memo[name] = build()
+    return memo[name]
+
+
+def invalidate(user_id: str) -> None:
+    """Drop user_id's context. Call after any write to the tables above or
+    to the user's profile."""
+    now = time.monotonic()
+    with _lock:
+        _invalidated[user_id] = (next(_stamps), now)
+        _invalidated.move_to_end(user_id)
+        while _invalidated:
+            oldest = next(iter(_invalidated.values()))
+            if now - oldest[1] < _MARKER_SECONDS:
+                break
+            _invalidated.popitem(last=False)
+        _counters["invalidations"] += 1
+    _cache.invalidate(_key(user_id))
+
+
+def clear() -> None:
+    with _lock:
+        _invalidated.clear()
+    _cache.clear()
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        counters = dict(_counters)
+    return {**_cache.stats(), **counters}
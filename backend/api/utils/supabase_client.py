@@ -11,16 +11,47 @@ Fixes applied:
   #14 – HTTP/2 FIX: Force HTTP/1.1 by replacing the postgrest httpx session
         after client creation. Prevents LocalProtocolError pseudo-header trailer
         bug triggered by .rpc() calls. Works across all supabase-py versions.
+  #15 – ASYNC: get_async_supabase() + with_retry_async() for code running on
+        the event loop (rate-limit middleware). Same retry classification,
+        but backs off with asyncio.sleep so a Supabase blip doesn't freeze
+        every other request on the instance.
+  #16 – POOLED USER CLIENTS: get_user_supabase() no longer runs create_client()
+        (plus a fresh httpx.Client) per request. User-scoped clients are thin
+        PostgREST clients that carry the user's JWT in their own headers and
+        share one keep-alive HTTP/1.1 transport, so RLS is unchanged but the
+        TCP+TLS handshake is paid once per connection, not once per request.
+  #17 – ASYNC DATA LAYER: *_async() twins of the user and chat helpers for
+        async routes. Each pair shares one query builder, so the sync and
+        async versions can't drift; the async one awaits the AsyncClient and
+        retries through with_retry_async(), so a slow query no longer holds
+        the event loop while other requests wait behind it.
+  #18 – CIRCUIT BREAKER: with_retry()/with_retry_async() go through a
+        per-class breaker (reads = retry_on_timeout=True, writes = the rest).
+        After DB_BREAKER_FAILURE_THRESHOLD consecutive connection failures or
+        timeouts the class opens and calls raise DatabaseUnavailableException
+        (503 + Retry-After) at once — no reset, no backoff sleeps — so an
+        outage doesn't turn into a reconnect storm with every user waiting
+        ~1s for a 500. After DB_BREAKER_COOLDOWN_SECONDS one probe call is
+        let through (half-open); its outcome closes or re-opens the breaker.
+        State is reported by /api/health?deep=true.
+  #19 – QUERY METRICS: the postgrest sessions (sync, async and the pooled
+        user transport) send through utils/db_metrics.py's instrumented
+        transports, which time every table/RPC call per route for
+        /api/admin/db-stats and the optional Server-Timing header.
 """
-from supabase import create_client, Client
-from typing import Optional, List, Dict, Any, Callable, TypeVar
+from supabase import create_client, acreate_client, Client, AsyncClient
+from postgrest import APIError, SyncPostgrestClient, SyncRequestBuilder
+from typing import Optional, List, Dict, Any, Awaitable, Callable, TypeVar
+import asyncio
 import logging
 import uuid
 import time
+import threading
 import httpx
 from api.config import settings
+from api.utils import db_metrics
 from api.exceptions import (
-    DatabaseException, UserNotFoundException,
+    DatabaseException, DatabaseUnavailableException, UserNotFoundException,
     UserAlreadyExistsException, UsernameTakenException,
 )
 
@@ -30,6 +61,10 @@ T = TypeVar("T")
 
 # Singleton client
 _supabase_client: Optional[Client] = None
+# Async singleton (service role) — see get_async_supabase()
+_async_supabase_client: Optional[AsyncClient] = None
+# Shared transport for user-scoped clients — see get_user_supabase()
+_user_http: Optional[httpx.Client] = None
 
 # ── Retry classification ─────────────────────────────────────────────────────
 # Split deliberately, because the two classes are NOT equally safe to retry.
@@ -85,6 +120,128 @@ def _is_timeout(exc: Exception) -> bool:
     return any(sig in msg for sig in _TIMEOUT_SIGNALS)
 
 
+# ── Circuit breaker (#18) ────────────────────────────────────────────────────
+
+class CircuitBreaker:
+    """closed → open after `threshold` consecutive transient failures;
+    open → half_open once `cooldown` seconds have passed; half_open lets a
+    single probe through and closes on its success or re-opens on failure.
+
+    Only connection errors and timeouts count as failures. Any other error
+    (a constraint violation, a missing row) means the database answered, so
+    it counts as a success for breaker purposes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._clock = time.monotonic
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def _cooldown(self) -> float:
+        return settings.DB_BREAKER_COOLDOWN_SECONDS
+
+    def retry_after(self) -> int:
+        remaining = self.opened_at + self._cooldown() - self._clock()
+        return max(1, int(remaining + 0.999))
+
+    def allow(self) -> bool:
+        """May a call go to Supabase now? Counts the refusals."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and self._clock() - self.opened_at >= self._cooldown():
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                logger.warning(f"Supabase {self.name} breaker closed — probe succeeded")
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def abandon(self) -> None:
+        """The call was cancelled before it finished (asyncio.wait_for
+        deadline): no verdict, but free the half-open probe slot."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or (
+                self.state == "closed"
+                and self.consecutive_failures >= settings.DB_BREAKER_FAILURE_THRESHOLD
+            ):
+                if self.state == "closed":
+                    self.trips += 1
+                    logger.error(
+                        f"Supabase {self.name} breaker OPEN after {self.consecutive_failures} "
+                        f"consecutive failures — failing fast for {self._cooldown():.0f}s"
+                    )
+                self.state = "open"
+                self.opened_at = self._clock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "trips": self.trips,
+                "rejected": self.rejected,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self.opened_at = 0.0
+            self.trips = 0
+            self.rejected = 0
+            self._probe_in_flight = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {
+    "read": CircuitBreaker("read"),
+    "write": CircuitBreaker("write"),
+}
+
+
+def _breaker_for(retry_on_timeout: bool) -> CircuitBreaker:
+    """retry_on_timeout=True is the existing marker for idempotent calls."""
+    return _breakers["read" if retry_on_timeout else "write"]
+
+
+def _record_outcome(breaker: CircuitBreaker, exc: Optional[Exception]) -> None:
+    if exc is not None and (_is_connection_error(exc) or _is_timeout(exc)):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """Breaker snapshot per operation class, for /api/health?deep=true."""
+    return {name: b.snapshot() for name, b in _breakers.items()}
+
+
+def reset_breakers() -> None:
+    for b in _breakers.values():
+        b.reset()
+
+
 def _reset_client() -> None:
     """Force the singleton to be recreated on next get_supabase() call."""
     global _supabase_client
@@ -92,11 +249,20 @@ def _reset_client() -> None:
     logger.info("Supabase client reset — will reconnect on next request")
 
 
-def _force_http1(client: Client) -> None:
+def _reset_async_client() -> None:
+    """Async counterpart of _reset_client()."""
+    global _async_supabase_client
+    _async_supabase_client = None
+    logger.info("Async Supabase client reset — will reconnect on next request")
+
+
+def _force_http1(client, session_cls=httpx.Client) -> None:
     """
     Replace the postgrest httpx session with one that has HTTP/2 disabled.
     Copies base_url and headers from the old session so requests still work.
     This is the version-agnostic fix for LocalProtocolError on .rpc() calls.
+    session_cls is httpx.AsyncClient for the async client. The new session
+    also sends through db_metrics' instrumented transport (#19).
     """
     try:
         pg = client.postgrest
@@ -105,8 +271,14 @@ def _force_http1(client: Client) -> None:
             logger.warning("Could not find postgrest session to patch")
             return
 
-        new_session = httpx.Client(
+        transport = (
+            db_metrics.AsyncInstrumentedTransport(http2=False)
+            if session_cls is httpx.AsyncClient
+            else db_metrics.InstrumentedTransport(http2=False)
+        )
+        new_session = session_cls(
             http2=False,
+            transport=transport,
             base_url=old_session.base_url,
             headers=dict(old_session.headers),
         )
@@ -143,21 +315,96 @@ def get_supabase() -> Client:
     return _supabase_client
 
 
-def get_user_supabase(jwt: str) -> Client:
+async def get_async_supabase() -> AsyncClient:
+    """
+    Service-role client whose queries are awaitable. Use from code that runs
+    on the event loop and must not block it (middleware, async routes).
+    No warm-up query: the first real call pays the connection, which keeps
+    the await on the caller's own deadline.
+    """
+    global _async_supabase_client
+    if _async_supabase_client is None:
+        try:
+            client = await acreate_client(
+                settings.SUPABASE_URL,
+                settings.SUPABASE_SERVICE_KEY,
+            )
+            _force_http1(client, session_cls=httpx.AsyncClient)
+            _async_supabase_client = client
+            logger.info("Async Supabase client initialized")
+        except Exception as e:
+            logger.error(f"Failed to initialize async Supabase client: {e}")
+            raise DatabaseException("initialization", str(e))
+    return _async_supabase_client
+
+
+def _get_user_http() -> httpx.Client:
+    """
+    The one httpx.Client every user-scoped client sends through. Carries no
+    Authorization header of its own — each request brings the user's JWT —
+    so a connection can serve any user. HTTP/1.1 for the same reason as #14.
     """
-    Create a per-request Supabase client authenticated with the user's JWT.
+    global _user_http
+    if _user_http is None:
+        _user_http = httpx.Client(
+            http2=False,
+            base_url=f"{settings.SUPABASE_URL}/rest/v1",
+            follow_redirects=True,
+            # Limits live on the transport: httpx ignores Client(limits=...)
+            # once a transport is supplied. Recycle idle sockets well before
+            # the gateway drops them, which is what surfaced as "Server
+            # disconnected" in #13.
+            transport=db_metrics.InstrumentedTransport(
+                http2=False,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=30),
+            ),
+        )
+    return _user_http
+
+
+class UserSupabase:
+    """
+    PostgREST as one user: `.table()`, `.from_()` and `.rpc()` — everything
+    the routes do with a user-scoped client. Requests carry
+    `Authorization: Bearer <user jwt>` plus the anon `apikey`, so PostgREST
+    runs them as that user and RLS (auth.uid()) applies exactly as it did
+    with a full create_client() per request.
+    """
+
+    def __init__(self, jwt: str):
+        key = settings.SUPABASE_ANON_KEY or settings.SUPABASE_SERVICE_KEY  # fallback until anon key is configured
+        self.postgrest = SyncPostgrestClient(
+            f"{settings.SUPABASE_URL}/rest/v1",
+            headers={
+                "apikey": key,
+                "Authorization": f"Bearer {jwt}",
+                "Accept": "application/json",
+                "Content-Type": "application/json",
+            },
+            http_client=_get_user_http(),
+        )
+
+    def table(self, table_name: str) -> SyncRequestBuilder:
+        return self.postgrest.from_(table_name)
+
+    from_ = table
+
+    def rpc(self, fn: str, params: Optional[Dict[str, Any]] = None, **kwargs):
+        return self.postgrest.rpc(fn, params or {}, **kwargs)
+
+
+def get_user_supabase(jwt: str) -> UserSupabase:
+    """
+    Return a Supabase client authenticated with the user's JWT.
     Queries through this client respect Row Level Security — users can only
     read/write their own rows. Use this for ALL user-data queries.
-    Use get_supabase() (service role) only for auth.admin.* and cron operations.
+    Use get_supabase() (service role) only for auth.admin.*, storage and cron
+    operations.
+
+    Cheap to call per request: no client construction beyond a header dict,
+    and the connection comes from the shared keep-alive pool (#16).
     """
-    client = create_client(
-        settings.SUPABASE_URL,
-        settings.SUPABASE_ANON_KEY or settings.SUPABASE_SERVICE_KEY,  # fallback until anon key is configured
-    )
-    # Set the user's JWT so PostgREST enforces RLS via auth.uid()
-    client.postgrest.auth(jwt)
-    _force_http1(client)
-    return client
+    return UserSupabase(jwt)
 
 
 def with_retry(operation: str, fn: Callable[[], T], *, retry_on_timeout: bool = False) -> T:
@@ -174,13 +421,23 @@ def with_retry(operation: str, fn: Callable[[], T], *, retry_on_timeout: bool =
     never saw the reply, so the server may already have applied it; retrying a
     non-idempotent write could duplicate a row. Defaults to False so a new
     write call site is safe unless someone has actually thought about it.
+
+    Raises DatabaseUnavailableException without calling fn() while the
+    breaker for this class is open (#18), and stops retrying if it opens
+    mid-loop.
     """
+    breaker = _breaker_for(retry_on_timeout)
     last_exc: Exception = RuntimeError("unreachable")
     for attempt in range(MAX_RETRIES):
+        if not breaker.allow():
+            if attempt:
+                raise last_exc  # opened mid-loop: report the real failure
+            raise DatabaseUnavailableException(operation, breaker.retry_after())
         try:
-            return fn()
+            result = fn()
         except Exception as exc:
             last_exc = exc
+            _record_outcome(breaker, exc)
             retryable = _is_connection_error(exc) or (retry_on_timeout and _is_timeout(exc))
             if retryable and attempt < MAX_RETRIES - 1:
                 logger.warning(
@@ -191,6 +448,53 @@ def with_retry(operation: str, fn: Callable[[], T], *, retry_on_timeout: bool =
                 time.sleep(RETRY_BACKOFF * (2 ** attempt))
             else:
                 raise
+        else:
+            _record_outcome(breaker, None)
+            return result
+    raise last_exc
+
+
+async def with_retry_async(
+    operation: str,
+    fn: Callable[[], Awaitable[T]],
+    *,
+    retry_on_timeout: bool = False,
+) -> T:
+    """
+    with_retry() for coroutines: same classification and attempt count, but
+    resets the async singleton and backs off with asyncio.sleep, so other
+    requests keep running while this one waits. Wrap the call in
+    asyncio.wait_for() when the caller needs a hard deadline. Shares the
+    sync path's circuit breakers (#18).
+    """
+    breaker = _breaker_for(retry_on_timeout)
+    last_exc: Exception = RuntimeError("unreachable")
+    for attempt in range(MAX_RETRIES):
+        if not breaker.allow():
+            if attempt:
+                raise last_exc  # opened mid-loop: report the real failure
+            raise DatabaseUnavailableException(operation, breaker.retry_after())
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            breaker.abandon()
+            raise
+        except Exception as exc:
+            last_exc = exc
+            _record_outcome(breaker, exc)
+            retryable = _is_connection_error(exc) or (retry_on_timeout and _is_timeout(exc))
+            if retryable and attempt < MAX_RETRIES - 1:
+                logger.warning(
+                    f"{operation}: disconnect on attempt {attempt + 1}, "
+                    f"resetting client and retrying in {RETRY_BACKOFF * (2**attempt):.1f}s … ({exc})"
+                )
+                _reset_async_client()
+                await asyncio.sleep(RETRY_BACKOFF * (2 ** attempt))
+            else:
+                raise
+        else:
+            _record_outcome(breaker, None)
+            return result
     raise last_exc
 
 
@@ -222,16 +526,22 @@ def _strip_sensitive(row: Dict[str, Any]) -> Dict[str, Any]:
     return {k: v for k, v in row.items() if k not in _SENSITIVE_USER_FIELDS}
 
 
+def _user_query(supabase, user_id: str):
+    return supabase.table("users").select("*").eq("id", user_id)
+
+
+def _one_user(response, user_id: str) -> Dict[str, Any]:
+    if not response.data:
+        raise UserNotFoundException(user_id)
+    return _strip_sensitive(response.data[0])
+
+
 def get_user_by_id(user_id: str) -> Dict[str, Any]:
     def _run():
-        supabase = get_supabase()
-        response = supabase.table("users").select("*").eq("id", user_id).execute()
-        if not response.data:
-            raise UserNotFoundException(user_id)
-        return _strip_sensitive(response.data[0])
+        return _one_user(_user_query(get_supabase(), user_id).execute(), user_id)
     try:
         return with_retry("get_user_by_id", _run, retry_on_timeout=True)
-    except UserNotFoundException:
+    except (UserNotFoundException, DatabaseUnavailableException):
         raise
     except Exception as e:
         logger.error(f"Error getting user {user_id}: {e}")
@@ -245,6 +555,8 @@ def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
         return response.data[0] if response.data else None
     try:
         return with_retry("get_user_by_email", _run, retry_on_timeout=True)
+    except DatabaseUnavailableException:
+        raise
     except Exception as e:
         logger.error(f"Error getting user by email: {e}")
         raise DatabaseException("get_user_by_email", str(e))
@@ -274,6 +586,8 @@ def create_user(user_data: Dict[str, Any]) -> Dict[str, Any]:
 
     try:
         return with_retry("create_user", _run)
+    except DatabaseUnavailableException:
+        raise
     except Exception as e:
         error_str = str(e)
         if "duplicate key" in error_str.lower() or "23505" in error_str:
@@ -296,90 +610,187 @@ def create_user(user_data: Dict[str, Any]) -> Dict[str, Any]:
         raise DatabaseException("create_user", error_str)
 
 
+def _update_user_query(supabase, user_id: str, updates: Dict[str, Any]):
+    return supabase.table("users").update(updates).eq("id", user_id)
+
+
+def _update_user_error(user_id: str, e: Exception) -> Exception:
+    # A taken username is normal user input, not a server fault. Postgres
+    # raises 23505 on users_username_key; without this it surfaced as
+    # DatabaseException -> HTTP 500 and paged as an error in Sentry
+    # (SYMBOLOS-BACKEND-15/16/17/18), while the student just saw a generic
+    # failure with no hint that the name was already taken.
+    # create_user already maps this to UsernameTakenException; the update
+    # path simply never did.
+    msg = str(e)
+    if "23505" in msg and "users_username_key" in msg:
+        return UsernameTakenException()
+    logger.error(f"Error updating user {user_id}: {e}")
+    return DatabaseException("update_user", str(e))
+
+
 def update_user(user_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
     def _run():
-        supabase = get_supabase()
-        response = supabase.table("users").update(updates).eq("id", user_id).execute()
-        if not response.data:
-            raise UserNotFoundException(user_id)
+        response = _update_user_query(get_supabase(), user_id, updates).execute()
+        # SEC FIX #8: _one_user strips verification_token et al. — the PATCH
+        # response is sent to the client, same as get_user_by_id.
+        user = _one_user(response, user_id)
         logger.info(f"User updated: {user_id}")
-        # SEC FIX #8: strip verification_token et al. before returning — the
-        # PATCH response is sent to the client, same as get_user_by_id.
-        return _strip_sensitive(response.data[0])
+        return user
     try:
         return with_retry("update_user", _run)
-    except UserNotFoundException:
+    except (UserNotFoundException, DatabaseUnavailableException):
         raise
     except Exception as e:
-        # A taken username is normal user input, not a server fault. Postgres
-        # raises 23505 on users_username_key; without this it surfaced as
-        # DatabaseException -> HTTP 500 and paged as an error in Sentry
-        # (SYMBOLOS-BACKEND-15/16/17/18), while the student just saw a generic
-        # failure with no hint that the name was already taken.
-        # create_user already maps this to UsernameTakenException; the update
-        # path simply never did.
-        msg = str(e)
-        if "23505" in msg and "users_username_key" in msg:
-            raise UsernameTakenException()
-        logger.error(f"Error updating user {user_id}: {e}")
-        raise DatabaseException("update_user", str(e))
+        raise _update_user_error(user_id, e)
 
 
 # ── Chat Operations ───────────────────────────────────────────────────────────
 
+def _chat_history_query(supabase, user_id: str, session_id: Optional[str], limit: int):
+    query = supabase.table("chat_messages").select("*").eq("user_id", user_id)
+    if session_id:
+        query = query.eq("session_id", session_id)
+    return query.order("created_at", desc=False).limit(min(limit, 200))
+
+
 def get_chat_history(user_id: str, session_id: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
     def _run():
-        supabase = get_supabase()
-        query = supabase.table("chat_messages").select("*").eq("user_id", user_id)
-        if session_id:
-            query = query.eq("session_id", session_id)
-        return query.order("created_at", desc=False).limit(min(limit, 200)).execute().data or []
+        return _chat_history_query(get_supabase(), user_id, session_id, limit).execute().data or []
     try:
         return with_retry("get_chat_history", _run, retry_on_timeout=True)
+    except DatabaseUnavailableException:
+        raise
     except Exception as e:
         logger.error(f"Error getting chat history for {user_id}: {e}")
         raise DatabaseException("get_chat_history", str(e))
 
 
-def get_user_sessions(user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
-    def _run():
-        supabase = get_supabase()
-        all_messages = (
-            supabase.table("chat_messages")
-            .select("session_id, created_at, content, role")
-            .eq("user_id", user_id)
-            .not_.is_("session_id", "null")
-            .order("created_at", desc=False)
-            .execute()
-        )
-        sessions_dict: Dict[str, Any] = {}
-        for msg in all_messages.data:
-            sid = msg["session_id"]
-            if sid not in sessions_dict:
-                sessions_dict[sid] = {
-                    "session_id": sid,
-                    "last_updated": msg["created_at"],
-                    "message_count": 0,
-                    "first_user_message": None,
-                }
-            if msg["role"] == "user" and sessions_dict[sid]["first_user_message"] is None:
-                sessions_dict[sid]["first_user_message"] = msg["content"][:50]
-            if msg["created_at"] > sessions_dict[sid]["last_updated"]:
-                sessions_dict[sid]["last_updated"] = msg["created_at"]
-            sessions_dict[sid]["message_count"] += 1
-
-        sessions = [
-            {
+def _sessions_query(supabase, user_id: str):
+    return (
+        supabase.table("chat_messages")
+        .select("session_id, created_at, content, role")
+        .eq("user_id", user_id)
+        .not_.is_("session_id", "null")
+        .order("created_at", desc=False)
+    )
+
+
+def _summarise_sessions(
+    messages: List[Dict[str, Any]], limit: int, before: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    sessions_dict: Dict[str, Any] = {}
+    for msg in messages:
+        sid = msg["session_id"]
+        if sid not in sessions_dict:
+            sessions_dict[sid] = {
                 "session_id": sid,
-                "last_message": data["first_user_message"] or "Chat Session",
-                "last_updated": data["last_updated"],
-                "message_count": data["message_count"],
+                "last_updated": msg["created_at"],
+                "message_count": 0,
+                "first_user_message": None,
             }
-            for sid, data in sessions_dict.items()
-        ]
-        sessions.sort(key=lambda x: x["last_updated"], reverse=True)
-        return sessions[:limit]
+        if msg["role"] == "user" and sessions_dict[sid]["first_user_message"] is None:
+            sessions_dict[sid]["first_user_message"] = msg["content"][:50]
+        if msg["created_at"] > sessions_dict[sid]["last_updated"]:
+            sessions_dict[sid]["last_updated"] = msg["created_at"]
+        sessions_dict[sid]["message_count"] += 1
+
+    sessions = [
+        {
+            "session_id": sid,
+            "last_message": data["first_user_message"] or "Chat Session",
+            "last_updated": data["last_updated"],
+            "message_count": data["message_count"],
+        }
+        for sid, data in sessions_dict.items()
+    ]
+    if before:
+        after_key = _session_cursor_key(before)
+        sessions = [s for s in sessions if (s["last_updated"], s["session_id"]) < after_key]
+    sessions.sort(key=lambda x: (x["last_updated"], x["session_id"]), reverse=True)
+    return sessions[:limit]
+
+
+# Sessions page newest first by (last_updated, session_id): session_id breaks
+# ties, so sessions sharing a timestamp across a page boundary aren't
+# skipped. The cursor is "<last_updated>|<session_id>" of a page's last row;
+# a bare timestamp (older clients) pages by last_updated alone.
+def session_cursor(session: Dict[str, Any]) -> str:
+    return f"{session['last_updated']}|{session['session_id']}"
+
+
+def _session_cursor_key(cursor: str) -> tuple:
+    last_updated, _, session_id = cursor.partition("|")
+    return (last_updated, session_id)
+
+
+# chat_sessions (2026_10_18d_chat_sessions.sql) is the trigger-maintained
+# summary the sessions list reads. Until it exists, fall back to scanning
+# chat_messages with _sessions_query() and re-probe every few minutes.
+_SESSIONS_INDEX_MISSING = {"PGRST205", "42P01"}
+_SESSIONS_INDEX_RETRY_AFTER = 300
+_sessions_index_disabled_until = 0.0
+
+
+def _session_page_query(supabase, user_id: str, limit: int, before: Optional[str]):
+    query = (
+        supabase.table("chat_sessions")
+        .select("session_id, first_user_message, last_updated, message_count")
+        .eq("user_id", user_id)
+    )
+    if before:
+        last_updated, session_id = _session_cursor_key(before)
+        if session_id:
+            query = query.or_(
+                f'last_updated.lt."{last_updated}",'
+                f'and(last_updated.eq."{last_updated}",session_id.lt."{session_id}")'
+            )
+        else:
+            query = query.lt("last_updated", last_updated)
+    return query.order("last_updated", desc=True).order("session_id", desc=True).limit(limit)
+
+
+def _session_page(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "session_id": r["session_id"],
+            "last_message": r.get("first_user_message") or "Chat Session",
+            "last_updated": r["last_updated"],
+            "message_count": r.get("message_count") or 0,
+        }
+        for r in rows
+    ]
+
 
+def _sessions_index_ready() -> bool:
+    return time.monotonic() >= _sessions_index_disabled_until
+
+
+def _sessions_index_missing(e: Exception) -> bool:
+    """True (and the index is skipped for a while) if `e` says the
+    chat_sessions migration isn't applied yet."""
+    global _sessions_index_disabled_until
+    if not (isinstance(e, APIError) and e.code in _SESSIONS_INDEX_MISSING):
+        return False
+    logger.warning(f"chat_sessions unavailable ({e.code}) — listing sessions from chat_messages")
+    _sessions_index_disabled_until = time.monotonic() + _SESSIONS_INDEX_RETRY_AFTER
+    return True
+
+
+def get_user_sessions(
+    user_id: str, limit: int = 20, before: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """A page of the user's sessions, most recently updated first. `before`
+    is session_cursor() of the previous page's last session."""
+    def _run():
+        sb = get_supabase()
+        if _sessions_index_ready():
+            try:
+                return _session_page(_session_page_query(sb, user_id, limit, before).execute().data or [])
+            except APIError as e:
+                if not _sessions_index_missing(e):
+                    raise
+        return _summarise_sessions(_sessions_query(sb, user_id).execute().data or [], limit, before)
     try:
         return with_retry("get_user_sessions", _run, retry_on_timeout=True)
     except Exception as e:
@@ -387,34 +798,47 @@ def get_user_sessions(user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
         return []
 
 
+def _message_row(user_id: str, role: str, content: str, session_id: Optional[str]) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "role": role,
+        "content": content[: settings.MAX_MESSAGE_LENGTH],
+        "session_id": session_id or str(uuid.uuid4()),
+    }
+
+
+def _inserted_message(response) -> Dict[str, Any]:
+    if not response.data:
+        raise DatabaseException("save_message", "No data returned")
+    return response.data[0]
+
+
 def save_message(user_id: str, role: str, content: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+    row = _message_row(user_id, role, content, session_id)
+
     def _run():
-        supabase = get_supabase()
-        sid = session_id or str(uuid.uuid4())
-        message_data = {
-            "user_id": user_id,
-            "role": role,
-            "content": content[: settings.MAX_MESSAGE_LENGTH],
-            "session_id": sid,
-        }
-        response = supabase.table("chat_messages").insert(message_data).execute()
-        if not response.data:
-            raise DatabaseException("save_message", "No data returned")
-        return response.data[0]
+        return _inserted_message(get_supabase().table("chat_messages").insert(row).execute())
     try:
         return with_retry("save_message", _run)
+    except DatabaseUnavailableException:
+        raise
     except Exception as e:
         logger.error(f"Error saving message: {e}")
         raise DatabaseException("save_message", str(e))
 
 
+def _delete_session_query(supabase, user_id: str, session_id: str):
+    return supabase.table("chat_messages").delete().eq("user_id", user_id).eq("session_id", session_id)
+
+
 def delete_chat_session(user_id: str, session_id: str) -> None:
     def _run():
-        supabase = get_supabase()
-        supabase.table("chat_messages").delete().eq("user_id", user_id).eq("session_id", session_id).execute()
+        _delete_session_query(get_supabase(), user_id, session_id).execute()
         logger.info(f"Deleted session {session_id} for user {user_id}")
     try:
         with_retry("delete_chat_session", _run)
+    except DatabaseUnavailableException:
+        raise
     except Exception as e:
         logger.error(f"Error deleting session {session_id}: {e}")
         raise DatabaseException("delete_session", str(e))
@@ -422,11 +846,235 @@ def delete_chat_session(user_id: str, session_id: str) -> None:
 
 def delete_chat_history(user_id: str) -> None:
     def _run():
-        supabase = get_supabase()
-        supabase.table("chat_messages").delete().eq("user_id", user_id).execute()
+        get_supabase().table("chat_messages").delete().eq("user_id", user_id).execute()
         logger.info(f"Deleted chat history for user {user_id}")
     try:
         with_retry("delete_chat_history", _run)
+    except DatabaseUnavailableException:
+        raise
+    except Exception as e:
+        logger.error(f"Error deleting chat history for {user_id}: {e}")
+        raise DatabaseException("delete_chat_history", str(e))
+
+
+# ── Async data layer (#17) ────────────────────────────────────────────────────
+# Same queries, same error mapping, same retry classification as the sync
+# helpers above. Use these from `async def` routes; the sync ones stay for
+# threadpool code (sync routes, crons, Inngest steps).
+
+async def get_user_by_id_async(user_id: str) -> Dict[str, Any]:
+    async def _run():
+        sb = await get_async_supabase()
+        return _one_user(await _user_query(sb, user_id).execute(), user_id)
+    try:
+        return await with_retry_async("get_user_by_id", _run, retry_on_timeout=True)
+    except (UserNotFoundException, DatabaseUnavailableException):
+        raise
+    except Exception as e:
+        logger.error(f"Error getting user {user_id}: {e}")
+        raise DatabaseException("get_user", str(e))
+
+
+async def update_user_async(user_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+    async def _run():
+        sb = await get_async_supabase()
+        user = _one_user(await _update_user_query(sb, user_id, updates).execute(), user_id)
+        logger.info(f"User updated: {user_id}")
+        return user
+    try:
+        return await with_retry_async("update_user", _run)
+    except (UserNotFoundException, DatabaseUnavailableException):
+        raise
+    except Exception as e:
+        raise _update_user_error(user_id, e)
+
+
+async def get_chat_history_async(
+    user_id: str, session_id: Optional[str] = None, limit: int = 50,
+) -> List[Dict[str, Any]]:
+    async def _run():
+        sb = await get_async_supabase()
+        return (await _chat_history_query(sb, user_id, session_id, limit).execute()).data or []
+    try:
+        return await with_retry_async("get_chat_history", _run, retry_on_timeout=True)
+    except DatabaseUnavailableException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting chat history for {user_id}: {e}")
+        raise DatabaseException("get_chat_history", str(e))
+
+
+async def get_user_sessions_async(
+    user_id: str, limit: int = 20, before: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    async def _run():
+        sb = await get_async_supabase()
+        if _sessions_index_ready():
+            try:
+                return _session_page((await _session_page_query(sb, user_id, limit, before).execute()).data or [])
+            except APIError as e:
+                if not _sessions_index_missing(e):
+                    raise
+        return _summarise_sessions((await _sessions_query(sb, user_id).execute()).data or [], limit, before)
+    try:
+        return await with_retry_async("get_user_sessions", _run, retry_on_timeout=True)
+    except Exception as e:
+        logger.error(f"Error getting user sessions for {user_id}: {e}")
+        return []
+
+
+async def save_message_async(
+    user_id: str, role: str, content: str, session_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    row = _message_row(user_id, role, content, session_id)
+
+    async def _run():
+        sb = await get_async_supabase()
+        return _inserted_message(await sb.table("chat_messages").insert(row).execute())
+    try:
+        return await with_retry_async("save_message", _run)
+    except DatabaseUnavailableException:
+        raise
+    except Exception as e:
+        logger.error(f"Error saving message: {e}")
+        raise DatabaseException("save_message", str(e))
+
+
+async def get_recent_chat_history_async(
+    user_id: str, session_id: str, limit: int,
+) -> List[Dict[str, Any]]:
+    """The newest `limit` messages of a session, oldest first — the model's
+    context window. get_chat_history_async() reads from the start of the
+    session, which is right for replaying it but not for prompting."""
+    async def _run():
+        sb = await get_async_supabase()
+        query = (
+            sb.table("chat_messages").select("*")
+            .eq("user_id", user_id).eq("session_id", session_id)
+            .order("created_at", desc=True).limit(min(limit, 200))
+        )
+        rows = (await query.execute()).data or []
+        return sorted(rows, key=lambda m: m.get("created_at") or "")
+    try:
+        return await with_retry_async("get_chat_history", _run, retry_on_timeout=True)
+    except DatabaseUnavailableException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting chat history for {user_id}: {e}")
+        raise DatabaseException("get_chat_history", str(e))
+
+
+# Errors meaning 2026_10_18c_chat_messages_turn_id.sql isn't applied yet:
+# unknown column (PostgREST schema cache / Postgres) or no unique index to
+# resolve ON CONFLICT against.
+_TURN_ID_MISSING = {"PGRST204", "42703", "42P10"}
+_TURN_ID_RETRY_AFTER = 300  # seconds before re-probing the column
+_turn_ids_disabled_until = 0.0
+
+
+def _turn_rows(
+    user_id: str, session_id: str, turn_id: str,
+    user_content: str, assistant_content: str, user_at: str, assistant_at: str,
+) -> List[Dict[str, Any]]:
+    # created_at is explicit: both rows land in one statement, so the column
+    # default would give them the same now() and the pair no stable order.
+    user_row = _message_row(user_id, "user", user_content, session_id)
+    assistant_row = _message_row(user_id, "assistant", assistant_content, session_id)
+    user_row.update(turn_id=turn_id, created_at=user_at)
+    assistant_row.update(turn_id=turn_id, created_at=assistant_at)
+    return [user_row, assistant_row]
+
+
+async def save_chat_turn_async(
+    user_id: str, session_id: str, turn_id: str,
+    user_content: str, assistant_content: str, *, user_at: str, assistant_at: str,
+) -> None:
+    """Persist one exchange — the user's message and the reply — in a single
+    write, after the model has answered.
+
+    `turn_id` is the idempotency key: rows are unique on (user_id, turn_id,
+    role), so a turn that is written twice (a client retry after a dropped
+    response, a replayed background write) lands once. Until the turn_id
+    migration is applied the pair is a plain two-row insert.
+    """
+    rows = _turn_rows(user_id, session_id, turn_id, user_content, assistant_content, user_at, assistant_at)
+
+    async def _run():
+        global _turn_ids_disabled_until
+        sb = await get_async_supabase()
+        if time.monotonic() >= _turn_ids_disabled_until:
+            try:
+                await sb.table("chat_messages").upsert(
+                    rows, on_conflict="user_id,turn_id,role", ignore_duplicates=True,
+                ).execute()
+                return
+            except APIError as e:
+                if e.code not in _TURN_ID_MISSING:
+                    raise
+                logger.warning(f"chat_messages.turn_id unavailable ({e.code}) — saving turns without idempotency")
+                _turn_ids_disabled_until = time.monotonic() + _TURN_ID_RETRY_AFTER
+        legacy = [{k: v for k, v in row.items() if k != "turn_id"} for row in rows]
+        await sb.table("chat_messages").insert(legacy).execute()
+    try:
+        await with_retry_async("save_chat_turn", _run)
+    except DatabaseUnavailableException:
+        raise
+    except Exception as e:
+        logger.error(f"Error saving chat turn {turn_id}: {e}")
+        raise DatabaseException("save_message", str(e))
+
+
+async def get_turn_reply_async(user_id: str, turn_id: str) -> Optional[Dict[str, Any]]:
+    """The reply already saved for turn `turn_id` (its session_id and
+    content), looked up across all of the user's sessions — a retried first
+    message arrives without the session id the server minted for it. Served
+    by the (user_id, turn_id, role) unique index; None until it exists."""
+    if time.monotonic() < _turn_ids_disabled_until:
+        return None
+
+    async def _run():
+        sb = await get_async_supabase()
+        try:
+            rows = (await sb.table("chat_messages").select("session_id, content")
+                    .eq("user_id", user_id).eq("turn_id", turn_id).eq("role", "assistant")
+                    .limit(1).execute()).data or []
+        except APIError as e:
+            if e.code not in _TURN_ID_MISSING:
+                raise
+            return None
+        return rows[0] if rows else None
+    try:
+        return await with_retry_async("get_turn_reply", _run, retry_on_timeout=True)
+    except DatabaseUnavailableException:
+        raise
+    except Exception as e:
+        logger.error(f"Error looking up chat turn {turn_id}: {e}")
+        raise DatabaseException("get_chat_history", str(e))
+
+
+async def delete_chat_session_async(user_id: str, session_id: str) -> None:
+    async def _run():
+        sb = await get_async_supabase()
+        await _delete_session_query(sb, user_id, session_id).execute()
+        logger.info(f"Deleted session {session_id} for user {user_id}")
+    try:
+        await with_retry_async("delete_chat_session", _run)
+    except DatabaseUnavailableException:
+        raise
+    except Exception as e:
+        logger.error(f"Error deleting session {session_id}: {e}")
+        raise DatabaseException("delete_session", str(e))
+
+
+async def delete_chat_history_async(user_id: str) -> None:
+    async def _run():
+        sb = await get_async_supabase()
+        await sb.table("chat_messages").delete().eq("user_id", user_id).execute()
+        logger.info(f"Deleted chat history for user {user_id}")
+    try:
+        await with_retry_async("delete_chat_history", _run)
+    except DatabaseUnavailableException:
+        raise
     except Exception as e:
         logger.error(f"Error deleting chat history for {user_id}: {e}")
         raise DatabaseException("delete_chat_history", str(e))
@@ -460,6 +1108,8 @@ def search_courses(
         return db_query.limit(limit).execute().data or []
     try:
         return with_retry("search_courses", _run, retry_on_timeout=True)
+    except DatabaseUnavailableException:
+        raise
     except Exception as e:
         raise DatabaseException(f"Database query failed: {str(e)}")
 
@@ -482,6 +1132,8 @@ def get_course(course_code: str) -> List[Dict[str, Any]]:
         )
     try:
         return with_retry("get_course", _run, retry_on_timeout=True)
+    except DatabaseUnavailableException:
+        raise
     except Exception as e:
         raise DatabaseException(f"Database query failed: {str(e)}")
 
@@ -502,6 +1154,8 @@ def get_favorites(user_id: str) -> List[Dict[str, Any]]:
         )
     try:
         return with_retry("get_favorites", _run, retry_on_timeout=True)
+    except DatabaseUnavailableException:
+        raise
     except Exception as e:
         logger.error(f"Error getting favorites for {user_id}: {e}")
         raise DatabaseException("get_favorites", str(e))
@@ -530,6 +1184,8 @@ def add_favorite(
         return response.data[0]
     try:
         return with_retry("add_favorite", _run)
+    except DatabaseUnavailableException:
+        raise
     except Exception as e:
         error_str = str(e)
         logger.error(f"Error adding favorite: {error_str}")
@@ -545,6 +1201,8 @@ def remove_favorite(user_id: str, course_code: str) -> None:
         logger.info(f"Removed favorite {course_code} for user {user_id}")
     try:
         with_retry("remove_favorite", _run)
+    except DatabaseUnavailableException:
+        raise
     except Exception as e:
         logger.error(f"Error removing favorite: {e}")
         raise DatabaseException("remove_favorite", str(e))
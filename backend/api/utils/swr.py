@@ -0,0 +1,188 @@
+"""
+Stale-while-revalidate loader for expensive in-process datasets.
+
+Some datasets are built by scanning a whole table (the term offerings scan
+of mcgill_sections is dozens of 1000-row pages). With a plain TTL cache the
+first request after each expiry — or on a cold instance — pays that scan.
+SWRLoader keeps the last good value instead:
+
+    offerings = SWRLoader("term_offerings", _scan, fresh_seconds=6 * 3600,
+                          seed=_read_snapshot)
+    offerings.get()
+
+  - fresh value          → returned as is
+  - stale value          → returned as is; one background thread rebuilds it
+  - no value yet         → seed() (e.g. a prebuilt snapshot file) if it gives
+                           one, else the caller loads synchronously
+
+Refreshes are coalesced: at most one background refresh runs at a time, and
+concurrent cold callers wait on the one load rather than each scanning. A
+failed background refresh keeps serving the stale value and is not retried
+for retry_seconds; a failed cold load raises to the caller.
+
+On serverless hosts the background thread may be frozen between
+invocations; it simply finishes on the next one, and requests keep being
+served from the stale value meanwhile.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SWRLoader:
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        *,
+        fresh_seconds: float,
+        seed: Optional[Callable[[], Optional[Tuple[Any, float]]]] = None,
+        retry_seconds: float = 60.0,
+    ):
+        """
+        Args:
+            loader:        Builds the value. Runs on a background thread when
+                           refreshing, so it must not rely on request state.
+            fresh_seconds: Age after which the value is refreshed.
+            seed:          Returns (value, built_at epoch seconds) or None;
+                           tried once, before the first synchronous load.
+            retry_seconds: Pause after a failed background refresh.
+        """
+        self.name = name
+        self._loader = loader
+        self._fresh_seconds = fresh_seconds
+        self._seed = seed
+        self._retry_seconds = retry_seconds
+        self._clock = time.time
+
+        self._lock = threading.Lock()       # guards the fields below
+        self._load_lock = threading.Lock()  # one loader run at a time
+        self._value: Any = None
+        self._built_at = 0.0
+        self._source: Optional[str] = None
+        self._seeded = False
+        self._refreshing = False
+        self._failed_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._counters = {
+            "fresh_hits": 0, "stale_hits": 0, "cold_loads": 0,
+            "refreshes": 0, "refresh_errors": 0, "seeded": 0,
+        }
+
+    # ── Public ───────────────────────────────────────────────────────────
+
+    def get(self) -> Any:
+        with self._lock:
+            value, built_at = self._value, self._built_at
+            seeded = self._seeded
+        if value is None and not seeded:
+            self.seed()
+            with self._lock:
+                value, built_at = self._value, self._built_at
+        if value is None:
+            return self._load_cold()
+
+        now = self._clock()
+        if now - built_at < self._fresh_seconds:
+            self._count("fresh_hits")
+            return value
+        self._count("stale_hits")
+        self._maybe_refresh(now)
+        return value
+
+    def seed(self) -> bool:
+        """Try the seed callable once; True if it supplied a value."""
+        with self._lock:
+            if self._seeded:
+                return False
+            self._seeded = True
+        if self._seed is None:
+            return False
+        try:
+            seeded = self._seed()
+        except Exception as e:
+            logger.warning(f"SWR {self.name}: seed failed: {e}")
+            return False
+        if not seeded:
+            return False
+        value, built_at = seeded
+        with self._lock:
+            if self._value is None:
+                self._value, self._built_at, self._source = value, built_at, "seed"
+                self._counters["seeded"] += 1
+        logger.info(f"SWR {self.name}: seeded, built {int(self._clock() - built_at)}s ago")
+        return True
+
+    def invalidate(self) -> None:
+        """Mark the value stale so the next get() starts a refresh."""
+        with self._lock:
+            self._built_at = 0.0
+            self._failed_at = None
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Block until an in-flight background refresh finishes (tests, scripts)."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            age = None if self._value is None else round(self._clock() - self._built_at, 1)
+            return {
+                "loaded": self._value is not None,
+                "source": self._source,
+                "age_seconds": age,
+                "refreshing": self._refreshing,
+                **self._counters,
+            }
+
+    # ── Internals ────────────────────────────────────────────────────────
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _store(self, value: Any, source: str) -> None:
+        with self._lock:
+            self._value, self._built_at, self._source = value, self._clock(), source
+            self._failed_at = None
+
+    def _load_cold(self) -> Any:
+        with self._load_lock:
+            with self._lock:
+                if self._value is not None:  # another caller loaded it meanwhile
+                    return self._value
+            value = self._loader()
+            self._store(value, "load")
+            self._count("cold_loads")
+            return value
+
+    def _maybe_refresh(self, now: float) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            if self._failed_at is not None and now - self._failed_at < self._retry_seconds:
+                return
+            self._refreshing = True
+        self._thread = threading.Thread(target=self._refresh, name=f"swr-{self.name}", daemon=True)
+        self._thread.start()
+
+    def _refresh(self) -> None:
+        try:
+            with self._load_lock:
+                value = self._loader()
+            self._store(value, "refresh")
+            self._count("refreshes")
+        except Exception as e:
+            logger.warning(f"SWR {self.name}: background refresh failed, serving stale: {e}")
+            with self._lock:
+                self._failed_at = self._clock()
+                self._counters["refresh_errors"] += 1
+        finally:
+            with self._lock:
+                self._refreshing = False
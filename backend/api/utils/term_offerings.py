@@ -0,0 +1,107 @@
+"""
+Term offerings: which courses run in which term, and who usually teaches them.
+
+Built by scanning mcgill_sections (see courses._load_term_offerings, which
+serves it stale-while-revalidate). The same build also runs at the end of
+`scripts/import_sections.py --apply` and is written to SNAPSHOT_PATH, which
+deploys with the API and seeds the loader on a cold instance, so the scan
+is never on the request path.
+
+No settings import here: the import script loads this module without the
+API's environment.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATH = Path(__file__).resolve().parent.parent / "data" / "term_offerings.json"
+SNAPSHOT_VERSION = 1
+
+_PAGE = 1000  # Supabase caps a select at 1000 rows
+
+
+def aggregate(rows: Iterable[dict]) -> tuple:
+    """mcgill_sections rows → (terms, offerings, instructors).
+
+    - terms:       {term label}
+    - offerings:   {term: {normalized course code}}
+    - instructors: {term: {normcode: representative instructor}} — the most
+                   common named instructor across the course's sections that term.
+    """
+    terms: set[str] = set()
+    offerings: dict[str, set] = {}
+    instr_counts: dict[tuple, Counter] = {}
+    for r in rows:
+        t, c = r.get("term"), r.get("course_code")
+        if not t or not c:
+            continue
+        code = c.upper().replace(" ", "")
+        terms.add(t)
+        offerings.setdefault(t, set()).add(code)
+        if r.get("instructor"):
+            instr_counts.setdefault((t, code), Counter())[r["instructor"]] += 1
+    instructors: dict[str, dict] = {}
+    for (t, code), counter in instr_counts.items():
+        instructors.setdefault(t, {})[code] = counter.most_common(1)[0][0]
+    return terms, offerings, instructors
+
+
+def scan(sb) -> tuple:
+    """Page through all of mcgill_sections and aggregate()."""
+    def _rows():
+        start = 0
+        while True:
+            rows = (
+                sb.table("mcgill_sections").select("term, course_code, instructor")
+                .range(start, start + _PAGE - 1).execute().data or []
+            )
+            yield from rows
+            if len(rows) < _PAGE:
+                return
+            start += _PAGE
+    return aggregate(_rows())
+
+
+def write_snapshot(result: tuple, path: Path = SNAPSHOT_PATH) -> Path:
+    terms, offerings, instructors = result
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "terms": sorted(terms),
+        "offerings": {t: sorted(codes) for t, codes in offerings.items()},
+        "instructors": instructors,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+    tmp.replace(path)
+    return path
+
+
+def read_snapshot(path: Path = SNAPSHOT_PATH) -> Optional[Tuple[tuple, float]]:
+    """((terms, offerings, instructors), built_at epoch) or None when there
+    is no usable snapshot."""
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable term-offerings snapshot {path}: {e}")
+        return None
+    if payload.get("version") != SNAPSHOT_VERSION:
+        logger.warning(f"Ignoring term-offerings snapshot version {payload.get('version')}")
+        return None
+    result = (
+        set(payload["terms"]),
+        {t: set(codes) for t, codes in payload["offerings"].items()},
+        payload["instructors"],
+    )
+    built_at = datetime.fromisoformat(payload["built_at"]).timestamp()
+    return result, built_at
@@ -0,0 +1,207 @@
+"""
+Translation memory for advisor-card text.
+
+Switching language used to regenerate every AI card from the student's full
+context, and system cards (transcript / registration reminders) — the same
+words for every student — were never translated at all. Retranslate now
+translates the cards a student already has, string by string, through a
+global memory keyed by (sha256(source text), target language):
+
+  1. translation_cache (utils/cache.py) — the in-process LRU, plus the
+     shared Redis L2 when CACHE_REDIS_URL is set;
+  2. the translation_memory table (2026_10_18h_translation_memory.sql) —
+     one select for every string the LRU didn't have;
+  3. Claude — one call with every string still missing, as a JSON array.
+
+Only shared text goes through the memory — system (reminder) cards, the
+same words for every student. An AI card's text is personal (grades,
+professors, plans), so it is passed as `private`: translated in the same
+Claude call, but never looked up, cached or written to the table, which has
+no owner and outlives the account. Whatever Claude translates of the shared
+text is written back to both levels, so a reminder card is translated once
+per language for all students. Only the source text's hash is used as the
+key; the table also keeps the source text itself for auditing.
+
+Until the migration is applied the table is skipped (re-probed every few
+minutes) and the LRU alone remembers translations.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from postgrest import APIError
+
+from ..config import settings
+from . import llm
+from .cache import translation_cache
+from .supabase_client import get_supabase
+
+logger = logging.getLogger(__name__)
+
+LANG_NAMES = {"en": "English", "fr": "French", "zh": "Simplified Chinese (Mandarin)"}
+
+_TABLE_MISSING = {"PGRST205", "42P01"}
+_TABLE_RETRY_AFTER = 300
+_table_disabled_until = 0.0
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, int] = {"strings": 0, "cache_hits": 0, "table_hits": 0, "translated": 0,
+                          "private": 0, "llm_calls": 0}
+
+
+def source_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _cache_key(lang: str, digest: str) -> str:
+    return f"tm:{lang}:{digest}"
+
+
+def _count(**deltas: int) -> None:
+    with _stats_lock:
+        for name, n in deltas.items():
+            _stats[name] += n
+
+
+def _table_available() -> bool:
+    return time.monotonic() >= _table_disabled_until
+
+
+def _table_failed(e: Exception, action: str) -> None:
+    global _table_disabled_until
+    if isinstance(e, APIError) and e.code in _TABLE_MISSING:
+        logger.info("translation_memory table missing — using the in-process cache only")
+        _table_disabled_until = time.monotonic() + _TABLE_RETRY_AFTER
+    else:
+        logger.warning(f"translation_memory {action} failed: {e}")
+
+
+def _lookup_table(digests: Dict[str, str], lang: str) -> Dict[str, str]:
+    """{text: translation} for the texts (by digest) the table has."""
+    if not digests or not _table_available():
+        return {}
+    try:
+        rows = (get_supabase().table("translation_memory")
+                .select("source_hash, translated_text")
+                .eq("target_lang", lang)
+                .in_("source_hash", list(digests))
+                .execute().data or [])
+    except Exception as e:
+        _table_failed(e, "lookup")
+        return {}
+    return {digests[r["source_hash"]]: r["translated_text"]
+            for r in rows if r.get("source_hash") in digests and r.get("translated_text")}
+
+
+def _store_table(translations: Dict[str, str], lang: str) -> None:
+    if not translations or not _table_available():
+        return
+    rows = [
+        {"source_hash": source_hash(text), "target_lang": lang,
+         "source_text": text, "translated_text": translated}
+        for text, translated in translations.items()
+    ]
+    try:
+        (get_supabase().table("translation_memory")
+         .upsert(rows, on_conflict="source_hash,target_lang", ignore_duplicates=True)
+         .execute())
+    except Exception as e:
+        _table_failed(e, "write")
+
+
+def lookup(texts: Iterable[str], lang: str) -> Dict[str, str]:
+    """Remembered translations of `texts` into `lang`, from the LRU, then
+    one table read for the rest. Texts nobody has translated are absent."""
+    found: Dict[str, str] = {}
+    digests: Dict[str, str] = {}
+    for text in texts:
+        digest = source_hash(text)
+        hit = translation_cache.get(_cache_key(lang, digest))
+        if hit is not None:
+            found[text] = hit
+        else:
+            digests[digest] = text
+    from_table = _lookup_table(digests, lang)
+    for text, translated in from_table.items():
+        translation_cache.set(_cache_key(lang, source_hash(text)), translated)
+    found.update(from_table)
+    _count(cache_hits=len(found) - len(from_table), table_hits=len(from_table))
+    return found
+
+
+def remember(translations: Dict[str, str], lang: str) -> None:
+    for text, translated in translations.items():
+        translation_cache.set(_cache_key(lang, source_hash(text)), translated)
+    _store_table(translations, lang)
+
+
+async def _translate_batch(texts: list, lang: str, trace: Optional[dict]) -> Dict[str, str]:
+    """One Claude call translating `texts` (in order) into `lang`. Retries
+    once on malformed output; raises if the second reply is unusable too."""
+    prompt = (
+        f"Translate each string in this JSON array into {LANG_NAMES.get(lang, lang)}. "
+        "Return ONLY a JSON array of the translations, same length and same order — no "
+        "markdown, no commentary. Keep course codes (e.g. COMP 202), numbers, grades, dates, "
+        "emoji, URLs and proper nouns (McGill, Minerva) unchanged. A string already in the "
+        "target language is returned as-is. These are short advice cards shown to a McGill "
+        f"student.\n\n{json.dumps(texts, ensure_ascii=False)}"
+    )
+    for attempt in range(2):
+        message = await llm.create(
+            "cards_retranslate",
+            trace=trace,
+            model=settings.CLAUDE_MODEL,
+            max_tokens=4096,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        _count(llm_calls=1)
+        raw = message.content[0].text.strip()
+        if raw.startswith("```"):
+            raw = raw.split("\n", 1)[1].rsplit("```", 1)[0].strip()
+        if "[" in raw and "]" in raw:
+            raw = raw[raw.find("["):raw.rfind("]") + 1]
+        try:
+            out = json.loads(raw)
+            if (isinstance(out, list) and len(out) == len(texts)
+                    and all(isinstance(t, str) and t.strip() for t in out)):
+                return dict(zip(texts, out))
+            error = f"expected {len(texts)} strings, got {type(out).__name__} of {len(out) if isinstance(out, list) else '?'}"
+        except json.JSONDecodeError as e:
+            error = str(e)
+        if attempt == 0:
+            logger.warning(f"Card translation reply unusable, retrying once: {error}")
+    raise ValueError(f"Card translation reply unusable: {error}")
+
+
+async def translate(texts: Iterable[str], lang: str, *, private: Iterable[str] = (),
+                    trace: Optional[dict] = None) -> Dict[str, str]:
+    """{text: translation into `lang`} for every non-empty text in `texts`
+    and `private`. Remembered shared translations cost nothing; the rest, and
+    every private text, go to Claude in one call. Private texts are never
+    looked up or remembered."""
+    unique = list(dict.fromkeys(t for t in texts if t and t.strip()))
+    shared = set(unique)
+    personal = [t for t in dict.fromkeys(private) if t and t.strip() and t not in shared]
+    found = await asyncio.to_thread(lookup, unique, lang)
+    missing = [t for t in unique if t not in found]
+    _count(strings=len(unique), private=len(personal))
+    if missing or personal:
+        translated = await _translate_batch(missing + personal, lang, trace)
+        await asyncio.to_thread(remember, {t: translated[t] for t in missing}, lang)
+        _count(translated=len(missing))
+        found.update(translated)
+    return found
+
+
+def stats() -> Dict[str, int]:
+    """Shared strings requested, answered from the LRU / the table and
+    translated by Claude, private strings translated, and Claude calls made,
+    on this instance."""
+    with _stats_lock:
+        return dict(_stats)
@@ -19,54 +19,28 @@ frontend can route the user back to the verification screen.
 from __future__ import annotations
 
 import logging
-from functools import lru_cache
-from time import time
-from typing import Tuple
 
 from fastapi import Depends, HTTPException, status
 
 from ..auth import get_current_user_id
-from .supabase_client import get_supabase
+from .auth_identity import get_identity
 
 logger = logging.getLogger(__name__)
 
-# Cache verified status for 60s per user to avoid hammering Supabase on every
-# request. Cache key is (user_id, minute_bucket) so it auto-expires.
-_VERIFIED_TTL_SECONDS = 60
-
-
-@lru_cache(maxsize=1024)
-def _cached_check(user_id: str, bucket: int) -> Tuple[bool, str]:
-    """Inner cache. Returns (is_verified, auth_email_lower)."""
-    sb = get_supabase()
-    # Real auth email (cannot be edited by the user)
-    auth_email = ""
-    try:
-        u = sb.auth.admin.get_user_by_id(user_id)
-        auth_email = (getattr(u.user, "email", None) or "").lower()
-    except Exception as exc:
-        logger.warning("auth.admin.get_user failed for %s: %s", user_id, type(exc).__name__)
-
-    # Verified flag we set ourselves (via Resend round-trip)
-    is_verified = False
-    try:
-        row = sb.table("users").select("email_verified").eq("id", user_id).single().execute()
-        is_verified = bool((row.data or {}).get("email_verified"))
-    except Exception as exc:
-        logger.warning("users.email_verified fetch failed for %s: %s", user_id, type(exc).__name__)
-
-    return (is_verified, auth_email)
-
 
 def is_email_verified(user_id: str) -> bool:
     """Return True if the user has either completed our own email verification
-    OR signed up with a real McGill address (already verified by SSO/IT)."""
-    bucket = int(time() // _VERIFIED_TTL_SECONDS)
-    verified, auth_email = _cached_check(user_id, bucket)
-    if verified:
+    OR signed up with a real McGill address (already verified by SSO/IT).
+
+    Reads the shared auth-identity cache, so this costs no round-trip when
+    auth_flags / the LLM budget already looked the user up this minute.
+    """
+    identity = get_identity(user_id)
+    if identity["email_verified"]:
         return True
     # Trust McGill's own mailer: if Supabase has confirmed the address belongs
     # to mail.mcgill.ca / mcgill.ca, we don't need to send a second link.
+    auth_email = identity["email"]
     if auth_email.endswith("@mail.mcgill.ca") or auth_email.endswith("@mcgill.ca"):
         return True
     return False
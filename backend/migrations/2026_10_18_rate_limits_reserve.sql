@@ -0,0 +1,70 @@
+-- ────────────────────────────────────────────────────────────────────────────
+-- 2026-10-18 — Batched token reservations for the two-tier rate limiter
+--
+-- main.HybridRateLimiter admits most requests from small in-process token
+-- leases. Leases are topped up by ONE call to this function per flush,
+-- carrying every key that needs tokens, instead of one increment_rate_limit
+-- RPC per request.
+--
+-- For each key the function grants at most what still fits under that key's
+-- cap for the window, under a row lock — so the sum of every instance's
+-- leases can never exceed the cap, and the global limit holds across
+-- instances. Returns tokens granted plus the new count per key.
+--
+-- Until this is applied the limiter logs a warning and keeps using the
+-- per-request increment_rate_limit path, so deploy order doesn't matter.
+--
+-- Idempotent — safe to re-run.
+-- ────────────────────────────────────────────────────────────────────────────
+
+CREATE OR REPLACE FUNCTION public.reserve_rate_limits(
+  p_window timestamptz,
+  p_keys   text[],
+  p_counts integer[],
+  p_caps   integer[]
+)
+RETURNS TABLE (key text, granted integer, count integer)
+LANGUAGE plpgsql
+VOLATILE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+#variable_conflict use_column
+DECLARE
+  i         integer;
+  v_current integer;
+  v_granted integer;
+BEGIN
+  -- The caller sorts p_keys, so concurrent flushes lock rows in the same
+  -- order and can't deadlock each other.
+  FOR i IN 1 .. coalesce(array_length(p_keys, 1), 0) LOOP
+    INSERT INTO rate_limits (key, window_start, count, updated_at)
+    VALUES (p_keys[i], p_window, 0, now())
+    ON CONFLICT (key, window_start) DO NOTHING;
+
+    SELECT rl.count INTO v_current
+    FROM rate_limits rl
+    WHERE rl.key = p_keys[i] AND rl.window_start = p_window
+    FOR UPDATE;
+
+    v_granted := GREATEST(0, LEAST(p_counts[i], p_caps[i] - v_current));
+    IF v_granted > 0 THEN
+      UPDATE rate_limits rl
+      SET count = rl.count + v_granted, updated_at = now()
+      WHERE rl.key = p_keys[i] AND rl.window_start = p_window;
+    END IF;
+
+    key     := p_keys[i];
+    granted := v_granted;
+    count   := v_current + v_granted;
+    RETURN NEXT;
+  END LOOP;
+END;
+$$;
+
+-- Backend-only: the service role calls this. Never expose it to the anon
+-- key shipped in the JS bundle — anyone could drain someone else's bucket.
+REVOKE ALL ON FUNCTION public.reserve_rate_limits(timestamptz, text[], integer[], integer[])
+  FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.reserve_rate_limits(timestamptz, text[], integer[], integer[])
+  TO service_role;
@@ -0,0 +1,78 @@
+-- ────────────────────────────────────────────────────────────────────────────
+-- 2026-10-18b — rate_limits namespaces + scheduled sweeper
+--
+-- rate_limits carries three kinds of counter, told apart by key prefix:
+--   minute  ip:* user:* admin_login:*    (rate limiter, admin login limiter)
+--   hour    anomaly:*                    (anomaly counters)
+--   day     llm_budget:* verify_send:*   (LLM budget, verification throttle)
+--
+-- The rate limiter used to prune inline with one table-wide
+-- `DELETE WHERE window_start < now() - 10 min`, which also dropped the
+-- current day's LLM budgets and hour's anomaly counters. Each namespace now
+-- has its own retention, enforced off the request path by
+-- sweep_rate_limits(), which utils/rate_limit_maintenance.py calls every
+-- 10 minutes (Inngest) and from the daily cron.
+--
+-- `namespace` is a generated column so no writer has to change; the index
+-- on (namespace, window_start) turns each namespace's sweep into a range
+-- scan. Keep the CASE in sync with rate_limit_maintenance.NAMESPACES.
+--
+-- Until this is applied the sweeper falls back to per-prefix PostgREST
+-- deletes with the same retention, so deploy order doesn't matter.
+--
+-- Idempotent — safe to re-run.
+-- ────────────────────────────────────────────────────────────────────────────
+
+ALTER TABLE public.rate_limits
+  ADD COLUMN IF NOT EXISTS namespace text
+  GENERATED ALWAYS AS (
+    CASE
+      WHEN key LIKE 'llm_budget:%' OR key LIKE 'verify_send:%' THEN 'day'
+      WHEN key LIKE 'anomaly:%'                                THEN 'hour'
+      ELSE 'minute'
+    END
+  ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_rate_limits_namespace_window
+  ON public.rate_limits (namespace, window_start);
+
+
+CREATE OR REPLACE FUNCTION public.sweep_rate_limits(
+  p_minute_before timestamptz,
+  p_hour_before   timestamptz,
+  p_day_before    timestamptz
+)
+RETURNS TABLE (namespace text, deleted bigint, remaining bigint, table_bytes bigint)
+LANGUAGE plpgsql
+VOLATILE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+#variable_conflict use_column
+DECLARE
+  v_ns     text;
+  v_before timestamptz;
+BEGIN
+  FOR v_ns, v_before IN
+    SELECT * FROM (VALUES ('minute', p_minute_before),
+                          ('hour',   p_hour_before),
+                          ('day',    p_day_before)) AS t(ns, before)
+  LOOP
+    DELETE FROM rate_limits rl
+    WHERE rl.namespace = v_ns AND rl.window_start < v_before;
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+
+    SELECT count(*) INTO remaining FROM rate_limits rl WHERE rl.namespace = v_ns;
+    namespace   := v_ns;
+    -- Same value on every row; the caller reads it off any one of them.
+    table_bytes := pg_total_relation_size('public.rate_limits');
+    RETURN NEXT;
+  END LOOP;
+END;
+$$;
+
+-- Backend-only, like reserve_rate_limits.
+REVOKE ALL ON FUNCTION public.sweep_rate_limits(timestamptz, timestamptz, timestamptz)
+  FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.sweep_rate_limits(timestamptz, timestamptz, timestamptz)
+  TO service_role;
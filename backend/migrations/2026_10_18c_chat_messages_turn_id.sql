@@ -0,0 +1,28 @@
+-- ────────────────────────────────────────────────────────────────────────────
+-- 2026-10-18c — chat_messages.turn_id (idempotent chat turn writes)
+--
+-- /api/chat/send and /stream write a whole exchange — the user's message and
+-- the assistant's reply — as one two-row upsert after the model answers
+-- (supabase_client.save_chat_turn_async). Both rows carry the turn's id, and
+-- the unique index below makes the write ON CONFLICT DO NOTHING, so a turn
+-- replayed after a dropped response or a crash lands exactly once.
+--
+-- The index is deliberately not partial: PostgREST's on_conflict needs a
+-- plain unique index on exactly these columns. NULLs are distinct, so every
+-- pre-existing row (turn_id NULL) is unaffected.
+--
+-- Until this is applied the backend saves turns with a plain insert and
+-- re-probes every few minutes, so deploy order doesn't matter.
+--
+-- Idempotent — safe to re-run.
+-- ────────────────────────────────────────────────────────────────────────────
+
+ALTER TABLE public.chat_messages
+  ADD COLUMN IF NOT EXISTS turn_id uuid;
+
+CREATE UNIQUE INDEX IF NOT EXISTS chat_messages_user_turn_role_key
+  ON public.chat_messages (user_id, turn_id, role);
+
+-- The chat turn reads the newest messages of one session.
+CREATE INDEX IF NOT EXISTS chat_messages_user_session_created_idx
+  ON public.chat_messages (user_id, session_id, created_at DESC);
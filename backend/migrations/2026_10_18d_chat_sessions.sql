@@ -0,0 +1,129 @@
+-- ────────────────────────────────────────────────────────────────────────────
+-- 2026-10-18d — chat_sessions: incrementally maintained session index
+--
+-- GET /api/chat/sessions used to select every chat_messages row the user
+-- had ever written and group them in Python to show 20 sessions — slower
+-- and larger every week for heavy users. chat_sessions keeps one summary
+-- row per (user, session): the first user message, last_updated and
+-- message_count, so the endpoint is one indexed, keyset-paginated read
+-- (supabase_client.get_user_sessions, cursor = last_updated + session_id).
+--
+-- The summary is maintained by statement-level triggers on chat_messages,
+-- so every writer is covered — the backend's turn write and message
+-- deletes, and clients writing through RLS — and a two-row chat turn costs
+-- one upsert, not two. Deleting part of a session only lowers its count;
+-- the app deletes whole sessions (or whole histories), and a session whose
+-- count reaches zero is removed.
+--
+-- The backfill runs with chat_messages locked against writes, so no
+-- message is counted by both it and the trigger. Until this is applied the
+-- endpoint falls back to the old full scan.
+--
+-- Idempotent — safe to re-run (the backfill recomputes, it doesn't add).
+-- ────────────────────────────────────────────────────────────────────────────
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.chat_sessions (
+  user_id            uuid        NOT NULL,
+  session_id         text        NOT NULL,
+  first_user_message text,                    -- first 50 chars, as shown in the list
+  last_updated       timestamptz NOT NULL,
+  message_count      integer     NOT NULL DEFAULT 0,
+  PRIMARY KEY (user_id, session_id)
+);
+
+-- The sessions list: newest first, paged with
+-- `(last_updated, session_id) < cursor` — session_id breaks timestamp ties.
+DROP INDEX IF EXISTS public.idx_chat_sessions_user_last_updated;
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_last_updated_session
+  ON public.chat_sessions (user_id, last_updated DESC, session_id DESC);
+
+-- ── Row Level Security ──────────────────────────────────────────────────────
+-- Read-only for the owner; only the triggers (and service_role) write.
+ALTER TABLE public.chat_sessions ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "chat_sessions_select_own" ON public.chat_sessions;
+CREATE POLICY "chat_sessions_select_own" ON public.chat_sessions
+FOR SELECT TO authenticated
+USING (user_id = auth.uid());
+
+-- ── Maintenance triggers ────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION public.chat_sessions_on_insert()
+RETURNS trigger LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+BEGIN
+  INSERT INTO chat_sessions AS s (user_id, session_id, first_user_message, last_updated, message_count)
+  SELECT n.user_id,
+         n.session_id::text,
+         (array_agg(left(n.content, 50) ORDER BY n.created_at) FILTER (WHERE n.role = 'user'))[1],
+         max(n.created_at),
+         count(*)
+  FROM new_rows n
+  WHERE n.session_id IS NOT NULL
+  GROUP BY n.user_id, n.session_id
+  ON CONFLICT (user_id, session_id) DO UPDATE SET
+    first_user_message = COALESCE(s.first_user_message, EXCLUDED.first_user_message),
+    last_updated       = GREATEST(s.last_updated, EXCLUDED.last_updated),
+    message_count      = s.message_count + EXCLUDED.message_count;
+  RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION public.chat_sessions_on_delete()
+RETURNS trigger LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+BEGIN
+  UPDATE chat_sessions s
+  SET message_count = s.message_count - d.removed
+  FROM (
+    SELECT o.user_id, o.session_id::text AS session_id, count(*) AS removed
+    FROM old_rows o
+    WHERE o.session_id IS NOT NULL
+    GROUP BY o.user_id, o.session_id
+  ) d
+  WHERE s.user_id = d.user_id AND s.session_id = d.session_id;
+
+  DELETE FROM chat_sessions s
+  USING (SELECT DISTINCT o.user_id, o.session_id::text AS session_id FROM old_rows o) d
+  WHERE s.user_id = d.user_id AND s.session_id = d.session_id AND s.message_count <= 0;
+  RETURN NULL;
+END $$;
+
+REVOKE EXECUTE ON FUNCTION public.chat_sessions_on_insert() FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.chat_sessions_on_delete() FROM PUBLIC, anon, authenticated;
+
+DROP TRIGGER IF EXISTS trg_chat_sessions_insert ON public.chat_messages;
+CREATE TRIGGER trg_chat_sessions_insert
+  AFTER INSERT ON public.chat_messages
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION public.chat_sessions_on_insert();
+
+DROP TRIGGER IF EXISTS trg_chat_sessions_delete ON public.chat_messages;
+CREATE TRIGGER trg_chat_sessions_delete
+  AFTER DELETE ON public.chat_messages
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION public.chat_sessions_on_delete();
+
+-- ── Backfill ────────────────────────────────────────────────────────────────
+LOCK TABLE public.chat_messages IN SHARE MODE;
+
+INSERT INTO public.chat_sessions AS s (user_id, session_id, first_user_message, last_updated, message_count)
+SELECT m.user_id,
+       m.session_id::text,
+       (array_agg(left(m.content, 50) ORDER BY m.created_at) FILTER (WHERE m.role = 'user'))[1],
+       max(m.created_at),
+       count(*)
+FROM public.chat_messages m
+WHERE m.session_id IS NOT NULL
+GROUP BY m.user_id, m.session_id
+ON CONFLICT (user_id, session_id) DO UPDATE SET
+  first_user_message = EXCLUDED.first_user_message,
+  last_updated       = EXCLUDED.last_updated,
+  message_count      = EXCLUDED.message_count;
+
+-- Summaries whose messages are all gone (only possible on a re-run).
+DELETE FROM public.chat_sessions s
+WHERE NOT EXISTS (
+  SELECT 1 FROM public.chat_messages m
+  WHERE m.user_id = s.user_id AND m.session_id::text = s.session_id
+);
+
+COMMIT;
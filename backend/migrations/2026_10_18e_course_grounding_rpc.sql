@@ -0,0 +1,32 @@
+-- ────────────────────────────────────────────────────────────────────────────
+-- 2026-10-18e — get_course_grounding(codes[]): batched course facts for AI
+--
+-- Chat and card asks ground the model on real catalogue data for up to 3
+-- course codes named in the message (courses.build_course_grounding_block).
+-- That was one get_course_details RPC per code, every message. This
+-- function answers all of a message's uncached codes in one round-trip.
+--
+-- Each code's row is exactly what get_course_details returns (as jsonb, so
+-- this function doesn't restate its column types); codes with no course
+-- produce no row, which the backend caches as a miss.
+--
+-- Until this is applied the backend falls back to one get_course_details
+-- call per code, so deploy order doesn't matter.
+--
+-- Idempotent — safe to re-run.
+-- ────────────────────────────────────────────────────────────────────────────
+
+CREATE OR REPLACE FUNCTION public.get_course_grounding(p_course_codes text[])
+RETURNS TABLE (course_code text, details jsonb)
+LANGUAGE sql STABLE
+SET search_path = public
+AS $$
+  SELECT c.code, to_jsonb(d)
+  FROM unnest(p_course_codes[1:10]) AS c(code)
+  CROSS JOIN LATERAL (
+    SELECT * FROM public.get_course_details(c.code) LIMIT 1
+  ) d;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.get_course_grounding(text[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.get_course_grounding(text[]) TO service_role;
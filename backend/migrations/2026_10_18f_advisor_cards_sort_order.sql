@@ -0,0 +1,39 @@
+-- ────────────────────────────────────────────────────────────────────────────
+-- 2026-10-18f — advisor_cards: insert-at-top without shifting every card
+--
+-- System cards (transcript reminder, course / summer registration) and
+-- asked cards used to make room at the top with one
+-- UPDATE ... SET sort_order = sort_order + 1 per existing card — 30 cards,
+-- 30 round-trips, per user, in the daily cron.
+--
+-- Cards still sort by sort_order ascending, but a card inserted on top now
+-- takes a key below every existing one: minus the current epoch second
+-- (cards.top_sort_order). Later inserts get smaller keys, so the newest is
+-- first, and nothing else is rewritten. reorder_advisor_cards keeps writing
+-- positions 0..n, which all sort after any top insert made since; generated
+-- cards keep 0..7. Ties (same second) break on generated_at DESC.
+--
+-- This migration renumbers each user's existing cards to 0..n-1 in their
+-- current order (rows left negative by the backend before this ran keep
+-- their place, since they already sort first) and indexes the read.
+--
+-- Idempotent — safe to re-run.
+-- ────────────────────────────────────────────────────────────────────────────
+
+WITH ranked AS (
+  SELECT id,
+         row_number() OVER (
+           PARTITION BY user_id
+           ORDER BY sort_order, generated_at DESC NULLS LAST, id
+         ) - 1 AS pos
+  FROM public.advisor_cards
+  WHERE sort_order >= 0
+)
+UPDATE public.advisor_cards a
+SET sort_order = r.pos
+FROM ranked r
+WHERE a.id = r.id
+  AND a.sort_order IS DISTINCT FROM r.pos;
+
+CREATE INDEX IF NOT EXISTS advisor_cards_user_sort_idx
+  ON public.advisor_cards (user_id, sort_order, generated_at DESC);
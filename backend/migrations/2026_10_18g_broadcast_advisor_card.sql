@@ -0,0 +1,83 @@
+-- ────────────────────────────────────────────────────────────────────────────
+-- 2026-10-18g — broadcast_advisor_card(): one reminder card to a chunk of users
+--
+-- The reminder crons (transcript re-upload, course / summer registration)
+-- read every user id in one select — capped at 1000 rows by PostgREST — then
+-- made two round-trips per user: "already has today's card?" and the insert.
+--
+-- utils/broadcast.py now walks users in keyset order (id > p_after, ORDER BY
+-- id, LIMIT p_limit) and sends each chunk through this function: one
+-- INSERT ... SELECT over the chunk, with an anti-join dropping users who
+-- already have a card with the same label since p_since and, when
+-- p_skip_uploads_since is given, users who imported courses since then.
+-- Returns the chunk's last user id (the next cursor), users scanned, and
+-- cards inserted. Re-running a chunk inserts nothing twice.
+--
+-- p_card holds advisor_cards columns (source, card_type, icon, label, title,
+-- body, actions, category, priority, sort_order, generated_at) as jsonb.
+--
+-- Until this is applied the backend does each chunk with three PostgREST
+-- calls, so deploy order doesn't matter.
+--
+-- Idempotent — safe to re-run.
+-- ────────────────────────────────────────────────────────────────────────────
+
+-- The anti-join's lookup: does this user have a card with this label since …
+CREATE INDEX IF NOT EXISTS advisor_cards_user_label_generated_idx
+  ON public.advisor_cards (user_id, label, generated_at DESC);
+
+CREATE OR REPLACE FUNCTION public.broadcast_advisor_card(
+  p_card               jsonb,
+  p_since              timestamptz,
+  p_after              uuid        DEFAULT NULL,
+  p_limit              int         DEFAULT 500,
+  p_skip_uploads_since timestamptz DEFAULT NULL
+)
+RETURNS TABLE (last_user_id uuid, scanned int, inserted int)
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+  v_ids      uuid[];
+  v_inserted int;
+BEGIN
+  SELECT array_agg(page.id ORDER BY page.id) INTO v_ids
+  FROM (
+    SELECT u.id
+    FROM public.users u
+    WHERE p_after IS NULL OR u.id > p_after
+    ORDER BY u.id
+    LIMIT least(greatest(p_limit, 1), 5000)
+  ) page;
+
+  IF v_ids IS NULL THEN
+    RETURN QUERY SELECT p_after, 0, 0;
+    RETURN;
+  END IF;
+
+  INSERT INTO public.advisor_cards
+    (user_id, source, card_type, icon, label, title, body, actions,
+     category, priority, sort_order, generated_at)
+  SELECT t.id, c.source, c.card_type, c.icon, c.label, c.title, c.body, c.actions,
+         c.category, c.priority, c.sort_order, coalesce(c.generated_at, now())
+  FROM unnest(v_ids) AS t(id)
+  CROSS JOIN jsonb_populate_record(NULL::public.advisor_cards, p_card) AS c
+  WHERE NOT EXISTS (
+          SELECT 1 FROM public.advisor_cards a
+          WHERE a.user_id = t.id
+            AND a.label = c.label
+            AND a.generated_at >= p_since)
+    AND (p_skip_uploads_since IS NULL OR NOT EXISTS (
+          SELECT 1 FROM public.completed_courses cc
+          WHERE cc.user_id = t.id
+            AND cc.created_at >= p_skip_uploads_since));
+  GET DIAGNOSTICS v_inserted = ROW_COUNT;
+
+  RETURN QUERY SELECT v_ids[array_length(v_ids, 1)], array_length(v_ids, 1), v_inserted;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.broadcast_advisor_card(jsonb, timestamptz, uuid, int, timestamptz)
+  FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.broadcast_advisor_card(jsonb, timestamptz, uuid, int, timestamptz)
+  TO service_role;
@@ -0,0 +1,35 @@
+-- ────────────────────────────────────────────────────────────────────────────
+-- 2026-10-18h — translation_memory: card text translated once per language
+--
+-- Switching the app's language retranslates a student's advisor cards
+-- (POST /api/cards/retranslate). Reminder cards carry the same text for
+-- every student, so each of their strings is looked up here by (sha256 of
+-- the source text, target language) before anything is sent to Claude; only
+-- strings with no row are translated, in one batched call, and written back.
+-- See utils/translation_memory.py — an in-process LRU sits in front of this
+-- table.
+--
+-- Only shared system-card text is stored. AI-card text is personal and rows
+-- here have no owner (nothing for account deletion to purge), so it is
+-- translated on every switch and never written here.
+--
+-- Rows are never updated: a given source text has one translation per
+-- language, written by whichever request translated it first.
+--
+-- Service-role only (RLS on, no policies). Until this is applied the
+-- backend remembers translations in-process only.
+--
+-- Idempotent — safe to re-run.
+-- ────────────────────────────────────────────────────────────────────────────
+
+CREATE TABLE IF NOT EXISTS public.translation_memory (
+  source_hash     text        NOT NULL,   -- sha256 hex of source_text
+  target_lang     text        NOT NULL,   -- 'en' | 'fr' | 'zh'
+  source_text     text        NOT NULL,
+  translated_text text        NOT NULL,
+  created_at      timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (source_hash, target_lang)
+);
+
+ALTER TABLE public.translation_memory ENABLE ROW LEVEL SECURITY;
+REVOKE ALL ON public.translation_memory FROM anon, authenticated;
@@ -0,0 +1,25 @@
+-- ────────────────────────────────────────────────────────────────────────────
+-- 2026-10-18i — advisor_cards.seen_at: precompute cards for active students
+--
+-- The nightly Inngest `precompute-cards` function regenerates AI cards that
+-- are about to go stale (older than 7 days) through the Message Batches API,
+-- so Home doesn't generate them while the student waits. Precomputed cards
+-- are saved with seen_at NULL; GET /api/cards stamps it when it serves them.
+-- Only students whose current cards have been seen are precomputed again,
+-- so someone who stopped using the app costs one batch request, not one a
+-- week forever.
+--
+-- Existing rows take the default (now()) and count as seen. The partial
+-- index serves the nightly "AI cards generated around 7 days ago" scan.
+--
+-- Until this is applied the precompute finds no column and does nothing.
+--
+-- Idempotent — safe to re-run.
+-- ────────────────────────────────────────────────────────────────────────────
+
+ALTER TABLE public.advisor_cards
+    ADD COLUMN IF NOT EXISTS seen_at timestamptz DEFAULT now();
+
+CREATE INDEX IF NOT EXISTS advisor_cards_ai_generated_at_idx
+    ON public.advisor_cards (generated_at, user_id)
+    WHERE source = 'ai';
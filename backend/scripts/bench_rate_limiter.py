@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-request rate limiter vs the two-tier (token lease) limiter.
+
+Replays the middleware's access pattern — an IP bucket and a user bucket
+checked on every request — against an in-memory stand-in for the
+`rate_limits` table whose RPCs sleep for a configurable round-trip time.
+Nothing touches the network or a real database.
+
+Usage
+-----
+    cd backend
+    python scripts/bench_rate_limiter.py                 # defaults below
+    python scripts/bench_rate_limiter.py --rpc-ms 15 --requests 3000 --clients 50
+
+Reports requests/sec and Postgres round-trips per request for both
+limiters. The gap grows with --rpc-ms: the per-request limiter pays it
+twice per request, the hybrid one roughly once per flush interval.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings refuse to import without these. The benchmark never uses them.
+for _k, _v in {
+    "ANTHROPIC_API_KEY": "sk-ant-bench",
+    "SUPABASE_URL": "https://bench.supabase.co",
+    "SUPABASE_SERVICE_KEY": "bench",
+    "ADMIN_SECRET": "bench-admin-secret-padded-to-32-characters",
+    "CRON_SECRET": "bench-cron-secret-padded-to-32-characters",
+}.items():
+    os.environ.setdefault(_k, _v)
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Call:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def execute(self):
+        return _Result(self._fn())
+
+
+class FakeRateLimitDB:
+    """`rate_limits` plus both RPCs, with a fixed simulated round-trip."""
+
+    def __init__(self, rpc_seconds: float):
+        self.rpc_seconds = rpc_seconds
+        self.counts: dict[tuple[str, str], int] = {}
+        self.round_trips = 0
+
+    def rpc(self, name, params):
+        def _run():
+            self.round_trips += 1
+            time.sleep(self.rpc_seconds)
+            if name == "increment_rate_limit":
+                k = (params["p_key"], params["p_window"])
+                self.counts[k] = self.counts.get(k, 0) + 1
+                return self.counts[k]
+            rows = []
+            for key, want, cap in zip(params["p_keys"], params["p_counts"], params["p_caps"]):
+                k = (key, params["p_window"])
+                current = self.counts.get(k, 0)
+                granted = max(0, min(want, cap - current))
+                self.counts[k] = current + granted
+                rows.append({"key": key, "granted": granted, "count": self.counts[k]})
+            return rows
+        return _Call(_run)
+
+    def table(self, _name):
+        raise AssertionError("benchmark only exercises the RPC paths")
+
+
+def run(limiter, db, requests: int, clients: int, seed: int) -> tuple[float, int, int]:
+    limiter._get_supabase = lambda: db
+    rng = random.Random(seed)
+    allowed = 0
+    start = time.perf_counter()
+    for _ in range(requests):
+        c = rng.randrange(clients)
+        path = rng.choice(("/api/courses/search", "/api/forum/posts", "/api/cards"))
+        if limiter.is_allowed(f"ip:10.0.0.{c}:{path}", 100) and \
+                limiter.is_allowed(f"user:u{c}:{path}", 50):
+            allowed += 1
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, db.round_trips, allowed
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--clients", type=int, default=20)
+    ap.add_argument("--rpc-ms", type=float, default=8.0, help="simulated PostgREST round-trip")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    from api.main import SupabaseRateLimiter, HybridRateLimiter
+
+    print(f"{args.requests} requests, {args.clients} clients, {args.rpc_ms} ms per RPC\n")
+    print(f"{'limiter':<22}{'req/s':>10}{'RPCs':>8}{'RPC/req':>10}{'allowed':>10}")
+    for label, cls in (("per-request RPC", SupabaseRateLimiter), ("hybrid (leases)", HybridRateLimiter)):
+        db = FakeRateLimitDB(args.rpc_ms / 1000)
+        rps, trips, allowed = run(cls(default_rpm=100), db, args.requests, args.clients, args.seed)
+        print(f"{label:<22}{rps:>10.0f}{trips:>8}{trips / args.requests:>10.2f}{allowed:>10}")
+
+
+if __name__ == "__main__":
+    main()
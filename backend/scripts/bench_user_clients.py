@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: user-scoped Supabase clients, create_client() per request vs the
+pooled UserSupabase (supabase_client.get_user_supabase).
+
+Points both at a local keep-alive HTTP/1.1 server standing in for PostgREST
+and counts the TCP connections it accepts. Every new connection is a TCP
+handshake here, and a TCP + TLS handshake against the real Supabase URL —
+so "connections" is the number of handshakes each approach pays.
+
+Usage
+-----
+    cd backend
+    python scripts/bench_user_clients.py                    # defaults below
+    python scripts/bench_user_clients.py --requests 1000 --users 50
+
+Nothing touches the network beyond 127.0.0.1.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings refuse to import without these. The benchmark never uses them.
+for _k, _v in {
+    "ANTHROPIC_API_KEY": "sk-ant-bench",
+    "SUPABASE_URL": "https://bench.supabase.co",
+    "SUPABASE_SERVICE_KEY": "bench",
+    "SUPABASE_ANON_KEY": "bench-anon",
+    "ADMIN_SECRET": "bench-admin-secret-padded-to-32-characters",
+    "CRON_SECRET": "bench-cron-secret-padded-to-32-characters",
+}.items():
+    os.environ.setdefault(_k, _v)
+
+
+class _PostgREST(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real gateway
+    disable_nagle_algorithm = True
+    connections = 0
+    requests = 0
+    auth_seen: set = set()
+    _lock = threading.Lock()
+
+    def setup(self):
+        with _PostgREST._lock:
+            _PostgREST.connections += 1
+        super().setup()
+
+    def do_GET(self):
+        with _PostgREST._lock:
+            _PostgREST.requests += 1
+            _PostgREST.auth_seen.add(self.headers.get("Authorization"))
+        body = json.dumps([{"id": "x"}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_a):
+        pass
+
+
+def _legacy_user_client(jwt: str):
+    """get_user_supabase() as it was: a full client and a fresh httpx pool."""
+    from supabase import create_client
+    from api.config import settings
+    from api.utils.supabase_client import _force_http1
+
+    client = create_client(settings.SUPABASE_URL, settings.SUPABASE_ANON_KEY)
+    client.postgrest.auth(jwt)
+    _force_http1(client)
+    return client
+
+
+def run(factory, requests: int, users: int) -> tuple[float, int, int]:
+    _PostgREST.connections = 0
+    _PostgREST.requests = 0
+    _PostgREST.auth_seen = set()
+    start = time.perf_counter()
+    for i in range(requests):
+        sb = factory(f"jwt-user-{i % users}")
+        sb.table("users").select("id").eq("id", "x").execute()
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, _PostgREST.connections, len(_PostgREST.auth_seen)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=500)
+    ap.add_argument("--users", type=int, default=20)
+    args = ap.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _PostgREST)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    import logging
+    logging.disable(logging.INFO)  # _force_http1 logs once per client
+    from api.config import settings
+    from api.utils import supabase_client as sc
+    settings.SUPABASE_URL = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"{args.requests} requests from {args.users} users against a local keep-alive server\n")
+    print(f"{'client':<28}{'req/s':>10}{'handshakes':>12}{'per req':>10}{'JWTs seen':>11}")
+    for label, factory in (("create_client per request", _legacy_user_client),
+                           ("pooled UserSupabase", sc.get_user_supabase)):
+        rps, conns, jwts = run(factory, args.requests, args.users)
+        print(f"{label:<28}{rps:>10.0f}{conns:>12}{conns / args.requests:>10.3f}{jwts:>11}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,10 @@ Usage
     # Write to Supabase after reviewing the dry-run:
     python scripts/import_sections.py --apply
 
+--apply finishes by rescanning the whole table and writing
+api/data/term_offerings.json. Commit that file with the deploy: the API
+loads it at startup, so /courses/search?term= never waits on the scan.
+
 Environment
 -----------
 Reads SUPABASE_URL / SUPABASE_SERVICE_KEY from backend/.env(.local) — same as
@@ -500,6 +504,13 @@ def main() -> int:
         print(f"  {term}: inserted {len(term_rows)} sections")
         total += len(term_rows)
     print(f"\n✓ Loaded {total} sections into mcgill_sections.")
+
+    # Snapshot of the whole table (not just the imported terms) for the API.
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from api.utils import term_offerings
+    snapshot = term_offerings.scan(sb)
+    path = term_offerings.write_snapshot(snapshot)
+    print(f"✓ Wrote {path.name} ({len(snapshot[0])} terms) — commit it with the deploy.")
     return 0
 
 
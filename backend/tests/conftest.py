@@ -47,6 +47,52 @@ class FakeAuthAdmin:
         return SimpleNamespace(user=user)
 
 
+_COMPARE = {
+    "eq":  lambda a, b: a == b,
+    "lt":  lambda a, b: a < b,
+    "gt":  lambda a, b: a > b,
+    "lte": lambda a, b: a <= b,
+    "gte": lambda a, b: a >= b,
+}
+
+
+def _compare(value, op, operand) -> bool:
+    return _COMPARE[op]("" if value is None else str(value), operand)
+
+
+def _split_top_level(text: str) -> list:
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(text):
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _parse_or(filters: str):
+    """[[(op, col, val), ...] per OR'd group], or None if any term isn't a
+    plain comparison the fake understands."""
+    groups = []
+    for term in _split_top_level(filters):
+        inner = term[4:-1] if term.startswith("and(") and term.endswith(")") else term
+        group = []
+        for cond in _split_top_level(inner):
+            col, _, rest = cond.partition(".")
+            op, _, val = rest.partition(".")
+            if op not in _COMPARE or not col:
+                return None
+            group.append((op, col, val[1:-1] if val.startswith('"') and val.endswith('"') else val))
+        groups.append(group)
+    return groups
+
+
 class FakeTable:
     """Records every query and returns canned data.
 
@@ -62,6 +108,9 @@ class FakeTable:
         self._pending_update = None
         self._pending_delete = False
         self._inserted = None
+        self._limit = None
+        self._range = None
+        self._negate = False
 
     def select(self, *args, **kwargs): return self
     def eq(self, col, val):
@@ -73,22 +122,72 @@ class FakeTable:
     def gte(self, col, val):
         self._filters.append(("gte", col, val))
         return self
-    def or_(self, *args, **kwargs):
-        """PostgREST OR — no-op shim. Defense-in-depth Python filters
-        in the endpoints still enforce the security assertions."""
+    def lt(self, col, val):
+        self._filters.append(("lt", col, val))
+        return self
+    def gt(self, col, val):
+        self._filters.append(("gt", col, val))
+        return self
+    def lte(self, col, val):
+        self._filters.append(("lte", col, val))
+        return self
+    def or_(self, filters, *args, **kwargs):
+        """PostgREST OR. Applied when every term is a plain comparison
+        (`col.lt."v"`, `and(...)` of those — e.g. keyset cursors); anything
+        else is a no-op shim, and defense-in-depth Python filters in the
+        endpoints still enforce the security assertions."""
+        groups = _parse_or(filters)
+        if groups is not None:
+            self._filters.append(("or", None, groups))
         return self
     def order(self, *args, **kwargs): return self
-    def limit(self, n): return self
-    def range(self, start, end): return self
+    def limit(self, n):
+        self._limit = n
+        return self
+    @property
+    def not_(self):
+        """PostgREST negation — `.not_.is_(col, "null")` keeps non-NULLs."""
+        self._negate = True
+        return self
+    def is_(self, col, val):
+        if self._negate and val == "null":
+            self._filters.append(("not_null", col, None))
+        self._negate = False
+        return self
+    def range(self, start, end):
+        self._range = (start, end)
+        return self
     def in_(self, col, vals):
         self._filters.append(("in", col, list(vals)))
         return self
     def single(self): return self
     def insert(self, row):
-        row = dict(row) if not isinstance(row, dict) else dict(row)
-        row.setdefault("id", f"fake-{self._name}-{len(self._data)}-{id(row)}")
-        self._data.append(row)
-        self._inserted = [row]
+        rows = [dict(r) for r in row] if isinstance(row, list) else [dict(row)]
+        for r in rows:
+            r.setdefault("id", f"fake-{self._name}-{len(self._data)}-{id(r)}")
+            self._data.append(r)
+        self._inserted = rows
+        return self
+    def upsert(self, row, on_conflict="", ignore_duplicates=False, **kwargs):
+        """ON CONFLICT over `on_conflict`'s columns. Like a Postgres unique
+        index, a NULL in any of them never conflicts."""
+        cols = [c.strip() for c in on_conflict.split(",") if c.strip()]
+        written = []
+        for r in ([dict(x) for x in row] if isinstance(row, list) else [dict(row)]):
+            key = [r.get(c) for c in cols]
+            existing = next(
+                (e for e in self._data
+                 if cols and None not in key and [e.get(c) for c in cols] == key),
+                None,
+            )
+            if existing is None:
+                r.setdefault("id", f"fake-{self._name}-{len(self._data)}-{id(r)}")
+                self._data.append(r)
+                written.append(r)
+            elif not ignore_duplicates:
+                existing.update(r)
+                written.append(existing)
+        self._inserted = written
         return self
     def update(self, row):
         self._pending_update = dict(row)
@@ -106,6 +205,17 @@ class FakeTable:
                 rows = [r for r in rows if r.get(col) in val]
             elif op == "gte":
                 rows = [r for r in rows if (r.get(col) or "") >= val]
+            elif op == "lt":
+                rows = [r for r in rows if (r.get(col) or "") < val]
+            elif op == "gt":
+                rows = [r for r in rows if (r.get(col) or "") > val]
+            elif op == "lte":
+                rows = [r for r in rows if (r.get(col) or "") <= val]
+            elif op == "or":
+                rows = [r for r in rows
+                        if any(all(_compare(r.get(c), o, v) for o, c, v in group) for group in val)]
+            elif op == "not_null":
+                rows = [r for r in rows if r.get(col) is not None]
             elif op == "ilike":
                 import re as _re
                 parts = []
@@ -143,6 +253,10 @@ class FakeTable:
                 self._data.remove(row)
             return SimpleNamespace(data=matched, count=len(matched))
 
+        if self._range is not None:
+            matched = matched[self._range[0]:self._range[1] + 1]
+        if self._limit is not None:
+            matched = matched[:self._limit]
         return SimpleNamespace(data=matched, count=len(matched))
 
 
@@ -175,6 +289,10 @@ class FakeSupabase:
     def set_auth_email(self, email: str) -> None:
         self._auth_email = email
         self.auth.admin = FakeAuthAdmin(email=email)
+        # A real email change goes through Supabase's confirmation flow and
+        # the next lookup after the TTL sees it; tests want it immediately.
+        from api.utils import auth_identity
+        auth_identity.clear()
 
     def set_table(self, name: str, rows: list) -> None:
         self._tables[name] = rows
@@ -186,8 +304,82 @@ class FakeSupabase:
         return SimpleNamespace(execute=lambda: SimpleNamespace(data=1))
 
 
+class _AsyncQuery:
+    """Wraps a fake query builder so `.execute()` is awaitable, like the
+    supabase AsyncClient's builders. Every other method chains through."""
+    def __init__(self, inner):
+        self._inner = inner
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if name == "execute":
+            async def _execute():
+                return attr()
+            return _execute
+        if not callable(attr):
+            return _AsyncQuery(attr)
+
+        def _chain(*args, **kwargs):
+            return _AsyncQuery(attr(*args, **kwargs))
+        return _chain
+
+
+class FakeAsyncSupabase:
+    """The async client's view of a FakeSupabase: same tables, same data,
+    so sync and async code paths in one test see each other's writes."""
+    def __init__(self, sync: FakeSupabase):
+        self._sync = sync
+
+    def table(self, name: str) -> _AsyncQuery:
+        return _AsyncQuery(self._sync.table(name))
+
+    def rpc(self, *args, **kwargs) -> _AsyncQuery:
+        return _AsyncQuery(self._sync.rpc(*args, **kwargs))
+
+
+class FakeRedis:
+    """In-memory stand-in for redis.Redis: the get / set(ex=) / delete subset
+    utils/cache.py uses, with expiry. Set `fail = True` to simulate an outage."""
+    def __init__(self):
+        self._data: dict = {}
+        self.now = 0.0
+        self.fail = False
+        self.calls = 0
+
+    def _check(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("redis unreachable")
+
+    def get(self, key):
+        self._check()
+        entry = self._data.get(key)
+        if entry is None or entry[1] <= self.now:
+            return None
+        return entry[0]
+
+    def set(self, key, value, ex=None):
+        self._check()
+        self._data[key] = (value, self.now + ex if ex else float("inf"))
+        return True
+
+    def delete(self, key):
+        self._check()
+        return int(self._data.pop(key, None) is not None)
+
+
 # ── Fixtures ──────────────────────────────────────────────────────────────────
 
+@pytest.fixture(autouse=True)
+def _closed_db_breakers():
+    """Retry tests feed deliberate connection failures through with_retry();
+    don't let them trip the Supabase circuit breaker for the next test."""
+    from api.utils import supabase_client
+    supabase_client.reset_breakers()
+    yield
+    supabase_client.reset_breakers()
+
+
 @pytest.fixture
 def fake_supabase(monkeypatch):
     """Patch every importable `get_supabase` reference so all routes see
@@ -198,6 +390,12 @@ def fake_supabase(monkeypatch):
     monkeypatch.setattr(supa, "get_supabase", lambda: sb)
     monkeypatch.setattr(supa, "get_user_supabase", lambda jwt: sb)
 
+    async_sb = FakeAsyncSupabase(sb)
+
+    async def _get_async_supabase():
+        return async_sb
+    monkeypatch.setattr(supa, "get_async_supabase", _get_async_supabase)
+
     # Each route does `from ..utils.supabase_client import get_supabase`
     # at module load time, binding the original function into its own
     # namespace. Override those bindings too.
@@ -224,6 +422,8 @@ def fake_supabase(monkeypatch):
         "api.utils.verified_user",
         "api.utils.llm_budget",
         "api.utils.anomaly",
+        "api.utils.broadcast",
+        "api.utils.translation_memory",
         "api.main",
     ):
         try:
@@ -241,6 +441,16 @@ def fake_supabase(monkeypatch):
     monkeypatch.setattr(auth_module, "get_supabase", lambda: sb)
     monkeypatch.setattr(auth_module, "get_user_supabase", lambda jwt: sb)
 
+    # Test tokens are bare user ids, not JWTs — resolve them through the
+    # fake's auth.get_user like the remote check does. Local verification
+    # has its own tests (test_jwt_verify.py).
+    from api.config import settings
+    from api.utils import auth_identity, jwt_verify, student_context
+    monkeypatch.setattr(settings, "AUTH_JWT_LOCAL_VERIFY", False)
+    jwt_verify.clear_cache()
+    auth_identity.clear()
+    student_context.clear()
+
     return sb
 
 
@@ -0,0 +1,116 @@
+"""
+Shared auth-identity cache: admin / McGill / verified checks share one
+auth.admin lookup per user per TTL, failures are negatively cached, and
+verification writes invalidate the entry.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from api.config import settings
+from api.utils import auth_identity
+from tests.conftest import auth
+
+
+class _CountingAdmin:
+    def __init__(self, email="student@mail.mcgill.ca", confirmed=True, fail=False):
+        self.calls = 0
+        self.email = email
+        self.confirmed = confirmed
+        self.fail = fail
+
+    def get_user_by_id(self, user_id):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("auth down")
+        return SimpleNamespace(user=SimpleNamespace(
+            id=user_id,
+            email=self.email,
+            email_confirmed_at="2026-01-01T00:00:00Z" if self.confirmed else None,
+        ))
+
+    def update_user_by_id(self, *_a, **_k):
+        return None
+
+
+@pytest.fixture
+def admin(fake_supabase):
+    a = _CountingAdmin()
+    fake_supabase.auth.admin = a
+    return a
+
+
+def test_all_checks_share_one_lookup(fake_supabase, admin, monkeypatch):
+    from api.auth import require_mcgill_email
+    from api.utils import llm_budget, verified_user
+
+    monkeypatch.setattr(settings, "ADMIN_EMAILS", "")
+    require_mcgill_email("u1")
+    assert verified_user.is_email_verified("u1") is True
+    assert llm_budget._is_admin_user("u1") is False
+
+    assert admin.calls == 1
+    s = auth_identity.stats()
+    assert (s["misses"], s["hits"], s["size"]) == (1, 2, 1)
+
+
+def test_auth_flags_reads_the_cache(client, fake_supabase, admin):
+    for _ in range(3):
+        resp = client.get("/api/auth/flags", headers=auth("u1"))
+        assert resp.json() == {"is_admin": False, "is_mcgill_email": True}
+    assert admin.calls == 1
+
+
+def test_failed_lookup_is_negatively_cached(fake_supabase, admin, monkeypatch):
+    from api.auth import require_mcgill_email
+    from fastapi import HTTPException
+
+    admin.fail = True
+    for _ in range(3):
+        with pytest.raises(HTTPException) as exc:
+            require_mcgill_email("u1")
+        assert exc.value.status_code == 403
+    assert admin.calls == 1
+    assert auth_identity.stats()["negative_hits"] == 2
+    assert auth_identity.stats()["lookup_errors"] == 1
+
+    # Negative entries expire on their own, shorter TTL.
+    import time as _time
+    admin.fail = False
+    real = _time.time
+    monkeypatch.setattr(auth_identity.time, "time",
+                        lambda: real() + settings.AUTH_IDENTITY_NEGATIVE_CACHE_SECONDS + 1)
+    assert auth_identity.get_identity("u1")["found"] is True
+    assert admin.calls == 2
+
+
+def test_entry_expires_after_ttl(fake_supabase, admin, monkeypatch):
+    import time as _time
+
+    auth_identity.get_identity("u1")
+    real = _time.time
+    monkeypatch.setattr(auth_identity.time, "time",
+                        lambda: real() + settings.AUTH_IDENTITY_CACHE_SECONDS + 1)
+    auth_identity.get_identity("u1")
+    assert admin.calls == 2
+
+
+def test_verify_email_invalidates_identity(client, fake_supabase, admin):
+    from api.routes.verification import _hash_token
+
+    admin.email = "someone@gmail.com"
+    fake_supabase.set_table("users", [{
+        "id": "u1",
+        "email_verified": False,
+        "verification_token": _hash_token("tok"),
+        "verification_token_expires_at": None,
+    }])
+    auth_identity.get_identity("u1")
+    assert admin.calls == 1
+
+    resp = client.post("/api/auth/verify-email", json={"user_id": "u1", "token": "tok"})
+    assert resp.status_code == 200
+    assert auth_identity.stats()["invalidations"] == 1
+
+    auth_identity.get_identity("u1")
+    assert admin.calls == 2
@@ -35,8 +35,8 @@ def test_ask_card_enforces_email_verification_gate(client, fake_supabase, monkey
         '{"type": "insight", "icon": "test", "label": "TEST", '
         '"title": "Test title", "body": "Test body", "actions": []}'
     )
-    import api.routes.cards as cards_mod
-    monkeypatch.setattr(cards_mod, "get_anthropic_client", lambda: mock_client)
+    from api.utils import llm
+    monkeypatch.setattr(llm, "get_client", lambda: mock_client)
 
     resp_ask = client.post(
         "/api/cards/ask/user-1",
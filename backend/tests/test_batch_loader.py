@@ -0,0 +1,181 @@
+"""
+BatchLoader: per-id lookups in fan-out code are coalesced into chunked
+.in_() queries, deduped and cached for the loader's lifetime.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from api.utils.batch_loader import BatchLoader, member_emails
+
+
+@pytest.fixture
+def counted(fake_supabase, monkeypatch):
+    """Count queries per table on the fake client."""
+    counts: dict = {}
+    real_table = fake_supabase.table
+
+    def _table(name):
+        counts[name] = counts.get(name, 0) + 1
+        return real_table(name)
+
+    monkeypatch.setattr(fake_supabase, "table", _table)
+    return counts
+
+
+@pytest.fixture
+def resend(monkeypatch):
+    """Capture Resend sends instead of making them."""
+    from api import config
+    import httpx
+
+    sent = []
+    monkeypatch.setattr(config.settings, "RESEND_API_KEY", "re_test")
+    monkeypatch.setattr(httpx, "post", lambda url, **kw: sent.append(kw["json"]) or SimpleNamespace(status_code=200, text=""))
+    return sent
+
+
+def test_dedupes_chunks_and_caches(fake_supabase, counted):
+    fake_supabase.set_table("users", [{"id": f"u{i}", "email": f"s{i}@mail.mcgill.ca"} for i in range(10)])
+    loader = BatchLoader(fake_supabase, "users", "email", chunk_size=4)
+
+    rows = loader.load_many(["u0", "u1", "u0", "u9", "ghost", "u2", "u3", "u4"])
+    assert list(rows) == ["u0", "u1", "u9", "ghost", "u2", "u3", "u4"]
+    assert rows["u9"]["email"] == "s9@mail.mcgill.ca"
+    assert rows["ghost"] is None
+    assert loader.queries == 2  # 7 distinct ids / 4 per chunk
+
+    # Cached, including the miss.
+    assert loader.load("u1")["email"] == "s1@mail.mcgill.ca"
+    assert loader.load("ghost") is None
+    assert loader.queries == 2
+    assert counted["users"] == 2
+
+
+def test_many_groups_rows_per_key(fake_supabase):
+    fake_supabase.set_table("user_clubs", [
+        {"club_id": "c1", "user_id": "a", "role": "owner"},
+        {"club_id": "c1", "user_id": "b", "role": "member"},
+        {"club_id": "c2", "user_id": "c", "role": "admin"},
+    ])
+    loader = BatchLoader(fake_supabase, "user_clubs", "user_id, role", key="club_id", many=True)
+    rows = loader.load_many(["c1", "c2", "c3"])
+    assert [r["user_id"] for r in rows["c1"]] == ["a", "b"]
+    assert [r["user_id"] for r in rows["c2"]] == ["c"]
+    assert rows["c3"] == []
+
+
+def test_many_pages_past_the_row_cap_and_filters_on_the_server(fake_supabase, counted):
+    # 2500 members ahead of each club's admin: one unpaged read would stop at 1000.
+    rows = []
+    for club in ("c1", "c2"):
+        rows += [{"club_id": club, "user_id": f"{club}-m{i}", "role": "member"} for i in range(2500)]
+        rows.append({"club_id": club, "user_id": f"{club}-admin", "role": "admin"})
+    fake_supabase.set_table("user_clubs", rows)
+
+    everyone = BatchLoader(fake_supabase, "user_clubs", "user_id", key="club_id", many=True)
+    assert len(everyone.load("c1")) == 2501 and len(everyone.load("c2")) == 2501
+    assert counted["user_clubs"] == 6  # 5002 rows in pages of 1000
+
+    leaders = BatchLoader(fake_supabase, "user_clubs", "user_id", key="club_id", many=True,
+                          where={"role": ["owner", "admin"]}, order_by="user_id")
+    found = leaders.load_many(["c1", "c2"])
+    assert {k: [r["user_id"] for r in v] for k, v in found.items()} == {"c1": ["c1-admin"], "c2": ["c2-admin"]}
+
+
+def test_member_emails_skips_blank_and_missing(fake_supabase):
+    fake_supabase.set_table("users", [
+        {"id": "a", "email": "a@mail.mcgill.ca"},
+        {"id": "b", "email": None},
+    ])
+    users = BatchLoader(fake_supabase, "users", "email")
+    assert member_emails(users, ["a", "b", "missing", "a"]) == ["a@mail.mcgill.ca"]
+
+
+def test_300_member_announcement_costs_a_handful_of_queries(fake_supabase, counted, resend):
+    from api.routes.clubs.email import _notify_club_members_announcement
+
+    fake_supabase.set_table("user_clubs", [{"club_id": "c1", "user_id": f"u{i}"} for i in range(300)])
+    fake_supabase.set_table("users", [{"id": f"u{i}", "email": f"s{i}@mail.mcgill.ca"} for i in range(300)])
+
+    _notify_club_members_announcement(fake_supabase, "c1", "Chess", "Hi", "Body")
+
+    assert counted == {"user_clubs": 1, "users": 2}
+    assert len(resend) == 1 and len(resend[0]["to"]) == 300
+
+
+def test_event_notification_uses_the_loader(fake_supabase, counted, resend):
+    from api.routes.clubs.email import _notify_club_members_new_event
+
+    fake_supabase.set_table("user_clubs", [{"club_id": "c1", "user_id": "u1"}, {"club_id": "c1", "user_id": "u2"}])
+    fake_supabase.set_table("users", [{"id": "u1", "email": "one@mail.mcgill.ca"}, {"id": "u2", "email": ""}])
+
+    _notify_club_members_new_event(fake_supabase, "c1", "Chess", "Blitz night", "2026-11-01")
+
+    assert counted["users"] == 1
+    assert resend[0]["to"] == ["one@mail.mcgill.ca"]
+
+
+def test_newsletter_notification_shares_the_run_loader(fake_supabase, counted, resend, monkeypatch):
+    from api.routes import newsletters
+    from api.routes.newsletters import _notify_newsletter_subscribers
+
+    monkeypatch.setattr(newsletters, "get_supabase", lambda: fake_supabase)
+
+    fake_supabase.set_table("newsletter_subscriptions", [
+        {"source_id": "s1", "user_id": "u1", "email_muted": False},
+        {"source_id": "s1", "user_id": "u2", "email_muted": True},
+        {"source_id": "s2", "user_id": "u1", "email_muted": False},
+    ])
+    fake_supabase.set_table("users", [{"id": "u1", "email": "one@mail.mcgill.ca"}, {"id": "u2", "email": "two@mail.mcgill.ca"}])
+    users = BatchLoader(fake_supabase, "users", "email")
+
+    events = [{"title": "Talk", "date": "2026-11-01"}]
+    _notify_newsletter_subscribers("s1", "Physics", events, users=users)
+    _notify_newsletter_subscribers("s2", "Math", events, users=users)
+
+    assert counted["users"] == 1  # u1 looked up once for both sources
+    assert [m["to"] for m in resend] == [["one@mail.mcgill.ca"], ["one@mail.mcgill.ca"]]
+
+
+def test_stale_club_cron_prefetches_memberships(fake_supabase, counted):
+    from api.routes.clubs import run_stale_club_cleanup_cron
+
+    old = datetime(2020, 1, 1, tzinfo=timezone.utc).isoformat()
+    fake_supabase.set_table("clubs", [
+        {"id": f"c{i}", "name": f"Club {i}", "created_by": "owner-1", "created_at": old} for i in range(20)
+    ])
+    fake_supabase.set_table("user_clubs", [{"club_id": f"c{i}", "user_id": "owner-1", "role": "owner"} for i in range(20)])
+
+    lookups = []
+
+    def _signin(user_id):
+        lookups.append(user_id)
+        return SimpleNamespace(user=SimpleNamespace(last_sign_in_at="2026-10-01T00:00:00Z"))
+
+    fake_supabase.auth.admin.get_user_by_id = _signin
+
+    result = run_stale_club_cleanup_cron(dry_run=True)
+    assert result["kept_recent_signin"] == 20
+    assert counted["user_clubs"] == 1
+    assert lookups == ["owner-1"]
+
+
+def test_stale_club_cron_keeps_clubs_whose_leaders_cant_be_loaded(fake_supabase, monkeypatch):
+    from api.routes.clubs import run_stale_club_cleanup_cron
+    from api.utils import batch_loader
+
+    old = datetime(2020, 1, 1, tzinfo=timezone.utc).isoformat()
+    fake_supabase.set_table("clubs", [{"id": "c1", "name": "Club", "created_by": "gone", "created_at": old}])
+    fake_supabase.set_table("user_clubs", [{"club_id": "c1", "user_id": "active-admin", "role": "admin"}])
+
+    def _fail(self, ids):
+        raise RuntimeError("statement timeout")
+    monkeypatch.setattr(batch_loader.BatchLoader, "_fetch", _fail)
+
+    result = run_stale_club_cleanup_cron()
+    assert result["deleted"] == 0 and result["kept_lookup_failed"] == 1
+    assert fake_supabase.table("clubs").select("id").execute().data
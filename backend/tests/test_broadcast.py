@@ -0,0 +1,158 @@
+"""
+Reminder broadcasts: every user (not just PostgREST's first 1000), one
+set-based insert per chunk, nobody carded twice, and a run that dies mid-way
+resumes from its last finished chunk.
+"""
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from api.config import settings
+from api.routes import cards
+from api.utils import broadcast
+
+POST_FINALS = date(2027, 1, 10)
+
+
+@pytest.fixture
+def users(fake_supabase, monkeypatch):
+    """1200 users, two chunks of 500 and one of 200, via the PostgREST path."""
+    monkeypatch.setattr(settings, "BROADCAST_CHUNK_SIZE", 500)
+    monkeypatch.setattr(broadcast, "_rpc_disabled_until", float("inf"))
+    ids = [f"u{i:04d}" for i in range(1200)]
+    fake_supabase.set_table("users", [{"id": uid} for uid in ids])
+    return ids
+
+
+def _clock(monkeypatch, now):
+    """Pin cards' wall clock (card generated_at, default `today`) to `now`."""
+    class _Pinned(cards.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now.astimezone(tz) if tz else now
+    monkeypatch.setattr(cards, "datetime", _Pinned)
+
+
+def _cards(fake_supabase, label=cards.TRANSCRIPT_REMINDER_LABEL):
+    return [r for r in fake_supabase._tables.get("advisor_cards", []) if r.get("label") == label]
+
+
+def test_reaches_every_user_once(users, fake_supabase, monkeypatch):
+    _clock(monkeypatch, cards.datetime(2027, 1, 10, 9, 0, tzinfo=cards.timezone.utc))
+    today = cards.broadcast_spec("transcript_reminder", POST_FINALS)["since"]
+    # Already carded today, and re-uploaded recently (many course rows).
+    fake_supabase.set_table("advisor_cards", [
+        {"user_id": "u0007", "label": cards.TRANSCRIPT_REMINDER_LABEL, "generated_at": today + "T08:00:00+00:00"},
+    ])
+    fake_supabase.set_table("completed_courses", [
+        {"id": n, "user_id": "u0999", "created_at": "2099-01-01T00:00:00+00:00"} for n in range(40)
+    ])
+    tables = []
+    real_table = fake_supabase.table
+    fake_supabase.table = lambda name: tables.append(name) or real_table(name)
+
+    spec = cards.broadcast_spec("transcript_reminder", POST_FINALS)
+    result = broadcast.run_broadcast(spec)
+
+    assert result == {"sent": 1198, "scanned": 1200, "chunks": 3}
+    carded = [r["user_id"] for r in _cards(fake_supabase)]
+    assert len(carded) == len(set(carded)) == 1199
+    assert "u1199" in carded and "u0999" not in carded
+    # Users, existing cards, recent uploads, insert — per chunk, not per user.
+    assert len(tables) == 3 * 4
+
+    # A second run the same day sends nothing.
+    assert broadcast.run_broadcast(spec)["sent"] == 0
+
+
+def test_spec_window_follows_today_not_the_clock(monkeypatch):
+    _clock(monkeypatch, cards.datetime(2027, 1, 11, 0, 5, tzinfo=cards.timezone.utc))
+
+    spec = cards.broadcast_spec("transcript_reminder", POST_FINALS)
+    assert spec["since"] == "2027-01-10"
+    assert spec["skip_uploads_since"] == "2026-12-27T00:00:00+00:00"
+
+
+def test_chunk_uses_the_rpc_when_available(fake_supabase, monkeypatch):
+    monkeypatch.setattr(settings, "BROADCAST_CHUNK_SIZE", 2)
+    monkeypatch.setattr(broadcast, "_rpc_disabled_until", 0.0)
+    pages = {None: ("b", 2, 2), "b": ("c", 1, 0)}
+    calls = []
+
+    def _rpc(name, params):
+        calls.append((name, params))
+        last, scanned, inserted = pages[params["p_after"]]
+        row = {"last_user_id": last, "scanned": scanned, "inserted": inserted}
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=[row]))
+    monkeypatch.setattr(fake_supabase, "rpc", _rpc)
+
+    spec = cards.broadcast_spec("course_registration", date(2027, 5, 20))
+    assert broadcast.run_broadcast(spec) == {"sent": 2, "scanned": 3, "chunks": 2}
+    assert [p["p_after"] for _, p in calls] == [None, "b"]
+    assert calls[0][1]["p_card"]["label"] == cards.COURSE_REGISTRATION_REMINDER_LABEL
+    assert calls[0][1]["p_skip_uploads_since"] is None
+    assert "users" not in fake_supabase._tables
+
+
+class _Step:
+    """ctx.step stand-in: memoises each step's result across invocations,
+    as Inngest does."""
+
+    def __init__(self, memo):
+        self.memo = memo
+        self.ran = []
+
+    async def run(self, step_id, handler):
+        if step_id not in self.memo:
+            self.memo[step_id] = await handler()
+            self.ran.append(step_id)
+        return self.memo[step_id]
+
+
+def test_steps_resume_after_the_last_finished_chunk(users, fake_supabase, monkeypatch):
+    real_chunk = broadcast.run_chunk
+    seen = []
+
+    def _flaky(spec, after=None):
+        seen.append(after)
+        if len(seen) == 3:
+            raise TimeoutError("function timed out")
+        return real_chunk(spec, after)
+    monkeypatch.setattr(broadcast, "run_chunk", _flaky)
+
+    memo = {}
+    spec_for = lambda: cards.broadcast_spec("transcript_reminder", POST_FINALS)
+    with pytest.raises(TimeoutError):
+        asyncio.run(broadcast.run_in_steps(_Step(memo), spec_for))
+    assert len(_cards(fake_supabase)) == 1000
+
+    retry = _Step(memo)
+    result = asyncio.run(broadcast.run_in_steps(retry, spec_for))
+    assert retry.ran == ["chunk-2"]
+    assert seen[-1] == "u0999"
+    assert result == {"sent": 1200, "scanned": 1200, "chunks": 3}
+    assert len(_cards(fake_supabase)) == 1200
+
+
+def test_cron_queues_or_runs_inline(users, fake_supabase, monkeypatch):
+    queued = []
+
+    async def _queue(name, day):
+        queued.append((name, day))
+        return True
+    monkeypatch.setattr(cards, "queue_broadcast", _queue)
+
+    assert asyncio.run(cards.run_reminder_broadcast("summer_registration", date(2027, 6, 1))) == \
+        {"sent": 0, "skipped": "not_summer_registration_day"}
+    assert asyncio.run(cards.run_reminder_broadcast("summer_registration", date(2027, 3, 1))) == \
+        {"queued": True, "days_before_open": 7}
+    assert queued == [("summer_registration", "2027-03-01")]
+    assert _cards(fake_supabase, cards.SUMMER_REGISTRATION_REMINDER_LABEL) == []
+
+    async def _unreachable(name, day):
+        return False
+    monkeypatch.setattr(cards, "queue_broadcast", _unreachable)
+    result = asyncio.run(cards.run_reminder_broadcast("summer_registration", date(2027, 3, 8)))
+    assert result == {"sent": 1200, "scanned": 1200, "chunks": 3, "days_before_open": 0}
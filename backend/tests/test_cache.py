@@ -0,0 +1,155 @@
+"""
+BoundedCache: LRU eviction under an entry/byte budget, per-namespace TTLs,
+per-namespace counters, and the optional shared L2.
+"""
+import pytest
+
+from api.utils import cache as cache_mod
+from api.utils.cache import BoundedCache, RedisBackend
+from tests.conftest import FakeRedis
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"t": 1000.0}
+    monkeypatch.setattr(cache_mod.time, "time", lambda: now["t"])
+    return now
+
+
+def test_lru_evicts_least_recently_used():
+    c = BoundedCache(max_entries=3)
+    for k in ("search:a", "search:b", "search:c"):
+        c.set(k, k)
+    assert c.get("search:a") == "search:a"  # a is now most recent
+    c.set("search:d", "d")
+
+    assert c.get("search:b") is None
+    assert [c.get(k) is not None for k in ("search:a", "search:c", "search:d")] == [True] * 3
+    assert c.size == 3
+    assert c.stats()["namespaces"]["search"]["evictions"] == 1
+
+
+def test_byte_budget_bounds_memory_and_rejects_oversized_values():
+    c = BoundedCache(max_entries=10_000, max_bytes=64 * 1024)
+    blob = "x" * 4000
+    for i in range(200):
+        c.set(f"search:q{i}", {"rows": [blob]})
+    assert c.bytes <= c.max_bytes
+    assert 0 < c.size < 200
+    assert c.get("search:q199") is not None
+    assert c.get("search:q0") is None
+
+    before = c.size
+    c.set("search:huge", ["y" * (c.max_bytes // 2)])
+    assert c.get("search:huge") is None
+    assert c.size == before  # nothing flushed for it
+    assert c.stats()["namespaces"]["search"]["rejected"] == 1
+
+
+def test_namespace_ttls_and_explicit_override(clock):
+    c = BoundedCache(default_ttl=300, namespace_ttls={"rmp_bulk": 600})
+    c.set("rmp_bulk:COMP202", 1)
+    c.set("search:comp", 2)
+    c.set("search:pinned", 3, ttl=900)
+
+    clock["t"] += 301
+    assert c.get("search:comp") is None
+    assert c.get("rmp_bulk:COMP202") == 1
+    assert c.get("search:pinned") == 3
+
+    clock["t"] += 300
+    assert c.get("rmp_bulk:COMP202") is None
+    assert c.stats()["namespaces"]["rmp_bulk"]["expired"] == 1
+
+
+def test_overwrite_and_invalidate_keep_byte_accounting():
+    c = BoundedCache()
+    c.set("search:a", "x" * 1000)
+    c.set("search:a", "y")
+    c.set("search:b", "z" * 500)
+    c.invalidate("search:b")
+    assert c.size == 1
+    assert c.bytes == cache_mod._approx_size("y") + cache_mod.sys.getsizeof("search:a")
+    c.clear()
+    assert (c.size, c.bytes) == (0, 0)
+
+
+def test_stats_hit_rate_per_namespace():
+    c = BoundedCache()
+    c.set("prof_search:x", [1])
+    c.get("prof_search:x")
+    c.get("prof_search:y")
+    ns = c.stats()["namespaces"]["prof_search"]
+    assert (ns["hits"], ns["misses"], ns["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_sets_in_term_offerings_are_sized():
+    offerings = {"Fall 2026": {f"COMP{i}" for i in range(500)}}
+    assert cache_mod._approx_size(offerings) > 500 * 50
+
+
+# ── L2 (shared Redis-protocol backend) ───────────────────────────────────
+
+def _pair(redis):
+    """Two 'instances' sharing one L2, each with its own L1."""
+    make = lambda: BoundedCache(default_ttl=300, l2=RedisBackend(redis, prefix="t:search:"))
+    return make(), make()
+
+
+def test_cold_instance_is_served_from_l2():
+    redis = FakeRedis()
+    warm, cold = _pair(redis)
+    offerings = ({"Fall 2026"}, {"Fall 2026": {"COMP202", "MATH240"}}, {"Fall 2026": {"COMP202": "A Prof"}})
+    warm.set("section_term_offerings", offerings)
+
+    got = cold.get("section_term_offerings")
+    assert got == offerings and isinstance(got, tuple) and isinstance(got[0], set)
+    ns = cold.stats()["namespaces"]["section_term_offerings"]
+    assert (ns["misses"], ns["l2_hits"]) == (1, 1)
+
+    # Now in the cold instance's L1 — no second L2 round trip.
+    calls = redis.calls
+    assert cold.get("section_term_offerings") == offerings
+    assert redis.calls == calls
+
+
+def test_l2_hit_keeps_remaining_ttl(clock):
+    redis = FakeRedis()
+    warm, cold = _pair(redis)
+    warm.set("search:comp", [1, 2])
+    clock["t"] += 200
+    assert cold.get("search:comp") == [1, 2]
+    clock["t"] += 101
+    assert cold.get("search:comp") is None
+
+
+def test_long_keys_are_hashed_and_invalidate_reaches_l2():
+    redis = FakeRedis()
+    warm, cold = _pair(redis)
+    key = "rmp_bulk:" + "|".join(f"COMP{i}" for i in range(100))
+    warm.set(key, {"COMP0": []})
+    assert all(len(k) < 100 for k in redis._data)
+
+    warm.invalidate(key)
+    assert cold.get(key) is None
+
+
+def test_l2_outage_falls_back_to_l1_and_cools_down():
+    redis = FakeRedis()
+    c, _ = _pair(redis)
+    redis.fail = True
+
+    c.set("search:a", 1)  # L2 write fails, L1 still has it
+    assert c.get("search:a") == 1
+    calls = redis.calls
+    assert c.get("search:missing") is None
+    assert redis.calls == calls  # L2 skipped while cooling down
+    assert c.stats()["l2"] == "cooling_down"
+    assert c.stats()["namespaces"]["search"]["l2_errors"] == 1
+
+
+def test_redis_backend_only_when_configured(monkeypatch):
+    from api.config import settings
+
+    monkeypatch.setattr(settings, "CACHE_REDIS_URL", "")
+    assert cache_mod.redis_backend("search") is None
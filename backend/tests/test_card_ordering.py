@@ -0,0 +1,58 @@
+"""
+Cards inserted on top (system reminders, asked cards) take one insert and a
+sort key below every existing card — no per-card sort_order shifts.
+"""
+from datetime import date
+
+from api.routes import cards
+from api.utils import broadcast
+
+
+def _existing(n):
+    return [{"id": f"c{i}", "user_id": "u1", "source": "ai", "sort_order": i,
+             "generated_at": "2026-10-01T00:00:00+00:00"} for i in range(n)]
+
+
+def _count_updates(fake_supabase, monkeypatch):
+    updates = []
+    table_cls = type(fake_supabase.table("advisor_cards"))
+    original = table_cls.update
+
+    def _update(self, row):
+        updates.append(row)
+        return original(self, row)
+    monkeypatch.setattr(table_cls, "update", _update)
+    return updates
+
+
+def test_system_card_insert_touches_no_other_card(fake_supabase, monkeypatch):
+    fake_supabase.set_table("advisor_cards", _existing(30))
+    fake_supabase.set_table("users", [{"id": "u1"}])
+    monkeypatch.setattr(broadcast, "_rpc_disabled_until", float("inf"))
+    updates = _count_updates(fake_supabase, monkeypatch)
+
+    spec = cards.broadcast_spec("transcript_reminder", date(2027, 1, 10))
+    assert broadcast.run_broadcast(spec)["sent"] == 1
+
+    assert updates == []
+    rows = fake_supabase._tables["advisor_cards"]
+    assert [r["sort_order"] for r in rows[:30]] == list(range(30))
+    reminder = rows[-1]
+    assert reminder["label"] == cards.TRANSCRIPT_REMINDER_LABEL
+    assert reminder["sort_order"] < min(r["sort_order"] for r in rows[:30])
+
+
+def test_newest_top_insert_sorts_first(fake_supabase, monkeypatch):
+    fake_supabase.set_table("advisor_cards", _existing(3))
+    updates = _count_updates(fake_supabase, monkeypatch)
+    clock = iter([1_790_000_000.0, 1_790_000_060.0])
+    monkeypatch.setattr(cards.time, "time", lambda: next(clock))
+
+    first = cards.insert_user_card("u1", {"title": "First"}, "first?", "en")
+    second = cards.insert_user_card("u1", {"title": "Second"}, "second?", "en")
+
+    assert updates == []
+    assert second["sort_order"] < first["sort_order"] < 0
+    # Positions written by reorder_advisor_cards (0..n) all sort after them.
+    ordered = sorted(fake_supabase._tables["advisor_cards"], key=lambda r: r["sort_order"])
+    assert [r.get("title") for r in ordered[:2]] == ["Second", "First"]
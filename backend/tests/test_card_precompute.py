@@ -0,0 +1,197 @@
+"""
+Nightly card precompute: only active students whose cards are about to go
+stale, one Message Batch for all of them, results saved unseen (and marked
+seen when served), and cards regenerated since submit left alone.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from api.config import settings
+from api.routes import cards
+from api.utils import llm
+
+NOW = datetime(2026, 10, 18, 7, 0, tzinfo=timezone.utc)
+
+
+def _ago(hours):
+    return (NOW - timedelta(hours=hours)).isoformat()
+
+
+def _ai(user_id, generated_at, seen=True, **extra):
+    return {"id": f"{user_id}-{generated_at}", "user_id": user_id, "source": "ai",
+            "title": "Old", "generated_at": generated_at,
+            "seen_at": generated_at if seen else None, **extra}
+
+
+class _Batches:
+    def __init__(self, replies, polls=1):
+        self.replies = replies
+        self.polls = polls
+        self.submitted = []
+
+    async def create(self, requests):
+        self.submitted.append(requests)
+        return SimpleNamespace(id="batch_1")
+
+    async def retrieve(self, batch_id):
+        self.polls -= 1
+        return SimpleNamespace(processing_status="ended" if self.polls < 0 else "in_progress")
+
+    async def results(self, batch_id):
+        async def _entries():
+            for custom_id, text in self.replies.items():
+                if text is None:
+                    yield SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type="errored"))
+                    continue
+                message = SimpleNamespace(content=[SimpleNamespace(text=text)], usage=None)
+                yield SimpleNamespace(custom_id=custom_id,
+                                      result=SimpleNamespace(type="succeeded", message=message))
+        return _entries()
+
+
+class _Step:
+    def __init__(self):
+        self.ran, self.slept = [], []
+
+    async def run(self, step_id, handler):
+        self.ran.append(step_id)
+        return await handler()
+
+    async def sleep(self, step_id, duration):
+        self.slept.append(step_id)
+
+
+def test_candidates_are_active_students_near_staleness(fake_supabase, monkeypatch):
+    monkeypatch.setattr(settings, "CARDS_PRECOMPUTE_LEAD_HOURS", 24)
+    fake_supabase.set_table("advisor_cards", [
+        _ai("due", _ago(160)), _ai("due", _ago(160)),        # several cards, one user
+        _ai("overdue", _ago(180)),
+        _ai("unseen", _ago(160), seen=False),                # last precompute never opened
+        _ai("fresh", _ago(20)),
+        _ai("gone", _ago(400)),                              # stopped visiting long ago
+        {"user_id": "sys", "source": "system", "generated_at": _ago(160), "seen_at": _ago(160)},
+    ])
+
+    assert cards.precompute_candidates(NOW) == ["due", "overdue"]
+
+    monkeypatch.setattr(settings, "CARDS_PRECOMPUTE_MAX_USERS", 1)
+    assert cards.precompute_candidates(NOW) == ["due"]
+    monkeypatch.setattr(settings, "CARDS_PRECOMPUTE_MAX_USERS", 0)
+    assert cards.precompute_candidates(NOW) == []
+
+
+def test_precompute_runs_as_one_batch_and_saves_unseen(fake_supabase, monkeypatch):
+    fresh = datetime.now(timezone.utc) - timedelta(hours=cards.CARDS_MAX_AGE_HOURS - 1)
+    stale = fresh.isoformat()
+    fake_supabase.set_table("advisor_cards", [
+        _ai("u1", stale), _ai("u2", stale), _ai("u3", stale), _ai("u4", stale),
+        {"user_id": "u1", "source": "ai", "title": "Kept", "body": "b", "category": "planning",
+         "is_saved": True, "generated_at": stale, "seen_at": stale},
+    ])
+    fake_supabase.set_table("users", [{"id": uid} for uid in ("u1", "u2", "u3", "u4")])
+    languages = {"u1": "fr"}
+    monkeypatch.setattr(cards, "_get_stored_cards_language", lambda uid: languages.get(uid))
+    monkeypatch.setattr(cards, "_set_stored_cards_language", lambda uid, lang: languages.__setitem__(uid, lang))
+
+    async def _ctx(user_id, user_sb=None):
+        return {"user": {"id": user_id, "year": 2}, "favorites": [], "completed": [],
+                "current": [], "calendar": [], "joined_clubs": [], "created_clubs": []}
+    monkeypatch.setattr(cards, "_fetch_student_context_parallel", _ctx)
+
+    reply = '[{"title": "New", "body": "b", "category": "bogus"}]'
+    batches = _Batches({"u1_fr": reply, "u2_en": reply, "u3_en": "not json", "u4_en": None}, polls=2)
+    monkeypatch.setattr(llm, "get_client", lambda: SimpleNamespace(messages=SimpleNamespace(batches=batches)))
+
+    real_submit = cards.submit_precompute_batch
+
+    async def _submit(user_ids):
+        batch = await real_submit(user_ids)
+        # u2 regenerates on demand while the batch is running.
+        fake_supabase._tables["advisor_cards"].append(
+            _ai("u2", (datetime.now(timezone.utc) + timedelta(seconds=1)).isoformat(), title="Mine"))
+        return batch
+    monkeypatch.setattr(cards, "submit_precompute_batch", _submit)
+
+    step = _Step()
+    result = asyncio.run(cards.run_precompute_in_steps(step))
+
+    assert step.ran == ["select", "submit-0", "poll-0", "poll-1", "poll-2", "save-0"]
+    assert step.slept == ["wait-0", "wait-1"]
+    assert result == {"users": 4, "batches": 1, "requests": 4,
+                      "saved": 1, "skipped": 1, "failed": 2, "timed_out": 0}
+
+    (requests,) = batches.submitted
+    assert sorted(r["custom_id"] for r in requests) == ["u1_fr", "u2_en", "u3_en", "u4_en"]
+    u1_prompt = next(r for r in requests if r["custom_id"] == "u1_fr")["params"]["messages"][0]["content"]
+    assert "Kept" in u1_prompt
+
+    rows = fake_supabase._tables["advisor_cards"]
+    u1 = [r for r in rows if r["user_id"] == "u1" and r.get("source") == "ai"]
+    assert [r["title"] for r in u1 if not r.get("is_saved")] == ["New"]
+    new = next(r for r in u1 if r["title"] == "New")
+    assert new["seen_at"] is None and new["category"] == "planning"
+    assert languages["u1"] == "fr"
+    # u2's own cards survive; u3 and u4 keep their old ones.
+    assert "Mine" in [r["title"] for r in rows if r["user_id"] == "u2"]
+    assert [r["title"] for r in rows if r["user_id"] == "u3"] == ["Old"]
+
+    # Serving the cards marks them seen, so the student stays a candidate.
+    cards._fetch_cards_response("u1")
+    assert new["seen_at"] is not None
+
+
+def test_nothing_to_submit_skips_the_batch(fake_supabase, monkeypatch):
+    fake_supabase.set_table("advisor_cards", [])
+    step = _Step()
+    assert asyncio.run(cards.run_precompute_in_steps(step)) == {"users": 0}
+    assert step.ran == ["select"]
+
+
+def test_saved_cards_survive_a_large_card_history(fake_supabase, monkeypatch):
+    # Far more unsaved cards than one PostgREST response holds, saved one last.
+    history = [{"id": f"c{i}", "user_id": "u1", "source": "ai", "title": f"Old {i}", "is_saved": False}
+               for i in range(1500)]
+    history.append({"id": "keep", "user_id": "u1", "source": "ai", "title": "Kept", "body": "b",
+                    "category": "planning", "is_saved": True})
+    fake_supabase.set_table("advisor_cards", history)
+    monkeypatch.setattr(cards, "_get_stored_cards_language", lambda uid: None)
+
+    async def _ctx(user_id, user_sb=None):
+        return {"user": {"id": user_id, "year": 2}, "favorites": [], "completed": [],
+                "current": [], "calendar": [], "joined_clubs": [], "created_clubs": []}
+    monkeypatch.setattr(cards, "_fetch_student_context_parallel", _ctx)
+    batches = _Batches({})
+    monkeypatch.setattr(llm, "get_client", lambda: SimpleNamespace(messages=SimpleNamespace(batches=batches)))
+
+    asyncio.run(cards.submit_precompute_batch(["u1"]))
+
+    (requests,) = batches.submitted
+    prompt = requests[0]["params"]["messages"][0]["content"]
+    assert "Kept" in prompt and "Old 0" not in prompt
+
+
+def test_large_runs_are_chunked_into_short_steps(fake_supabase, monkeypatch):
+    monkeypatch.setattr(cards, "_PRECOMPUTE_CHUNK", 2)
+    monkeypatch.setattr(cards, "precompute_candidates", lambda: ["u1", "u2", "u3", "u4", "u5"])
+    submitted = []
+
+    async def _submit(user_ids):
+        submitted.append(user_ids)
+        return {"batch_id": f"b{len(submitted)}", "requests": len(user_ids), "submitted_at": "t"}
+    monkeypatch.setattr(cards, "submit_precompute_batch", _submit)
+
+    async def _status(batch_id):
+        return "ended"
+    monkeypatch.setattr(llm, "batch_status", _status)
+
+    async def _save(batch):
+        return {"saved": batch["requests"], "skipped": 0, "failed": 0}
+    monkeypatch.setattr(cards, "save_precompute_results", _save)
+
+    step = _Step()
+    result = asyncio.run(cards.run_precompute_in_steps(step))
+
+    assert submitted == [["u1", "u2"], ["u3", "u4"], ["u5"]]
+    assert step.ran == ["select", "submit-0", "submit-1", "submit-2", "poll-0", "save-0", "save-1", "save-2"]
+    assert result["batches"] == 3 and result["saved"] == 5
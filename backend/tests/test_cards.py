@@ -122,27 +122,9 @@ class TestCourseRegistrationReminder:
     """
 
     def _card(self, days_before_open, monkeypatch):
-        """Run the insert and capture the row it would write, without a DB."""
+        """The row the reminder broadcast would write, without a DB."""
         import api.routes.cards as cards
-        captured = {}
-
-        class _Tbl:
-            def __init__(self, name): self.name = name
-            def select(self, *a, **k): return self
-            def eq(self, *a, **k): return self
-            def gte(self, *a, **k): return self
-            def limit(self, *a, **k): return self
-            def update(self, *a, **k): return self
-            def execute(self): return type('R', (), {'data': []})()
-            def insert(self, row):
-                if self.name == 'advisor_cards' and row.get('label') == cards.COURSE_REGISTRATION_REMINDER_LABEL:
-                    captured.update(row)
-                return self
-
-        monkeypatch.setattr(cards, 'get_supabase', lambda: type('S', (), {'table': staticmethod(lambda n: _Tbl(n))})())
-        monkeypatch.setattr(cards, '_has_active_course_registration_card', lambda uid: False)
-        assert cards._insert_course_registration_card('u1', days_before_open) is True
-        return captured
+        return cards._course_registration_card(days_before_open)
 
     def test_heads_up_card_names_both_terms(self, monkeypatch):
         card = self._card(8, monkeypatch)
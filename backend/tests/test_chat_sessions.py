@@ -0,0 +1,101 @@
+"""
+GET /api/chat/sessions: one keyset-paginated read of the chat_sessions
+summary, with the full chat_messages scan only until it is migrated.
+"""
+import pytest
+from postgrest import APIError
+
+from api.utils import supabase_client as sc
+from tests.conftest import FakeTable, auth
+
+
+@pytest.fixture
+def user(fake_supabase, monkeypatch):
+    fake_supabase.set_table("users", [{"id": "u1", "email": "tester@mail.mcgill.ca"}])
+    monkeypatch.setattr(sc, "_sessions_index_disabled_until", 0.0)
+    return fake_supabase
+
+
+def test_sessions_page_through_the_summary(client, user):
+    # Newest first, as the index returns them (the fake doesn't sort).
+    user.set_table("chat_sessions", [
+        {"user_id": "u1", "session_id": f"s{i}", "first_user_message": f"question {i}",
+         "last_updated": f"2026-10-{i:02d}T12:00:00+00:00", "message_count": 2}
+        for i in (5, 4, 3)
+    ] + [{"user_id": "u2", "session_id": "other", "first_user_message": "not mine",
+          "last_updated": "2026-10-09T12:00:00+00:00", "message_count": 2}])
+    user.set_table("chat_messages", [])
+
+    first = client.get("/api/chat/sessions/u1?limit=2", headers=auth("u1")).json()
+    assert [s["session_id"] for s in first["sessions"]] == ["s5", "s4"]
+    assert first["sessions"][0] == {
+        "session_id": "s5", "last_message": "question 5",
+        "last_updated": "2026-10-05T12:00:00+00:00", "message_count": 2,
+    }
+    assert first["next_cursor"] == "2026-10-04T12:00:00+00:00|s4"
+
+    second = client.get(
+        "/api/chat/sessions/u1", params={"limit": 2, "cursor": first["next_cursor"]}, headers=auth("u1"),
+    ).json()
+    assert [s["session_id"] for s in second["sessions"]] == ["s3"]
+    assert second["next_cursor"] is None
+
+
+def test_cursor_breaks_timestamp_ties_by_session_id(client, user, monkeypatch):
+    same = "2026-10-04T12:00:00+00:00"
+    user.set_table("chat_sessions", [
+        {"user_id": "u1", "session_id": sid, "first_user_message": sid,
+         "last_updated": same, "message_count": 2} for sid in ("sc", "sb")
+    ])
+    filters = []
+    monkeypatch.setattr(FakeTable, "or_", lambda self, f: filters.append(f) or self)
+
+    client.get("/api/chat/sessions/u1", params={"limit": 2, "cursor": f"{same}|sc"}, headers=auth("u1"))
+
+    assert filters == [
+        f'last_updated.lt."{same}",and(last_updated.eq."{same}",session_id.lt."sc")'
+    ]
+    # The cursor can't smuggle extra filter syntax in.
+    bad = client.get("/api/chat/sessions/u1", params={"cursor": f'{same}|x",id.gt."0'}, headers=auth("u1"))
+    assert bad.status_code == 422
+
+
+def test_fallback_scan_pages_ties_without_skipping(client, user, monkeypatch):
+    monkeypatch.setattr(sc, "_sessions_index_disabled_until", float("inf"))
+    same = "2026-10-04T12:00:00+00:00"
+    user.set_table("chat_messages", [
+        {"user_id": "u1", "session_id": sid, "role": "user", "content": sid, "created_at": same}
+        for sid in ("s1", "s2", "s3")
+    ])
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/chat/sessions/u1", params=params, headers=auth("u1")).json()
+        seen += [s["session_id"] for s in page["sessions"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["s3", "s2", "s1"]
+
+
+def test_sessions_fall_back_to_messages_until_migrated(client, user, monkeypatch):
+    real_select = FakeTable.select
+
+    def _select(self, *args, **kwargs):
+        if self._name == "chat_sessions":
+            raise APIError({"code": "PGRST205", "message": "Could not find the table 'public.chat_sessions'"})
+        return real_select(self, *args, **kwargs)
+    monkeypatch.setattr(FakeTable, "select", _select)
+    user.set_table("chat_messages", [
+        {"user_id": "u1", "session_id": "s1", "role": "user", "content": "older", "created_at": "2026-10-01T10:00:00+00:00"},
+        {"user_id": "u1", "session_id": "s1", "role": "assistant", "content": "a", "created_at": "2026-10-01T10:00:05+00:00"},
+        {"user_id": "u1", "session_id": "s2", "role": "user", "content": "newer", "created_at": "2026-10-02T10:00:00+00:00"},
+    ])
+
+    body = client.get("/api/chat/sessions/u1", headers=auth("u1")).json()
+
+    assert [(s["session_id"], s["last_message"], s["message_count"]) for s in body["sessions"]] == [
+        ("s2", "newer", 1), ("s1", "older", 2),
+    ]
+    assert sc._sessions_index_disabled_until > 0
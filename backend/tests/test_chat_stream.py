@@ -0,0 +1,111 @@
+"""
+POST /api/chat/stream: the /send request answered as SSE token deltas, with
+the conversation persisted once the stream completes.
+"""
+import json
+from types import SimpleNamespace
+
+import anthropic
+import httpx
+import pytest
+
+from api.utils import llm
+from tests.conftest import auth
+
+
+class _FakeStream:
+    def __init__(self, chunks, fail_after=None):
+        self._chunks = chunks
+        self._fail_after = fail_after
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        for i, chunk in enumerate(self._chunks):
+            if self._fail_after is not None and i == self._fail_after:
+                raise anthropic.APIConnectionError(request=httpx.Request("POST", "https://api.anthropic.com"))
+            yield chunk
+
+    async def get_final_message(self):
+        return SimpleNamespace(
+            content=[SimpleNamespace(text="".join(self._chunks))],
+            usage=SimpleNamespace(input_tokens=120, output_tokens=8),
+        )
+
+
+class _FakeAsyncAnthropic:
+    def __init__(self, chunks, fail_after=None):
+        self.calls = []
+
+        def _stream(**kwargs):
+            self.calls.append(kwargs)
+            return _FakeStream(chunks, fail_after)
+        self.messages = SimpleNamespace(stream=_stream)
+
+
+def _events(resp):
+    return [json.loads(line[6:]) for line in resp.text.splitlines() if line.startswith("data: ")]
+
+
+@pytest.fixture
+def user(fake_supabase):
+    fake_supabase.set_table("users", [{"id": "u1", "email": "tester@mail.mcgill.ca", "major": "Computer Science"}])
+    return fake_supabase
+
+
+def test_stream_emits_deltas_then_persists(client, user, monkeypatch):
+    fake = _FakeAsyncAnthropic(["Try ", "COMP ", "250."])
+    monkeypatch.setattr(llm, "get_client", lambda: fake)
+
+    resp = client.post("/api/chat/stream", json={"user_id": "u1", "message": "What next?"}, headers=auth("u1"))
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = _events(resp)
+    assert events[0]["type"] == "start"
+    assert [e["text"] for e in events if e["type"] == "delta"] == ["Try ", "COMP ", "250."]
+    done = events[-1]
+    assert done["type"] == "done" and done["tokens_used"] == 128
+    assert done["session_id"] == events[0]["session_id"]
+
+    saved = user._tables["chat_messages"]
+    assert [(m["role"], m["content"]) for m in saved] == [("user", "What next?"), ("assistant", "Try COMP 250.")]
+
+    # Prompt caching is kept on the stable system block.
+    call = fake.calls[0]
+    assert call["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert call["messages"][-1] == {"role": "user", "content": "What next?"}
+
+
+def test_stream_reports_api_errors_without_saving_the_turn(client, user, monkeypatch):
+    monkeypatch.setattr(llm, "get_client", lambda: _FakeAsyncAnthropic(["a", "b"], fail_after=1))
+
+    resp = client.post("/api/chat/stream", json={"user_id": "u1", "message": "Hi"}, headers=auth("u1"))
+
+    events = _events(resp)
+    assert events[-1]["type"] == "error"
+    assert "temporarily unavailable" in events[-1]["detail"]
+    # The turn is written as a pair once answered, so a failed one leaves no
+    # orphaned user message behind.
+    assert user._tables.get("chat_messages", []) == []
+
+
+def test_stream_applies_the_same_gates_as_send(client, user, monkeypatch):
+    import api.utils.verified_user as vu
+
+    fake = _FakeAsyncAnthropic(["x"])
+    monkeypatch.setattr(llm, "get_client", lambda: fake)
+    monkeypatch.setattr(vu, "is_email_verified", lambda _uid: False)
+
+    resp = client.post("/api/chat/stream", json={"user_id": "u1", "message": "Hi"}, headers=auth("u1"))
+    assert resp.status_code == 403
+    assert resp.json()["detail"]["code"] == "email_not_verified"
+
+    resp = client.post("/api/chat/stream", json={"user_id": "u2", "message": "Hi"}, headers=auth("u1"))
+    assert resp.status_code == 403
+    assert fake.calls == []
@@ -0,0 +1,130 @@
+"""
+Supabase circuit breaker (#18): during an outage with_retry() stops
+reconnecting and sleeping, and fails fast with a 503 until a probe succeeds.
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from api.config import settings
+from api.exceptions import DatabaseUnavailableException, UserNotFoundException
+from api.utils import supabase_client as sc
+from tests.conftest import auth
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable monotonic clock for the cooldown; no real backoff sleeps."""
+    now = {"t": 1000.0}
+    for b in sc._breakers.values():
+        monkeypatch.setattr(b, "_clock", lambda: now["t"])
+    monkeypatch.setattr(sc, "RETRY_BACKOFF", 0)
+    monkeypatch.setattr(sc, "_reset_client", lambda: None)
+    monkeypatch.setattr(settings, "DB_BREAKER_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(settings, "DB_BREAKER_COOLDOWN_SECONDS", 15.0)
+    return now
+
+
+def _down(calls):
+    def fn():
+        calls["n"] += 1
+        raise httpx.ConnectError("connection refused")
+    return fn
+
+
+def test_opens_after_threshold_and_fails_fast(clock):
+    calls = {"n": 0}
+    with pytest.raises(httpx.ConnectError):
+        sc.with_retry("get_user_by_id", _down(calls), retry_on_timeout=True)
+    assert calls["n"] == 3
+    assert sc.breaker_states()["read"]["state"] == "open"
+
+    with pytest.raises(DatabaseUnavailableException) as exc:
+        sc.with_retry("get_user_by_id", _down(calls), retry_on_timeout=True)
+    assert calls["n"] == 3  # never called
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == "15"
+    assert sc.breaker_states()["read"]["rejected"] == 1
+
+
+def test_read_and_write_classes_are_independent(clock):
+    calls = {"n": 0}
+    with pytest.raises(httpx.ConnectError):
+        sc.with_retry("search_courses", _down(calls), retry_on_timeout=True)
+    assert sc.with_retry("save_message", lambda: "saved") == "saved"
+    assert sc.breaker_states()["write"]["state"] == "closed"
+
+
+def test_half_open_probe_closes_or_reopens(clock):
+    calls = {"n": 0}
+    with pytest.raises(httpx.ConnectError):
+        sc.with_retry("op", _down(calls), retry_on_timeout=True)
+
+    clock["t"] += 16
+    # Failed probe: one call, straight back to open, no retries.
+    with pytest.raises(httpx.ConnectError):
+        sc.with_retry("op", _down(calls), retry_on_timeout=True)
+    assert calls["n"] == 4
+    assert sc.breaker_states()["read"]["state"] == "open"
+
+    clock["t"] += 16
+    assert sc.with_retry("op", lambda: "ok", retry_on_timeout=True) == "ok"
+    state = sc.breaker_states()["read"]
+    assert (state["state"], state["consecutive_failures"], state["trips"]) == ("closed", 0, 1)
+
+
+def test_answers_from_the_database_are_not_failures(clock):
+    def missing():
+        raise UserNotFoundException("u1")
+
+    for _ in range(5):
+        with pytest.raises(UserNotFoundException):
+            sc.with_retry("get_user_by_id", missing, retry_on_timeout=True)
+    assert sc.breaker_states()["read"]["state"] == "closed"
+
+
+def test_helpers_surface_503_instead_of_500(clock, fake_supabase):
+    sc._breakers["read"].state = "open"
+    sc._breakers["read"].opened_at = clock["t"]
+
+    with pytest.raises(DatabaseUnavailableException):
+        sc.get_user_by_id("u1")
+    with pytest.raises(DatabaseUnavailableException):
+        asyncio.run(sc.get_chat_history_async("u1"))
+    # Helpers that already degrade to an empty answer keep doing so.
+    assert sc.get_user_sessions("u1") == []
+
+
+def test_cancelled_probe_frees_the_half_open_slot(clock):
+    b = sc._breakers["read"]
+    b.state, b.opened_at = "open", clock["t"] - 20
+
+    async def _hang():
+        await asyncio.sleep(1)
+
+    async def _go():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(sc.with_retry_async("op", _hang, retry_on_timeout=True), 0.01)
+
+    asyncio.run(_go())
+    assert b.allow() is True
+
+
+def test_deep_health_reports_breakers(client, fake_supabase):
+    sc._breakers["write"].state = "open"
+    body = client.get("/api/health?deep=true").json()
+    assert body["checks"]["database"] == "ok"
+    assert body["checks"]["database_breakers"]["write"]["state"] == "open"
+    assert body["checks"]["database_breakers"]["read"]["state"] == "closed"
+
+
+def test_open_breaker_returns_503_with_retry_after(client, fake_supabase):
+    fake_supabase.set_table("users", [{"id": "u1"}])
+    sc._breakers["read"].state = "open"
+    sc._breakers["read"].opened_at = sc._breakers["read"]._clock()
+
+    resp = client.get("/api/chat/history/u1", headers=auth("u1"))
+    assert resp.status_code == 503
+    assert resp.json()["code"] == "database_connection_error"
+    assert int(resp.headers["Retry-After"]) >= 1
@@ -0,0 +1,74 @@
+"""
+Course grounding for chat and card asks: cached per course code (including
+codes that aren't courses), with every uncached code fetched in one RPC.
+"""
+from types import SimpleNamespace
+
+import pytest
+from postgrest import APIError
+
+from api.routes import courses
+from api.utils.cache import BoundedCache
+
+_DETAILS = {
+    "COMP250": {"course_name": "Introduction to Computer Science", "recent_avg": 3.1,
+                "prerequisites": "COMP 202", "rmp_rating": 4.2, "rmp_difficulty": 3.0},
+    "MATH140": {"course_name": "Calculus 1", "recent_avg": 2.9},
+}
+
+
+@pytest.fixture
+def rpc(fake_supabase, monkeypatch):
+    monkeypatch.setattr(courses, "search_cache", BoundedCache(default_ttl=300))
+    monkeypatch.setattr(courses, "_batch_rpc_disabled_until", 0.0)
+    calls = []
+
+    def _rpc(name, params):
+        calls.append((name, params))
+        if name == "get_course_grounding":
+            data = [{"course_code": c, "details": _DETAILS[c]} for c in params["p_course_codes"] if c in _DETAILS]
+        else:
+            data = [_DETAILS[params["p_course_code"]]] if params["p_course_code"] in _DETAILS else []
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=data))
+    monkeypatch.setattr(fake_supabase, "rpc", _rpc)
+    return calls
+
+
+def test_three_codes_one_call_then_none(rpc):
+    message = "Should I take COMP 250, math140 or ABCD 999 next term?"
+
+    block = courses.build_course_grounding_block(message)
+    assert rpc == [("get_course_grounding", {"p_course_codes": ["COMP250", "MATH140", "ABCD999"]})]
+    assert "COMP250 (Introduction to Computer Science): class average 3.1; RMP rating 4.2/5" in block
+    assert "MATH140 (Calculus 1)" in block
+    assert "ABCD999" not in block
+
+    # Found courses and the miss are both cached.
+    assert courses.build_course_grounding_block(message) == block
+    assert len(rpc) == 1
+
+
+def test_failed_lookup_is_not_cached(rpc, fake_supabase, monkeypatch):
+    def _down(name, params):
+        raise ConnectionError("connection reset")
+    working = fake_supabase.rpc
+    monkeypatch.setattr(fake_supabase, "rpc", _down)
+    assert courses.build_course_grounding_block("COMP 250?") is None
+
+    monkeypatch.setattr(fake_supabase, "rpc", working)
+    assert "COMP250" in courses.build_course_grounding_block("COMP 250?")
+
+
+def test_per_code_fallback_until_the_rpc_exists(rpc, fake_supabase, monkeypatch):
+    working = fake_supabase.rpc
+
+    def _no_batch(name, params):
+        if name == "get_course_grounding":
+            raise APIError({"code": "PGRST202", "message": "Could not find the function"})
+        return working(name, params)
+    monkeypatch.setattr(fake_supabase, "rpc", _no_batch)
+
+    assert courses.fetch_course_grounding("MATH140")["title"] == "Calculus 1"
+    assert courses.fetch_course_groundings(["COMP250", "ABCD999"]).keys() == {"COMP250"}
+    assert [name for name, _ in rpc] == ["get_course_details"] * 3
+    assert courses._batch_rpc_disabled_until > 0
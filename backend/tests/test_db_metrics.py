@@ -0,0 +1,130 @@
+"""
+Per-query DB instrumentation: the instrumented httpx transports record each
+PostgREST call per route, /api/admin/db-stats reads the rolling store, and
+DB_SERVER_TIMING adds a Server-Timing header.
+"""
+import asyncio
+import contextvars
+import json
+
+import httpx
+import pytest
+
+from api.config import settings
+from api.utils import db_metrics
+
+
+@pytest.fixture(autouse=True)
+def _fresh_store():
+    db_metrics.reset()
+    yield
+    db_metrics.reset()
+
+
+class _Chunks(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """An unread network-style body, delivered in two chunks."""
+
+    def __init__(self, payload: bytes):
+        self._parts = [payload[:5], payload[5:]]
+
+    def __iter__(self):
+        yield from self._parts
+
+    async def __aiter__(self):
+        for part in self._parts:
+            yield part
+
+
+def _postgrest(request: httpx.Request) -> httpx.Response:
+    if request.url.path.endswith("/rpc/increment_rate_limit"):
+        return httpx.Response(200, json=3)  # pre-read body
+    rows = json.dumps([{"id": i} for i in range(4)]).encode()
+    return httpx.Response(200, stream=_Chunks(rows), headers={"Content-Range": "0-3/*"})
+
+
+def _sync_client():
+    inner = httpx.MockTransport(_postgrest)
+    return httpx.Client(
+        transport=db_metrics.InstrumentedTransport(inner),
+        base_url="https://x.supabase.co/rest/v1",
+    )
+
+
+def test_records_target_op_rows_and_bytes():
+    def _run():
+        totals = db_metrics.begin_request("GET /api/courses/{id}")
+        with _sync_client() as c:
+            body = c.get("/courses", params={"select": "id"}).content
+            c.get("/courses")
+            c.post("/rpc/increment_rate_limit", json={})
+            c.post("/users", json={}, headers={"Prefer": "resolution=merge-duplicates"})
+        return totals, len(body)
+
+    totals, nbytes = contextvars.copy_context().run(_run)
+    assert totals["queries"] == 4
+
+    snap = db_metrics.snapshot()
+    by_key = {(e["route"], e["target"], e["op"]): e for e in snap["entries"]}
+    courses = by_key[("GET /api/courses/{id}", "courses", "select")]
+    assert (courses["count"], courses["rows"], courses["bytes"]) == (2, 8, 2 * nbytes)
+    assert ("GET /api/courses/{id}", "rpc:increment_rate_limit", "rpc") in by_key
+    assert ("GET /api/courses/{id}", "users", "upsert") in by_key
+    assert snap["queries"] == 4
+
+
+def test_async_transport_and_background_route():
+    async def _go():
+        inner = httpx.MockTransport(_postgrest)
+        async with httpx.AsyncClient(
+            transport=db_metrics.AsyncInstrumentedTransport(inner),
+            base_url="https://x.supabase.co/rest/v1",
+        ) as c:
+            await c.patch("/chat_messages", json={})
+            await c.delete("/chat_messages")
+
+    contextvars.Context().run(asyncio.run, _go())
+    ops = {(e["route"], e["op"]) for e in db_metrics.snapshot()["entries"]}
+    assert ops == {(db_metrics.BACKGROUND_ROUTE, "update"), (db_metrics.BACKGROUND_ROUTE, "delete")}
+
+
+def test_disabled_records_nothing(monkeypatch):
+    monkeypatch.setattr(settings, "DB_METRICS_ENABLED", False)
+    with _sync_client() as c:
+        assert c.get("/courses").json()[0] == {"id": 0}
+    assert db_metrics.snapshot()["entries"] == []
+
+
+def test_old_buckets_fall_out_of_the_window(monkeypatch):
+    now = {"t": 1_000_000.0}
+    monkeypatch.setattr(db_metrics.time, "time", lambda: now["t"])
+    db_metrics.record("users", "select", 5.0, 1, 100, 200)
+    now["t"] += 60 * (settings.DB_METRICS_WINDOW_MINUTES + 2)
+    db_metrics.record("users", "select", 7.0, 1, 100, 200)
+    snap = db_metrics.snapshot()
+    assert snap["queries"] == 1 and snap["total_ms"] == 7.0
+    assert len(db_metrics._buckets) == 1
+
+
+def test_admin_db_stats_requires_admin_token(client, monkeypatch):
+    from api.routes import admin
+
+    monkeypatch.setattr(settings, "ADMIN_SECRET", "test-admin-secret")
+    db_metrics.record("advisor_cards", "select", 40.0, 10, 5000, 200)
+    db_metrics.record("users", "select", 2.0, 1, 200, 500)
+
+    assert client.get("/api/admin/db-stats").status_code == 401
+
+    resp = client.get("/api/admin/db-stats?sort=bytes",
+                      headers={"X-Cron-Secret": admin._issue_admin_token()})
+    assert resp.status_code == 200
+    entries = resp.json()["entries"]
+    assert [e["target"] for e in entries] == ["advisor_cards", "users"]
+    assert entries[1]["errors"] == 1
+
+
+def test_server_timing_header_is_opt_in(client, monkeypatch):
+    assert "server-timing" not in client.get("/api/health").headers
+
+    monkeypatch.setattr(settings, "DB_SERVER_TIMING", True)
+    header = client.get("/api/health").headers["server-timing"]
+    assert header.startswith("db;dur=") and "queries" in header
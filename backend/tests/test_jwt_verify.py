@@ -0,0 +1,149 @@
+"""
+Local JWT verification in get_current_user_id.
+
+The dependency used to call supabase.auth.get_user() on every request. These
+pin that a valid token is accepted with no call to Supabase Auth, that every
+claim the remote check enforced is still enforced, and that the remote check
+only runs when explicitly opted into.
+"""
+import asyncio
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import HTTPException
+
+from api import auth
+from api.config import settings
+from api.utils import jwt_verify
+
+SECRET = "test-project-jwt-secret-at-least-32-bytes-long"
+USER = "7b0c5f4e-1111-4222-8333-944455556666"
+
+
+class _Request:
+    def __init__(self, token):
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+
+class _RemoteAuth:
+    """Supabase Auth stand-in that counts round-trips."""
+
+    def __init__(self, user_id=USER):
+        self.calls = 0
+        self._user_id = user_id
+
+    def get_user(self, _token):
+        self.calls += 1
+        return type("R", (), {"user": type("U", (), {"id": self._user_id})()})()
+
+
+@pytest.fixture
+def remote(monkeypatch):
+    remote_auth = _RemoteAuth()
+    sb = type("SB", (), {"auth": remote_auth})()
+    monkeypatch.setattr(auth, "get_supabase", lambda: sb)
+    monkeypatch.setattr(settings, "AUTH_JWT_LOCAL_VERIFY", True)
+    monkeypatch.setattr(settings, "AUTH_JWT_REMOTE_FALLBACK", False)
+    monkeypatch.setattr(settings, "SUPABASE_JWT_SECRET", SECRET)
+    jwt_verify.clear_cache()
+    yield remote_auth
+    jwt_verify.clear_cache()
+
+
+def _claims(**overrides):
+    claims = {
+        "sub": USER,
+        "aud": "authenticated",
+        "iss": f"{settings.SUPABASE_URL}/auth/v1",
+        "exp": int(time.time()) + 3600,
+        "role": "authenticated",
+    }
+    claims.update(overrides)
+    return claims
+
+
+def _hs256(**overrides):
+    return jwt.encode(_claims(**overrides), SECRET, algorithm="HS256")
+
+
+def _user_id(token):
+    return asyncio.run(auth.get_current_user_id(_Request(token)))
+
+
+def test_valid_token_is_verified_without_calling_supabase(remote):
+    assert _user_id(_hs256()) == USER
+    assert remote.calls == 0
+
+
+@pytest.mark.parametrize("token", [
+    pytest.param(lambda: _hs256(exp=int(time.time()) - 60), id="expired"),
+    pytest.param(lambda: _hs256(aud="anon"), id="wrong-audience"),
+    pytest.param(lambda: _hs256(iss="https://evil.supabase.co/auth/v1"), id="wrong-issuer"),
+    pytest.param(lambda: jwt.encode(_claims(), "x" * 40, algorithm="HS256"), id="wrong-key"),
+    pytest.param(lambda: jwt.encode({k: v for k, v in _claims().items() if k != "exp"}, SECRET,
+                                    algorithm="HS256"), id="no-exp"),
+    pytest.param(lambda: "not-a-jwt", id="malformed"),
+])
+def test_bad_tokens_are_rejected_locally(remote, token):
+    with pytest.raises(HTTPException) as exc:
+        _user_id(token())
+    assert exc.value.status_code == 401
+    assert remote.calls == 0
+
+
+def test_repeat_requests_hit_the_token_cache(remote, monkeypatch):
+    token = _hs256()
+    _user_id(token)
+
+    def _boom(_t):
+        raise AssertionError("cached token was re-verified")
+    monkeypatch.setattr(jwt_verify, "verify_token", _boom)
+
+    assert _user_id(token) == USER
+
+
+def test_cache_never_outlives_the_token(remote):
+    token = _hs256(exp=int(time.time()) + 2)
+    jwt_verify.remember(token, USER, exp=time.time() - 1)
+    assert jwt_verify.cached_user_id(token) is None
+
+
+def test_asymmetric_tokens_use_the_jwks(remote, monkeypatch):
+    private = ec.generate_private_key(ec.SECP256R1())
+    token = jwt.encode(_claims(), private, algorithm="ES256", headers={"kid": "k1"})
+
+    class _Jwks:
+        def get_signing_key_from_jwt(self, _t):
+            return type("K", (), {"key": private.public_key()})()
+
+    monkeypatch.setattr(jwt_verify, "_get_jwks_client", lambda: _Jwks())
+    assert _user_id(token) == USER
+    assert remote.calls == 0
+
+
+def test_unconfigured_secret_verifies_hs256_remotely(remote, monkeypatch):
+    # A deploy that hasn't set SUPABASE_JWT_SECRET must not 401 everyone.
+    monkeypatch.setattr(settings, "SUPABASE_JWT_SECRET", "")
+    assert _user_id(_hs256()) == USER
+    assert remote.calls == 1
+
+
+def test_unreachable_jwks_rejects_unless_remote_fallback_is_opted_into(remote, monkeypatch):
+    private = ec.generate_private_key(ec.SECP256R1())
+    token = jwt.encode(_claims(), private, algorithm="ES256", headers={"kid": "k1"})
+
+    class _Down:
+        def get_signing_key_from_jwt(self, _t):
+            raise jwt.PyJWKClientConnectionError("unreachable")
+    monkeypatch.setattr(jwt_verify, "_get_jwks_client", lambda: _Down())
+
+    with pytest.raises(HTTPException):
+        _user_id(token)
+    assert remote.calls == 0
+
+    monkeypatch.setattr(settings, "AUTH_JWT_REMOTE_FALLBACK", True)
+    assert _user_id(token) == USER
+    assert remote.calls == 1
+
@@ -0,0 +1,144 @@
+"""
+LLM gateway: tiered admission through one per-instance gate, unified retry
+on 429 / 5xx, and per-feature accounting.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import anthropic
+import httpx
+import pytest
+
+from api.config import settings
+from api.exceptions import LLMBusyException
+from api.utils import llm
+from api.utils.llm import BULK, INTERACTIVE, STANDARD, PriorityGate
+
+
+def _message(text="ok"):
+    return SimpleNamespace(
+        content=[SimpleNamespace(text=text)],
+        usage=SimpleNamespace(input_tokens=10, output_tokens=5,
+                              cache_read_input_tokens=7, cache_creation_input_tokens=0),
+    )
+
+
+def _status_error(cls, status, headers=None):
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return cls("err", response=response, body=None)
+
+
+class _Client:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+        async def _create(**kwargs):
+            self.calls += 1
+            outcome = self.outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        self.messages = SimpleNamespace(create=_create)
+
+
+@pytest.fixture(autouse=True)
+def _fresh(monkeypatch):
+    monkeypatch.setattr(llm, "_gate", PriorityGate(4, reserved_interactive=1, bulk_limit=2))
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_SECONDS", 0.001)
+    llm.reset_stats()
+
+
+def test_bulk_spike_leaves_reserved_slots_for_chat():
+    async def run():
+        gate = PriorityGate(4, reserved_interactive=1, bulk_limit=2)
+        for _ in range(2):
+            await gate.acquire(BULK)
+        # Bulk is at its own cap; a third waits even though slots are free.
+        with pytest.raises(asyncio.TimeoutError):
+            await gate.acquire(BULK, timeout=0.02)
+        await gate.acquire(STANDARD)
+        # Standard may not take the interactive reservation...
+        with pytest.raises(asyncio.TimeoutError):
+            await gate.acquire(STANDARD, timeout=0.02)
+        # ...but chat gets it immediately.
+        await asyncio.wait_for(gate.acquire(INTERACTIVE), 0.5)
+        assert gate.stats()["in_use"] == {INTERACTIVE: 1, STANDARD: 1, BULK: 2}
+    asyncio.run(run())
+
+
+def test_waiters_are_admitted_most_urgent_first():
+    async def run():
+        gate = PriorityGate(1)
+        await gate.acquire(STANDARD)
+        order = []
+
+        async def waiter(tier, name):
+            await gate.acquire(tier)
+            order.append(name)
+            gate.release(tier)
+
+        tasks = [asyncio.create_task(waiter(BULK, "bulk")),
+                 asyncio.create_task(waiter(STANDARD, "standard")),
+                 asyncio.create_task(waiter(INTERACTIVE, "chat"))]
+        await asyncio.sleep(0.01)
+        assert gate.stats()["waiting"] == {INTERACTIVE: 1, STANDARD: 1, BULK: 1}
+        gate.release(STANDARD)
+        await asyncio.gather(*tasks)
+        assert order == ["chat", "standard", "bulk"]
+        assert gate.stats()["in_use"] == {INTERACTIVE: 0, STANDARD: 0, BULK: 0}
+    asyncio.run(run())
+
+
+def test_retries_429_and_5xx_then_succeeds(monkeypatch):
+    client = _Client(
+        _status_error(anthropic.RateLimitError, 429, {"retry-after": "0"}),
+        _status_error(anthropic.InternalServerError, 500),
+        _message("hello"),
+    )
+    monkeypatch.setattr(llm, "get_client", lambda: client)
+
+    message = asyncio.run(llm.create("chat", model="m", max_tokens=10, messages=[]))
+
+    assert message.content[0].text == "hello"
+    assert client.calls == 3
+    row = llm.stats()["features"]["chat"]
+    assert (row["calls"], row["retries"], row["errors"]) == (1, 2, 0)
+    assert (row["input_tokens"], row["output_tokens"], row["cache_read_tokens"]) == (10, 5, 7)
+    assert row["tier"] == INTERACTIVE
+
+
+def test_client_errors_are_not_retried(monkeypatch):
+    client = _Client(_status_error(anthropic.BadRequestError, 400))
+    monkeypatch.setattr(llm, "get_client", lambda: client)
+
+    with pytest.raises(anthropic.BadRequestError):
+        asyncio.run(llm.create("cards", model="m", max_tokens=10, messages=[]))
+    assert client.calls == 1
+    assert llm.stats()["features"]["cards"]["errors"] == 1
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 1)
+    client = _Client(*[_status_error(anthropic.InternalServerError, 503)] * 3)
+    monkeypatch.setattr(llm, "get_client", lambda: client)
+
+    with pytest.raises(anthropic.InternalServerError):
+        asyncio.run(llm.create("transcript", model="m", max_tokens=10, messages=[]))
+    assert client.calls == 2
+
+
+def test_queue_timeout_is_a_503(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_QUEUE_TIMEOUT_SECONDS", 0.02)
+    monkeypatch.setattr(llm, "get_client", lambda: _Client(_message()))
+
+    async def run():
+        for _ in range(2):
+            await llm._gate.acquire(BULK)
+        with pytest.raises(LLMBusyException) as exc:
+            await llm.create("club_translation", model="m", max_tokens=10, messages=[])
+        return exc.value
+    exc = asyncio.run(run())
+    assert exc.status_code == 503
+    assert llm.stats()["features"]["club_translation"]["rejected"] == 1
@@ -0,0 +1,84 @@
+"""
+Prompt assembler: student-data sections fitted to token budgets (newest
+courses kept, retakes deduplicated), a byte-stable cached prefix for chat,
+and per-section size accounting.
+"""
+from api.config import settings
+from api.routes import cards, chat
+from api.utils import prompt_budget
+from api.utils.prompt_budget import PromptAssembler, estimate_tokens
+
+_TERMS = ("Winter", "Summer", "Fall")
+
+
+def _ctx(n_completed=60):
+    completed = [
+        {"course_code": f"COMP {200 + i}", "course_title": f"Course {i}", "grade": "A",
+         "term": _TERMS[i % 3], "year": 2014 + i // 3, "credits": 3}
+        for i in range(n_completed)
+    ]
+    # A withdrawal later retaken and passed.
+    completed.append({"course_code": "COMP 200", "course_title": "Course 0", "grade": "W",
+                      "term": "Fall", "year": 2013, "credits": 3})
+    return {
+        "user": {"id": "u1", "major": "Computer Science", "year": 3},
+        "favorites": [{"course_code": f"MATH {300 + i}", "course_title": "Topic"} for i in range(40)],
+        "completed": completed,
+        "current": [],
+        "calendar": [],
+        "joined_clubs": ["Chess Club"],
+        "created_clubs": [],
+        "version": 1,
+    }
+
+
+def test_sections_are_cut_to_budget_newest_first(fake_supabase, monkeypatch):
+    monkeypatch.setattr(settings, "PROMPT_SECTION_BUDGETS", {"completed": 100, "favorites": 60})
+    prompt_budget.reset_stats()
+
+    text = cards.build_rich_context(_ctx())
+
+    completed = text.split("COMPLETED COURSES\n")[1].split("\n\n")[0].splitlines()
+    # Newest term first; the tail is summarised, not silently dropped.
+    assert completed[0].startswith("  - COMP 259") and "Fall 2033" in completed[0]
+    assert completed[-1].startswith("  (+") and "older courses not shown" in completed[-1]
+    assert "Grade: W" not in text
+    assert estimate_tokens("\n".join(completed[:-1])) <= 100
+
+    row = prompt_budget.stats()["cards_context"]
+    assert row["renders"] == 1
+    assert row["sections"]["completed"]["budget"] == 100
+    assert row["sections"]["completed"]["truncated"] == 1
+    assert row["sections"]["favorites"]["dropped"] > 0
+    assert row["sections"]["clubs"]["dropped"] == 0
+
+
+def test_small_contexts_render_in_full(fake_supabase):
+    text = cards.build_rich_context(_ctx(n_completed=5))
+    assert "not shown" not in text
+    assert text.count("| Grade:") == 5
+
+
+def test_chat_cached_prefix_is_identical_across_turns(fake_supabase, monkeypatch):
+    monkeypatch.setattr(settings, "PROMPT_SECTION_BUDGETS", {"completed": 100})
+    ctx = _ctx()
+    user = ctx["user"]
+
+    home = chat.build_system_context_parts(user, current_tab="home", ctx=ctx)
+    planning = chat.build_system_context_parts(
+        user, current_tab="degree_planning", language="fr", card_context="Card: Prerequisite gap", ctx=ctx,
+    )
+
+    assert home[0] == planning[0]
+    assert "Prerequisite gap" in planning[1] and "Prerequisite gap" not in planning[0]
+    assert "older not shown" in home[0]
+
+    blocks = chat._system_blocks(planning, "REAL MCGILL CATALOGUE DATA ...")
+    assert [("cache_control" in b) for b in blocks] == [True, False, False]
+    assert blocks[0]["text"] == home[0]
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("COMP 250") == 2
+    assert estimate_tokens("计算机科学") == 5
@@ -0,0 +1,158 @@
+"""
+rate_limits sweeper: per-namespace retention, off the request path.
+
+The old inline prune deleted every row older than 10 minutes, which reset
+today's LLM budgets and this hour's anomaly counters along with the expired
+rate-limit minutes.
+"""
+import fnmatch
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from api.utils import rate_limit_maintenance as rlm
+
+NOW = datetime(2026, 10, 18, 15, 30, tzinfo=timezone.utc)
+
+
+class _Result:
+    def __init__(self, data=None, count=None):
+        self.data = data
+        self.count = count
+
+
+class _Query:
+    def __init__(self, rows, op):
+        self._rows = rows
+        self._op = op
+        self._filters = []
+
+    def like(self, col, pattern):
+        self._filters.append(lambda r: fnmatch.fnmatchcase(r[col], pattern.replace("%", "*")))
+        return self
+
+    def lt(self, col, val):
+        self._filters.append(lambda r: r[col] < val)
+        return self
+
+    def limit(self, _n):
+        return self
+
+    def execute(self):
+        hit = [r for r in self._rows if all(f(r) for f in self._filters)]
+        if self._op == "delete":
+            for r in hit:
+                self._rows.remove(r)
+            return _Result([], count=len(hit))
+        return _Result(hit[:1], count=len(hit))
+
+
+class _Table:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def delete(self, **_kw):
+        return _Query(self._rows, "delete")
+
+    def select(self, *_a, **_kw):
+        return _Query(self._rows, "select")
+
+
+class _NoRpcSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def rpc(self, *_a, **_k):
+        raise Exception("Could not find the function public.sweep_rate_limits")
+
+    def table(self, _name):
+        return _Table(self.rows)
+
+
+def _row(key, age):
+    return {"key": key, "window_start": (NOW - age).isoformat()}
+
+
+@pytest.fixture
+def rows(monkeypatch):
+    data = [
+        _row("ip:1.2.3.4:/api/x", timedelta(minutes=1)),       # live minute
+        _row("ip:1.2.3.4:/api/x", timedelta(minutes=30)),      # expired minute
+        _row("admin_login:__global__", timedelta(hours=1)),    # expired minute
+        _row("anomaly:forum_post:u1", timedelta(minutes=30)),  # this hour — keep
+        _row("anomaly:forum_post:u1", timedelta(hours=5)),     # expired hour
+        _row("llm_budget:chat:u1", timedelta(hours=15)),       # today — keep
+        _row("llm_budget:chat:u1", timedelta(days=3)),         # expired day
+        _row("verify_send:u1", timedelta(days=1)),             # yesterday — keep
+    ]
+    sb = _NoRpcSupabase(data)
+    monkeypatch.setattr(rlm, "get_supabase", lambda: sb)
+    return data
+
+
+def test_namespace_for_keys():
+    assert rlm.namespace_for("ip:1.2.3.4:/api/x") == "minute"
+    assert rlm.namespace_for("user:u1:/api/x") == "minute"
+    assert rlm.namespace_for("anomaly:club_join:u1") == "hour"
+    assert rlm.namespace_for("llm_budget:cards:u1") == "day"
+    assert rlm.namespace_for("something-new:x") == "minute"
+
+
+def test_each_namespace_keeps_its_live_windows(rows):
+    report = rlm.sweep_rate_limits(now=NOW)
+
+    assert sorted(r["key"] for r in rows) == [
+        "anomaly:forum_post:u1",
+        "ip:1.2.3.4:/api/x",
+        "llm_budget:chat:u1",
+        "verify_send:u1",
+    ]
+    assert report["namespaces"] == {
+        "minute": {"deleted": 2, "remaining": 1},
+        "hour":   {"deleted": 1, "remaining": 1},
+        "day":    {"deleted": 1, "remaining": 2},
+    }
+    assert report["table_rows"] == 4
+    assert report["via"] == "postgrest"
+    assert report["duration_ms"] >= 0
+
+
+def test_rpc_report_is_used_when_deployed(monkeypatch):
+    seen = {}
+
+    rows = [
+        {"namespace": "minute", "deleted": 7, "remaining": 40, "table_bytes": 81920},
+        {"namespace": "hour",   "deleted": 0, "remaining": 3,  "table_bytes": 81920},
+        {"namespace": "day",    "deleted": 2, "remaining": 9,  "table_bytes": 81920},
+    ]
+
+    class _Call:
+        def execute(self):
+            return _Result(rows)
+
+    class _Rpc:
+        def rpc(self, name, params):
+            seen["name"], seen["params"] = name, params
+            return _Call()
+
+    monkeypatch.setattr(rlm, "get_supabase", lambda: _Rpc())
+    report = rlm.sweep_rate_limits(now=NOW)
+
+    assert seen["name"] == "sweep_rate_limits"
+    assert seen["params"]["p_minute_before"] == (NOW - timedelta(minutes=10)).isoformat()
+    assert report["table_rows"] == 52
+    assert report["table_bytes"] == 81920
+    assert report["via"] == "rpc"
+
+
+def test_cron_wrapper_never_raises(monkeypatch):
+    def _down():
+        raise ConnectionError("supabase down")
+
+    monkeypatch.setattr(rlm, "get_supabase", _down)
+    assert rlm.run_rate_limit_sweep_cron() == {"deleted": 0, "error": "ConnectionError"}
+
+
+def test_rate_limiter_no_longer_deletes_on_the_request_path():
+    from api import main as app_main
+    assert not hasattr(app_main.SupabaseRateLimiter, "_prune")
@@ -0,0 +1,103 @@
+"""
+Rate-limit buckets are keyed by route template, not by concrete URL.
+
+Keying by path gave every /api/cards/{user_id}/{card_id} its own row in
+`rate_limits`, so the table (and its prune) scaled with distinct URLs. These
+pin the template keys, the tier table that replaced the substring chain, and
+that the tiers themselves didn't move.
+"""
+import pytest
+
+from api import main as app_main
+from api.config import settings
+
+
+@pytest.fixture
+def keys(client, monkeypatch):
+    """Every (key, rpm) the middleware asks the limiter about."""
+    seen = []
+
+    async def _spy(key, rpm=None):
+        seen.append((key, rpm))
+        return True
+
+    monkeypatch.setattr(app_main._limiter, "is_allowed_async", _spy)
+    return seen
+
+
+def test_ids_in_the_url_share_one_bucket(client, keys):
+    client.delete("/api/cards/u1/card-1")
+    client.delete("/api/cards/u1/card-2/")
+    client.delete("/api/cards/u2/card-3")
+
+    ip_keys = {k for k, _ in keys if k.startswith("ip:")}
+    assert ip_keys == {"ip:testclient:/api/cards/{user_id}/{card_id}"}
+
+
+def test_unroutable_paths_share_one_bucket(client, keys):
+    client.get("/api/no-such-thing/1")
+    client.get("/api/no-such-thing/2")
+    client.get("/wp-admin/setup.php")
+
+    assert {k for k, _ in keys} == {f"ip:testclient:{app_main.RouteTemplateIndex.UNMATCHED}"}
+
+
+def test_method_picks_the_route_that_will_serve_it():
+    idx = app_main._route_templates
+    assert idx.resolve("POST", "/api/cards/generate/u1") == "/api/cards/generate/{user_id}"
+    assert idx.resolve("GET", "/api/cards/u1") == "/api/cards/{user_id}"
+
+
+def test_each_template_is_compiled_once():
+    idx = app_main._route_templates
+    templates = [template for _regex, template, _methods in idx._compile()]
+    assert len(templates) == len(set(templates))
+    methods = {template: m for _regex, template, m in idx._compile()}
+    assert {"GET", "DELETE"} <= methods["/api/cards/{user_id}"]
+
+
+def test_preflight_is_keyed_by_the_route_it_announces(client, keys):
+    client.options("/api/cards/generate/u1", headers={
+        "Origin": "http://localhost:5173", "Access-Control-Request-Method": "POST",
+    })
+    assert (f"ip:testclient:/api/cards/generate/{{user_id}}", settings.CLAUDE_RATE_LIMIT_PER_MINUTE) in keys
+
+
+def test_wrong_method_is_not_keyed_by_another_route():
+    idx = app_main._route_templates
+    assert idx.resolve("PUT", "/api/cards/generate/u1") == idx.METHOD_NOT_ALLOWED
+    assert idx.resolve("OPTIONS", "/api/cards/u1") == idx.METHOD_NOT_ALLOWED
+
+
+@pytest.mark.parametrize("method,path,rpm", [
+    ("POST", "/api/chat/send",               settings.CHAT_RATE_LIMIT_PER_MINUTE),
+    ("POST", "/api/cards/generate/u1",       settings.CLAUDE_RATE_LIMIT_PER_MINUTE),
+    ("POST", "/api/cards/stream/u1",         settings.CLAUDE_RATE_LIMIT_PER_MINUTE),
+    ("POST", "/api/transcript/parse/u1",     settings.CLAUDE_RATE_LIMIT_PER_MINUTE),
+    ("GET",  "/api/cards/u1",                settings.RATE_LIMIT_PER_MINUTE),
+    ("GET",  "/api/health",                  settings.RATE_LIMIT_PER_MINUTE),
+])
+def test_tiers_unchanged_from_the_substring_chain(method, path, rpm):
+    idx = app_main._route_templates
+    assert app_main._tier_rpm(idx.tier(idx.resolve(method, path))) == rpm
+
+
+def test_inngest_is_exempt(client, keys):
+    client.put("/api/inngest")
+    assert keys == []
+
+
+def test_tier_table_is_configurable(monkeypatch):
+    idx = app_main.RouteTemplateIndex(app_main.app, [])
+    monkeypatch.setattr(settings, "RATE_LIMIT_ROUTE_TIERS", {"/courses": "claude", "/courses/search": "default"})
+
+    assert idx.tier("/api/courses/{course_id}") == "claude"
+    # Longest prefix wins, on whole segments only.
+    assert idx.tier("/api/courses/search") == "default"
+    assert idx.tier("/api/courses-archive") == "default"
+
+
+def test_unknown_tier_is_rejected_at_startup():
+    from api.config import Settings
+    with pytest.raises(ValueError):
+        Settings(RATE_LIMIT_ROUTE_TIERS={"/chat": "free-for-all"})
@@ -0,0 +1,136 @@
+"""
+The rate-limit middleware runs on the event loop, so its Supabase calls must
+never block it.
+
+is_allowed() goes through with_retry(), whose time.sleep backoff froze every
+concurrent request on the instance for up to ~0.9s during a Supabase blip.
+is_allowed_async() awaits the async client, backs off with asyncio.sleep and
+gives up at _DEADLINE, after which the in-memory fallback decides.
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from api import main as app_main
+from api.utils import supabase_client as sc
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _AsyncRpc:
+    def __init__(self, fn):
+        self._fn = fn
+
+    async def execute(self):
+        return _Result(await self._fn())
+
+
+class _SlowAsyncSupabase:
+    """Every RPC takes `delay` seconds — a degraded Supabase."""
+
+    def __init__(self, delay, data=1):
+        self.delay = delay
+        self.data = data
+        self.calls = 0
+
+    def rpc(self, _name, params):
+        async def _run():
+            self.calls += 1
+            await asyncio.sleep(self.delay)
+            if callable(self.data):
+                return self.data(params)
+            return self.data
+        return _AsyncRpc(_run)
+
+
+class _FlakyAsyncSupabase:
+    def __init__(self, fail_times):
+        self.remaining = fail_times
+        self.calls = 0
+
+    def rpc(self, _name, _params):
+        async def _run():
+            self.calls += 1
+            if self.remaining:
+                self.remaining -= 1
+                raise httpx.ConnectError("connection refused")
+            return 1
+        return _AsyncRpc(_run)
+
+
+def _use(limiter, monkeypatch, fake):
+    async def _get():
+        return fake
+    monkeypatch.setattr(limiter, "_get_async_supabase", _get)
+
+
+@pytest.fixture(autouse=True)
+def _no_blocking_sleep(monkeypatch):
+    """Any time.sleep on the async path is exactly the bug being fixed."""
+    def _boom(_s):
+        raise AssertionError("time.sleep called on the event loop")
+    monkeypatch.setattr(sc.time, "sleep", _boom)
+
+
+def test_retry_backs_off_without_blocking_the_loop(monkeypatch):
+    limiter = app_main.SupabaseRateLimiter(default_rpm=100)
+    fake = _FlakyAsyncSupabase(fail_times=1)
+    _use(limiter, monkeypatch, fake)
+    monkeypatch.setattr(sc, "RETRY_BACKOFF", 0.01)
+
+    assert asyncio.run(limiter.is_allowed_async("k")) is True
+    assert fake.calls == 2
+
+
+def test_deadline_degrades_to_the_in_memory_fallback(monkeypatch):
+    limiter = app_main.SupabaseRateLimiter(default_rpm=100)
+    _use(limiter, monkeypatch, _SlowAsyncSupabase(delay=5))
+    monkeypatch.setattr(limiter, "_DEADLINE", 0.05)
+    monkeypatch.setattr(limiter, "_fallback_is_allowed", lambda key: "FALLBACK")
+
+    started = time.monotonic()
+    assert asyncio.run(limiter.is_allowed_async("k")) == "FALLBACK"
+    assert time.monotonic() - started < 1
+
+
+def test_slow_db_call_does_not_stall_other_requests(monkeypatch):
+    """While one request waits on a slow Supabase, the loop keeps serving."""
+    limiter = app_main.SupabaseRateLimiter(default_rpm=100)
+    _use(limiter, monkeypatch, _SlowAsyncSupabase(delay=0.2))
+
+    async def _scenario():
+        ticks = 0
+
+        async def _other_request():
+            nonlocal ticks
+            for _ in range(10):
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        await asyncio.gather(limiter.is_allowed_async("k"), _other_request())
+        return ticks
+
+    assert asyncio.run(_scenario()) == 10
+
+
+def test_concurrent_requests_on_a_dry_bucket_share_one_reservation(monkeypatch):
+    limiter = app_main.HybridRateLimiter(default_rpm=100)
+
+    def _grant(params):
+        return [{"key": k, "granted": n, "count": n}
+                for k, n in zip(params["p_keys"], params["p_counts"])]
+
+    fake = _SlowAsyncSupabase(delay=0.05, data=_grant)
+    _use(limiter, monkeypatch, fake)
+    monkeypatch.setattr(limiter, "_FLUSH_INTERVAL", 3600)
+
+    async def _burst():
+        return await asyncio.gather(*(limiter.is_allowed_async("ip:x:/api/y", 100) for _ in range(3)))
+
+    assert asyncio.run(_burst()) == [True, True, True]
+    assert fake.calls == 1, "the initial lease covers the burst — one RPC, not three"
@@ -0,0 +1,208 @@
+"""
+Two-tier rate limiter: in-process token leases decide most requests, and the
+shared `rate_limits` table tops them up with one bulk RPC per flush.
+
+These pin the properties the per-request limiter gave us for free and the
+hybrid one has to keep on purpose: the global cap still holds when several
+instances share a key, and a DB outage still lands on the 3 rpm fallback.
+"""
+import httpx
+import pytest
+
+from api import main as app_main
+from api.utils import supabase_client as sc
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _SharedPostgres:
+    """The `rate_limits` table as every instance sees it."""
+
+    def __init__(self):
+        self.counts = {}
+        self.bulk_calls = 0
+        self.single_calls = 0
+
+
+class _FakeSupabase:
+    def __init__(self, db, fail=None):
+        self._db = db
+        self._fail = fail
+
+    def rpc(self, name, params):
+        if self._fail is not None:
+            raise self._fail
+        db = self._db
+        if name == "reserve_rate_limits":
+            # Mirrors migrations/2026_10_18_rate_limits_reserve.sql.
+            db.bulk_calls += 1
+            rows = []
+            for key, want, cap in zip(params["p_keys"], params["p_counts"], params["p_caps"]):
+                k = (key, params["p_window"])
+                current = db.counts.get(k, 0)
+                granted = max(0, min(want, cap - current))
+                db.counts[k] = current + granted
+                rows.append({"key": key, "granted": granted, "count": db.counts[k]})
+            return _Call(rows)
+        if name == "increment_rate_limit":
+            db.single_calls += 1
+            k = (params["p_key"], params["p_window"])
+            db.counts[k] = db.counts.get(k, 0) + 1
+            return _Call(db.counts[k])
+        raise AssertionError(f"unexpected rpc {name}")
+
+    def table(self, _name):
+        return _NoopTable()
+
+
+class _Call:
+    def __init__(self, data):
+        self._data = data
+
+    def execute(self):
+        return _Result(self._data)
+
+
+class _NoopTable:
+    def delete(self):
+        return self
+
+    def lt(self, *_a):
+        return self
+
+    def execute(self):
+        return _Result([])
+
+
+@pytest.fixture(autouse=True)
+def _no_sleep(monkeypatch):
+    monkeypatch.setattr(sc, "RETRY_BACKOFF", 0)
+
+
+def _instance(db, monkeypatch, **fake_kwargs):
+    limiter = app_main.HybridRateLimiter(default_rpm=100)
+    fake = _FakeSupabase(db, **fake_kwargs)
+    monkeypatch.setattr(limiter, "_get_supabase", lambda: fake)
+    # Make flushes happen only when a test asks for them.
+    monkeypatch.setattr(limiter, "_FLUSH_INTERVAL", 3600)
+    return limiter
+
+
+def test_steady_traffic_mostly_skips_the_database(monkeypatch):
+    db = _SharedPostgres()
+    limiter = _instance(db, monkeypatch)
+
+    for i in range(60):
+        assert limiter.is_allowed("ip:1.2.3.4:/api/courses", rpm=100) is True
+        if i % 10 == 9:
+            limiter.flush()
+
+    # One reservation per flush plus the odd dry-bucket top-up — nowhere
+    # near one round-trip per request.
+    assert db.bulk_calls < 20
+    assert db.single_calls == 0
+
+
+def test_one_flush_tops_up_every_key_in_a_single_rpc(monkeypatch):
+    db = _SharedPostgres()
+    limiter = _instance(db, monkeypatch)
+
+    for _ in range(3):
+        limiter.is_allowed("ip:a:/api/x", rpm=100)
+        limiter.is_allowed("user:b:/api/x", rpm=100)
+    calls_before = db.bulk_calls
+    limiter.flush()
+
+    assert db.bulk_calls == calls_before + 1
+    assert limiter._buckets["ip:a:/api/x"]["tokens"] > 0
+    assert limiter._buckets["user:b:/api/x"]["tokens"] > 0
+
+
+def test_global_cap_holds_across_instances(monkeypatch):
+    """Three instances sharing one key must not admit more than the limit
+    between them, however their requests and flushes interleave."""
+    db = _SharedPostgres()
+    instances = [_instance(db, monkeypatch) for _ in range(3)]
+
+    admitted = 0
+    for i in range(300):
+        if instances[i % 3].is_allowed("ip:shared:/api/x", rpm=20):
+            admitted += 1
+        if i % 7 == 6:
+            for inst in instances:
+                inst.flush()
+
+    # Parent semantics: allowed while the count after the request is < rpm.
+    assert admitted <= 19
+    assert admitted >= 15, "leases shouldn't strand most of the budget"
+
+
+def test_missing_rpc_falls_back_to_the_per_request_path(monkeypatch):
+    db = _SharedPostgres()
+    limiter = _instance(db, monkeypatch)
+
+    class _NoBulk(_FakeSupabase):
+        def rpc(self, name, params):
+            if name == "reserve_rate_limits":
+                raise Exception("Could not find the function public.reserve_rate_limits")
+            return super().rpc(name, params)
+
+    fake = _NoBulk(db)
+    monkeypatch.setattr(limiter, "_get_supabase", lambda: fake)
+
+    assert limiter.is_allowed("k", rpm=100) is True
+    assert limiter.is_allowed("k", rpm=100) is True
+    assert db.single_calls == 2
+
+
+def test_outage_still_degrades_to_the_in_memory_fallback(monkeypatch):
+    db = _SharedPostgres()
+    limiter = _instance(db, monkeypatch, fail=httpx.ConnectError("connection refused"))
+    monkeypatch.setattr(limiter, "_fallback_is_allowed", lambda key: "FALLBACK")
+
+    assert limiter.is_allowed("k", rpm=100) == "FALLBACK"
+    assert limiter._sync_healthy is False
+    # Still degraded on the next request — no local tokens were handed out.
+    assert limiter.is_allowed("k", rpm=100) == "FALLBACK"
+
+
+def test_open_breaker_counts_as_an_outage_not_a_missing_rpc(monkeypatch):
+    from api.exceptions import DatabaseUnavailableException
+
+    db = _SharedPostgres()
+    limiter = _instance(db, monkeypatch, fail=DatabaseUnavailableException("rate_limiter", 5))
+    monkeypatch.setattr(limiter, "_fallback_is_allowed", lambda key: "FALLBACK")
+
+    assert limiter.is_allowed("k", rpm=100) == "FALLBACK"
+    assert limiter._sync_healthy is False
+    assert limiter._bulk_disabled_until == 0
+
+
+def test_open_breaker_on_the_async_path_skips_the_sync_fallback(monkeypatch):
+    import asyncio
+    from api.exceptions import DatabaseUnavailableException
+
+    limiter = app_main.HybridRateLimiter(default_rpm=100)
+
+    class _Open:
+        def rpc(self, _name, _params):
+            class _Call:
+                async def execute(self):
+                    raise DatabaseUnavailableException("rate_limiter", 5)
+            return _Call()
+
+    async def _get():
+        return _Open()
+    monkeypatch.setattr(limiter, "_get_async_supabase", _get)
+    monkeypatch.setattr(limiter, "_fallback_is_allowed", lambda key: "FALLBACK")
+
+    def _sync_path(*_a, **_kw):
+        raise AssertionError("sync per-request path used during an outage")
+    monkeypatch.setattr(app_main.SupabaseRateLimiter, "is_allowed", _sync_path)
+
+    assert asyncio.run(limiter.is_allowed_async("k", rpm=100)) == "FALLBACK"
+    assert limiter._sync_healthy is False
+    assert limiter._bulk_disabled_until == 0
@@ -160,7 +160,6 @@ class TestRpcMissingStillFallsBackToManualReadWrite:
                 return _FakeQuery(store)
 
         monkeypatch.setattr(limiter, "_get_supabase", lambda: _NoRpcSupabase())
-        monkeypatch.setattr(limiter, "_prune", lambda supabase: None)
 
         assert limiter.is_allowed("diagnostic-probe", rpm=100) is True
         assert store[("diagnostic-probe", limiter._window_start())]["count"] == 1
@@ -0,0 +1,90 @@
+"""
+Shared student-context cache: chat and cards read one entry per user, writes
+to the underlying tables drop it, and a build that raced an invalidation is
+not cached.
+"""
+import asyncio
+
+from api.utils import student_context
+from api.utils.cache import BoundedCache
+from tests.conftest import auth
+
+
+def _seed(fake_supabase, uid="u1"):
+    fake_supabase.set_table("users", [{"id": uid, "email": "tester@mail.mcgill.ca", "major": "Computer Science"}])
+    fake_supabase.set_table("favorites", [{"user_id": uid, "course_code": "COMP 202", "course_title": "Foundations"}])
+    fake_supabase.set_table("completed_courses", [{"user_id": uid, "course_code": "MATH 140", "credits": 3}])
+
+
+def _count_tables(fake_supabase, monkeypatch):
+    seen = []
+    real = fake_supabase.table
+
+    def _table(name):
+        seen.append(name)
+        return real(name)
+    monkeypatch.setattr(fake_supabase, "table", _table)
+    return seen
+
+
+def test_chat_and_cards_share_one_fetch(fake_supabase, monkeypatch):
+    from api.routes import cards, chat
+
+    _seed(fake_supabase)
+    seen = _count_tables(fake_supabase, monkeypatch)
+
+    card_ctx = cards.fetch_student_context("u1")
+    first = seen.count("favorites")
+    prompt = chat.build_system_context(card_ctx["user"])
+    again = asyncio.run(cards._fetch_student_context_parallel("u1"))
+
+    assert first == 1
+    assert seen.count("favorites") == 1
+    assert "COMP 202" in prompt
+    assert again["favorites"] == card_ctx["favorites"]
+
+
+def test_favorite_write_invalidates(client, fake_supabase):
+    _seed(fake_supabase)
+    invalidations = student_context.stats()["invalidations"]
+    before = student_context.get("u1")
+    assert [f["course_code"] for f in before["favorites"]] == ["COMP 202"]
+
+    resp = client.post(
+        "/api/favorites/u1",
+        json={"course_code": "COMP 250", "course_title": "Intro to CS", "subject": "COMP", "catalog": "250"},
+        headers=auth("u1"),
+    )
+    assert resp.status_code == 200
+
+    after = student_context.get("u1")
+    assert "COMP 250" in [f["course_code"] for f in after["favorites"]]
+    assert after["version"] > before["version"]
+    assert student_context.stats()["invalidations"] == invalidations + 1
+
+
+def test_build_that_raced_an_invalidation_is_not_cached(fake_supabase, monkeypatch):
+    _seed(fake_supabase)
+    real = fake_supabase.table
+
+    def _table(name):
+        if name == "favorites":
+            # A write lands (and invalidates) while this read is in flight.
+            student_context.invalidate("u1")
+        return real(name)
+    monkeypatch.setattr(fake_supabase, "table", _table)
+
+    discarded = student_context.stats()["discarded_builds"]
+    stale = student_context.get("u1")
+    assert stale["favorites"]
+    assert student_context.stats()["discarded_builds"] == discarded + 1
+    assert student_context._cache.get(student_context._key("u1")) is None
+
+
+def test_cache_is_bounded(fake_supabase, monkeypatch):
+    monkeypatch.setattr(student_context, "_cache", BoundedCache(default_ttl=300, max_entries=2))
+    for uid in ("u1", "u2", "u3"):
+        _seed(fake_supabase, uid)
+        student_context.get(uid)
+    assert student_context.stats()["size"] == 2
+    assert student_context._cache.get(student_context._key("u1")) is None
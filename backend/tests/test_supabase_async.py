@@ -0,0 +1,102 @@
+"""
+Async data layer (#17): *_async() helpers mirror the sync ones and don't
+block the event loop, so concurrent requests overlap their DB I/O.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from api.exceptions import UserNotFoundException
+from api.utils import supabase_client as sc
+from tests.conftest import auth
+
+
+def test_save_then_read_matches_sync_helpers(fake_supabase):
+    fake_supabase.set_table("chat_messages", [])
+
+    async def _go():
+        await sc.save_message_async("u1", "user", "hello", "s1")
+        await sc.save_message_async("u1", "assistant", "hi!", "s1")
+        return await sc.get_chat_history_async("u1", session_id="s1")
+
+    history = asyncio.run(_go())
+    assert [m["content"] for m in history] == ["hello", "hi!"]
+    assert history == sc.get_chat_history("u1", session_id="s1")
+
+
+def test_get_user_by_id_async_strips_tokens_and_raises_not_found(fake_supabase):
+    fake_supabase.set_table("users", [{"id": "u1", "username": "a", "verification_token": "h"}])
+
+    user = asyncio.run(sc.get_user_by_id_async("u1"))
+    assert user == {"id": "u1", "username": "a"}
+
+    with pytest.raises(UserNotFoundException):
+        asyncio.run(sc.get_user_by_id_async("missing"))
+
+
+def test_retries_on_disconnect_without_sleeping_the_loop(monkeypatch):
+    calls = {"n": 0}
+
+    class _Query:
+        def select(self, *_a): return self
+        def eq(self, *_a): return self
+        def order(self, *_a, **_k): return self
+        def limit(self, *_a): return self
+
+        async def execute(self):
+            calls["n"] += 1
+            if calls["n"] == 1:
+                raise Exception("Server disconnected without sending a response")
+            return SimpleNamespace(data=[{"content": "ok"}])
+
+    async def _client():
+        return SimpleNamespace(table=lambda _n: _Query())
+
+    async def _no_sleep(_s):
+        return None
+
+    monkeypatch.setattr(sc, "get_async_supabase", _client)
+    monkeypatch.setattr(sc.asyncio, "sleep", _no_sleep)
+    monkeypatch.setattr(sc.time, "sleep", lambda _s: pytest.fail("blocking sleep on the event loop"))
+
+    assert asyncio.run(sc.get_chat_history_async("u1")) == [{"content": "ok"}]
+    assert calls["n"] == 2
+
+
+def test_concurrent_queries_overlap(monkeypatch):
+    class _SlowQuery:
+        def select(self, *_a): return self
+        def eq(self, *_a): return self
+        def order(self, *_a, **_k): return self
+        def limit(self, *_a): return self
+
+        async def execute(self):
+            await asyncio.sleep(0.05)  # one PostgREST round-trip
+            return SimpleNamespace(data=[])
+
+    async def _client():
+        return SimpleNamespace(table=lambda _n: _SlowQuery())
+
+    monkeypatch.setattr(sc, "get_async_supabase", _client)
+
+    async def _go():
+        start = time.perf_counter()
+        await asyncio.gather(*(sc.get_chat_history_async(f"u{i}") for i in range(10)))
+        return time.perf_counter() - start
+
+    # Ten 50 ms queries back to back would take 0.5 s.
+    assert asyncio.run(_go()) < 0.25
+
+
+def test_chat_history_route_uses_async_layer(client, fake_supabase, monkeypatch):
+    fake_supabase.set_table("users", [{"id": "u1"}])
+    fake_supabase.set_table("chat_messages", [
+        {"id": "m1", "user_id": "u1", "session_id": "s1", "role": "user", "content": "hey"},
+    ])
+    monkeypatch.setattr(sc, "get_supabase", lambda: pytest.fail("sync client on an async route"))
+
+    resp = client.get("/api/chat/history/u1?session_id=s1", headers=auth("u1"))
+    assert resp.status_code == 200
+    assert [m["content"] for m in resp.json()["messages"]] == ["hey"]
@@ -0,0 +1,138 @@
+"""
+Stale-while-revalidate loading of term offerings: stale values are served
+while one background refresh runs, cold loads coalesce, and a snapshot from
+import_sections.py seeds a cold instance so no request waits on the scan.
+"""
+import threading
+import time
+
+import pytest
+
+from api.utils import term_offerings
+from api.utils.swr import SWRLoader
+from tests.conftest import auth
+
+
+class _Loader:
+    def __init__(self):
+        self.calls = 0
+        self.gate = threading.Event()
+        self.gate.set()
+        self.fail = False
+
+    def __call__(self):
+        self.calls += 1
+        self.gate.wait(2)
+        if self.fail:
+            raise RuntimeError("scan failed")
+        return f"v{self.calls}"
+
+
+@pytest.fixture
+def clock():
+    return {"t": 1_000_000.0}
+
+
+def _swr(loader, clock, **kw):
+    swr = SWRLoader("test", loader, fresh_seconds=100, **kw)
+    swr._clock = lambda: clock["t"]
+    return swr
+
+
+def test_serves_stale_while_one_refresh_runs(clock):
+    loader = _Loader()
+    swr = _swr(loader, clock)
+    assert swr.get() == "v1"
+
+    clock["t"] += 101
+    loader.gate.clear()
+    assert swr.get() == "v1"  # stale, refresh started
+    assert swr.get() == "v1"  # no second refresh while the first runs
+    loader.gate.set()
+    swr.wait(2)
+
+    assert loader.calls == 2
+    assert swr.get() == "v2"
+    stats = swr.stats()
+    assert (stats["source"], stats["refreshes"], stats["stale_hits"]) == ("refresh", 1, 2)
+
+
+def test_failed_refresh_keeps_stale_and_backs_off(clock):
+    loader = _Loader()
+    swr = _swr(loader, clock, retry_seconds=60)
+    swr.get()
+
+    clock["t"] += 101
+    loader.fail = True
+    assert swr.get() == "v1"
+    swr.wait(2)
+    assert swr.get() == "v1"
+    swr.wait(2)
+    assert loader.calls == 2  # backing off, no retry yet
+
+    clock["t"] += 61
+    loader.fail = False
+    swr.get()
+    swr.wait(2)
+    assert swr.get() == "v3"
+    assert swr.stats()["refresh_errors"] == 1
+
+
+def test_concurrent_cold_callers_share_one_load(clock):
+    loader = _Loader()
+    loader.gate.clear()
+    swr = _swr(loader, clock)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(swr.get())) for _ in range(5)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    loader.gate.set()
+    for t in threads:
+        t.join(2)
+    assert results == ["v1"] * 5
+    assert loader.calls == 1
+
+
+def test_seed_is_served_without_loading(clock):
+    loader = _Loader()
+    swr = _swr(loader, clock, seed=lambda: ("snapshot", clock["t"] - 10))
+    assert swr.get() == "snapshot"
+    assert loader.calls == 0
+    assert swr.stats()["source"] == "seed"
+
+
+def test_snapshot_round_trip(tmp_path):
+    result = term_offerings.aggregate([
+        {"term": "Fall 2026", "course_code": "COMP 202", "instructor": "Jane Doe"},
+        {"term": "Fall 2026", "course_code": "COMP 202", "instructor": "Jane Doe"},
+        {"term": "Fall 2026", "course_code": "COMP 202", "instructor": "Alan Weeks"},
+        {"term": "Winter 2027", "course_code": "MATH 240", "instructor": None},
+        {"term": None, "course_code": "PHYS 101"},
+    ])
+    path = term_offerings.write_snapshot(result, tmp_path / "term_offerings.json")
+    loaded, built_at = term_offerings.read_snapshot(path)
+    assert loaded == result
+    assert loaded[2] == {"Fall 2026": {"COMP202": "Jane Doe"}}
+    assert abs(built_at - time.time()) < 60
+
+    assert term_offerings.read_snapshot(tmp_path / "missing.json") is None
+    (tmp_path / "bad.json").write_text("{not json")
+    assert term_offerings.read_snapshot(tmp_path / "bad.json") is None
+
+
+def test_search_by_term_uses_the_snapshot(client, fake_supabase, monkeypatch):
+    from api.routes import courses
+
+    snapshot = ({"Fall 2026"}, {"Fall 2026": {"COMP202"}}, {"Fall 2026": {"COMP202": "Jane Doe"}})
+    swr = SWRLoader("term_offerings", courses._fetch_term_offerings, fresh_seconds=21600,
+                    seed=lambda: (snapshot, time.time() - 60))
+    monkeypatch.setattr(courses, "_term_offerings", swr)
+
+    scans = []
+    monkeypatch.setattr(term_offerings, "scan", lambda sb: scans.append(1))
+
+    resp = client.get("/api/courses/terms", headers=auth("u1"))
+    assert resp.status_code == 200
+    assert resp.json()["terms"] == ["Fall 2026"]
+    assert scans == []
@@ -0,0 +1,157 @@
+"""
+Retranslate translates the cards a student has, through a translation memory
+keyed by (sha256(text), language): reminder cards shared by every student are
+translated once, and only strings nobody has translated reach Claude — all of
+them in one call.
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from postgrest import APIError
+
+from api.routes import cards
+from api.utils import translation_memory as tm
+from api.utils.cache import BoundedCache
+from tests.conftest import auth
+
+REMINDER = {
+    "source": "system", "label": "TRANSCRIPT UPDATE", "title": "Re-upload your transcript",
+    "body": "Final grades are posted.", "card_type": "urgent", "icon": "📄",
+    "actions": json.dumps([{"type": "open_transcript_upload", "label": "Upload transcript"},
+                           "What gets updated when I re-upload?"]),
+}
+
+
+def _ai(user_id, title):
+    return {"source": "ai", "label": "PLANNING", "title": title, "body": f"{title} body",
+            "card_type": "insight", "icon": "💡", "actions": json.dumps([f"Why {title}?"])}
+
+
+@pytest.fixture
+def llm_calls(fake_supabase, monkeypatch):
+    monkeypatch.setattr(tm, "translation_cache", BoundedCache(default_ttl=3600))
+    monkeypatch.setattr(tm, "_table_disabled_until", 0.0)
+    calls = []
+
+    async def _create(feature, **kwargs):
+        texts = json.loads(kwargs["messages"][0]["content"].split("\n\n", 1)[1])
+        calls.append(texts)
+        return SimpleNamespace(content=[SimpleNamespace(text=json.dumps([f"FR {t}" for t in texts]))])
+    monkeypatch.setattr(tm.llm, "create", _create)
+
+    rows = []
+    for uid in ("u1", "u2"):
+        rows.append({"id": f"{uid}-reminder", "user_id": uid, **REMINDER})
+        rows.append({"id": f"{uid}-ai", "user_id": uid, **_ai(uid, f"Plan {uid}")})
+    rows.append({"id": "u1-asked", "user_id": "u1", "source": "user", "title": "My question",
+                 "body": "Answer", "actions": "[]", "label": "YOUR QUESTION"})
+    fake_supabase.set_table("advisor_cards", rows)
+    fake_supabase.set_table("users", [{"id": "u1", "email": "a@mail.mcgill.ca"},
+                                      {"id": "u2", "email": "b@mail.mcgill.ca"}])
+    return calls
+
+
+def _card(fake_supabase, card_id):
+    return next(r for r in fake_supabase._tables["advisor_cards"] if r["id"] == card_id)
+
+
+def test_shared_reminder_translated_once_across_students(client, fake_supabase, llm_calls):
+    r = client.post("/api/cards/retranslate/u1", json={"language": "fr"}, headers=auth("u1"))
+    assert r.status_code == 200, r.text
+    assert len(llm_calls) == 1 and "Re-upload your transcript" in llm_calls[0]
+
+    reminder = _card(fake_supabase, "u1-reminder")
+    assert reminder["title"] == "FR Re-upload your transcript"
+    assert reminder["label"] == "TRANSCRIPT UPDATE"  # the broadcast's dedupe key
+    actions = reminder["actions"]   # decoded in place by the cards response
+    assert (json.loads(actions) if isinstance(actions, str) else actions) == [
+        {"type": "open_transcript_upload", "label": "FR Upload transcript"},
+        "FR What gets updated when I re-upload?",
+    ]
+    assert _card(fake_supabase, "u1-ai")["body"] == "FR Plan u1 body"
+    assert _card(fake_supabase, "u1-asked")["title"] == "My question"
+
+    r = client.post("/api/cards/retranslate/u2", json={"language": "fr"}, headers=auth("u2"))
+    assert r.status_code == 200, r.text
+    # The reminder was remembered; u2's own AI card text is always sent.
+    assert llm_calls[1] == ["PLANNING", "Plan u2", "Plan u2 body", "Why Plan u2?"]
+    assert _card(fake_supabase, "u2-reminder")["title"] == "FR Re-upload your transcript"
+    assert _card(fake_supabase, "u2-ai")["body"] == "FR Plan u2 body"
+
+
+def test_cards_replaced_during_the_call_are_not_brought_back(client, fake_supabase, llm_calls, monkeypatch):
+    create = tm.llm.create
+
+    async def _replaced_meanwhile(feature, **kwargs):
+        table = fake_supabase._tables["advisor_cards"]
+        table[:] = [r for r in table if r["id"] != "u1-ai"]
+        table.append({"id": "u1-new", "user_id": "u1", **_ai("u1", "Fresh plan")})
+        _card(fake_supabase, "u1-reminder")["is_saved"] = True
+        return await create(feature, **kwargs)
+    monkeypatch.setattr(tm.llm, "create", _replaced_meanwhile)
+
+    r = client.post("/api/cards/retranslate/u1", json={"language": "fr"}, headers=auth("u1"))
+    assert r.status_code == 200, r.text
+    ids = [row["id"] for row in fake_supabase._tables["advisor_cards"] if row["user_id"] == "u1"]
+    assert "u1-ai" not in ids and "u1-new" in ids
+    reminder = _card(fake_supabase, "u1-reminder")
+    assert reminder["title"] == "FR Re-upload your transcript"
+    assert reminder["is_saved"] is True
+
+
+def test_personal_card_text_is_never_remembered(client, fake_supabase, llm_calls):
+    r = client.post("/api/cards/retranslate/u1", json={"language": "fr"}, headers=auth("u1"))
+    assert r.status_code == 200, r.text
+
+    stored = {row["source_text"] for row in fake_supabase._tables["translation_memory"]}
+    assert "Re-upload your transcript" in stored
+    assert not stored & {"PLANNING", "Plan u1", "Plan u1 body", "Why Plan u1?"}
+    assert tm.lookup(["Plan u1 body"], "fr") == {}
+
+
+def test_table_answers_after_a_cold_start(fake_supabase, llm_calls, monkeypatch):
+    asyncio.run(tm.translate(["Re-upload your transcript"], "fr"))
+    assert fake_supabase._tables["translation_memory"][0]["source_hash"] == tm.source_hash("Re-upload your transcript")
+
+    monkeypatch.setattr(tm, "translation_cache", BoundedCache(default_ttl=3600))
+    out = asyncio.run(tm.translate(["Re-upload your transcript", "Re-upload your transcript"], "fr"))
+    assert out == {"Re-upload your transcript": "FR Re-upload your transcript"}
+    assert len(llm_calls) == 1
+
+
+def test_missing_table_falls_back_to_the_lru(fake_supabase, llm_calls, monkeypatch):
+    def _missing(name):
+        raise APIError({"code": "PGRST205", "message": "Could not find the table"})
+    monkeypatch.setattr(fake_supabase, "table", _missing)
+
+    assert asyncio.run(tm.translate(["Hello"], "zh")) == {"Hello": "FR Hello"}
+    assert tm._table_disabled_until > 0
+    assert asyncio.run(tm.translate(["Hello"], "zh")) == {"Hello": "FR Hello"}
+    assert len(llm_calls) == 1
+
+
+def test_unusable_reply_is_not_remembered(fake_supabase, llm_calls, monkeypatch):
+    async def _short(feature, **kwargs):
+        return SimpleNamespace(content=[SimpleNamespace(text='["only one"]')])
+    monkeypatch.setattr(tm.llm, "create", _short)
+
+    with pytest.raises(ValueError):
+        asyncio.run(tm.translate(["One", "Two"], "fr"))
+    assert tm.lookup(["One", "Two"], "fr") == {}
+
+
+def test_translated_reminder_is_not_broadcast_again(client, fake_supabase, llm_calls, monkeypatch):
+    from datetime import date
+    from api.utils import broadcast
+
+    monkeypatch.setattr(broadcast, "_rpc_disabled_until", float("inf"))
+    spec = cards.broadcast_spec("transcript_reminder", date(2027, 1, 10))
+    for row in fake_supabase._tables["advisor_cards"]:
+        if row["source"] == "system":
+            row["generated_at"] = spec["since"] + "T08:00:00+00:00"
+
+    r = client.post("/api/cards/retranslate/u1", json={"language": "fr"}, headers=auth("u1"))
+    assert r.status_code == 200, r.text
+    assert broadcast.run_broadcast(spec)["sent"] == 0
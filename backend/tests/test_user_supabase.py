@@ -0,0 +1,49 @@
+"""
+User-scoped clients share one transport but never each other's identity.
+
+get_user_supabase() used to build a full client (and a new httpx pool) per
+request. The pooled version must still send every request as the user whose
+JWT it was built with — that header is what RLS keys on.
+"""
+import httpx
+import pytest
+
+from api.utils import supabase_client as sc
+
+
+@pytest.fixture
+def seen(monkeypatch):
+    requests = []
+
+    def _handler(req):
+        requests.append(req)
+        return httpx.Response(200, json=[])
+
+    shared = httpx.Client(transport=httpx.MockTransport(_handler), http2=False)
+    monkeypatch.setattr(sc, "_user_http", shared)
+    return requests
+
+
+def test_each_client_sends_its_own_jwt_over_the_shared_transport(seen):
+    alice = sc.get_user_supabase("jwt-alice")
+    bob = sc.get_user_supabase("jwt-bob")
+
+    alice.table("users").select("id").execute()
+    bob.table("users").select("id").execute()
+    alice.rpc("increment_thing", {"x": 1}).execute()
+
+    assert [r.headers["authorization"] for r in seen] == [
+        "Bearer jwt-alice", "Bearer jwt-bob", "Bearer jwt-alice",
+    ]
+    assert all(r.headers["apikey"] for r in seen)
+    assert alice.postgrest.session is bob.postgrest.session
+
+
+def test_shared_transport_carries_no_identity_of_its_own(monkeypatch):
+    monkeypatch.setattr(sc, "_user_http", None)
+    shared = sc._get_user_http()
+    try:
+        assert "authorization" not in shared.headers
+        assert sc._get_user_http() is shared
+    finally:
+        shared.close()
@@ -237,12 +237,32 @@ export default function RightSidebar({
     if (!user?.id) return
     setNavMessages(prev => [...prev, { role: 'user', content: text }])
     setNavThinking(true)
+    // The reply streams in: the thinking indicator is swapped for an
+    // assistant bubble on the first delta, which then grows in place.
+    const replyId = `reply-${Date.now()}`
+    const appendDelta = (chunk) => {
+      setNavMessages(prev => {
+        const i = prev.findIndex(m => m.id === replyId)
+        if (i === -1) return [...prev, { id: replyId, role: 'assistant', content: chunk }]
+        const next = prev.slice()
+        next[i] = { ...prev[i], content: prev[i].content + chunk }
+        return next
+      })
+      setNavThinking(false)
+    }
+    const showError = () => {
+      setNavMessages(prev => prev.some(m => m.id === replyId)
+        ? prev
+        : [...prev, { id: replyId, role: 'assistant', content: t('rsb.errorMsg') }])
+    }
     try {
-      const res = await chatAPI.sendMessage(user.id, text, navSessionId, activeTab, degreeProgressRef?.current)
-      if (!navSessionId && res.session_id) setNavSessionId(res.session_id)
-      setNavMessages(prev => [...prev, { role: 'assistant', content: res.response }])
+      await chatAPI.sendMessageStream(user.id, text, navSessionId, activeTab, {
+        onStart: (ev) => { if (!navSessionId && ev.session_id) setNavSessionId(ev.session_id) },
+        onDelta: appendDelta,
+        onError: showError,
+      })
     } catch {
-      setNavMessages(prev => [...prev, { role: 'assistant', content: t('rsb.errorMsg') }])
+      showError()
     } finally {
       setNavThinking(false)
     }
@@ -130,6 +130,9 @@ export const chatAPI = {
         current_tab: currentTab,
         language,
         degree_progress: degreeProgress || undefined,
+        // One per send; replays of this request (e.g. after a token refresh)
+        // reuse it, so the backend answers and stores the turn once.
+        turn_id: crypto.randomUUID(),
       })
       return response.data
     } catch (error) {
@@ -138,6 +141,63 @@ export const chatAPI = {
     }
   },
 
+  /**
+   * Streaming variant of sendMessage via SSE (POST /chat/stream).
+   * Calls onStart({ session_id }) first, onDelta(text) for each chunk of the
+   * reply as Claude produces it, onDone({ session_id, tokens_used, ttft_ms })
+   * once the reply is saved, and onError(detail) on failure.
+   */
+  async sendMessageStream(userId, message, sessionId = null, currentTab = null, { onStart, onDelta, onDone, onError } = {}) {
+    const stored = localStorage.getItem('language')
+    const language = ['en', 'fr', 'zh'].includes(stored) ? stored : 'en'
+    const { data: { session } } = await supabase.auth.getSession()
+    const response = await fetch(`${API_URL}/chat/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        ...(session?.access_token ? { Authorization: `Bearer ${session.access_token}` } : {}),
+      },
+      body: JSON.stringify({
+        user_id: userId,
+        message,
+        session_id: sessionId,
+        current_tab: currentTab,
+        language,
+        turn_id: crypto.randomUUID(),
+      }),
+    })
+    if (!response.ok) {
+      onError?.('Failed to send message')
+      return
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+
+    try {
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+        const lines = buffer.split('\n')
+        buffer = lines.pop() // keep incomplete last line
+        for (const line of lines) {
+          if (!line.startsWith('data: ')) continue
+          try {
+            const event = JSON.parse(line.slice(6))
+            if (event.type === 'start') onStart?.(event)
+            else if (event.type === 'delta') onDelta?.(event.text)
+            else if (event.type === 'done') onDone?.(event)
+            else if (event.type === 'error') onError?.(event.detail)
+          } catch { /* ignore malformed SSE lines */ }
+        }
+      }
+    } finally {
+      reader.releaseLock()
+    }
+  },
+
   async getHistory(userId, sessionId = null, limit = 50) {
     try {
       const params = { limit }
@@ -152,11 +212,14 @@ export const chatAPI = {
     }
   },
 
-  async getSessions(userId, limit = 20) {
+  // Most recent first. Pass the previous page's next_cursor to continue.
+  async getSessions(userId, limit = 20, cursor = null) {
     try {
-      const response = await api.get(`/chat/sessions/${userId}`, {
-        params: { limit }
-      })
+      const params = { limit }
+      if (cursor) {
+        params.cursor = cursor
+      }
+      const response = await api.get(`/chat/sessions/${userId}`, { params })
       return response.data
     } catch (error) {
       console.error('Get sessions error:', error)